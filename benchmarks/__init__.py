@@ -0,0 +1,4 @@
+from .synthetic_data import SyntheticDataset, SIZES, generate_dataset
+from .runner import BENCHMARKS, register_benchmark, run_benchmark, run_benchmarks, compare_results
+from .import_time import IMPORT_TIME_BUDGETS, DEFERRED_MODULES, measure_import_time, check_import_times
+from . import hot_paths
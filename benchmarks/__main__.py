@@ -0,0 +1,119 @@
+from benchmarks import SIZES, BENCHMARKS, generate_dataset, run_benchmarks, compare_results, check_import_times
+
+from pathlib import Path
+import argparse
+import tempfile
+import json
+import sys
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Run the PhanDose benchmarks on synthetic data, and write their results as JSON.",
+        epilog=(
+            "Examples:\n"
+            "  1. Run every benchmark on small synthetic data:\n"
+            "     python -m benchmarks --size small -o results.json\n\n"
+            "  2. Compare a run with a previous one, failing on a regression of more than 20 %:\n"
+            "     python -m benchmarks --size medium -o results.json --baseline results_main.json --threshold 0.2\n\n"
+            "  3. Check the import times of the package and of its entry points against their budgets:\n"
+            "     python -m benchmarks --import_time\n"
+        ),
+        formatter_class=argparse.RawTextHelpFormatter
+    )
+
+    parser.add_argument(
+        '--size', type=str, default="small", choices=list(SIZES),
+        help="Size of the synthetic data. Defaults to small."
+    )
+
+    parser.add_argument(
+        '-b', '--benchmarks', type=str, nargs='+', choices=list(BENCHMARKS),
+        help="Benchmarks to run. Defaults to every benchmark."
+    )
+
+    parser.add_argument(
+        '--repeat', type=int, default=3,
+        help="Number of timed calls of each benchmark. Defaults to 3."
+    )
+
+    parser.add_argument(
+        '--no_memory', action='store_true',
+        help="Don't measure the peak memory of the benchmarks."
+    )
+
+    parser.add_argument(
+        '--dir_data', type=str, required=False,
+        help="Directory of the synthetic data, kept after the run. Defaults to a temporary directory."
+    )
+
+    parser.add_argument(
+        '-o', '--output', type=str, required=False,
+        help="JSON file of the results. Defaults to the standard output."
+    )
+
+    parser.add_argument(
+        '--baseline', type=str, required=False,
+        help="JSON file of the results of a previous run, to compare with. Exits with 1 on a regression."
+    )
+
+    parser.add_argument(
+        '--threshold', type=float, default=0.2,
+        help="Relative increase of the time or of the peak memory considered a regression. Defaults to 0.2."
+    )
+
+    parser.add_argument(
+        '--import_time', action='store_true',
+        help="Only check the import times of the package and of its entry points against their budgets, and that\n"
+             "they don't import the deferred heavy dependencies. Exits with 1 on a failed check."
+    )
+
+    args = parser.parse_args()
+
+    if args.import_time:
+        sys.exit(check_import_time())
+
+    def log_result(name: str, result: dict):
+        if result["status"] == "ok":
+            print(f"{name} : {result['min_s']:.4f} s (min of {result['repeat']})", file=sys.stderr)
+        else:
+            print(f"{name} : {result['status']} ({result['reason']})", file=sys.stderr)
+
+    with tempfile.TemporaryDirectory() as dir_tmp:
+        dataset = generate_dataset(Path(args.dir_data or dir_tmp), size=args.size)
+        results = run_benchmarks(dataset, names=args.benchmarks, repeat=args.repeat, memory=not args.no_memory,
+                                 callback=log_result)
+
+    regressed = False
+    if args.baseline:
+        results["comparison"] = compare_results(results, json.loads(Path(args.baseline).read_text()),
+                                                threshold=args.threshold)
+        for comparison in results["comparison"]:
+            if comparison["regressed"]:
+                regressed = True
+                print(f"Regression of {comparison['name']} : time x{comparison['time_ratio']:.2f}, "
+                      f"memory x{comparison['memory_ratio'] or float('nan'):.2f}", file=sys.stderr)
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2))
+    else:
+        print(json.dumps(results, indent=2))
+
+    sys.exit(1 if regressed else 0)
+
+
+def check_import_time() -> int:
+    """ Check the import times against their budgets, returning the exit code : 1 on a failed check, else 0 """
+
+    list_checks = check_import_times()
+    for check in list_checks:
+        print(f"{check['module']} : {check['import_time_s']:.3f} s (budget {check['budget_s']:.3f} s)"
+              + (f", imports {check['deferred_imported']}" if check["deferred_imported"] else "")
+              + (" FAILED" if check["failed"] else ""), file=sys.stderr)
+
+    print(json.dumps(list_checks, indent=2))
+    return 1 if any(check["failed"] for check in list_checks) else 0
+
+
+if __name__ == "__main__":
+    main()
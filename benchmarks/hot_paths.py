@@ -0,0 +1,70 @@
+""" Benchmarks of the hot paths of the pipeline, on synthetic data """
+
+from .synthetic_data import SyntheticDataset
+from .runner import register_benchmark
+
+from contextlib import contextmanager
+from pathlib import Path
+import pydicom as dcm
+
+
+@register_benchmark("convert_scan_to_dataframe")
+def bench_convert_scan_to_dataframe(dataset: SyntheticDataset):
+    from phandose.conversions import convert_scan_to_dataframe
+
+    dicom_slices = [dcm.dcmread(str(path_dicom)) for path_dicom in dataset.ct_paths]
+    return lambda: convert_scan_to_dataframe(dicom_slices)
+
+
+@register_benchmark("convert_rtdose_to_dataframe")
+def bench_convert_rtdose_to_dataframe(dataset: SyntheticDataset):
+    from phandose.conversions import convert_rtdose_to_dataframe
+
+    return lambda: convert_rtdose_to_dataframe(dataset.path_rtdose)
+
+
+@register_benchmark("convert_nifti_segmentation_directory_to_contours_dataframe")
+def bench_convert_nifti_segmentation_directory(dataset: SyntheticDataset):
+    from phandose.patient.segmentations_to_coordinates import \
+        convert_nifti_segmentation_directory_to_contours_dataframe
+
+    return lambda: convert_nifti_segmentation_directory_to_contours_dataframe(dataset.dir_segmentations)
+
+
+@register_benchmark("PhantomFilter.filter")
+def bench_phantom_filter(dataset: SyntheticDataset):
+    from phandose.phantom_library.filter_phantoms import PhantomFilter
+
+    def filter_phantoms():
+        with phantom_library(dataset.dir_phantom_library):
+            return PhantomFilter(dataset.df_contours, dataset.df_patient_characteristics).filter()
+
+    return filter_phantoms
+
+
+@register_benchmark("calculate_contour_area")
+def bench_calculate_contour_area(dataset: SyntheticDataset):
+    from phandose.patient.patient_contours import calculate_contour_area
+
+    return lambda: calculate_contour_area(dataset.df_contours)
+
+
+@register_benchmark("Patient.from_dir_dicom")
+def bench_patient_from_dir_dicom(dataset: SyntheticDataset):
+    from phandose.patient import Patient
+
+    return lambda: Patient.from_dir_dicom(patient_id=dataset.patient_id, dir_dicom=dataset.dir_patient)
+
+
+@contextmanager
+def phantom_library(dir_phantom_library: Path):
+    """ Use a synthetic phantom library instead of the configured one """
+
+    from phandose import constants
+
+    dir_configured = constants.DIR_PHANTOM_LIBRARY
+    constants.DIR_PHANTOM_LIBRARY = str(dir_phantom_library)
+    try:
+        yield
+    finally:
+        constants.DIR_PHANTOM_LIBRARY = dir_configured
@@ -0,0 +1,89 @@
+""" Import time of the package and of its entry points, measured with ``python -X importtime`` in fresh interpreters """
+
+from pathlib import Path
+import subprocess
+import sys
+
+# The import time budgets (s) of the package and of its entry points, in a fresh interpreter :
+IMPORT_TIME_BUDGETS = {"phandose": 0.05,
+                       "cli.app_mode.__main__": 1.0,
+                       "cli.scripts.separate_modalities": 1.5}
+
+# The heavy dependencies imported on first use, which must not be imported at startup :
+DEFERRED_MODULES = ("dask", "nibabel", "skimage", "cv2", "swifter", "totalsegmentator")
+
+# The root of the repository, from which the modules are imported :
+DIR_ROOT = Path(__file__).resolve().parent.parent
+
+
+def measure_import_time(module_name: str, repeat: int = 3) -> dict:
+    """
+    Measure the import time of a module in fresh interpreters, with ``python -X importtime``.
+
+    Parameters
+    ----------
+    module_name : (str)
+        The name of the module, e.g. "cli.scripts.separate_modalities".
+
+    repeat : (int, Optional)
+        The number of measures, the minimal time being kept, defaults to 3.
+
+    Returns
+    -------
+    dict
+        The name of the module, its import time (s), including that of its dependencies, the modules it imports,
+        and those of them which should be deferred to their first use.
+
+    """
+
+    list_times, set_imported = [], set()
+    for _ in range(repeat):
+        process = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module_name}"],
+                                 cwd=DIR_ROOT, capture_output=True, text=True, check=True)
+
+        # The lines are "import time: self [us] | cumulative | imported package", the module being the last one :
+        for line in process.stderr.splitlines():
+            if not line.startswith("import time:") or "cumulative" in line:
+                continue
+
+            _, cumulative, name = line.split("|")
+            set_imported.add(name.strip())
+            if name.strip() == module_name:
+                list_times.append(int(cumulative) / 1e6)
+
+    return {"module": module_name,
+            "import_time_s": min(list_times),
+            "imported_modules": sorted(set_imported),
+            "deferred_imported": sorted(name for name in set_imported if name.split(".")[0] in DEFERRED_MODULES)}
+
+
+def check_import_times(budgets: dict[str, float] = None, repeat: int = 3) -> list[dict]:
+    """
+    Check the import times of the package and of its entry points against their budgets.
+
+    Parameters
+    ----------
+    budgets : (dict[str, float], Optional)
+        The import time budget (s) of each module, defaults to IMPORT_TIME_BUDGETS.
+
+    repeat : (int, Optional)
+        The number of measures of each module, defaults to 3.
+
+    Returns
+    -------
+    list[dict]
+        For each module : its import time and budget, the deferred modules it imports, and whether it is over
+        budget, or imports a deferred module.
+
+    """
+
+    list_checks = []
+    for module_name, budget in (budgets or IMPORT_TIME_BUDGETS).items():
+        result = measure_import_time(module_name, repeat=repeat)
+        list_checks.append({"module": module_name,
+                            "import_time_s": result["import_time_s"],
+                            "budget_s": budget,
+                            "deferred_imported": result["deferred_imported"],
+                            "failed": result["import_time_s"] > budget or bool(result["deferred_imported"])})
+
+    return list_checks
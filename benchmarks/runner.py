@@ -0,0 +1,196 @@
+""" Timing and memory measurements of the registered benchmarks, and comparison of their results between runs """
+
+from .synthetic_data import SyntheticDataset
+
+from datetime import datetime, timezone
+from typing import Callable
+import statistics
+import tracemalloc
+import platform
+import time
+import sys
+
+# The registered benchmarks : each one prepares its inputs from a synthetic dataset, and returns the call to measure :
+BENCHMARKS: dict[str, Callable[[SyntheticDataset], Callable[[], object]]] = {}
+
+
+def register_benchmark(name: str):
+    """ Register a benchmark : a function preparing its inputs from a SyntheticDataset, returning the call to time """
+
+    def decorator(function: Callable[[SyntheticDataset], Callable[[], object]]):
+        BENCHMARKS[name] = function
+        return function
+
+    return decorator
+
+
+def run_benchmark(name: str, dataset: SyntheticDataset, repeat: int = 3, memory: bool = True) -> dict:
+    """
+    Run a benchmark : measure the wall time of its call, and the peak memory of its Python allocations.
+
+    The peak memory is measured with tracemalloc, on an additional call, so that tracing doesn't slow down the timed
+    calls. Only the allocations of the calling process are traced, not those of the worker processes.
+
+    Parameters
+    ----------
+    name : (str)
+        The name of the benchmark.
+
+    dataset : (SyntheticDataset)
+        The synthetic data of the benchmark.
+
+    repeat : (int, Optional)
+        The number of timed calls, defaults to 3.
+
+    memory : (bool, Optional)
+        Whether to measure the peak memory, defaults to True.
+
+    Returns
+    -------
+    dict
+        The status of the benchmark ("ok", "skipped" if a dependency is missing, or "error"), and its measurements :
+        the times of the calls, their minimum, median and mean, in seconds, and the peak memory, in bytes.
+
+    """
+
+    try:
+        call = BENCHMARKS[name](dataset)
+
+        times = []
+        for _ in range(repeat):
+            start_time = time.perf_counter()
+            call()
+            times.append(time.perf_counter() - start_time)
+
+        result = {"status": "ok",
+                  "repeat": repeat,
+                  "times_s": times,
+                  "min_s": min(times),
+                  "median_s": statistics.median(times),
+                  "mean_s": statistics.fmean(times),
+                  "peak_memory_bytes": None}
+
+        if memory:
+            tracemalloc.start()
+            try:
+                call()
+                result["peak_memory_bytes"] = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+
+        return result
+
+    except ImportError as e:
+        return {"status": "skipped", "reason": f"{type(e).__name__}: {e}"}
+
+    except Exception as e:
+        return {"status": "error", "reason": f"{type(e).__name__}: {e}"}
+
+
+def run_benchmarks(dataset: SyntheticDataset,
+                   names: list[str] = None,
+                   repeat: int = 3,
+                   memory: bool = True,
+                   callback: Callable[[str, dict], None] = None) -> dict:
+    """
+    Run benchmarks on a synthetic dataset.
+
+    Parameters
+    ----------
+    dataset : (SyntheticDataset)
+        The synthetic data of the benchmarks.
+
+    names : (list[str], Optional)
+        The names of the benchmarks to run, defaults to every registered benchmark.
+
+    repeat : (int, Optional)
+        The number of timed calls of each benchmark, defaults to 3.
+
+    memory : (bool, Optional)
+        Whether to measure the peak memory of the benchmarks, defaults to True.
+
+    callback : (Callable[[str, dict], None], Optional)
+        Called with the name and the result of each benchmark, once run.
+
+    Returns
+    -------
+    dict
+        The results : {"environment": {...}, "size": str, "benchmarks": {name: result}}.
+
+    """
+
+    names = list(BENCHMARKS) if names is None else names
+    unknown_names = set(names) - set(BENCHMARKS)
+    if unknown_names:
+        raise ValueError(f"Unknown benchmarks : {sorted(unknown_names)}, must be in {list(BENCHMARKS)} !")
+
+    dict_results = {}
+    for name in names:
+        dict_results[name] = run_benchmark(name, dataset, repeat=repeat, memory=memory)
+        if callback is not None:
+            callback(name, dict_results[name])
+
+    return {"environment": get_environment(), "size": dataset.size, "benchmarks": dict_results}
+
+
+def get_environment() -> dict:
+    """ Get the environment of a run : the date, the platform, and the versions of Python and the main dependencies """
+
+    dict_versions = {}
+    for module_name in ("numpy", "pandas", "pydicom", "nibabel", "dask"):
+        module = sys.modules.get(module_name)
+        dict_versions[module_name] = getattr(module, "__version__", None) if module else None
+
+    return {"date": datetime.now(timezone.utc).isoformat(),
+            "platform": platform.platform(),
+            "processor": platform.processor(),
+            "python": platform.python_version(),
+            "versions": dict_versions}
+
+
+def compare_results(results: dict, baseline: dict, threshold: float = 0.2) -> list[dict]:
+    """
+    Compare the results of a run with those of a baseline run.
+
+    Parameters
+    ----------
+    results : (dict)
+        The results of the run, see run_benchmarks.
+
+    baseline : (dict)
+        The results of the baseline run.
+
+    threshold : (float, Optional)
+        The relative increase of the minimal time, or of the peak memory, above which a benchmark regressed,
+        defaults to 0.2 (20 %).
+
+    Returns
+    -------
+    list[dict]
+        For each benchmark run successfully in both runs : its name, the ratios of its minimal time and of its peak
+        memory to the baseline, and whether it regressed.
+
+    """
+
+    if results.get("size") != baseline.get("size"):
+        raise ValueError(f"Can't compare runs on {results.get('size')} and {baseline.get('size')} synthetic data !")
+
+    list_comparisons = []
+    for name, result in results["benchmarks"].items():
+        result_baseline = baseline.get("benchmarks", {}).get(name)
+        if result["status"] != "ok" or not result_baseline or result_baseline["status"] != "ok":
+            continue
+
+        time_ratio = result["min_s"] / result_baseline["min_s"] if result_baseline["min_s"] else None
+
+        memory_ratio = None
+        if result["peak_memory_bytes"] and result_baseline["peak_memory_bytes"]:
+            memory_ratio = result["peak_memory_bytes"] / result_baseline["peak_memory_bytes"]
+
+        list_comparisons.append({"name": name,
+                                 "time_ratio": time_ratio,
+                                 "memory_ratio": memory_ratio,
+                                 "regressed": any(ratio is not None and ratio > 1 + threshold
+                                                  for ratio in (time_ratio, memory_ratio))})
+
+    return list_comparisons
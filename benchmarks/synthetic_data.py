@@ -0,0 +1,494 @@
+""" Synthetic patient data for the benchmarks : DICOM files, TotalSegmentator-style NIfTI masks and phantoms """
+
+from pydicom.dataset import Dataset, FileMetaDataset
+from pydicom.sequence import Sequence
+from pydicom.uid import ExplicitVRLittleEndian, generate_uid
+from typing import NamedTuple
+from pathlib import Path
+import nibabel as nib
+import pandas as pd
+import numpy as np
+
+SOP_CLASS_UIDS = {"CT": "1.2.840.10008.5.1.4.1.1.2",
+                  "RTDOSE": "1.2.840.10008.5.1.4.1.1.481.2",
+                  "RTSTRUCT": "1.2.840.10008.5.1.4.1.1.481.3"}
+
+# The vertebrae of a full phantom, from the top to the bottom :
+VERTEBRAE = [f"vertebrae {name}" for name in ["C1", "C2", "C3", "C4", "C5", "C6", "C7",
+                                               "T1", "T2", "T3", "T4", "T5", "T6", "T7", "T8", "T9", "T10", "T11",
+                                               "T12", "L1", "L2", "L3", "L4", "L5", "S1"]]
+
+# The sizes of the synthetic data : the CT (rows, columns, slices), the RTDOSE grid (rows, columns, frames),
+# the NIfTI masks (shape, number of masks), the contour points per slice, and the number of phantoms :
+SIZES = {
+    "small": {"ct_shape": (64, 64, 16), "dose_shape": (32, 32, 16), "mask_shape": (64, 64, 16), "n_masks": 4,
+              "n_points": 32, "n_phantoms": 4},
+    "medium": {"ct_shape": (256, 256, 64), "dose_shape": (96, 96, 64), "mask_shape": (128, 128, 64), "n_masks": 12,
+               "n_points": 64, "n_phantoms": 12},
+    "large": {"ct_shape": (512, 512, 160), "dose_shape": (160, 160, 160), "mask_shape": (256, 256, 160),
+              "n_masks": 30, "n_points": 128, "n_phantoms": 40},
+}
+
+
+class SyntheticDataset(NamedTuple):
+    """ The paths and DataFrames of a synthetic patient, and of a synthetic phantom library """
+
+    size: str
+    patient_id: str
+    dir_patient: Path
+    ct_paths: list[Path]
+    path_rtdose: Path
+    path_rtstruct: Path
+    dir_segmentations: Path
+    dir_phantom_library: Path
+    df_contours: pd.DataFrame
+    df_patient_characteristics: pd.DataFrame
+
+
+def make_dataset(modality: str,
+                 sop_instance_uid: str = None,
+                 series_instance_uid: str = None,
+                 study_instance_uid: str = "1.2.826.0.1.3680043.8.498.1",
+                 frame_of_reference_uid: str = "1.2.826.0.1.3680043.8.498.2",
+                 patient_id: str = "SYNTHETIC") -> Dataset:
+    """ Create a DICOM dataset of a modality, with its file meta information and UIDs """
+
+    file_meta = FileMetaDataset()
+    file_meta.MediaStorageSOPClassUID = SOP_CLASS_UIDS[modality]
+    file_meta.MediaStorageSOPInstanceUID = sop_instance_uid or generate_uid()
+    file_meta.TransferSyntaxUID = ExplicitVRLittleEndian
+
+    ds = Dataset()
+    ds.file_meta = file_meta
+    ds.is_little_endian, ds.is_implicit_VR = True, False
+    ds.SOPClassUID = file_meta.MediaStorageSOPClassUID
+    ds.SOPInstanceUID = file_meta.MediaStorageSOPInstanceUID
+    ds.SeriesInstanceUID = series_instance_uid or generate_uid()
+    ds.StudyInstanceUID = study_instance_uid
+    ds.FrameOfReferenceUID = frame_of_reference_uid
+    ds.PatientID = patient_id
+    ds.PatientSex = "M"
+    ds.PatientPosition = "HFS"
+    ds.Modality = modality
+    ds.SeriesDescription = f"synthetic {modality}"
+
+    return ds
+
+
+def write_ct_series(dir_dicom: Path,
+                    shape: tuple[int, int, int],
+                    spacing: tuple[float, float] = (1.0, 1.0),
+                    slice_thickness: float = 2.5,
+                    series_instance_uid: str = None,
+                    **kwargs) -> list[Path]:
+    """
+    Write the slices of a synthetic CT : a water ellipse in air, with a bone disk at its center.
+
+    Parameters
+    ----------
+    dir_dicom : (Path)
+        The directory of the slices.
+
+    shape : (tuple[int, int, int])
+        The number of rows, columns and slices of the CT.
+
+    spacing : (tuple[float, float], Optional)
+        The pixel spacing, in mm, defaults to (1.0, 1.0).
+
+    slice_thickness : (float, Optional)
+        The distance between two slices, in mm, defaults to 2.5.
+
+    series_instance_uid : (str, Optional)
+        The Series Instance UID of the CT, defaults to a new UID.
+
+    **kwargs : (dict)
+        Additional keyword arguments of make_dataset.
+
+    Returns
+    -------
+    list[Path]
+        The paths of the slices, sorted along the z-axis.
+
+    """
+
+    dir_dicom.mkdir(parents=True, exist_ok=True)
+    series_instance_uid = series_instance_uid or generate_uid()
+    n_rows, n_cols, n_slices = shape
+
+    # The same synthetic image on every slice, in Hounsfield units + 1024 :
+    rows, cols = np.ogrid[:n_rows, :n_cols]
+    radius = ((rows - n_rows / 2) / (0.4 * n_rows)) ** 2 + ((cols - n_cols / 2) / (0.45 * n_cols)) ** 2
+    image = np.where(radius <= 1, 1024, 0) + np.where(radius <= 0.05, 700, 0)
+    pixel_data = image.astype(np.int16).tobytes()
+
+    list_paths = []
+    for i in range(n_slices):
+        ds = make_dataset("CT", series_instance_uid=series_instance_uid, **kwargs)
+
+        procedure_code = Dataset()
+        procedure_code.CodeMeaning = "TDM"
+        ds.ProcedureCodeSequence = Sequence([procedure_code])
+
+        ds.InstanceNumber = i + 1
+        ds.ImagePositionPatient = [-n_cols * spacing[1] / 2, -n_rows * spacing[0] / 2, i * slice_thickness]
+        ds.ImageOrientationPatient = [1, 0, 0, 0, 1, 0]
+        ds.PixelSpacing = list(spacing)
+        ds.SliceThickness = slice_thickness
+        ds.Rows, ds.Columns = n_rows, n_cols
+        ds.BitsAllocated, ds.BitsStored, ds.HighBit = 16, 16, 15
+        ds.PixelRepresentation, ds.SamplesPerPixel = 1, 1
+        ds.PhotometricInterpretation = "MONOCHROME2"
+        ds.RescaleSlope, ds.RescaleIntercept = 1, -1024
+        ds.PixelData = pixel_data
+
+        path_dicom = dir_dicom / f"CT_{i + 1:04d}.dcm"
+        ds.save_as(str(path_dicom), write_like_original=False)
+        list_paths.append(path_dicom)
+
+    return list_paths
+
+
+def write_rtdose(path_dicom: Path,
+                 shape: tuple[int, int, int],
+                 spacing: tuple[float, float, float] = (2.5, 2.5, 2.5),
+                 max_dose: float = 60.0,
+                 **kwargs) -> Path:
+    """
+    Write a synthetic multi-frame RTDOSE : a gaussian dose distribution, centered on the grid.
+
+    Parameters
+    ----------
+    path_dicom : (Path)
+        The path of the RTDOSE.
+
+    shape : (tuple[int, int, int])
+        The number of rows, columns and frames of the dose grid.
+
+    spacing : (tuple[float, float, float], Optional)
+        The row, column and frame spacings, in mm, defaults to (2.5, 2.5, 2.5).
+
+    max_dose : (float, Optional)
+        The maximal dose, in Gy, defaults to 60.
+
+    **kwargs : (dict)
+        Additional keyword arguments of make_dataset.
+
+    Returns
+    -------
+    Path
+        The path of the RTDOSE.
+
+    """
+
+    path_dicom.parent.mkdir(parents=True, exist_ok=True)
+    n_rows, n_cols, n_frames = shape
+
+    frames, rows, cols = np.ogrid[:n_frames, :n_rows, :n_cols]
+    dose_grid = max_dose * np.exp(-((frames - n_frames / 2) ** 2 / (0.1 * n_frames ** 2) +
+                                    (rows - n_rows / 2) ** 2 / (0.1 * n_rows ** 2) +
+                                    (cols - n_cols / 2) ** 2 / (0.1 * n_cols ** 2)))
+    dose_grid_scaling = max_dose / (2 ** 32 - 1)
+
+    ds = make_dataset("RTDOSE", **kwargs)
+    ds.DoseSummationType, ds.DoseUnits, ds.DoseType = "PLAN", "GY", "PHYSICAL"
+    ds.DoseGridScaling = dose_grid_scaling
+    ds.ImagePositionPatient = [-n_cols * spacing[1] / 2, -n_rows * spacing[0] / 2, 0.0]
+    ds.ImageOrientationPatient = [1, 0, 0, 0, 1, 0]
+    ds.PixelSpacing = [spacing[0], spacing[1]]
+    ds.SliceThickness = spacing[2]
+    ds.GridFrameOffsetVector = [k * spacing[2] for k in range(n_frames)]
+    ds.Rows, ds.Columns, ds.NumberOfFrames = n_rows, n_cols, n_frames
+    ds.BitsAllocated, ds.BitsStored, ds.HighBit = 32, 32, 31
+    ds.PixelRepresentation, ds.SamplesPerPixel = 0, 1
+    ds.PhotometricInterpretation = "MONOCHROME2"
+    ds.PixelData = np.rint(dose_grid / dose_grid_scaling).astype(np.uint32).tobytes()
+
+    ds.save_as(str(path_dicom), write_like_original=False)
+    return path_dicom
+
+
+def make_contours_dataframe(roi_extents: dict[str, tuple[float, float, float, float]],
+                            n_points: int = 32,
+                            slice_thickness: float = 2.5) -> pd.DataFrame:
+    """
+    Create the DataFrame of synthetic contours : one ellipse per ROI and slice.
+
+    Parameters
+    ----------
+    roi_extents : (dict[str, tuple[float, float, float, float]])
+        The extent of each ROI : its lowest and highest z, and the semi-axes of its ellipse along x and y, in mm.
+
+    n_points : (int, Optional)
+        The number of points of each contour, defaults to 32.
+
+    slice_thickness : (float, Optional)
+        The distance between two slices, in mm, defaults to 2.5.
+
+    Returns
+    -------
+    pd.DataFrame
+        The contours, with columns ['ROIName', 'ROINumber', 'ROIContourNumber', 'ROIContourPointNumber',
+        'x', 'y', 'z'].
+
+    """
+
+    angles = np.linspace(0, 2 * np.pi, n_points, endpoint=False)
+
+    list_df_contours = []
+    for roi_number, (roi_name, (z_min, z_max, a, b)) in enumerate(roi_extents.items(), start=1):
+
+        z = np.arange(z_min, z_max + slice_thickness / 2, slice_thickness)
+        df_roi = pd.DataFrame({"ROIName": roi_name,
+                               "ROINumber": roi_number,
+                               "ROIContourNumber": np.repeat(np.arange(1, len(z) + 1), n_points),
+                               "ROIContourPointNumber": np.tile(np.arange(1, n_points + 1), len(z)),
+                               "x": np.tile(a * np.cos(angles), len(z)),
+                               "y": np.tile(b * np.sin(angles), len(z)),
+                               "z": np.repeat(z, n_points)})
+        list_df_contours.append(df_roi)
+
+    return pd.concat(list_df_contours, ignore_index=True)
+
+
+def get_anatomy_extents(list_vertebrae: list[str],
+                        z_start: float = 0.0,
+                        vertebra_height: float = 10.0,
+                        body_width: float = 150.0,
+                        margin: float = 10.0,
+                        slice_thickness: float = 2.5) -> dict[str, tuple[float, float, float, float]]:
+    """
+    Get the extents of stacked vertebrae, from the top to the bottom, within a body trunc exceeding them.
+
+    The extents are aligned on the slices, so that every vertebra has a body trunc contour on its slices.
+    """
+
+    def align(z: float) -> float:
+        return z_start + slice_thickness * round((z - z_start) / slice_thickness)
+
+    z_max = align(z_start + margin + len(list_vertebrae) * vertebra_height)
+    roi_extents = {"body trunc": (z_start, align(z_max + margin), body_width, 0.7 * body_width)}
+
+    for i, vertebra in enumerate(list_vertebrae):
+        z_top = align(z_max - i * vertebra_height)
+        roi_extents[vertebra] = (align(z_top - vertebra_height) + slice_thickness, z_top, 20.0, 15.0)
+
+    return roi_extents
+
+
+def write_rtstruct(path_dicom: Path, df_contours: pd.DataFrame, referenced_series_instance_uid: str,
+                   **kwargs) -> Path:
+    """
+    Write a synthetic RTSTRUCT of contours, referencing a scan.
+
+    Parameters
+    ----------
+    path_dicom : (Path)
+        The path of the RTSTRUCT.
+
+    df_contours : (pd.DataFrame)
+        The contours, see make_contours_dataframe.
+
+    referenced_series_instance_uid : (str)
+        The Series Instance UID of the scan the contours are drawn on.
+
+    **kwargs : (dict)
+        Additional keyword arguments of make_dataset.
+
+    Returns
+    -------
+    Path
+        The path of the RTSTRUCT.
+
+    """
+
+    path_dicom.parent.mkdir(parents=True, exist_ok=True)
+    ds = make_dataset("RTSTRUCT", **kwargs)
+    ds.StructureSetLabel = "synthetic"
+
+    referenced_series = Dataset()
+    referenced_series.SeriesInstanceUID = referenced_series_instance_uid
+    referenced_study = Dataset()
+    referenced_study.ReferencedSOPInstanceUID = ds.StudyInstanceUID
+    referenced_study.RTReferencedSeriesSequence = Sequence([referenced_series])
+    referenced_frame = Dataset()
+    referenced_frame.FrameOfReferenceUID = ds.FrameOfReferenceUID
+    referenced_frame.RTReferencedStudySequence = Sequence([referenced_study])
+    ds.ReferencedFrameOfReferenceSequence = Sequence([referenced_frame])
+
+    list_rois, list_roi_contours, list_observations = [], [], []
+    for (roi_number, roi_name), df_roi in df_contours.groupby(["ROINumber", "ROIName"], sort=True):
+
+        roi = Dataset()
+        roi.ROINumber, roi.ROIName = int(roi_number), roi_name
+        roi.ReferencedFrameOfReferenceUID = ds.FrameOfReferenceUID
+        roi.ROIGenerationAlgorithm = "AUTOMATIC"
+        list_rois.append(roi)
+
+        list_contours = []
+        for _, df_contour in df_roi.groupby("ROIContourNumber", sort=True):
+            contour = Dataset()
+            contour.ContourGeometricType = "CLOSED_PLANAR"
+            contour.NumberOfContourPoints = len(df_contour)
+            contour.ContourData = [float(value) for value in df_contour[["x", "y", "z"]].to_numpy().ravel()]
+            list_contours.append(contour)
+
+        roi_contour = Dataset()
+        roi_contour.ReferencedROINumber = int(roi_number)
+        roi_contour.ROIDisplayColor = [255, 0, 0]
+        roi_contour.ContourSequence = Sequence(list_contours)
+        list_roi_contours.append(roi_contour)
+
+        observation = Dataset()
+        observation.ObservationNumber = observation.ReferencedROINumber = int(roi_number)
+        observation.RTROIInterpretedType = "ORGAN"
+        list_observations.append(observation)
+
+    ds.StructureSetROISequence = Sequence(list_rois)
+    ds.ROIContourSequence = Sequence(list_roi_contours)
+    ds.RTROIObservationsSequence = Sequence(list_observations)
+
+    ds.save_as(str(path_dicom), write_like_original=False)
+    return path_dicom
+
+
+def write_nifti_masks(dir_segmentations: Path, shape: tuple[int, int, int], n_masks: int,
+                      spacing: float = 1.5) -> list[Path]:
+    """
+    Write synthetic TotalSegmentator-style masks : one ellipsoid per <roi_name>.nii.gz file, spread along z.
+
+    Parameters
+    ----------
+    dir_segmentations : (Path)
+        The directory of the masks.
+
+    shape : (tuple[int, int, int])
+        The shape of the masks.
+
+    n_masks : (int)
+        The number of masks, named after the vertebrae, then "organ_<i>".
+
+    spacing : (float, Optional)
+        The isotropic voxel spacing, in mm, defaults to 1.5.
+
+    Returns
+    -------
+    list[Path]
+        The paths of the masks.
+
+    """
+
+    dir_segmentations.mkdir(parents=True, exist_ok=True)
+    affine = np.diag([-spacing, -spacing, spacing, 1.0])
+
+    i, j, k = np.ogrid[:shape[0], :shape[1], :shape[2]]
+    list_paths = []
+    for index in range(n_masks):
+        roi_name = VERTEBRAE[index] if index < len(VERTEBRAE) else f"organ {index}"
+
+        # Ellipsoids of alternating sizes, along the z-axis :
+        center_k = (index + 0.5) * shape[2] / n_masks
+        radius = ((i - shape[0] / 2) / (0.1 + 0.02 * (index % 4)) / shape[0]) ** 2 + \
+                 ((j - shape[1] / 2) / (0.1 + 0.02 * (index % 3)) / shape[1]) ** 2 + \
+                 ((k - center_k) / max(0.5 * shape[2] / n_masks, 1)) ** 2
+        mask = (radius <= 1).astype(np.uint8)
+
+        path_mask = dir_segmentations / f"{roi_name.replace(' ', '_')}.nii.gz"
+        nib.save(nib.Nifti1Image(mask, affine), path_mask)
+        list_paths.append(path_mask)
+
+    return list_paths
+
+
+def write_phantom_library(dir_phantom_library: Path, n_phantoms: int, n_points: int = 32,
+                          slice_thickness: float = 2.5) -> list[Path]:
+    """
+    Write a synthetic phantom library : the contours of full phantoms, as tab-separated PHANTOM_<position>_<sex>_<i>.txt
+    files, with vertebrae and body sizes varying around those of the synthetic patient.
+
+    Returns
+    -------
+    list[Path]
+        The paths of the phantoms.
+
+    """
+
+    dir_phantom_library.mkdir(parents=True, exist_ok=True)
+
+    list_paths = []
+    for index in range(n_phantoms):
+        scale = 0.9 + 0.2 * index / max(n_phantoms - 1, 1)
+        position, sex = ("HFS", "FFS")[index % 4 == 3], ("M", "F")[index % 2]
+
+        roi_extents = get_anatomy_extents(VERTEBRAE, vertebra_height=10.0 * scale, body_width=150.0 * scale,
+                                          slice_thickness=slice_thickness)
+        df_phantom = make_contours_dataframe(roi_extents, n_points=n_points, slice_thickness=slice_thickness)
+
+        path_phantom = dir_phantom_library / f"PHANTOM_{position}_{sex}_{index:03d}.txt"
+        df_phantom.to_csv(path_phantom, sep="\t", index=False)
+        list_paths.append(path_phantom)
+
+    return list_paths
+
+
+def generate_dataset(dir_output: Path, size: str = "small", patient_id: str = "SYNTHETIC") -> SyntheticDataset:
+    """
+    Generate a synthetic patient (CT, RTDOSE, RTSTRUCT, TotalSegmentator-style masks), and a phantom library.
+
+    Parameters
+    ----------
+    dir_output : (Path)
+        The directory of the generated data.
+
+    size : (str, Optional)
+        The size of the data, one of SIZES : "small", "medium" or "large", defaults to "small".
+
+    patient_id : (str, Optional)
+        The patient ID of the synthetic patient, defaults to "SYNTHETIC".
+
+    Returns
+    -------
+    SyntheticDataset
+        The paths and DataFrames of the synthetic data.
+
+    """
+
+    if size not in SIZES:
+        raise ValueError(f"Invalid size : {size}, must be one of {list(SIZES)} !")
+
+    dict_size = SIZES[size]
+    dir_output = Path(dir_output)
+    dir_patient = dir_output / "dicom" / patient_id
+
+    # The patient : a CT, its dose and its contours, the vertebrae from T1 to L5 being fully within the contours :
+    series_instance_uid = generate_uid()
+    ct_paths = write_ct_series(dir_patient / "CT", shape=dict_size["ct_shape"],
+                               series_instance_uid=series_instance_uid, patient_id=patient_id)
+    path_rtdose = write_rtdose(dir_patient / "RD" / "RTDOSE.dcm", shape=dict_size["dose_shape"],
+                               patient_id=patient_id)
+
+    df_contours = make_contours_dataframe(get_anatomy_extents(VERTEBRAE[7:24]), n_points=dict_size["n_points"])
+    path_rtstruct = write_rtstruct(dir_patient / "RS" / "RTSTRUCT.dcm", df_contours, series_instance_uid,
+                                   patient_id=patient_id)
+
+    df_patient_characteristics = pd.DataFrame([{"Folder": str(dir_patient / "CT"),
+                                                "Type": "CT_TO_TOTALSEGMENTATOR",
+                                                "PatientSex": "M",
+                                                "PatientPosition": "HFS"}])
+
+    # The TotalSegmentator-style masks, and the phantom library :
+    dir_segmentations = dir_output / "segmentations" / patient_id
+    write_nifti_masks(dir_segmentations, shape=dict_size["mask_shape"], n_masks=dict_size["n_masks"])
+
+    dir_phantom_library = dir_output / "phantom_library"
+    write_phantom_library(dir_phantom_library, n_phantoms=dict_size["n_phantoms"], n_points=dict_size["n_points"])
+
+    return SyntheticDataset(size=size,
+                            patient_id=patient_id,
+                            dir_patient=dir_patient,
+                            ct_paths=ct_paths,
+                            path_rtdose=path_rtdose,
+                            path_rtstruct=path_rtstruct,
+                            dir_segmentations=dir_segmentations,
+                            dir_phantom_library=dir_phantom_library,
+                            df_contours=df_contours,
+                            df_patient_characteristics=df_patient_characteristics)
@@ -1,25 +1,126 @@
+from phandose.patient_hub.checkpoint_manifest import CheckpointManifest, DONE, FAILED
 from phandose.patient_hub.storage_handler import LocalStorageHandler
+from phandose.patient_hub.file_transfer import TransferReport
+from phandose.utils.profiling import enable_profiling, format_stats, get_profiler, merge_stats, span
 from phandose.utils import (add_file_handler_to_root,
                             enable_tqdm_logging,
+                            enable_queue_logging,
+                            disable_queue_logging,
+                            init_worker_logging,
                             get_logger)
 from phandose.patient import Patient
 
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from tqdm import tqdm
 from pathlib import Path
 import argparse
 import logging
+import json
 import time
 
 # Initialize the logger for this script
 logger = get_logger("cli.scripts.separate_modalities")
 
+# The checkpoint manifest of the runs, in the output directory :
+MANIFEST_NAME = ".separate_modalities.sqlite"
+
+# The profiling reports of a run, in the profiling directory :
+PROFILE_NAME, TRACE_NAME = "separate_modalities_profile.json", "separate_modalities_trace.json"
+
+# The storage handler of the process, created once per worker process :
+_storage_handler = None
+
+
+def _init_worker(storage_kwargs: dict, log_queue=None, profile_memory: bool | None = None):
+
+    global _storage_handler
+
+    # The worker processes send their records to the handlers of the main process :
+    if log_queue is not None:
+        init_worker_logging(log_queue)
+
+    # Profile the stages of each patient, if enabled :
+    if profile_memory is not None:
+        enable_profiling(memory=profile_memory)
+
+    _storage_handler = LocalStorageHandler(**storage_kwargs)
+
+
+def _close_worker():
+
+    global _storage_handler
+
+    if _storage_handler is not None:
+        _storage_handler.close()
+        _storage_handler = None
+
+
+def process_patient(patient_id: str, dir_input: str | Path) -> tuple[str, str, str | None, dict, float, dict | None]:
+    """
+    Separate the modalities of a patient, and store them with the storage handler of the process.
+
+    A failed patient is removed from the storage, without interrupting the other patients.
+
+    Parameters
+    ----------
+    patient_id : (str)
+        The patient ID of the patient.
+
+    dir_input : (str | Path)
+        Input directory containing the DICOM files.
+
+    Returns
+    -------
+    tuple[str, str, str | None, dict, float, dict | None]
+        The patient ID, its status ("done" or "failed"), the error of a failed patient, the transfer report of the
+        patient as a dictionary, the processing time in seconds, and the profiled stages of the patient if the
+        profiling is enabled (see Profiler.collect).
+
+    """
+
+    start_time = time.perf_counter()
+
+    with span("patient", patient_id=patient_id):
+        try:
+            # Create the Patient object, for the given patient ID, and the patient's DICOM directory :
+            logger.info(f"Processing patient ID: {patient_id} ...")
+            patient = Patient.from_dir_dicom(patient_id=patient_id, dir_dicom=Path(dir_input) / patient_id)
+
+            # Store the Patient object in the LocalStorageHandler :
+            report = _storage_handler.save_patient(patient=patient)
+
+            logger.info(f"patient ID {patient_id} successfully processed !")
+            status, error, dict_report = DONE, None, report.to_dict()
+
+        except Exception as e:
+            # Remove the patient from the storage handler if an error occurs, and log the error message :
+            logger.error(f"Failed to process patient ID : {patient_id} ! Error : {e}")
+
+            try:
+                _storage_handler.delete_patient(patient_id=patient_id)
+            except Exception as e_delete:
+                logger.error(f"Failed to remove patient ID : {patient_id} from the storage ! Error : {e_delete}")
+
+            status, error, dict_report = FAILED, str(e), {}
+
+    profile = get_profiler().collect(reset=True) if get_profiler().enabled else None
+
+    return patient_id, status, error, dict_report, time.perf_counter() - start_time, profile
+
 
 def separate_modalities(list_patients: list[str],
                         dir_input: str | Path,
                         dir_output: str | Path,
                         verbose: bool = False,
                         log_level: str = "DEBUG",
-                        dir_log: str | Path = None):
+                        dir_log: str | Path = None,
+                        transfer_mode: str = "copy",
+                        verify: str = "mtime",
+                        deduplicate: bool = False,
+                        workers: int = 1,
+                        resume: bool = False,
+                        dir_profile: str | Path = None,
+                        profile_memory: bool = False) -> dict[str, int]:
 
     """
     Separate modalities for a list of patients and store them in the output directory.
@@ -44,6 +145,36 @@ def separate_modalities(list_patients: list[str],
     dir_log : (str | Path, Optional)
         Directory for per-run log files, by default dir_output.
 
+    transfer_mode : (str, Optional)
+        How the files are transferred into the patient hub : "copy" or "hardlink", by default "copy".
+
+    verify : (str, Optional)
+        How a file already in the patient hub is recognized as identical, and skipped : "size", "mtime" or
+        "checksum", by default "mtime".
+
+    deduplicate : (bool, Optional)
+        Store each distinct DICOM file once in the patient hub, the patients' files being hard links to it,
+        by default False.
+
+    workers : (int, Optional)
+        The number of worker processes, each processing one patient at a time, by default 1 (in-process).
+
+    resume : (bool, Optional)
+        Skip the patients completed by previous runs, recorded in the checkpoint manifest of the output directory,
+        by default False (a new run, forgetting the previous ones).
+
+    dir_profile : (str | Path, Optional)
+        Profile the stages of each patient, logging their wall time, and writing the statistics of the run per
+        patient and the Chrome trace of the stages in this directory, by default None (no profiling).
+
+    profile_memory : (bool, Optional)
+        Also measure the peak memory of the stages with tracemalloc, slowing down the run, by default False.
+
+    Returns
+    -------
+    dict[str, int]
+        The number of patients done, failed and skipped.
+
     """
 
     # Initialize the logger :
@@ -59,43 +190,131 @@ def separate_modalities(list_patients: list[str],
     # Enable TQDM-compatible logging
     enable_tqdm_logging()
 
+    # Emit the records of the main and the worker processes from a background thread :
+    log_queue = enable_queue_logging()
+
     logger.info("Running PhanDose separate_modalities script ...")
 
-    # Initialize the LocalStorageHandler object :
-    storage_handler = LocalStorageHandler(dir_storage=Path(dir_output))
+    # Open the checkpoint manifest, and skip the patients already completed when resuming :
+    manifest = CheckpointManifest(Path(dir_output) / MANIFEST_NAME)
+    if not resume:
+        manifest.reset()
+
+    list_pending = manifest.get_pending_patients(list_patients)
+    dict_counts = {DONE: 0, FAILED: 0, "skipped": len(list_patients) - len(list_pending)}
+    if dict_counts["skipped"]:
+        logger.info(f"Resuming : {dict_counts['skipped']} patients already completed are skipped")
+
+    # The storage handler of each process :
+    storage_kwargs = {"dir_storage": Path(dir_output),
+                      "transfer_mode": transfer_mode,
+                      "verify": verify,
+                      "deduplicate": deduplicate}
+
+    # The profiling of each process, if enabled :
+    profile_memory = profile_memory if dir_profile else None
 
-    # Iterate over the list of patients :
+    # Record the patients as they complete, and aggregate their progress, transfers and profiled stages :
     start_time = time.time()
-    progress_bar = tqdm(total=len(list_patients), desc="Starting...", ncols=100)
-    for patient_id in list_patients:
+    report = TransferReport()
+    dict_profile_stats, list_trace_events = {}, []
+    progress_bar = tqdm(total=len(list_patients), initial=dict_counts["skipped"], desc="Starting...", ncols=100)
+
+    def on_patient_processed(patient_id: str,
+                             status: str,
+                             error: str | None,
+                             dict_report: dict,
+                             elapsed: float,
+                             profile: dict | None):
+
+        manifest.record(patient_id=patient_id, status=status, error=error, elapsed=elapsed)
+        report.update(TransferReport.from_dict(dict_report))
+        dict_counts[status] += 1
+
+        if profile is not None:
+            dict_profile_stats[patient_id] = profile["stats"]
+            list_trace_events.extend(profile["events"])
+            logger.info(format_stats(profile["stats"], title=f"Stages of patient ID {patient_id}"))
+
+        if status == FAILED:
+            tqdm.write(f"Failed to process patient ID : {patient_id} ! Error : {error}")
+
+        progress_bar.set_description(f"patient ID {patient_id} {status}")
+        progress_bar.set_postfix(done=dict_counts[DONE], failed=dict_counts[FAILED])
+        progress_bar.update(1)
 
-        try:
-            # Create the Patient object, for the given patient ID, and the patient's DICOM directory :
-            msg = f"Processing patient ID: {patient_id} ..."
-            logger.info(msg), progress_bar.set_description(msg)
-            patient = Patient.from_dir_dicom(patient_id=patient_id, dir_dicom=Path(dir_input) / patient_id)
+    try:
+        if workers <= 1:
+            _init_worker(storage_kwargs, profile_memory=profile_memory)
+            try:
+                for patient_id in list_pending:
+                    progress_bar.set_description(f"Processing patient ID: {patient_id} ...")
+                    on_patient_processed(*process_patient(patient_id, dir_input))
+            finally:
+                _close_worker()
+
+        else:
+            with ProcessPoolExecutor(max_workers=workers,
+                                     initializer=_init_worker,
+                                     initargs=(storage_kwargs, log_queue, profile_memory)) as executor:
+
+                list_futures = [executor.submit(process_patient, patient_id, dir_input) for patient_id in list_pending]
+                try:
+                    for future in as_completed(list_futures):
+                        on_patient_processed(*future.result())
+
+                except BaseException:
+                    # Don't start the remaining patients, those completed are in the manifest for --resume :
+                    executor.shutdown(cancel_futures=True)
+                    raise
+
+    finally:
+        progress_bar.close()
+        manifest.close()
+        disable_queue_logging()
+
+        if dir_profile:
+            write_profile(Path(dir_profile), dict_profile_stats, list_trace_events)
+
+    logger.info(f"Patient hub transfer : {report}")
+    logger.info(f"Patients : {dict_counts[DONE]} done, {dict_counts[FAILED]} failed, "
+                f"{dict_counts['skipped']} skipped (already completed)")
+    logger.info("Completed the separate_modalities process in {:.2f} seconds.".format(time.time() - start_time))
 
-            # Store the Patient object in the LocalStorageHandler :
-            storage_handler.save_patient(patient=patient)
+    return dict_counts
 
-            # Log the success message :
-            msg = f"patient ID {patient_id} successfully processed !"
-            logger.info(msg), progress_bar.set_description(msg)
-            time.sleep(1)
 
-        except ValueError as e:
-            # Remove the patient from the storage handler if an error occurs, and log the error message :
-            msg = f"Failed to process patient ID : {patient_id} ! Error : {e}"
-            tqdm.write(msg), logger.error(msg)
-            time.sleep(2)
+def write_profile(dir_profile: Path, dict_profile_stats: dict[str, dict], list_trace_events: list[dict]):
+    """
+    Log the profiled stages of a run, and write them in the profiling directory.
 
-            storage_handler.delete_patient(patient_id=patient_id)
+    Parameters
+    ----------
+    dir_profile : (Path)
+        The profiling directory.
 
-        # Update the progress bar
-        progress_bar.update(1)
+    dict_profile_stats : (dict[str, dict])
+        The statistics of the profiled stages of each patient, by patient ID.
 
-    progress_bar.close()
-    logger.info("Completed the separate_modalities process in {:.2f} seconds.".format(time.time() - start_time))
+    list_trace_events : (list[dict])
+        The profiled stages of every patient, as Chrome trace events.
+
+    """
+
+    dict_stats = {}
+    for patient_stats in dict_profile_stats.values():
+        merge_stats(dict_stats, patient_stats)
+
+    logger.info(format_stats(dict_stats, title=f"Stages of the {len(dict_profile_stats)} patients"))
+
+    dir_profile.mkdir(parents=True, exist_ok=True)
+    with open(dir_profile / PROFILE_NAME, "w") as f:
+        json.dump({"stats": dict_stats, "patients": dict_profile_stats}, f, indent=1)
+
+    with open(dir_profile / TRACE_NAME, "w") as f:
+        json.dump({"traceEvents": list_trace_events, "displayTimeUnit": "ms"}, f, default=str)
+
+    logger.info(f"Profiling reports written to : {dir_profile}")
 
 
 def main():
@@ -115,7 +334,12 @@ def main():
             "  2. Process patients listed in a file:\n"
             "     phandose_separate_modalities -i /data/dicom -o /data/output -pf patients.txt\n\n"
             "  3. Enable verbose logging with INFO level:\n"
-            "     phandose_separate_modalities -i /data/dicom -o /data/output -p 123 456 --verbose --log_level INFO\n"
+            "     phandose_separate_modalities -i /data/dicom -o /data/output -p 123 456 --verbose --log_level INFO\n\n"
+            "  4. Process a cohort with 8 worker processes, resuming an interrupted run:\n"
+            "     phandose_separate_modalities -i /data/dicom -o /data/output -pf patients.txt --workers 8 --resume\n\n"
+            "  5. Profile the wall time and the peak memory of the stages of each patient:\n"
+            "     phandose_separate_modalities -i /data/dicom -o /data/output -p 123 --profile /data/profile "
+            "--profile_memory\n"
         ),
 
         formatter_class=argparse.RawTextHelpFormatter
@@ -162,6 +386,41 @@ def main():
         help="Directory to store per-run log files. Defaults to the value of --dir_output."
     )
 
+    parser.add_argument(
+        '--transfer_mode', type=str, default="copy", choices=["copy", "hardlink"],
+        help="How the files are transferred into the patient hub. Defaults to copy."
+    )
+
+    parser.add_argument(
+        '--verify', type=str, default="mtime", choices=["size", "mtime", "checksum"],
+        help="How a file already in the patient hub is recognized as identical, and skipped. Defaults to mtime."
+    )
+
+    parser.add_argument(
+        '--deduplicate', action='store_true',
+        help="Store each distinct DICOM file once in the patient hub, the patients' files being hard links to it."
+    )
+
+    parser.add_argument(
+        '--workers', type=int, default=1,
+        help="Number of worker processes, each processing one patient at a time. Defaults to 1."
+    )
+
+    parser.add_argument(
+        '--resume', action='store_true',
+        help="Skip the patients completed by previous runs, recorded in the checkpoint manifest of --dir_output."
+    )
+
+    parser.add_argument(
+        '--profile', type=str, required=False, dest='dir_profile',
+        help="Profile the stages of each patient, writing the statistics and the Chrome trace in this directory."
+    )
+
+    parser.add_argument(
+        '--profile_memory', action='store_true',
+        help="Also measure the peak memory of the profiled stages, with tracemalloc, slowing down the run."
+    )
+
     args = parser.parse_args()
 
     if not args.patients and not args.patients_file:
@@ -178,7 +437,14 @@ def main():
                         dir_output=args.dir_output,
                         verbose=args.verbose,
                         log_level=args.log_level,
-                        dir_log=args.dir_log)
+                        dir_log=args.dir_log,
+                        transfer_mode=args.transfer_mode,
+                        verify=args.verify,
+                        deduplicate=args.deduplicate,
+                        workers=args.workers,
+                        resume=args.resume,
+                        dir_profile=args.dir_profile,
+                        profile_memory=args.profile_memory)
 
 
 if __name__ == "__main__":
@@ -4,6 +4,8 @@ import platform
 __all__ = [
     "DIR_PHANTOM_LIBRARY",
     "DIR_PATIENT_HUB",
+    "DIR_DICOM_INDEX",
+    "DIR_SEGMENTATION_CACHE",
     "DIR_LOGS"
 ]
 
@@ -15,4 +17,13 @@ DIR_PATIENT_HUB_LINUX = "/home/maichi/.PhanDose/PatientHub"
 DIR_PATIENT_HUB_WINDOWS = fr"D:/PhanDose/PatientHub"
 DIR_PATIENT_HUB = DIR_PATIENT_HUB_LINUX if platform.system() == "Linux" else DIR_PATIENT_HUB_WINDOWS
 
+DIR_DICOM_INDEX_LINUX = "/home/maichi/.PhanDose/DicomIndex"
+DIR_DICOM_INDEX_WINDOWS = fr"D:/PhanDose/DicomIndex"
+DIR_DICOM_INDEX = DIR_DICOM_INDEX_LINUX if platform.system() == "Linux" else DIR_DICOM_INDEX_WINDOWS
+
+DIR_SEGMENTATION_CACHE_LINUX = "/home/maichi/.PhanDose/SegmentationCache"
+DIR_SEGMENTATION_CACHE_WINDOWS = fr"D:/PhanDose/SegmentationCache"
+DIR_SEGMENTATION_CACHE = DIR_SEGMENTATION_CACHE_LINUX if platform.system() == "Linux" \
+    else DIR_SEGMENTATION_CACHE_WINDOWS
+
 DIR_LOGS = str(Path(__file__).parent.parent / "logs")
@@ -1,10 +1,16 @@
+from phandose.utils.profiling import profiled
+from phandose.dose import RtdoseGrid
 from phandose import exceptions
 
-import nibabel as nib
+from typing import TYPE_CHECKING
+from pathlib import Path
 import pydicom as dcm
 import pandas as pd
 import numpy as np
 
+if TYPE_CHECKING:
+    import nibabel as nib
+
 
 def compute_orientation(image_orientation):
     """
@@ -35,58 +41,40 @@ def compute_orientation(image_orientation):
     return orientation
 
 
-def extract_dose_grid(rtdose: dcm.dataset.Dataset) -> np.ndarray:
+def extract_dose_grid(rtdose: dcm.dataset.Dataset | Path | RtdoseGrid) -> np.ndarray:
 
-    # Extract the dose grid and apply scaling :
-    dose_grid = rtdose.pixel_array.astype(np.float32)
-    try:
-        dose_grid *= rtdose.DoseGridScaling
-    except AttributeError as e:
-        raise exceptions.DicomMetadataError("Missing DoseScaling attribute !") from e
+    # Decode the dose grid frame by frame, applying the scaling to each frame :
+    dose_grid = rtdose if isinstance(rtdose, RtdoseGrid) else RtdoseGrid(rtdose)
+    return dose_grid.to_array()
 
-    return dose_grid
 
+@profiled
+def convert_rtdose_to_nifti(rtdose: dcm.dataset.Dataset | Path | RtdoseGrid) -> 'nib.Nifti1Image':
 
-def convert_rtdose_to_nifti(rtdose: dcm.dataset.Dataset) -> nib.Nifti1Image:
-
-    # Extract the dose grid :
-    dose_grid = extract_dose_grid(rtdose)
+    import nibabel as nib
 
-    # Transpose the dose grid to match the NIfTI convention :
-    dose_grid = dose_grid.transpose(1, 0, 2)
-
-    # Extract spatial metadata :
-    try:
-        pixel_spacing = rtdose.PixelSpacing
-        slice_thickness = rtdose.SliceThickness
-        origin = np.array(rtdose.ImagePositionPatient)
-        image_orientation = np.array(rtdose.ImageOrientationPatient).reshape(2, 3)
-
-    except AttributeError as e:
-        raise exceptions.DicomMetadataError("Missing spatial metadata !") from e
-
-    # Compute the orientation matrix :
-    orientation = compute_orientation(image_orientation)
+    dose_grid = rtdose if isinstance(rtdose, RtdoseGrid) else RtdoseGrid(rtdose)
 
-    # construct the transformation matrix :
-    affine = np.eye(4)
-    affine[:3, :3] = orientation * np.array(pixel_spacing + [slice_thickness])
-    affine[:3, 3] = origin
+    # The (col, row, frame) dose grid, as a proxy on the memory-mapped file or a view on the decoded grid :
+    dataobj = dose_grid.nifti_dataobj()
 
-    return nib.Nifti1Image(dose_grid, affine)
+    return nib.Nifti1Image(dataobj, dose_grid.geometry().nifti_affine)
 
 
-def convert_rtdose_to_dataframe(rtdose: dcm.dataset.Dataset) -> pd.DataFrame:
+@profiled
+def convert_rtdose_to_dataframe(rtdose: dcm.dataset.Dataset | Path | RtdoseGrid) -> pd.DataFrame:
 
     # Extract the dose grid :
-    dose_grid = extract_dose_grid(rtdose)
+    rtdose_grid = rtdose if isinstance(rtdose, RtdoseGrid) else RtdoseGrid(rtdose)
+    dose_grid = extract_dose_grid(rtdose_grid)
+    rtdose = rtdose_grid.header
 
     # Extract spatial metadata :
     try:
         pixel_spacing = rtdose.PixelSpacing
         slice_thickness = rtdose.SliceThickness
         origin = np.array(rtdose.ImagePositionPatient)
-        image_orientation = np.array(rtdose.ImageOrientationPatient).reshape(2, 3)
+        image_orientation = list(rtdose.ImageOrientationPatient)
 
     except AttributeError as e:
         raise exceptions.DicomMetadataError("Missing spatial metadata !") from e
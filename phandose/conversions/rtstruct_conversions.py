@@ -1,12 +1,15 @@
 from phandose import exceptions
 
-import nibabel as nib
+from typing import TYPE_CHECKING
 import pydicom as dcm
 import pandas as pd
 import numpy as np
 
+if TYPE_CHECKING:
+    import nibabel as nib
 
-def convert_rtstruct_to_nifti(rtstruct: dcm.dataset.Dataset) -> nib.Nifti1Image:
+
+def convert_rtstruct_to_nifti(rtstruct: dcm.dataset.Dataset) -> 'nib.Nifti1Image':
     pass
 
 
@@ -1,18 +1,20 @@
+from phandose.utils.profiling import profiled
 from phandose import exceptions
 
-import nibabel as nib
-from typing import Iterable
-import dask.dataframe as dd
-from dask import delayed
+from typing import Iterable, TYPE_CHECKING
 import pydicom as dcm
 import pandas as pd
 import numpy as np
 
+if TYPE_CHECKING:
+    import nibabel as nib
 
-def convert_scan_to_nifti(dicom_slices: Iterable[dcm.dataset.FileDataset]) -> nib.Nifti1Image:
+
+def convert_scan_to_nifti(dicom_slices: Iterable[dcm.dataset.FileDataset]) -> 'nib.Nifti1Image':
     pass
 
 
+@profiled
 def convert_scan_to_dataframe(dicom_slices: Iterable[dcm.dataset.FileDataset]) -> pd.DataFrame:
     """
     Converts an iterable of DICOM slices to a DataFrame with coordinates and intensity values.
@@ -28,6 +30,11 @@ def convert_scan_to_dataframe(dicom_slices: Iterable[dcm.dataset.FileDataset]) -
         DataFrame with columns ['x', 'y', 'z', 'intensity'], where each row represents a voxel
         with its 3D coordinates and intensity value.
     """
+
+    # Dask is imported on first use, its import being slower than most conversions :
+    import dask.dataframe as dd
+    from dask import delayed
+
     @delayed
     def compute_voxel_coords(n_rows, n_cols, spacing):
 
@@ -0,0 +1,3 @@
+from .dose_geometry import DoseGridGeometry, get_resampling_weights
+from .rtdose_grid import RtdoseGrid
+from .dose_accumulator import DoseAccumulator, sum_doses
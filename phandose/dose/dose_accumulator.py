@@ -0,0 +1,313 @@
+from phandose.utils import get_logger
+from .dose_geometry import DoseGridGeometry, get_resampling_weights
+from .rtdose_grid import RtdoseGrid
+
+from pydicom.uid import generate_uid, ExplicitVRLittleEndian
+from typing import Iterable, TYPE_CHECKING
+from pathlib import Path
+import pydicom as dcm
+import numpy as np
+import copy
+
+# Initialize the logger :
+logger = get_logger("phandose.dose.dose_accumulator")
+
+if TYPE_CHECKING:
+    from phandose.modalities import RtdoseModality
+    import nibabel as nib
+
+# The RTDOSE inputs accepted by the accumulator :
+RtdoseSource = 'RtdoseModality | RtdoseGrid | dcm.dataset.Dataset | Path | str'
+
+
+class DoseAccumulator:
+    """
+    Sums RTDOSE grids (per-beam, per-phase or per-fraction doses) onto a common grid.
+
+    Each dose is resampled with trilinear weights, cached per pair of grids, and accumulated in place into a single
+    float32 grid, one target frame at a time : only the accumulated grid and at most two frames of the dose being
+    added are held in memory, the frames being decoded on demand by RtdoseGrid.
+
+    Attributes
+    ----------
+    _geometry : (DoseGridGeometry)
+        The geometry of the common grid, that of the first added dose if not given.
+
+    _dose : (np.ndarray)
+        The accumulated dose (Gy), of shape (n_frames, n_rows, n_cols).
+
+    _header : (dcm.dataset.Dataset)
+        The header (without pixel data) of the first added dose, used as a template by to_rtdose.
+
+    _n_doses : (int)
+        The number of doses added so far.
+
+    """
+
+    def __init__(self, geometry: DoseGridGeometry = None):
+        """
+        Initialize an empty dose accumulator.
+
+        Parameters
+        ----------
+        geometry : (DoseGridGeometry, Optional)
+            The geometry of the common grid, defaults to the geometry of the first added dose.
+
+        """
+
+        self._geometry = geometry
+        self._dose = None if geometry is None else np.zeros(geometry.shape, dtype=np.float32)
+        self._header = None
+        self._n_doses = 0
+
+    @property
+    def geometry(self) -> DoseGridGeometry | None:
+        return self._geometry
+
+    @property
+    def dose(self) -> np.ndarray | None:
+        return self._dose
+
+    @property
+    def n_doses(self) -> int:
+        return self._n_doses
+
+    def add(self, rtdose: RtdoseSource, weight: float = 1.0) -> 'DoseAccumulator':
+        """
+        Resample a dose onto the common grid and add it to the accumulated dose.
+
+        Parameters
+        ----------
+        rtdose : (RtdoseModality | RtdoseGrid | dcm.dataset.Dataset | Path | str)
+            The dose to add : an RTDOSE modality, grid, dataset or file.
+
+        weight : (float, Optional)
+            The weight of the dose, e.g. a number of fractions, defaults to 1.
+
+        Returns
+        -------
+        DoseAccumulator
+            The accumulator itself, to chain the additions.
+
+        Raises
+        ------
+        DicomMetadataError
+            If the dose misses its DoseGridScaling or spatial metadata, or isn't oriented like the common grid.
+
+        """
+
+        dose_grid = _open_dose_grid(rtdose)
+        geometry = dose_grid.geometry()
+
+        if self._geometry is None:
+            self._geometry = geometry
+            self._dose = np.zeros(geometry.shape, dtype=np.float32)
+
+        if self._header is None:
+            self._header = _copy_header(dose_grid.header)
+
+        weight = np.float32(weight)
+        if geometry == self._geometry:
+            self._add_frames(dose_grid, weight)
+        else:
+            self._add_resampled_frames(dose_grid, geometry, weight)
+
+        self._n_doses += 1
+        logger.debug("Added %s (%d doses accumulated)", dose_grid, self._n_doses)
+
+        return self
+
+    def _add_frames(self, dose_grid: RtdoseGrid, weight: np.float32):
+
+        for k, frame in enumerate(dose_grid):
+            if weight != 1:
+                frame *= weight
+            self._dose[k] += frame
+
+    def _add_resampled_frames(self, dose_grid: RtdoseGrid, geometry: DoseGridGeometry, weight: np.float32):
+
+        frame_weights, row_weights, col_weights = get_resampling_weights(geometry, self._geometry)
+
+        # Keep the last decoded source frames, as consecutive target frames share their source frames :
+        decoded_frames = {}
+
+        def get_frame(index: int) -> np.ndarray:
+            if index not in decoded_frames:
+                if len(decoded_frames) >= 2:
+                    decoded_frames.pop(next(iter(decoded_frames)))
+                decoded_frames[index] = dose_grid.frame(index)
+            return decoded_frames[index]
+
+        for k in np.flatnonzero(frame_weights.valid):
+
+            # Interpolate along the frames, then the rows, then the columns :
+            frame = get_frame(frame_weights.i0[k]) * (frame_weights.w0[k] * weight)
+            if frame_weights.w1[k]:
+                frame += get_frame(frame_weights.i1[k]) * (frame_weights.w1[k] * weight)
+
+            frame = frame[row_weights.i0] * row_weights.w0[:, None] + frame[row_weights.i1] * row_weights.w1[:, None]
+            frame = frame[:, col_weights.i0] * col_weights.w0 + frame[:, col_weights.i1] * col_weights.w1
+
+            self._dose[k] += frame
+
+    def add_all(self, list_rtdoses: Iterable[RtdoseSource], weights: Iterable[float] = None) -> 'DoseAccumulator':
+        """ Add several doses, one after the other, with their weights (defaults to 1) """
+
+        list_rtdoses = list(list_rtdoses)
+        weights = [1.0] * len(list_rtdoses) if weights is None else list(weights)
+
+        if len(weights) != len(list_rtdoses):
+            raise ValueError("There must be as many weights as doses !")
+
+        for rtdose, weight in zip(list_rtdoses, weights):
+            self.add(rtdose, weight)
+
+        return self
+
+    def _check_not_empty(self):
+        if self._n_doses == 0:
+            raise ValueError("No dose was added to the accumulator !")
+
+    def to_rtdose(self, summation_type: str = "MULTI_PLAN", path_output: Path = None) -> dcm.dataset.FileDataset:
+        """
+        Encode the accumulated dose as a new RTDOSE, based on the header of the first added dose.
+
+        Parameters
+        ----------
+        summation_type : (str, Optional)
+            The DoseSummationType of the new RTDOSE, defaults to "MULTI_PLAN".
+
+        path_output : (Path, Optional)
+            The path to save the new RTDOSE to, if given.
+
+        Returns
+        -------
+        dcm.dataset.FileDataset
+            The new RTDOSE, with a new SOPInstanceUID and the dose encoded as uint32.
+
+        """
+
+        self._check_not_empty()
+
+        rtdose = copy.deepcopy(self._header)
+        geometry = self._geometry
+
+        # Identify the new RTDOSE :
+        rtdose.SOPInstanceUID = generate_uid()
+        rtdose.file_meta.MediaStorageSOPInstanceUID = rtdose.SOPInstanceUID
+        rtdose.file_meta.TransferSyntaxUID = ExplicitVRLittleEndian
+        rtdose.DoseSummationType = summation_type
+
+        # Geometry of the common grid :
+        rtdose.ImagePositionPatient = list(geometry.origin)
+        rtdose.ImageOrientationPatient = list(geometry.orientation)
+        rtdose.PixelSpacing = [geometry.row_spacing, geometry.col_spacing]
+        rtdose.Rows, rtdose.Columns = geometry.rows, geometry.cols
+        rtdose.NumberOfFrames = len(geometry.frame_offsets)
+        rtdose.GridFrameOffsetVector = [offset - geometry.frame_offsets[0] for offset in geometry.frame_offsets]
+
+        # Encode the dose, frame by frame to avoid a float64 copy of the grid :
+        max_dose = float(self._dose.max())
+        scaling = max_dose / np.iinfo(np.uint32).max if max_dose > 0 else 1.0
+
+        pixel_array = np.empty(self._dose.shape, dtype=np.uint32)
+        for k, frame in enumerate(self._dose):
+            pixel_array[k] = np.clip(np.rint(frame / scaling), 0, np.iinfo(np.uint32).max)
+
+        rtdose.DoseGridScaling = scaling
+        rtdose.DoseUnits = "GY"
+        rtdose.SamplesPerPixel = 1
+        rtdose.PhotometricInterpretation = "MONOCHROME2"
+        rtdose.BitsAllocated, rtdose.BitsStored, rtdose.HighBit = 32, 32, 31
+        rtdose.PixelRepresentation = 0
+        rtdose.PixelData = pixel_array.tobytes()
+        rtdose["PixelData"].VR = "OW"
+
+        if path_output is not None:
+            rtdose.save_as(str(path_output), write_like_original=False)
+
+        return rtdose
+
+    def to_nifti(self, path_output: Path = None) -> 'nib.Nifti1Image':
+        """
+        Get the accumulated dose as a NIfTI image, with a RAS affine and no copy of the dose grid.
+
+        Parameters
+        ----------
+        path_output : (Path, Optional)
+            The path to save the NIfTI image to, if given.
+
+        Returns
+        -------
+        nib.Nifti1Image
+            The accumulated dose (Gy), indexed by (col, row, frame).
+
+        """
+
+        import nibabel as nib
+
+        self._check_not_empty()
+
+        nifti = nib.Nifti1Image(self._dose.transpose(2, 1, 0), self._geometry.nifti_affine)
+
+        if path_output is not None:
+            nib.save(nifti, str(path_output))
+
+        return nifti
+
+    def __str__(self):
+        shape = None if self._geometry is None else self._geometry.shape
+        return f"DoseAccumulator: {self._n_doses} doses - shape: {shape}"
+
+    __repr__ = __str__
+
+
+def sum_doses(list_rtdoses: Iterable[RtdoseSource],
+              weights: Iterable[float] = None,
+              geometry: DoseGridGeometry = None) -> DoseAccumulator:
+    """
+    Sum RTDOSE grids onto a common grid.
+
+    Parameters
+    ----------
+    list_rtdoses : (Iterable[RtdoseModality | RtdoseGrid | dcm.dataset.Dataset | Path | str])
+        The doses to sum.
+
+    weights : (Iterable[float], Optional)
+        The weight of each dose, defaults to 1.
+
+    geometry : (DoseGridGeometry, Optional)
+        The geometry of the common grid, defaults to the geometry of the first dose.
+
+    Returns
+    -------
+    DoseAccumulator
+        The accumulator holding the summed dose, see DoseAccumulator.to_rtdose and DoseAccumulator.to_nifti.
+
+    """
+
+    return DoseAccumulator(geometry).add_all(list_rtdoses, weights)
+
+
+def _open_dose_grid(rtdose: RtdoseSource) -> RtdoseGrid:
+
+    if isinstance(rtdose, RtdoseGrid):
+        return rtdose
+
+    # Open the file of a modality directly, so that the modality doesn't keep the full dataset cached :
+    if hasattr(rtdose, "path_dicom"):
+        rtdose = rtdose.path_dicom
+
+    return RtdoseGrid(rtdose)
+
+
+def _copy_header(rtdose: dcm.dataset.Dataset) -> dcm.dataset.FileDataset:
+
+    file_meta = copy.deepcopy(getattr(rtdose, "file_meta", dcm.dataset.FileMetaDataset()))
+    header = dcm.dataset.FileDataset(None, {}, file_meta=file_meta, preamble=b"\0" * 128)
+    # The pixel data is skipped by its tag, before its element is accessed, which would read it if it is deferred :
+    for tag in rtdose.keys():
+        if tag != dcm.tag.Tag("PixelData"):
+            header.add(copy.deepcopy(rtdose[tag]))
+
+    return header
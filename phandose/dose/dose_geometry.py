@@ -0,0 +1,199 @@
+from phandose import exceptions
+
+from functools import lru_cache
+from typing import NamedTuple
+import pydicom as dcm
+import numpy as np
+
+
+class DoseGridGeometry(NamedTuple):
+    """
+    The geometry of an RTDOSE grid, hashable so that resampling weights can be cached per pair of grids.
+
+    Attributes
+    ----------
+    origin : (tuple[float, float, float])
+        The ImagePositionPatient of the first voxel of the first frame.
+
+    orientation : (tuple[float, ...])
+        The ImageOrientationPatient (6 elements) of the frames.
+
+    row_spacing : (float)
+        The spacing (mm) between two rows, PixelSpacing[0].
+
+    col_spacing : (float)
+        The spacing (mm) between two columns, PixelSpacing[1].
+
+    frame_offsets : (tuple[float, ...])
+        The offsets (mm) of the frames along the normal of the frames, relative to the origin.
+
+    rows : (int)
+        The number of rows of a frame.
+
+    cols : (int)
+        The number of columns of a frame.
+    """
+
+    origin: tuple[float, float, float]
+    orientation: tuple[float, ...]
+    row_spacing: float
+    col_spacing: float
+    frame_offsets: tuple[float, ...]
+    rows: int
+    cols: int
+
+    @property
+    def shape(self) -> tuple[int, int, int]:
+        return len(self.frame_offsets), self.rows, self.cols
+
+    @property
+    def rotation(self) -> np.ndarray:
+        """ The (3, 3) matrix whose rows are the row direction, the column direction and the normal of the frames """
+
+        x_vector, y_vector = np.array(self.orientation, dtype=float).reshape(2, 3)
+        return np.array([x_vector, y_vector, np.cross(x_vector, y_vector)])
+
+    @property
+    def affine(self) -> np.ndarray:
+        """ The (4, 4) affine mapping the (col, row, frame) indices to the patient coordinates (DICOM LPS, mm) """
+
+        frame_spacing = self.frame_offsets[1] - self.frame_offsets[0] if len(self.frame_offsets) > 1 else 1.0
+
+        affine = np.eye(4)
+        affine[:3, :3] = self.rotation.T * np.array([self.col_spacing, self.row_spacing, frame_spacing])
+        affine[:3, 3] = np.array(self.origin) + self.rotation[2] * self.frame_offsets[0]
+
+        return affine
+
+    @property
+    def nifti_affine(self) -> np.ndarray:
+        """ The affine of the (col, row, frame) indices in NIfTI's RAS coordinates, instead of DICOM's LPS ones """
+
+        return np.diag([-1.0, -1.0, 1.0, 1.0]) @ self.affine
+
+    @classmethod
+    def from_dataset(cls, rtdose: dcm.dataset.Dataset) -> 'DoseGridGeometry':
+        """
+        Get the geometry of an RTDOSE dataset.
+
+        Parameters
+        ----------
+        rtdose : (dcm.dataset.Dataset)
+            The RTDOSE dataset, or its header.
+
+        Returns
+        -------
+        DoseGridGeometry
+            The geometry of the dose grid.
+
+        Raises
+        ------
+        DicomMetadataError
+            If the spatial metadata of the dose grid is missing.
+
+        """
+
+        try:
+            origin = tuple(float(value) for value in rtdose.ImagePositionPatient)
+            orientation = tuple(float(value) for value in rtdose.ImageOrientationPatient)
+            row_spacing, col_spacing = (float(value) for value in rtdose.PixelSpacing)
+            rows, cols = int(rtdose.Rows), int(rtdose.Columns)
+            n_frames = int(rtdose.get("NumberOfFrames", 1) or 1)
+            frame_offsets = np.array(rtdose.get("GridFrameOffsetVector", None) or [0.0] * n_frames, dtype=float)
+
+        except (AttributeError, TypeError, ValueError) as e:
+            raise exceptions.DicomMetadataError("Missing spatial metadata !") from e
+
+        if len(origin) != 3 or len(orientation) != 6 or len(frame_offsets) != n_frames:
+            raise exceptions.DicomMetadataError("Invalid spatial metadata !")
+
+        # Offsets whose first value isn't 0 are absolute positions along the normal of the frames :
+        if frame_offsets[0] != 0:
+            normal = np.cross(*np.array(orientation).reshape(2, 3))
+            frame_offsets = frame_offsets - float(np.dot(origin, normal))
+
+        return cls(origin=origin,
+                   orientation=orientation,
+                   row_spacing=row_spacing,
+                   col_spacing=col_spacing,
+                   frame_offsets=tuple(frame_offsets.tolist()),
+                   rows=rows,
+                   cols=cols)
+
+
+class AxisWeights(NamedTuple):
+    """ Linear interpolation weights along one axis : value = w0 * source[i0] + w1 * source[i1] """
+
+    i0: np.ndarray
+    i1: np.ndarray
+    w0: np.ndarray
+    w1: np.ndarray
+    valid: np.ndarray
+
+
+@lru_cache(maxsize=128)
+def get_resampling_weights(source: DoseGridGeometry,
+                           target: DoseGridGeometry) -> tuple[AxisWeights, AxisWeights, AxisWeights]:
+    """
+    Get the trilinear weights resampling a dose grid onto another one with the same orientation.
+
+    The weights are separable, one set per axis (frames, rows, columns), and cached for each pair of grids.
+    The target voxels outside the source grid get null weights.
+
+    Parameters
+    ----------
+    source : (DoseGridGeometry)
+        The geometry of the resampled grid.
+
+    target : (DoseGridGeometry)
+        The geometry of the common grid.
+
+    Returns
+    -------
+    tuple[AxisWeights, AxisWeights, AxisWeights]
+        The weights along the frames, the rows and the columns of the target grid.
+
+    Raises
+    ------
+    DicomMetadataError
+        If the two grids don't have the same orientation.
+
+    """
+
+    if not np.allclose(source.orientation, target.orientation, atol=1e-4):
+        raise exceptions.DicomMetadataError("Can't resample dose grids with different orientations !")
+
+    # Positions of the source voxels, in the target's frame of reference :
+    shift = target.rotation @ (np.array(source.origin) - np.array(target.origin))
+
+    return (_get_axis_weights(np.array(target.frame_offsets), shift[2] + np.array(source.frame_offsets)),
+            _get_axis_weights(np.arange(target.rows) * target.row_spacing,
+                              shift[1] + np.arange(source.rows) * source.row_spacing),
+            _get_axis_weights(np.arange(target.cols) * target.col_spacing,
+                              shift[0] + np.arange(source.cols) * source.col_spacing))
+
+
+def _get_axis_weights(target_positions: np.ndarray, source_positions: np.ndarray, tolerance: float = 1e-3):
+
+    order = np.argsort(source_positions, kind="stable")
+    sorted_positions = source_positions[order]
+
+    if len(sorted_positions) == 1:
+        valid = np.abs(target_positions - sorted_positions[0]) <= tolerance
+        upper = np.zeros(len(target_positions), dtype=int)
+        lower, fraction = upper, np.zeros(len(target_positions))
+
+    else:
+        valid = ((target_positions >= sorted_positions[0] - tolerance) &
+                 (target_positions <= sorted_positions[-1] + tolerance))
+        upper = np.clip(np.searchsorted(sorted_positions, target_positions, side="right"), 1,
+                        len(sorted_positions) - 1)
+        lower = upper - 1
+        fraction = np.clip((target_positions - sorted_positions[lower]) /
+                           (sorted_positions[upper] - sorted_positions[lower]), 0, 1)
+
+    return AxisWeights(i0=order[lower],
+                       i1=order[upper],
+                       w0=((1 - fraction) * valid).astype(np.float32),
+                       w1=(fraction * valid).astype(np.float32),
+                       valid=valid)
@@ -0,0 +1,237 @@
+from phandose import exceptions
+from .dose_geometry import DoseGridGeometry
+
+from pydicom.encaps import generate_pixel_data_frame, encapsulate
+from pydicom.uid import ImplicitVRLittleEndian, ExplicitVRBigEndian
+from pydicom.tag import Tag
+from typing import TYPE_CHECKING
+from pathlib import Path
+import pydicom as dcm
+import numpy as np
+
+if TYPE_CHECKING:
+    import nibabel as nib
+
+# Elements larger than this size are not read with the header, the pixel data being memory-mapped or read on access :
+HEADER_DEFER_SIZE = "64 KB"
+
+# The attributes describing the encoding of the pixel data :
+PIXEL_KEYWORDS = ["Rows", "Columns", "BitsAllocated", "BitsStored", "HighBit", "PixelRepresentation",
+                  "SamplesPerPixel", "PhotometricInterpretation"]
+
+
+class RtdoseGrid:
+    """
+    Lazy accessor to the dose grid of an RTDOSE, decoding its frames on demand.
+
+    Uncompressed pixel data is memory-mapped from the file (or viewed in place from an in-memory dataset), and
+    compressed pixel data is decoded one frame at a time. The DoseGridScaling is applied to each frame on access,
+    so that the full grid is never decoded nor copied as a whole.
+
+    Attributes
+    ----------
+    _header : (dcm.dataset.Dataset)
+        The RTDOSE dataset, its pixel data being deferred when it is read from a file.
+
+    _path_dicom : (Path)
+        The path of the RTDOSE file, None for an in-memory dataset.
+
+    _stored_frames : (np.ndarray)
+        The stored (unscaled) frames, of shape (n_frames, n_rows, n_cols), memory-mapped or viewed in place.
+        None for compressed pixel data.
+
+    _encoded_frames : (list[bytes])
+        The encoded frames of compressed pixel data, None for uncompressed pixel data.
+
+    """
+
+    def __init__(self, rtdose: dcm.dataset.Dataset | Path | str):
+        """
+        Open the dose grid of an RTDOSE.
+
+        Parameters
+        ----------
+        rtdose : (dcm.dataset.Dataset | Path | str)
+            The RTDOSE dataset, or the path of the RTDOSE file.
+
+        Raises
+        ------
+        DicomMetadataError
+            If the RTDOSE doesn't have any pixel data, or misses its DoseGridScaling.
+
+        """
+
+        if isinstance(rtdose, (str, Path)):
+            self._path_dicom = Path(rtdose)
+            self._header = dcm.dcmread(str(rtdose), defer_size=HEADER_DEFER_SIZE)
+        else:
+            self._path_dicom = None
+            self._header = rtdose
+
+        self._stored_frames = None
+        self._encoded_frames = None
+
+        if "PixelData" not in self._header:
+            raise exceptions.DicomMetadataError("The RTDOSE doesn't have any pixel data !")
+
+        # The position of the pixel data in the file, kept by the raw element until it is converted. The element is
+        # taken from the dataset's dictionary, since get_item reads the deferred value, and loses its position :
+        self._pixel_data_offset = getattr(self._header._dict.get(Tag("PixelData")), "value_tell", None)
+
+        try:
+            self._scaling = np.float32(self._header.DoseGridScaling)
+        except AttributeError as e:
+            raise exceptions.DicomMetadataError("Missing DoseScaling attribute !") from e
+
+        self._transfer_syntax = getattr(getattr(self._header, "file_meta", None), "TransferSyntaxUID", None)
+        self._transfer_syntax = self._transfer_syntax or ImplicitVRLittleEndian
+
+    @property
+    def header(self) -> dcm.dataset.Dataset:
+        return self._header
+
+    @property
+    def path_dicom(self) -> Path | None:
+        return self._path_dicom
+
+    @property
+    def scaling(self) -> np.float32:
+        return self._scaling
+
+    @property
+    def shape(self) -> tuple[int, int, int]:
+        return int(self._header.get("NumberOfFrames", 1) or 1), int(self._header.Rows), int(self._header.Columns)
+
+    @property
+    def stored_dtype(self) -> np.dtype:
+        """ The dtype of the stored pixel values, with the byte order of the transfer syntax """
+
+        kind = "i" if self._header.get("PixelRepresentation", 0) else "u"
+        byte_order = ">" if self._transfer_syntax == ExplicitVRBigEndian else "<"
+
+        return np.dtype(f"{byte_order}{kind}{int(self._header.BitsAllocated) // 8}")
+
+    @property
+    def is_compressed(self) -> bool:
+        return self._transfer_syntax.is_compressed
+
+    @property
+    def is_memory_mapped(self) -> bool:
+        """ Whether the pixel data can be memory-mapped from the file : uncompressed and stored uncompressed """
+
+        return (self._path_dicom is not None and self._pixel_data_offset is not None and not self.is_compressed and
+                not self._transfer_syntax.is_deflated and int(self._header.BitsAllocated) in (8, 16, 32, 64))
+
+    def geometry(self) -> DoseGridGeometry:
+        return DoseGridGeometry.from_dataset(self._header)
+
+    def stored_frames(self) -> np.ndarray | None:
+        """ The stored (unscaled) frames, memory-mapped or viewed in place, None for compressed pixel data """
+
+        if self._stored_frames is None and not self.is_compressed:
+
+            if self.is_memory_mapped:
+                self._stored_frames = np.memmap(self._path_dicom, dtype=self.stored_dtype, mode="r",
+                                                offset=self._pixel_data_offset, shape=self.shape)
+
+            elif int(self._header.BitsAllocated) in (8, 16, 32, 64):
+                self._stored_frames = np.frombuffer(self._header.PixelData, dtype=self.stored_dtype,
+                                                    count=int(np.prod(self.shape))).reshape(self.shape)
+            else:
+                self._stored_frames = self._header.pixel_array.reshape(self.shape)
+
+        return self._stored_frames
+
+    def frame(self, index: int, dtype=np.float32) -> np.ndarray:
+        """
+        Decode a frame of the dose grid, and apply the DoseGridScaling.
+
+        Parameters
+        ----------
+        index : (int)
+            The index of the frame.
+
+        dtype : (np.dtype, Optional)
+            The dtype of the decoded frame, defaults to np.float32.
+
+        Returns
+        -------
+        np.ndarray
+            The dose (Gy) of the frame, of shape (n_rows, n_cols).
+
+        """
+
+        stored_frames = self.stored_frames()
+        stored_frame = self._decode_frame(index) if stored_frames is None else stored_frames[index]
+
+        frame = stored_frame.astype(dtype)
+        frame *= self._scaling
+
+        return frame
+
+    def _decode_frame(self, index: int) -> np.ndarray:
+
+        n_frames = self.shape[0]
+        if self._encoded_frames is None:
+            self._encoded_frames = list(generate_pixel_data_frame(self._header.PixelData, n_frames))
+
+        # Decode the frame alone, through a single-frame dataset :
+        frame_dataset = dcm.dataset.Dataset()
+        frame_dataset.file_meta = dcm.dataset.FileMetaDataset()
+        frame_dataset.file_meta.TransferSyntaxUID = self._transfer_syntax
+        frame_dataset.is_little_endian, frame_dataset.is_implicit_VR = True, False
+
+        for keyword in PIXEL_KEYWORDS:
+            if keyword in self._header:
+                setattr(frame_dataset, keyword, self._header[keyword].value)
+
+        frame_dataset.NumberOfFrames = 1
+        frame_dataset.PixelData = encapsulate([self._encoded_frames[index]])
+        frame_dataset["PixelData"].is_undefined_length = True
+
+        return frame_dataset.pixel_array
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self.frame(index)
+
+    def to_array(self, dtype=np.float32) -> np.ndarray:
+        """ Decode the whole dose grid (Gy), frame by frame into a single array of shape (n_frames, n_rows, n_cols) """
+
+        dose_grid = np.empty(self.shape, dtype=dtype)
+        for index in range(len(self)):
+            dose_grid[index] = self.frame(index, dtype=dtype)
+
+        return dose_grid
+
+    def nifti_dataobj(self) -> 'nib.arrayproxy.ArrayProxy | np.ndarray':
+        """
+        Get the dose grid (Gy) indexed by (col, row, frame), without copying it.
+
+        The stored frames are laid out as (frame, row, col) in C order, which is (col, row, frame) in Fortran order :
+        a memory-mapped grid is read through a nibabel proxy scaled by DoseGridScaling, and a decoded grid is
+        transposed as a view.
+
+        Returns
+        -------
+        nib.arrayproxy.ArrayProxy | np.ndarray
+            The data object of a NIfTI image of the dose grid.
+
+        """
+
+        if self.is_memory_mapped:
+            import nibabel as nib
+            return nib.arrayproxy.ArrayProxy(str(self._path_dicom),
+                                             (self.shape[::-1], self.stored_dtype, self._pixel_data_offset,
+                                              float(self._scaling), 0.0),
+                                             order="F")
+
+        return self.to_array().transpose(2, 1, 0)
+
+    def __str__(self):
+        return f"RtdoseGrid: {self._header.get('SOPInstanceUID', '')} - shape: {self.shape}"
+
+    __repr__ = __str__
@@ -0,0 +1,12 @@
+from .junction_smoother import JunctionSmoother, PolarProfile
+from .contour_resampler import resample_contours_z
+from .scan_junction import ScanJunction
+from .scan_extension_director import ScanExtensionDirector
+
+
+__all__ = ["JunctionSmoother",
+           "PolarProfile",
+           "resample_contours_z",
+           "ScanJunction",
+           "ScanExtensionDirector",
+           ]
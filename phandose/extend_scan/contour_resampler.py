@@ -0,0 +1,133 @@
+from statistics import mode
+import pandas as pd
+import numpy as np
+
+
+def get_resampling_z_step(df_contours: pd.DataFrame, min_z_step: float = 5) -> float:
+    """
+    Get the z-step used to resample the merged patient + phantom contours.
+
+    The z-step is the most common spacing between two consecutive slices, rounded to the nearest integer,
+    and at least `min_z_step`.
+
+    Parameters
+    ----------
+    df_contours : (pd.DataFrame)
+        The contours DataFrame, with at least the column 'z'.
+
+    min_z_step : (float, Optional)
+        The minimal z-step (mm), defaults to 5.
+
+    Returns
+    -------
+    float
+        The z-step (mm).
+
+    """
+
+    list_z = np.unique(df_contours["z"].to_numpy(dtype=float))
+
+    if len(list_z) < 2:
+        return min_z_step
+
+    return max(min_z_step, round(mode(np.diff(list_z).tolist())))
+
+
+def resample_contours_z(df_contours: pd.DataFrame, z_step: float = None) -> pd.DataFrame:
+    """
+    Resample the merged patient + phantom contours on a regular grid along the z-axis.
+
+    The regular grid goes from the lowest to the highest slice of the contours (excluded), with a spacing of `z_step`.
+    For each ROI and each section, every z of the grid lying within the ROI's z-range is mapped to the
+    nearest slice of the ROI (the lowest one in case of a tie), whose contours are copied at that z.
+
+    The ROIs are renumbered from 1 in alphabetical order, and the contours are renumbered from 1 within each
+    resampled slice, in the order of their original contour numbers.
+
+    Parameters
+    ----------
+    df_contours : (pd.DataFrame)
+        The contours DataFrame, without missing values, with at least the columns :
+        ['Section', 'ROIName', 'ROINumber', 'ROIContourNumber', 'ROIContourPointNumber', 'x', 'y', 'z']
+
+    z_step : (float, Optional)
+        The spacing (mm) of the regular z grid, defaults to the value of `get_resampling_z_step`.
+
+    Returns
+    -------
+    pd.DataFrame
+        The resampled contours DataFrame, with the same columns as the input DataFrame,
+        sorted by ROIName, Section, z, ROIContourNumber, ROIContourPointNumber, x and y.
+
+    """
+
+    columns = df_contours.columns.tolist()
+    if df_contours.empty:
+        return df_contours.copy().reset_index(drop=True)
+
+    if z_step is None:
+        z_step = get_resampling_z_step(df_contours)
+
+    z = df_contours["z"].to_numpy(dtype=float)
+    z_expected = np.arange(z.min(), z.max(), z_step, dtype=float)
+
+    # Encode each (ROI, section) pair as an integer group, in sorted order :
+    roi_codes, _ = pd.factorize(df_contours["ROIName"], sort=True)
+    section_codes, sections = pd.factorize(df_contours["Section"], sort=True)
+    group = roi_codes.astype(np.int64) * len(sections) + section_codes
+
+    # Sort the rows once, by group, z, contour, point, x and y :
+    order = np.lexsort((df_contours["y"].to_numpy(),
+                        df_contours["x"].to_numpy(),
+                        df_contours["ROIContourPointNumber"].to_numpy(),
+                        df_contours["ROIContourNumber"].to_numpy(),
+                        z,
+                        group))
+    df_sorted = df_contours.iloc[order].reset_index(drop=True)
+    group, z = group[order], z[order]
+
+    # Boundaries of the source slices (rows sharing the same group and z) :
+    slice_start = np.flatnonzero(np.r_[True, (group[1:] != group[:-1]) | (z[1:] != z[:-1])])
+    slice_end = np.r_[slice_start[1:], len(df_sorted)]
+    slice_group, slice_z = group[slice_start], z[slice_start]
+
+    # Boundaries of the groups, in the source slices :
+    group_start = np.flatnonzero(np.r_[True, slice_group[1:] != slice_group[:-1]])
+    group_end = np.r_[group_start[1:], len(slice_start)]
+
+    # Expected z values within the z-range of each group :
+    lo = np.searchsorted(z_expected, slice_z[group_start], side="left")
+    hi = np.searchsorted(z_expected, slice_z[group_end - 1], side="right")
+    n_targets = hi - lo
+
+    target_group_idx = np.repeat(np.arange(len(group_start)), n_targets)
+    target_z = z_expected[np.repeat(lo, n_targets) + np.arange(n_targets.sum()) -
+                          np.repeat(np.cumsum(n_targets) - n_targets, n_targets)]
+
+    # Map every target z to the nearest source slice of its group, with integer composite keys (group, rank of z) :
+    z_union, z_rank = np.unique(np.concatenate([slice_z, target_z]), return_inverse=True)
+    slice_key = slice_group * len(z_union) + z_rank[:len(slice_z)]
+    target_key = slice_group[group_start][target_group_idx] * len(z_union) + z_rank[len(slice_z):]
+
+    upper = np.searchsorted(slice_key, target_key, side="left")
+    lower = np.maximum(upper - 1, group_start[target_group_idx])
+    use_lower = (slice_z[upper] != target_z) & ((target_z - slice_z[lower]) <= (slice_z[upper] - target_z))
+    target_slice = np.where(use_lower, lower, upper)
+
+    # Gather the rows of the selected slices, with one fancy-index operation :
+    counts = slice_end[target_slice] - slice_start[target_slice]
+    row_idx = (np.repeat(slice_start[target_slice], counts) + np.arange(counts.sum()) -
+               np.repeat(np.cumsum(counts) - counts, counts))
+
+    df_resampled = df_sorted.iloc[row_idx].reset_index(drop=True)
+    df_resampled["z"] = np.repeat(target_z, counts)
+    df_resampled["ROINumber"] = np.repeat(slice_group[target_slice] // len(sections) + 1, counts)
+
+    # Renumber the contours from 1 within each resampled slice :
+    target_id = np.repeat(np.arange(len(target_z)), counts)
+    contour_id = df_resampled.groupby([target_id, df_resampled["ROIContourNumber"].to_numpy()],
+                                      sort=False).ngroup().to_numpy()
+    first_contour_id = contour_id[np.cumsum(counts) - counts]
+    df_resampled["ROIContourNumber"] = contour_id - np.repeat(first_contour_id, counts) + 1
+
+    return df_resampled[columns]
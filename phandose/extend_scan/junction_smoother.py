@@ -0,0 +1,415 @@
+import pandas as pd
+import numpy as np
+
+
+class PolarProfile:
+    """
+    Radius of a closed contour as a function of its polar angle around a center point.
+
+    The profile replaces the per-row `interp1d(kind='slinear', fill_value='extrapolate')` calls of the
+    original extension script : it is evaluated on whole arrays of angles at once, it only holds plain
+    numpy arrays (so it is cheap to pickle and to send to worker processes), and it is read-only.
+
+    Attributes
+    ----------
+    _theta : (np.ndarray)
+        The sorted, unique polar angles of the contour points, in radians.
+
+    _r : (np.ndarray)
+        The radius of the contour at each angle of `_theta`.
+
+    _periodic : (bool)
+        If True, the profile is interpolated on a periodic angle axis (period 2π), otherwise angles outside
+        the range of `_theta` are linearly extrapolated from the first and last segments, as in the script.
+
+    """
+
+    def __init__(self, theta, r, periodic: bool = False):
+        """
+        Initializes the polar profile from the polar coordinates of the contour points.
+
+        Parameters
+        ----------
+        theta : (array-like)
+            The polar angles of the contour points, in radians.
+
+        r : (array-like)
+            The radius of the contour points.
+
+        periodic : (bool, Optional)
+            Whether to interpolate on a periodic angle axis, defaults to False.
+
+        Raises
+        ------
+        ValueError
+            If the profile has less than two distinct angles.
+
+        """
+
+        theta = np.asarray(theta, dtype=float).ravel()
+        r = np.asarray(r, dtype=float).ravel()
+
+        if theta.shape != r.shape:
+            raise ValueError("theta and r must have the same number of points !")
+
+        # Keep the last radius of each duplicated angle (as drop_duplicates(keep='last')), sorted by angle :
+        _, idx_unique = np.unique(theta[::-1], return_index=True)
+        theta, r = theta[::-1][idx_unique], r[::-1][idx_unique]
+
+        if len(theta) < 2:
+            raise ValueError("A polar profile needs at least two distinct angles !")
+
+        theta.flags.writeable = False
+        r.flags.writeable = False
+
+        self._theta = theta
+        self._r = r
+        self._periodic = periodic
+
+    @classmethod
+    def from_contour(cls, x, y, center_x: float, center_y: float, periodic: bool = False) -> 'PolarProfile':
+        """
+        Creates the polar profile of a contour given by its cartesian coordinates.
+
+        Parameters
+        ----------
+        x, y : (array-like)
+            The cartesian coordinates of the contour points.
+
+        center_x, center_y : (float)
+            The coordinates of the center of the polar coordinates.
+
+        periodic : (bool, Optional)
+            Whether to interpolate on a periodic angle axis, defaults to False.
+
+        Returns
+        -------
+        PolarProfile
+            The polar profile of the contour.
+
+        """
+
+        r, theta = cartesian_to_polar_coordinates(x, y, center_x, center_y)
+        return cls(theta, r, periodic=periodic)
+
+    @property
+    def theta(self) -> np.ndarray:
+        return self._theta
+
+    @property
+    def r(self) -> np.ndarray:
+        return self._r
+
+    @property
+    def periodic(self) -> bool:
+        return self._periodic
+
+    def __call__(self, theta) -> np.ndarray:
+        """
+        Evaluates the radius of the contour at the given angles.
+
+        Parameters
+        ----------
+        theta : (array-like)
+            The polar angles, in radians.
+
+        Returns
+        -------
+        np.ndarray
+            The interpolated radius at each angle.
+
+        """
+
+        theta = np.asarray(theta, dtype=float)
+
+        if self._periodic:
+            return np.interp(theta, self._theta, self._r, period=2 * np.pi)
+
+        r = np.interp(theta, self._theta, self._r)
+
+        # Linear extrapolation outside the angle range, from the first and last segments :
+        below, above = theta < self._theta[0], theta > self._theta[-1]
+        if below.any():
+            slope = (self._r[1] - self._r[0]) / (self._theta[1] - self._theta[0])
+            r[below] = self._r[0] + slope * (theta[below] - self._theta[0])
+
+        if above.any():
+            slope = (self._r[-1] - self._r[-2]) / (self._theta[-1] - self._theta[-2])
+            r[above] = self._r[-1] + slope * (theta[above] - self._theta[-1])
+
+        return r
+
+    def __reduce__(self):
+        return self.__class__, (self._theta, self._r, self._periodic)
+
+
+def cartesian_to_polar_coordinates(x, y, center_x: float, center_y: float) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Convert cartesian coordinates to polar coordinates, around a center point.
+
+    Parameters
+    ----------
+    x, y : (array-like)
+        The cartesian coordinates of the points.
+
+    center_x, center_y : (float)
+        The coordinates of the center point.
+
+    Returns
+    -------
+    tuple[np.ndarray, np.ndarray]
+        The radius and the angle (in radians) of each point.
+
+    """
+
+    complex_format = (np.asarray(x, dtype=float) - center_x) + 1j * (np.asarray(y, dtype=float) - center_y)
+    return np.abs(complex_format), np.angle(complex_format, deg=False)
+
+
+class JunctionSmoother:
+    """
+    Blend the phantom's 'body trunc' into the patient's body, at the junction between the patient and the phantom.
+
+    The phantom section (top or bottom) is first warped with the homography mapping the phantom's junction
+    rectangle onto the patient's one, then the phantom's body contours lying between the patient's junction
+    slice and the smoothing slice (at `smooth_length` mm from the junction) are replaced by a weighted blend
+    of the patient's junction profile and the phantom's profile at the smoothing slice.
+
+    All the computations are done with array operations over the whole section.
+
+    Attributes
+    ----------
+    _junction_profile : (PolarProfile)
+        The polar profile of the patient's body contour at the junction slice.
+
+    _center_x, _center_y : (float)
+        The center of the polar coordinates, i.e. the center of the patient's junction contour.
+
+    _junction_z : (float)
+        The z-coordinate of the patient's junction slice.
+
+    _smooth_length : (float)
+        The distance (mm) along z over which the phantom's body is blended into the patient's body.
+
+    _side : (str)
+        The side of the extension, either 'top' or 'bottom'.
+
+    """
+
+    # ROIs warped by the homography, for each side of the extension (None means every ROI) :
+    WARPED_ROIS = {"top": ("body trunc",), "bottom": None}
+
+    # Default smoothing lengths (mm) for each side of the extension :
+    SMOOTH_LENGTHS = {"top": 20, "bottom": 50}
+
+    def __init__(self,
+                 junction_profile: PolarProfile,
+                 center_x: float,
+                 center_y: float,
+                 junction_z: float,
+                 smooth_length: float = None,
+                 side: str = "top"):
+        """
+        Initializes the junction smoother.
+
+        Parameters
+        ----------
+        junction_profile : (PolarProfile)
+            The polar profile of the patient's body contour at the junction slice.
+
+        center_x, center_y : (float)
+            The center of the polar coordinates, i.e. the center of the patient's junction contour.
+
+        junction_z : (float)
+            The z-coordinate of the patient's junction slice.
+
+        smooth_length : (float, Optional)
+            The smoothing length (mm), defaults to 20 for the top extension and 50 for the bottom one.
+
+        side : (str, Optional)
+            The side of the extension, either 'top' or 'bottom', defaults to 'top'.
+
+        """
+
+        if side not in self.SMOOTH_LENGTHS:
+            raise ValueError(f"Invalid side '{side}', expected one of : {', '.join(self.SMOOTH_LENGTHS)}")
+
+        self._junction_profile = junction_profile
+        self._center_x = center_x
+        self._center_y = center_y
+        self._junction_z = junction_z
+        self._smooth_length = smooth_length if smooth_length is not None else self.SMOOTH_LENGTHS[side]
+        self._side = side
+
+    @property
+    def junction_profile(self) -> PolarProfile:
+        return self._junction_profile
+
+    @property
+    def junction_z(self) -> float:
+        return self._junction_z
+
+    @property
+    def smooth_length(self) -> float:
+        return self._smooth_length
+
+    @property
+    def side(self) -> str:
+        return self._side
+
+    @staticmethod
+    def compute_homography(rectangle_src: np.ndarray, rectangle_dst: np.ndarray) -> np.ndarray:
+        """
+        Computes the homography mapping the phantom's junction rectangle onto the patient's junction rectangle.
+
+        Parameters
+        ----------
+        rectangle_src : (np.ndarray)
+            The (4, 2) corners of the phantom's junction rectangle.
+
+        rectangle_dst : (np.ndarray)
+            The (4, 2) corners of the patient's junction rectangle.
+
+        Returns
+        -------
+        np.ndarray
+            The (3, 3) homography matrix.
+
+        """
+
+        import cv2
+
+        homography, _ = cv2.findHomography(np.asarray(rectangle_src), np.asarray(rectangle_dst))
+
+        if homography is None:
+            raise ValueError("Failed to compute the homography between the junction rectangles !")
+
+        return homography
+
+    def warp(self, df_section: pd.DataFrame, homography: np.ndarray) -> pd.DataFrame:
+        """
+        Applies the homography to the phantom section, in a single transform over all the warped points.
+
+        Parameters
+        ----------
+        df_section : (pd.DataFrame)
+            The phantom section, with at least the columns ['ROIName', 'x', 'y'].
+
+        homography : (np.ndarray)
+            The (3, 3) homography matrix.
+
+        Returns
+        -------
+        pd.DataFrame
+            A copy of the phantom section with the warped x and y coordinates.
+
+        """
+
+        df_section = df_section.copy()
+
+        warped_rois = self.WARPED_ROIS[self._side]
+        mask = np.ones(len(df_section), dtype=bool) if warped_rois is None \
+            else df_section["ROIName"].isin(warped_rois).to_numpy()
+
+        if mask.any():
+            import cv2
+
+            points = df_section.loc[mask, ["x", "y"]].to_numpy(dtype=np.float64).reshape(-1, 1, 2)
+            points = cv2.perspectiveTransform(points, np.asarray(homography, dtype=np.float64)).reshape(-1, 2)
+            df_section.loc[mask, "x"] = points[:, 0]
+            df_section.loc[mask, "y"] = points[:, 1]
+
+        return df_section
+
+    def smooth(self, df_section: pd.DataFrame) -> pd.DataFrame:
+        """
+        Blends the phantom's body trunc into the patient's junction profile.
+
+        Parameters
+        ----------
+        df_section : (pd.DataFrame)
+            The (warped) phantom section, with at least the columns ['ROIName', 'x', 'y', 'z'].
+
+        Returns
+        -------
+        pd.DataFrame
+            The phantom section made of, in order : the internal contours, the body extremities,
+            the body trunc contours beyond the smoothing slice, and the smoothed body trunc contours.
+
+        Raises
+        ------
+        ValueError
+            If the phantom section has no 'body trunc' contour.
+
+        """
+
+        roi_names = df_section["ROIName"]
+        df_body_trunc = df_section.loc[roi_names == "body trunc"]
+
+        if df_body_trunc.empty:
+            raise ValueError("The phantom section doesn't contain any 'body trunc' contour to smooth !")
+
+        z = df_body_trunc["z"].to_numpy(dtype=float)
+
+        # Find the phantom's smoothing slice, at smooth_length mm from the junction :
+        if self._side == "top":
+            dz = np.abs(z - self._junction_z - self._smooth_length)
+        else:
+            dz = np.abs(np.abs(z - self._junction_z) - self._smooth_length)
+
+        is_smooth_junction = dz == dz.min()
+        smooth_z = z[is_smooth_junction][0]
+
+        phantom_profile = PolarProfile.from_contour(df_body_trunc["x"].to_numpy()[is_smooth_junction],
+                                                    df_body_trunc["y"].to_numpy()[is_smooth_junction],
+                                                    self._center_x,
+                                                    self._center_y,
+                                                    periodic=self._junction_profile.periodic)
+
+        # Body trunc contours between the junction and the smoothing slice :
+        is_to_smooth = z <= smooth_z if self._side == "top" else z >= smooth_z
+        df_to_smooth = df_body_trunc.loc[is_to_smooth].copy()
+
+        _, theta = cartesian_to_polar_coordinates(df_to_smooth["x"].to_numpy(),
+                                                  df_to_smooth["y"].to_numpy(),
+                                                  self._center_x,
+                                                  self._center_y)
+
+        z_to_smooth = z[is_to_smooth]
+        pond = (z_to_smooth - self._junction_z if self._side == "top" else self._junction_z - z_to_smooth)
+        pond = pond / self._smooth_length
+
+        r_pred = pond * phantom_profile(theta) + (1 - pond) * self._junction_profile(theta)
+        df_to_smooth["x"] = r_pred * np.cos(theta) + self._center_x
+        df_to_smooth["y"] = r_pred * np.sin(theta) + self._center_y
+
+        # Concatenate the contours :
+        df_internal = df_section.loc[~roi_names.isin(["body trunc", "body extremities"])]
+        df_body_extremities = df_section.loc[roi_names == "body extremities"]
+        df_body_trunc_not_smooth = df_body_trunc.loc[~is_to_smooth]
+
+        return pd.concat([df_internal,
+                          df_body_extremities,
+                          df_body_trunc_not_smooth,
+                          df_to_smooth], ignore_index=True)
+
+    def blend(self, df_section: pd.DataFrame, homography: np.ndarray) -> pd.DataFrame:
+        """
+        Warps the phantom section with the homography, then smooths its body trunc at the junction.
+
+        Parameters
+        ----------
+        df_section : (pd.DataFrame)
+            The phantom section, aligned on the patient's junction vertebra.
+
+        homography : (np.ndarray)
+            The (3, 3) homography matrix.
+
+        Returns
+        -------
+        pd.DataFrame
+            The blended phantom section.
+
+        """
+
+        return self.smooth(self.warp(df_section, homography))
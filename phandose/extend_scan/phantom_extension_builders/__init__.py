@@ -0,0 +1,3 @@
+from .phantom_extension_builder import (PhantomExtensionBuilder,
+                                        PhantomTopExtensionBuilder,
+                                        PhantomBottomExtensionBuilder)
@@ -0,0 +1,155 @@
+from phandose.extend_scan.scan_junction_builders.scan_junction_builder import get_bounding_rectangle
+from phandose.extend_scan.junction_smoother import JunctionSmoother
+from phandose.extend_scan.scan_junction import ScanJunction
+from phandose.patient.patient_contours import calculate_contour_area
+
+from abc import ABC, abstractmethod
+import pandas as pd
+import time
+import numpy as np
+
+
+class PhantomExtensionBuilder(ABC):
+    """
+    Base class of the builders of the phantom sections (top or bottom) extending the patient's contours.
+
+    The phantom section is aligned on the patient's junction vertebra, warped with the homography mapping the
+    phantom's junction rectangle onto the patient's one, then its body is smoothed into the patient's junction.
+
+    Subclasses must implement :
+    - select_section(): Method to select the phantom's contours beyond the junction vertebra.
+    - select_junction(): Method to select the phantom's body contours at its junction slice.
+
+    """
+
+    section = None
+    side = None
+
+    def __init__(self,
+                 df_phantom: pd.DataFrame,
+                 junction: ScanJunction,
+                 smooth_length: float = None):
+        """
+        Initializes the phantom extension builder.
+
+        Parameters
+        ----------
+        df_phantom : (pd.DataFrame)
+            The contours of the phantom, with columns ['ROIName', 'ROINumber', 'ROIContourNumber', 'x', 'y', 'z']
+
+        junction : (ScanJunction)
+            The patient-side junction the phantom is extended from.
+
+        smooth_length : (float, Optional)
+            The smoothing length (mm), defaults to the JunctionSmoother's default for the junction's side.
+
+        """
+
+        self._df_phantom = df_phantom
+        self._junction = junction
+        self._smoother: JunctionSmoother = junction.smoother(smooth_length)
+
+        self._df_section = None
+        self._homography = None
+        self._timings = {}
+
+    @property
+    def junction(self) -> ScanJunction:
+        return self._junction
+
+    @property
+    def df_section(self) -> pd.DataFrame:
+        return self._df_section
+
+    @property
+    def homography(self) -> np.ndarray:
+        return self._homography
+
+    @property
+    def timings(self) -> dict[str, float]:
+        """
+        The duration (s) of each step of the last build, with keys ['align', 'homography', 'smooth'], the
+        'homography' step including the warp of the phantom section.
+        """
+        return self._timings
+
+    @abstractmethod
+    def select_section(self, df_phantom: pd.DataFrame, bar_z: float) -> pd.DataFrame:
+        """ Select the phantom's contours beyond its junction vertebra, of barycenter z-coordinate bar_z """
+        pass
+
+    @abstractmethod
+    def select_junction(self, df_section: pd.DataFrame) -> pd.DataFrame:
+        """ Select the phantom's body contours at the junction slice of the aligned section """
+        pass
+
+    def align(self):
+
+        # Barycenter of the junction vertebra in the phantom :
+        vertebra = self._junction.vertebra
+        df_vertebra = self._df_phantom.loc[self._df_phantom["ROIName"] == vertebra["Organ"], ["x", "y", "z"]]
+
+        if df_vertebra.empty:
+            raise ValueError(f"The junction vertebra {vertebra['Organ']} is missing from the phantom !")
+
+        bar_x, bar_y, bar_z = df_vertebra.mean()
+
+        # Translate the phantom section onto the patient's junction vertebra :
+        df_section = self.select_section(self._df_phantom, bar_z).copy()
+        df_section["x"] = df_section["x"] + (vertebra["Barx"] - bar_x)
+        df_section["y"] = df_section["y"] + (vertebra["Bary"] - bar_y)
+        df_section["z"] = df_section["z"] + (vertebra["Barz"] - bar_z)
+
+        self._df_section = df_section
+
+    def build_homography(self):
+
+        # Keep the most central contour of the phantom's junction slice :
+        df_junction = self.select_junction(self._df_section)
+        df_junction_area = calculate_contour_area(df_junction)
+        centrality = df_junction_area["Centrex"].abs()
+        contour_number = df_junction_area.loc[centrality == centrality.min(), "ROIContourNumber"].values[0]
+
+        rectangle = get_bounding_rectangle(df_junction.loc[df_junction["ROIContourNumber"] == contour_number])
+        self._homography = self._smoother.compute_homography(rectangle, self._junction.rectangle)
+
+        # Warp the phantom section with the homography, timed with it rather than with the smoothing :
+        self._df_section = self._smoother.warp(self._df_section, self._homography)
+
+    def smooth(self):
+        self._df_section = self._smoother.smooth(self._df_section)
+        self._df_section[["Origine", "Section"]] = ["Phantom", self.section]
+
+    def build(self) -> pd.DataFrame:
+
+        for stage, step in [("align", self.align), ("homography", self.build_homography), ("smooth", self.smooth)]:
+            start = time.perf_counter()
+            step()
+            self._timings[stage] = time.perf_counter() - start
+
+        return self._df_section
+
+
+class PhantomTopExtensionBuilder(PhantomExtensionBuilder):
+
+    section = 1
+    side = "top"
+
+    def select_section(self, df_phantom: pd.DataFrame, bar_z: float) -> pd.DataFrame:
+        return df_phantom.loc[df_phantom["z"] >= bar_z]
+
+    def select_junction(self, df_section: pd.DataFrame) -> pd.DataFrame:
+        return df_section.loc[(df_section["ROIName"] == "body trunc") & (df_section["z"] == df_section["z"].min())]
+
+
+class PhantomBottomExtensionBuilder(PhantomExtensionBuilder):
+
+    section = 2
+    side = "bottom"
+
+    def select_section(self, df_phantom: pd.DataFrame, bar_z: float) -> pd.DataFrame:
+        return df_phantom.loc[df_phantom["z"] <= bar_z]
+
+    def select_junction(self, df_section: pd.DataFrame) -> pd.DataFrame:
+        return df_section.loc[df_section["ROIName"].isin(["body trunc", "body extremities"]) &
+                              (df_section["z"] == df_section["z"].max())]
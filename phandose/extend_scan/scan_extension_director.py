@@ -1,14 +1,70 @@
-from phandose.patient.patient_contours import get_contours_barycenters
+from phandose.extend_scan.phantom_extension_builders import (PhantomTopExtensionBuilder,
+                                                             PhantomBottomExtensionBuilder)
+from phandose.extend_scan.scan_junction_builders import ScanTopJunctionBuilder, ScanBottomJunctionBuilder
+from phandose.patient.patient_contours import (get_contours_barycenters,
+                                               is_vertebrae_fully_within_contours,
+                                               needed_top_part)
+from phandose.extend_scan.contour_resampler import resample_contours_z
+from phandose.extend_scan.scan_junction import ScanJunction
+from phandose.utils.profiling import profiled
+from phandose.utils import get_logger
 
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
 import pandas as pd
+import time
+
+# Initialize the logger :
+logger = get_logger("phandose.extend_scan.scan_extension_director")
+
+# Columns of the extended contours :
+EXTENDED_CONTOURS_COLUMNS = ['Origine', 'Section', 'ROIName', 'ROINumber', 'ROIContourNumber',
+                             'ROIContourPointNumber', 'x', 'y', 'z']
+
+# Stages of the extension, timed by the extend_* methods, the stages of the phantom sections by side :
+EXTENSION_STAGES = ['load', 'junctions', 'patient',
+                    'top.align', 'top.homography', 'top.smooth',
+                    'bottom.align', 'bottom.homography', 'bottom.smooth',
+                    'merge', 'resample', 'write', 'total']
 
 
 class ScanExtensionDirector:
+    """
+    Extend the contours of a patient with a phantom, on top and/or at the bottom of the patient.
+
+    The patient-side junctions are computed once, and can be shared with other directors extending
+    the same patient with other phantoms (see `extend_with_phantoms`).
+
+    """
 
     def __init__(self,
-                 path_phantom,
-                 df_contours,
-                 df_barycenter: pd.DataFrame = None):
+                 path_phantom: Path | str = None,
+                 df_contours: pd.DataFrame = None,
+                 df_barycenter: pd.DataFrame = None,
+                 top_junction: ScanJunction = None,
+                 bottom_junction: ScanJunction = None):
+        """
+        Initializes the scan extension director.
+
+        Parameters
+        ----------
+        path_phantom : (Path | str, Optional)
+            The path of the phantom's contours (.txt file), only needed to extend the patient with a single phantom.
+
+        df_contours : (pd.DataFrame)
+            The contours of the patient, with columns :
+            ['ROIName', 'ROINumber', 'ROIContourNumber', 'ROIContourPointNumber', 'x', 'y', 'z']
+
+        df_barycenter : (pd.DataFrame, Optional)
+            The barycenters of the patient's vertebrae fully within the contours, computed if not provided.
+
+        top_junction : (ScanJunction, Optional)
+            The patient's top junction, built on first access if not provided.
+
+        bottom_junction : (ScanJunction, Optional)
+            The patient's bottom junction, built on first access if not provided.
+
+        """
 
         self._path_phantom = path_phantom
         self._df_phantom = None
@@ -16,10 +72,13 @@ class ScanExtensionDirector:
         self._df_contours = df_contours
         self._df_barycenter = df_barycenter
 
+        self._top_junction = top_junction
+        self._bottom_junction = bottom_junction
+
     @property
     def df_phantom(self):
         if self._df_phantom is None:
-            self._df_phantom = pd.read_csv(self._path_phantom, sep="\t", encoding="ISO-8859-1")
+            self._df_phantom = load_phantom(self._path_phantom)
 
         return self._df_phantom
 
@@ -30,21 +89,344 @@ class ScanExtensionDirector:
     @property
     def df_barycenter(self):
         if self._df_barycenter is None:
-            self._df_barycenter = get_contours_barycenters(self._df_contours)
+            df_full_vertebrae = is_vertebrae_fully_within_contours(self._df_contours)
+            list_full_vertebrae = df_full_vertebrae.loc[df_full_vertebrae["Full"], "ROIName"].tolist()
+
+            self._df_barycenter = get_contours_barycenters(
+                self._df_contours.loc[self._df_contours["ROIName"].isin(list_full_vertebrae)])
 
         return self._df_barycenter
 
+    @property
+    def top_junction(self) -> ScanJunction:
+        if self._top_junction is None:
+            self._top_junction = ScanTopJunctionBuilder(self.df_contours, self.df_barycenter).build()
+
+        return self._top_junction
+
+    @property
+    def bottom_junction(self) -> ScanJunction:
+        if self._bottom_junction is None:
+            self._bottom_junction = ScanBottomJunctionBuilder(self.df_contours, self.df_barycenter).build()
+
+        return self._bottom_junction
+
+    def get_df_patient(self, top: bool, bottom: bool) -> pd.DataFrame:
+        """
+        Get the patient's contours between the junctions it is extended from, tagged as section 0.
+
+        Parameters
+        ----------
+        top : (bool)
+            Whether the patient is extended on top, its contours above the top junction are then removed.
+
+        bottom : (bool)
+            Whether the patient is extended at the bottom, its contours below the bottom junction are then removed.
+
+        Returns
+        -------
+        pd.DataFrame
+            The patient's contours, with the columns 'Origine' and 'Section'.
+
+        """
+
+        df_patient = self.df_contours
+        if top:
+            df_patient = df_patient.loc[df_patient["z"] <= self.top_junction.z]
+
+        if bottom:
+            df_patient = df_patient.loc[df_patient["z"] >= self.bottom_junction.z]
+
+        df_patient = df_patient.copy()
+        df_patient[["Origine", "Section"]] = ["Patient", 0]
+
+        return df_patient
+
     def is_top_extension_warranted(self):
-        raise NotImplementedError("This method must be implemented in the subclass.")
+        return needed_top_part(self.df_contours)
 
     def is_bottom_extension_warranted(self):
         return not {'femur left', 'femur right'}.issubset(self.df_contours["ROIName"].unique())
 
-    def extend_top_only(self):
-        pass
+    def get_junctions(self, top: bool, bottom: bool) -> tuple[ScanJunction | None, ScanJunction | None]:
+        return self.top_junction if top else None, self.bottom_junction if bottom else None
+
+    @profiled
+    def extend(self) -> pd.DataFrame:
+        """
+        Extend the patient's contours with the phantom, on every side where the extension is warranted.
+
+        Returns
+        -------
+        pd.DataFrame
+            The merged patient + phantom contours, resampled along the z-axis.
+
+        """
+
+        top, bottom = self.is_top_extension_warranted(), self.is_bottom_extension_warranted()
+
+        return extend_contours(self.get_df_patient(top, bottom), self.df_phantom, *self.get_junctions(top, bottom))
+
+    @profiled
+    def extend_with_phantoms(self,
+                             list_path_phantoms: list[Path | str],
+                             max_workers: int = None) -> dict[str, pd.DataFrame]:
+        """
+        Extend the patient's contours with each of the phantoms, in parallel worker processes.
+
+        The patient is extended on every side where the extension is warranted. The patient's junctions and
+        contours are computed once, and sent once to each worker process.
+
+        Parameters
+        ----------
+        list_path_phantoms : (list[Path | str])
+            The paths of the phantoms' contours (.txt files).
+
+        max_workers : (int, Optional)
+            The maximal number of worker processes, defaults to the number of processors.
+
+        Returns
+        -------
+        dict[str, pd.DataFrame]
+            The merged patient + phantom contours, for each phantom's name.
+
+        """
+
+        list_path_phantoms = [Path(path_phantom) for path_phantom in list_path_phantoms]
+        if not list_path_phantoms:
+            return {}
+
+        top, bottom = self.is_top_extension_warranted(), self.is_bottom_extension_warranted()
+        initargs = (self.get_df_patient(top, bottom), *self.get_junctions(top, bottom))
+        logger.info(f"Extending the patient with {len(list_path_phantoms)} phantoms ...")
+
+        with ProcessPoolExecutor(max_workers=max_workers,
+                                 initializer=_init_extension_worker,
+                                 initargs=initargs) as executor:
+
+            list_df_extended = executor.map(_extend_with_phantom, list_path_phantoms)
+            dict_df_extended = {path_phantom.name: df_extended
+                                for path_phantom, df_extended in zip(list_path_phantoms, list_df_extended)}
+
+        logger.info(f"Successfully extended the patient with {len(list_path_phantoms)} phantoms !")
+        return dict_df_extended
+
+    def extend_top_only(self, path_output: Path | str = None) -> tuple[pd.DataFrame, dict[str, float]]:
+        """
+        Extend the patient's contours with the phantom on top only.
+
+        Parameters
+        ----------
+        path_output : (Path | str, Optional)
+            The path of the .txt file the merged contours are written to, not written if None.
+
+        Returns
+        -------
+        tuple[pd.DataFrame, dict[str, float]]
+            The merged patient + phantom contours, and the duration (s) of each stage of the extension.
+
+        """
+
+        return self._extend(top=True, bottom=False, path_output=path_output)
+
+    def extend_bottom_only(self, path_output: Path | str = None) -> tuple[pd.DataFrame, dict[str, float]]:
+        """
+        Extend the patient's contours with the phantom at the bottom only.
+
+        Parameters
+        ----------
+        path_output : (Path | str, Optional)
+            The path of the .txt file the merged contours are written to, not written if None.
+
+        Returns
+        -------
+        tuple[pd.DataFrame, dict[str, float]]
+            The merged patient + phantom contours, and the duration (s) of each stage of the extension.
+
+        """
+
+        return self._extend(top=False, bottom=True, path_output=path_output)
+
+    def extend_top_and_bottom(self, path_output: Path | str = None) -> tuple[pd.DataFrame, dict[str, float]]:
+        """
+        Extend the patient's contours with the phantom on top and at the bottom.
+
+        Parameters
+        ----------
+        path_output : (Path | str, Optional)
+            The path of the .txt file the merged contours are written to, not written if None.
+
+        Returns
+        -------
+        tuple[pd.DataFrame, dict[str, float]]
+            The merged patient + phantom contours, and the duration (s) of each stage of the extension.
+
+        """
+
+        return self._extend(top=True, bottom=True, path_output=path_output)
+
+    @profiled
+    def _extend(self, top: bool, bottom: bool, path_output: Path | str = None) -> tuple[pd.DataFrame, dict[str, float]]:
+
+        timings = dict.fromkeys(EXTENSION_STAGES, 0.0)
+        start_total = time.perf_counter()
+
+        start = time.perf_counter()
+        df_phantom = self.df_phantom
+        timings["load"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        top_junction, bottom_junction = self.get_junctions(top, bottom)
+        timings["junctions"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        df_patient = self.get_df_patient(top, bottom)
+        timings["patient"] = time.perf_counter() - start
+
+        df_extended = extend_contours(df_patient, df_phantom, top_junction, bottom_junction, timings=timings)
+
+        if path_output is not None:
+            start = time.perf_counter()
+            df_extended.to_csv(path_output, sep="\t", index=False, encoding="ISO-8859-1")
+            timings["write"] = time.perf_counter() - start
+
+        timings["total"] = time.perf_counter() - start_total
+
+        logger.info("Extension timings (s) : " + ", ".join(f"{stage}={duration:.3f}"
+                                                           for stage, duration in timings.items()))
+
+        return df_extended, timings
+
+
+@profiled
+def load_phantom(path_phantom: Path | str) -> pd.DataFrame:
+    """
+    Load the contours of a phantom, without its 'body' and 'skin' ROIs.
+
+    Parameters
+    ----------
+    path_phantom : (Path | str)
+        The path of the phantom's contours (.txt file).
+
+    Returns
+    -------
+    pd.DataFrame
+        The contours of the phantom, tagged with Origine 'Phantom'.
+
+    """
+
+    df_phantom = pd.read_csv(path_phantom, sep="\t", encoding="ISO-8859-1", header=0)
+    df_phantom = df_phantom.loc[~df_phantom["ROIName"].isin(["body", "skin"])].copy()
+    df_phantom["Origine"] = "Phantom"
+
+    return df_phantom
+
+
+@profiled
+def extend_contours(df_patient: pd.DataFrame,
+                    df_phantom: pd.DataFrame,
+                    top_junction: ScanJunction = None,
+                    bottom_junction: ScanJunction = None,
+                    timings: dict[str, float] = None) -> pd.DataFrame:
+    """
+    Merge the patient's contours with the phantom sections built on its junctions, and resample them along z.
+
+    The top and bottom phantom sections are built one after the other : their steps are pandas / numpy operations
+    holding the GIL, which ran slower on two threads than in sequence, and two sections don't amortize the start of
+    worker processes. The phantoms are extended in parallel processes by extend_with_phantoms instead.
+
+    Parameters
+    ----------
+    df_patient : (pd.DataFrame)
+        The patient's contours between its junctions, tagged as section 0.
+
+    df_phantom : (pd.DataFrame)
+        The contours of the phantom.
+
+    top_junction : (ScanJunction, Optional)
+        The patient's top junction, no top extension if None.
+
+    bottom_junction : (ScanJunction, Optional)
+        The patient's bottom junction, no bottom extension if None.
+
+    timings : (dict[str, float], Optional)
+        If provided, the duration (s) of the 'align', 'homography' (including the warp) and 'smooth' stages of each
+        section, keyed by side (e.g. 'top.align'), and of the 'merge' and 'resample' stages are added to it.
+
+    Returns
+    -------
+    pd.DataFrame
+        The merged patient + phantom contours, resampled along the z-axis.
+
+    """
+
+    list_builders = []
+    if top_junction is not None:
+        list_builders.append(PhantomTopExtensionBuilder(df_phantom, top_junction))
+
+    if bottom_junction is not None:
+        list_builders.append(PhantomBottomExtensionBuilder(df_phantom, bottom_junction))
+
+    list_df_sections = [builder.build() for builder in list_builders]
+
+    if timings is not None:
+        for builder in list_builders:
+            for stage, duration in builder.timings.items():
+                timings[f"{builder.side}.{stage}"] = timings.get(f"{builder.side}.{stage}", 0.0) + duration
+
+    return merge_extended_contours([df_patient, *list_df_sections], timings=timings)
+
+
+def merge_extended_contours(list_df_sections: list[pd.DataFrame], timings: dict[str, float] = None) -> pd.DataFrame:
+    """
+    Merge the patient's and the phantom's sections, rename the body ROIs to 'external', and resample along z.
+
+    Parameters
+    ----------
+    list_df_sections : (list[pd.DataFrame])
+        The patient's and the phantom's sections.
+
+    timings : (dict[str, float], Optional)
+        If provided, the duration (s) of the 'merge' and 'resample' stages are added to it.
+
+    Returns
+    -------
+    pd.DataFrame
+        The merged contours, resampled along the z-axis.
+
+    """
+
+    start = time.perf_counter()
+    df_merged = pd.concat(list_df_sections, ignore_index=True)[EXTENDED_CONTOURS_COLUMNS].dropna()
+    df_merged.loc[df_merged["ROIName"].isin(["body trunc", "body extremities"]), "ROIName"] = "external"
+    duration_merge = time.perf_counter() - start
+
+    start = time.perf_counter()
+    df_resampled = resample_contours_z(df_merged)
+
+    if timings is not None:
+        timings["merge"] = timings.get("merge", 0.0) + duration_merge
+        timings["resample"] = timings.get("resample", 0.0) + time.perf_counter() - start
+
+    return df_resampled
+
+
+# State shared by the extension worker processes, set once per process by _init_extension_worker :
+_worker_state = {}
+
+
+def _init_extension_worker(df_patient: pd.DataFrame,
+                           top_junction: ScanJunction | None,
+                           bottom_junction: ScanJunction | None):
+
+    _worker_state["df_patient"] = df_patient
+    _worker_state["top_junction"] = top_junction
+    _worker_state["bottom_junction"] = bottom_junction
+
 
-    def extend_bottom_only(self):
-        pass
+def _extend_with_phantom(path_phantom: Path) -> pd.DataFrame:
 
-    def extend_top_and_bottom(self):
-        pass
+    return extend_contours(df_patient=_worker_state["df_patient"],
+                           df_phantom=load_phantom(path_phantom),
+                           top_junction=_worker_state["top_junction"],
+                           bottom_junction=_worker_state["bottom_junction"])
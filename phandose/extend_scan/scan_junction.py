@@ -1,48 +1,132 @@
+from .junction_smoother import JunctionSmoother, PolarProfile
+
+from types import MappingProxyType
 import pandas as pd
+import numpy as np
 
 
 class ScanJunction:
+    """
+    The patient-side quantities of a junction between the patient and a phantom.
+
+    A ScanJunction is computed once per patient and side (top or bottom) by a ScanJunctionBuilder, and shared by
+    the extensions with every candidate phantom. It is immutable, and picklable so that it can be sent once
+    to worker processes.
+
+    Attributes
+    ----------
+    _side : (str)
+        The side of the junction, either 'top' or 'bottom'.
+
+    _vertebra : (MappingProxyType)
+        The junction vertebra, with keys ['Organ', 'Barx', 'Bary', 'Barz'].
+
+    _z : (float)
+        The z-coordinate of the patient's junction slice.
+
+    _df_junction : (pd.DataFrame)
+        The contour points of the patient's body trunc at the junction slice.
+
+    _center : (tuple[float, float])
+        The center (Centrex, Centrey) of the polar coordinates of the junction.
+
+    _profile : (PolarProfile)
+        The polar profile of the junction contour, around the center.
+
+    _rectangle : (np.ndarray)
+        The (4, 2) corners of the bounding rectangle of the junction contour.
+
+    """
+
+    __slots__ = ("_side", "_vertebra", "_z", "_df_junction", "_center", "_profile", "_rectangle")
 
     def __init__(self,
-                 vertebra: dict = None,
-                 df_junction: pd.DataFrame = None,
-                 df_junction_area: pd.DataFrame = None,
-                 interp_junction=None,
-                 rectangle=None):
-
-        self._vertebra = vertebra
-        self._df_junction = df_junction
-        self._df_junction_area = df_junction_area
-        self._interp_junction = interp_junction
-        self._rectangle = rectangle
+                 side: str,
+                 vertebra: dict,
+                 z: float,
+                 df_junction: pd.DataFrame,
+                 center: tuple[float, float],
+                 profile: PolarProfile,
+                 rectangle: np.ndarray):
 
-    @property
-    def vertebra(self):
-        return self._vertebra
+        rectangle = np.array(rectangle)
+        rectangle.flags.writeable = False
+
+        object.__setattr__(self, "_side", side)
+        object.__setattr__(self, "_vertebra", MappingProxyType(dict(vertebra)))
+        object.__setattr__(self, "_z", float(z))
+        object.__setattr__(self, "_df_junction", df_junction.copy())
+        object.__setattr__(self, "_center", (float(center[0]), float(center[1])))
+        object.__setattr__(self, "_profile", profile)
+        object.__setattr__(self, "_rectangle", rectangle)
 
-    def set_vertebra(self, organ, bar_x, bar_y, bar_z):
-        self._vertebra = {"Organ": organ, "Barx": bar_x, "Bary": bar_y, "Barz": bar_z}
+    def __setattr__(self, name, value):
+        raise AttributeError(f"ScanJunction is immutable, can't set attribute '{name}' !")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"ScanJunction is immutable, can't delete attribute '{name}' !")
+
+    def __reduce__(self):
+        return self.__class__, (self._side,
+                                dict(self._vertebra),
+                                self._z,
+                                self._df_junction,
+                                self._center,
+                                self._profile,
+                                self._rectangle)
 
     @property
-    def df_junction(self):
-        return self._df_junction
+    def side(self) -> str:
+        return self._side
 
-    @df_junction.setter
-    def df_junction(self, df_junction):
-        self._df_junction = df_junction
+    @property
+    def vertebra(self) -> MappingProxyType:
+        return self._vertebra
 
     @property
-    def df_junction_area(self):
-        return self._df_junction_area
+    def z(self) -> float:
+        return self._z
 
-    @df_junction_area.setter
-    def df_junction_area(self, df_junction_area):
-        self._df_junction_area = df_junction_area
+    @property
+    def df_junction(self) -> pd.DataFrame:
+        return self._df_junction.copy()
+
+    @property
+    def center(self) -> tuple[float, float]:
+        return self._center
 
     @property
-    def interp_junction(self):
-        return self._interp_junction
+    def profile(self) -> PolarProfile:
+        return self._profile
 
     @property
-    def rectangle(self):
+    def rectangle(self) -> np.ndarray:
         return self._rectangle
+
+    def smoother(self, smooth_length: float = None) -> JunctionSmoother:
+        """
+        Create the JunctionSmoother blending a phantom's body into the patient's body at this junction.
+
+        Parameters
+        ----------
+        smooth_length : (float, Optional)
+            The smoothing length (mm), defaults to the JunctionSmoother's default for the junction's side.
+
+        Returns
+        -------
+        JunctionSmoother
+            The junction smoother.
+
+        """
+
+        return JunctionSmoother(junction_profile=self._profile,
+                                center_x=self._center[0],
+                                center_y=self._center[1],
+                                junction_z=self._z,
+                                smooth_length=smooth_length,
+                                side=self._side)
+
+    def __str__(self):
+        return f"ScanJunction: {self.side} - Vertebra: {self.vertebra['Organ']} - z: {self.z}"
+
+    __repr__ = __str__
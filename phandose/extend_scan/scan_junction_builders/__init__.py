@@ -0,0 +1,3 @@
+from .scan_junction_builder import ScanJunctionBuilder
+from .scan_top_junction_builder import ScanTopJunctionBuilder
+from .scan_bottom_junction_builder import ScanBottomJunctionBuilder
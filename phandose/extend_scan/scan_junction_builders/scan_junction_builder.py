@@ -1,15 +1,50 @@
-from abc import abstractmethod
+from phandose.extend_scan.junction_smoother import PolarProfile
+from phandose.extend_scan.scan_junction import ScanJunction
+from phandose.patient.patient_contours import calculate_contour_area
 
+from abc import ABC, abstractmethod
+import pandas as pd
+import numpy as np
 
-class ScanJunctionBuilder:
+
+class ScanJunctionBuilder(ABC):
+    """
+    Base class of the builders of the patient-side junctions (top or bottom) between the patient and a phantom.
+
+    Subclasses must implement :
+    - find_vertebra(): Method to find the junction vertebra, among the barycenters of the patient's full vertebrae.
+
+    """
+
+    side = None
 
     def __init__(self,
-                 df_contours,
-                 df_barycenter):
+                 df_contours: pd.DataFrame,
+                 df_barycenter: pd.DataFrame):
+        """
+        Initializes the junction builder.
+
+        Parameters
+        ----------
+        df_contours : (pd.DataFrame)
+            The contours of the patient, with columns ['ROIName', 'ROINumber', 'ROIContourNumber', 'x', 'y', 'z']
+
+        df_barycenter : (pd.DataFrame)
+            The barycenters of the patient's vertebrae fully within the contours,
+            with columns ['Organ', 'Barx', 'Bary', 'Barz']
+
+        """
 
         self._df_contours = df_contours
         self._df_barycenter = df_barycenter
 
+        self._vertebra = None
+        self._z = None
+        self._df_junction = None
+        self._center = None
+        self._profile = None
+        self._rectangle = None
+
     @property
     def df_contours(self):
         return self._df_contours
@@ -19,5 +54,86 @@ class ScanJunctionBuilder:
         return self._df_barycenter
 
     @abstractmethod
-    def build(self):
+    def find_vertebra(self) -> float:
+        """ Find the z-coordinate of the barycenter of the junction vertebra """
         pass
+
+    def set_vertebra(self, bar_z: float):
+
+        if self.df_barycenter.empty or pd.isna(bar_z):
+            raise ValueError(f"No junction vertebra found for the {self.side} junction !")
+
+        vertebra = self.df_barycenter.loc[self.df_barycenter["Barz"] == bar_z].iloc[0]
+        self._vertebra = {"Organ": vertebra["Organ"],
+                          "Barx": vertebra["Barx"],
+                          "Bary": vertebra["Bary"],
+                          "Barz": vertebra["Barz"]}
+
+    def build_junction(self):
+
+        # Body trunc slice(s) the nearest to the junction vertebra :
+        df_junction = self.df_contours.loc[self.df_contours["ROIName"] == "body trunc"]
+        if df_junction.empty:
+            raise ValueError(f"No 'body trunc' contour found for the {self.side} junction !")
+
+        gap = (df_junction["z"] - self._vertebra["Barz"]).abs()
+        df_junction = df_junction.loc[gap == gap.min()]
+        self._z = df_junction.iloc[0]["z"]
+
+        # Keep the most central contour of the junction slice :
+        df_junction_area = calculate_contour_area(df_junction)
+        centrality = df_junction_area["Centrex"].abs()
+        contour_number = df_junction_area.loc[centrality == centrality.min(), "ROIContourNumber"].values[0]
+
+        self._df_junction = df_junction.loc[df_junction["ROIContourNumber"] == contour_number]
+        self._center = (df_junction_area.iloc[0]["Centrex"], df_junction_area.iloc[0]["Centrey"])
+
+    def build_rectangle(self):
+        self._rectangle = get_bounding_rectangle(self._df_junction)
+
+    def build_profile(self):
+        self._profile = PolarProfile.from_contour(self._df_junction["x"].to_numpy(),
+                                                  self._df_junction["y"].to_numpy(),
+                                                  *self._center)
+
+    def build(self) -> ScanJunction:
+
+        self.set_vertebra(self.find_vertebra())
+        self.build_junction()
+        self.build_rectangle()
+        self.build_profile()
+
+        return ScanJunction(side=self.side,
+                            vertebra=self._vertebra,
+                            z=self._z,
+                            df_junction=self._df_junction,
+                            center=self._center,
+                            profile=self._profile,
+                            rectangle=self._rectangle)
+
+
+def get_bounding_rectangle(df_contour: pd.DataFrame) -> np.ndarray:
+    """
+    Get the corners of the bounding rectangle of a contour.
+
+    Parameters
+    ----------
+    df_contour : (pd.DataFrame)
+        The contour points, with columns ['x', 'y']
+
+    Returns
+    -------
+    np.ndarray
+        The (4, 2) corners of the bounding rectangle, starting from the upper left corner, counterclockwise.
+
+    """
+
+    import cv2
+
+    points = df_contour[["x", "y"]].to_numpy().astype(np.int32)
+    xul, yul, wr, hr = cv2.boundingRect(points)
+
+    return np.array([[xul, yul],
+                     [xul, yul + hr],
+                     [xul + wr, yul + hr],
+                     [xul + wr, yul]])
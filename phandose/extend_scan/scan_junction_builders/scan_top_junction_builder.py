@@ -1,14 +1,20 @@
-from scan_junction_builder import ScanJunctionBuilder
+from .scan_junction_builder import ScanJunctionBuilder
+
+from phandose.patient.patient_contours import get_mean_organ_spacing_z
 
 
 class ScanTopJunctionBuilder(ScanJunctionBuilder):
 
-    def __init__(self,
-                 df_contours,
-                 df_barycenter,):
+    side = "top"
+
+    def find_vertebra(self) -> float:
+
+        # If the skull is contoured, the junction vertebra is the highest one lying well below the skull :
+        if "skull" in self.df_contours["ROIName"].unique():
 
-        super().__init__(df_contours, df_barycenter)
+            skull_z_min = self.df_contours.loc[self.df_contours["ROIName"] == "skull", "z"].min()
+            spacing_z = get_mean_organ_spacing_z(self.df_barycenter)
 
+            return self.df_barycenter.loc[self.df_barycenter["Barz"] < skull_z_min - 3 * spacing_z, "Barz"].max()
 
-    def build(self):
-        pass
+        return self.df_barycenter["Barz"].max()
@@ -17,6 +17,7 @@ from .standalone_modalities import (StandAloneModality,
                                     RtstructModality,
                                     RtplanModality,
                                     RtdoseModality)
+from .series_archive import SeriesArchive
 
 # Registry for available modalities
 MODALITY_REGISTRY = {
@@ -39,6 +40,7 @@ __all__ = ["Modality",
            "RtstructModality",
            "RtplanModality",
            "RtdoseModality",
+           "SeriesArchive",
            "create_modality",
            "MODALITY_REGISTRY"]
 
@@ -87,8 +87,8 @@ class Modality(ABC):
         pass
 
     @abstractmethod
-    def to_dict(self) -> dict:
-        """ Return a dictionary representation of the modality """
+    def to_dict(self, compact: bool = False) -> dict:
+        """ Return a dictionary representation of the modality, compact if the modality supports it """
         pass
 
     def __str__(self):
@@ -1,12 +1,18 @@
+from .scan_volume import ScanVolume, get_volume_key, get_cached_volume, cache_volume
+from .series_archive import SeriesArchive
 from .modality import Modality
 
-from phandose.utils import dicom_utils
-from phandose import conversions
+from phandose.utils import dicom_utils, get_logger, DicomIndex
+from phandose import exceptions
 
 from abc import ABC
-from typing import Generator
+from typing import Generator, Iterable
 from pathlib import Path
 import pydicom as dcm
+import hashlib
+
+# Initialize the logger :
+logger = get_logger("phandose.modalities.scan_modalities")
 
 
 class ScanModality(Modality, ABC):
@@ -17,7 +23,10 @@ class ScanModality(Modality, ABC):
                  modality_type: str,
                  dicom_paths: list[Path] = None,
                  series_description: str = None,
-                 dir_dicom: Path = None):
+                 dir_dicom: Path = None,
+                 path_archive: Path = None,
+                 n_files: int = None,
+                 files_hash: str = None):
         """
         Initializes a ScanModality instance.
 
@@ -38,22 +47,70 @@ class ScanModality(Modality, ABC):
         dir_dicom : (Path, Optional)
             Directory containing the DICOM files for the scan, defaults to None
 
+        path_archive : (Path, Optional)
+            Path to the series archive packing the DICOM files of the scan, see SeriesArchive, defaults to None.
+            When set, the slices are read from the archive instead of the DICOM files.
+
+        n_files : (int, Optional)
+            The number of DICOM files of the scan in dir_dicom, from its compact serialized form, defaults to None.
+
+        files_hash : (str, Optional)
+            The hash of the names of the DICOM files of the scan in dir_dicom, see get_files_hash, from its compact
+            serialized form, defaults to None. The DICOM files resolved lazily from dir_dicom are checked against it,
+            a DicomMetadataError being raised if they changed since the scan was serialized.
+
         """
 
         super().__init__(modality_id=modality_id,
                          modality_type=modality_type,
                          series_description=series_description,
-                         dir_dicom=dir_dicom)
+                         dir_dicom=Path(dir_dicom) if dir_dicom else None)
 
         self._dicom_paths = dicom_paths
+        self._path_archive = Path(path_archive) if path_archive else None
+        self._n_files = n_files
+        self._files_hash = files_hash
+
+        # The last volume of the scan, kept while its slices are unchanged, see volume :
+        self._volume = None
 
     @property
     def dicom_paths(self) -> list[Path]:
+        """
+        The paths of the DICOM files of the scan, resolved lazily from its DICOM directory.
+
+        Raises
+        ------
+        DicomMetadataError
+            If the resolved DICOM files don't match those of the compact serialized form, even after a re-scan of
+            the DICOM directory.
+
+        """
+
+        # The slices of a packed scan aren't separate files :
+        if not self._dicom_paths and self._path_archive is not None:
+            return []
 
         if not self._dicom_paths:
             self.dicom_paths = dicom_utils.find_dicom_paths_of_scan(dir_dicom=self._dir_dicom,
                                                                     series_instance_uid=self.modality_id)
 
+            # Check the resolved DICOM files against those of the compact serialized form, re-scanning the DICOM
+            # directory if they don't match, in case its index is stale :
+            if self._files_hash is not None and get_files_hash(self._dicom_paths) != self._files_hash:
+                logger.debug("Re-scanning %s : %d DICOM files found for %s, %s expected",
+                             self._dir_dicom, len(self._dicom_paths), self, self._n_files)
+
+                DicomIndex.open(self._dir_dicom, scan=False).refresh()
+                self.dicom_paths = dicom_utils.find_dicom_paths_of_scan(dir_dicom=self._dir_dicom,
+                                                                        series_instance_uid=self.modality_id)
+
+                if get_files_hash(self._dicom_paths) != self._files_hash:
+                    n_found, self._dicom_paths = len(self._dicom_paths), None
+                    raise exceptions.DicomMetadataError(f"The DICOM files of {self} in {self._dir_dicom} changed "
+                                                        f"since it was serialized : {n_found} files found, "
+                                                        f"{self._n_files} expected !")
+
         return self._dicom_paths
 
     @dicom_paths.setter
@@ -62,17 +119,136 @@ class ScanModality(Modality, ABC):
         if isinstance(dicom_paths, list):
             dicom_paths = [path for path in dicom_paths]
         self._dicom_paths = dicom_paths
+        self._volume = None
+
+    @property
+    def path_archive(self) -> Path | None:
+        return self._path_archive
+
+    @path_archive.setter
+    def path_archive(self, path_archive: Path | None):
+        self._path_archive = Path(path_archive) if path_archive else None
+        self._volume = None
 
     def set_series_description(self):
         self._series_description = next(self.dicom()).SeriesDescription
 
     def dicom(self) -> Generator[dcm.dataset.FileDataset, None, None]:
+
+        if self._path_archive is not None:
+            return self._read_archive()
+
         return (dcm.dcmread(str(path_dicom)) for path_dicom in self.dicom_paths)
 
+    def _read_archive(self) -> Generator[dcm.dataset.FileDataset, None, None]:
+        with SeriesArchive(self._path_archive) as archive:
+            yield from archive.iter_slices()
+
+    def volume(self, spill: bool = False, dir_spill: Path = None) -> ScanVolume:
+        """
+        Get the decoded volume of the scan, decoding its slices only if it isn't cached.
+
+        The volume is cached weakly in memory, and optionally spilled to a .npy file (memory-mapped when loaded),
+        keyed by the Series Instance UID and the modification times of the slices. The scan keeps its last volume,
+        until its DICOM files or its series archive are changed, so that it isn't decoded again on each call.
+
+        Parameters
+        ----------
+        spill : (bool, Optional)
+            Whether to spill the volume to disk if it isn't already, defaults to False.
+
+        dir_spill : (Path, Optional)
+            The directory of the spilled volume, defaults to the scan's DICOM directory (e.g. its patient-hub copy).
+
+        Returns
+        -------
+        ScanVolume
+            The decoded volume of the scan.
+
+        """
+
+        key = get_volume_key(self.modality_id, [self._path_archive] if self._path_archive else self.dicom_paths)
+
+        if self._volume is not None and self._volume.key == key:
+            return self._volume
+
+        volume = get_cached_volume(key)
+        if volume is not None:
+            self._volume = volume
+            return volume
+
+        dir_spill = Path(dir_spill) if dir_spill else self.dir_dicom
+        path_npy = dir_spill / f".{key}.npy" if dir_spill else None
+
+        if path_npy is not None and path_npy.exists() and path_npy.with_suffix(".npz").exists():
+            volume = ScanVolume.load(key, path_npy)
+
+        else:
+            volume = ScanVolume.from_dicom(key, self.dicom())
+
+            if spill and path_npy is not None:
+
+                # Remove the volumes spilled for previous versions of the slices :
+                for path_stale in dir_spill.glob(f".{self.modality_id}.*.np[yz]"):
+                    path_stale.unlink(missing_ok=True)
+
+                volume.save(path_npy)
+
+        cache_volume(volume)
+        self._volume = volume
+        return volume
+
     def dataframe(self):
-        return conversions.convert_scan_to_dataframe(self.dicom())
+        return self.volume().to_dataframe()
+
+    def to_dict(self, compact: bool = False):
+        """
+        Serialize the scan as a dictionary.
+
+        Parameters
+        ----------
+        compact : (bool, Optional)
+            Whether to serialize the DICOM directory of the scan, with the number and the hash of its DICOM files,
+            instead of the path of every DICOM file, defaults to False. The compact form applies only to a scan
+            whose DICOM files all are in its DICOM directory (e.g. a scan of the patient hub), whose DICOM files are
+            then resolved lazily when deserialized.
 
-    def to_dict(self):
+        Returns
+        -------
+        dict
+            The dictionary representation of the scan.
+
+        """
+
+        if self._path_archive is not None:
+            return {
+                "modality_id": self.modality_id,
+                "modality_type": self.modality_type,
+                "series_description": self.series_description,
+                "path_archive": str(self._path_archive)
+            }
+
+        if compact and self._dir_dicom is not None:
+
+            # A scan hydrated from its compact form is serialized again without resolving its DICOM files :
+            if not self._dicom_paths and self._files_hash is not None:
+                n_files, files_hash = self._n_files, self._files_hash
+
+            else:
+                self.dicom_paths = list(self.dicom_paths)
+                in_dir_dicom = all(Path(path).parent == self._dir_dicom for path in self._dicom_paths)
+                n_files, files_hash = (len(self._dicom_paths), get_files_hash(self._dicom_paths)) if in_dir_dicom \
+                    else (None, None)
+
+            if files_hash is not None:
+                return {
+                    "modality_id": self.modality_id,
+                    "modality_type": self.modality_type,
+                    "series_description": self.series_description,
+                    "dir_dicom": str(self._dir_dicom),
+                    "n_files": n_files,
+                    "files_hash": files_hash
+                }
 
         return {
             "modality_id": self.modality_id,
@@ -88,13 +264,19 @@ class CTScanModality(ScanModality):
                  modality_id: str,
                  dir_dicom: Path = None,
                  dicom_paths: Generator[Path, None, None] = None,
-                 series_description: str = None):
+                 series_description: str = None,
+                 path_archive: Path = None,
+                 n_files: int = None,
+                 files_hash: str = None):
 
         super().__init__(modality_id=modality_id,
                          modality_type="CT",
                          dir_dicom=dir_dicom,
                          dicom_paths=dicom_paths,
-                         series_description=series_description)
+                         series_description=series_description,
+                         path_archive=path_archive,
+                         n_files=n_files,
+                         files_hash=files_hash)
 
 
 class PETScanModality(ScanModality):
@@ -103,10 +285,22 @@ class PETScanModality(ScanModality):
                  modality_id: str,
                  dir_dicom: Path = None,
                  dicom_paths: Generator[Path, None, None] = None,
-                 series_description: str = None):
+                 series_description: str = None,
+                 path_archive: Path = None,
+                 n_files: int = None,
+                 files_hash: str = None):
 
         super().__init__(modality_id=modality_id,
                          modality_type="PET",
                          dir_dicom=dir_dicom,
                          dicom_paths=dicom_paths,
-                         series_description=series_description)
+                         series_description=series_description,
+                         path_archive=path_archive,
+                         n_files=n_files,
+                         files_hash=files_hash)
+
+
+def get_files_hash(dicom_paths: Iterable[Path]) -> str:
+    """ Get the hash of the names of a scan's DICOM files, independent of their order """
+
+    return hashlib.sha1("\n".join(sorted(Path(path).name for path in dicom_paths)).encode()).hexdigest()
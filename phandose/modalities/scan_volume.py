@@ -0,0 +1,303 @@
+from phandose import exceptions
+
+from typing import Iterable
+from pathlib import Path
+import pydicom as dcm
+import pandas as pd
+import numpy as np
+import weakref
+import hashlib
+import os
+
+# Decoded volumes held in memory, for as long as they are referenced elsewhere :
+_cached_volumes = weakref.WeakValueDictionary()
+
+
+class ScanVolume:
+    """
+    The decoded pixel data of a scan, with the geometry needed to place its voxels in world coordinates.
+
+    The pixel data is kept in its stored dtype, and rescaled on demand with the slope and intercept of each slice.
+
+    Attributes
+    ----------
+    _key : (str)
+        The cache key of the volume, see get_volume_key.
+
+    _pixel_array : (np.ndarray)
+        The stored pixel values, of shape (n_slices, n_rows, n_cols), sorted along the z-axis.
+
+    _positions : (np.ndarray)
+        The ImagePositionPatient of each slice, of shape (n_slices, 3).
+
+    _orientation : (np.ndarray)
+        The ImageOrientationPatient of the slices, of shape (6,).
+
+    _spacing : (np.ndarray)
+        The PixelSpacing of the slices, of shape (2,).
+
+    _slopes : (np.ndarray)
+        The RescaleSlope of each slice, of shape (n_slices,).
+
+    _intercepts : (np.ndarray)
+        The RescaleIntercept of each slice, of shape (n_slices,).
+
+    """
+
+    __slots__ = ("_key", "_pixel_array", "_positions", "_orientation", "_spacing", "_slopes", "_intercepts",
+                 "__weakref__")
+
+    def __init__(self,
+                 key: str,
+                 pixel_array: np.ndarray,
+                 positions: np.ndarray,
+                 orientation: np.ndarray,
+                 spacing: np.ndarray,
+                 slopes: np.ndarray,
+                 intercepts: np.ndarray):
+
+        self._key = key
+        self._pixel_array = pixel_array
+        self._positions = np.asarray(positions, dtype=float)
+        self._orientation = np.asarray(orientation, dtype=float)
+        self._spacing = np.asarray(spacing, dtype=float)
+        self._slopes = np.asarray(slopes, dtype=float)
+        self._intercepts = np.asarray(intercepts, dtype=float)
+
+    @property
+    def key(self) -> str:
+        return self._key
+
+    @property
+    def pixel_array(self) -> np.ndarray:
+        return self._pixel_array
+
+    @property
+    def positions(self) -> np.ndarray:
+        return self._positions
+
+    @property
+    def orientation(self) -> np.ndarray:
+        return self._orientation
+
+    @property
+    def spacing(self) -> np.ndarray:
+        return self._spacing
+
+    @property
+    def slopes(self) -> np.ndarray:
+        return self._slopes
+
+    @property
+    def intercepts(self) -> np.ndarray:
+        return self._intercepts
+
+    @property
+    def shape(self) -> tuple[int, int, int]:
+        return self._pixel_array.shape
+
+    def rescaled_array(self, dtype=np.float32) -> np.ndarray:
+        """ Get the rescaled pixel values (e.g. Hounsfield units), of shape (n_slices, n_rows, n_cols) """
+
+        rescaled = self._pixel_array.astype(dtype)
+        rescaled *= self._slopes.astype(dtype)[:, None, None]
+        rescaled += self._intercepts.astype(dtype)[:, None, None]
+
+        return rescaled
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """
+        Convert the volume to a DataFrame with coordinates and intensity values.
+
+        Returns
+        -------
+        pd.DataFrame,
+            DataFrame with columns ['x', 'y', 'z', 'intensity'], where each row represents a voxel
+            with its 3D coordinates and intensity value, slice by slice.
+        """
+
+        n_slices, n_rows, n_cols = self.shape
+
+        # Voxel coordinates within a slice, then in world coordinates for every slice :
+        x_vector, y_vector = self._orientation.reshape(2, 3)
+        orientation = np.array([x_vector, y_vector, np.cross(x_vector, y_vector)])
+
+        row_grid, col_grid = np.meshgrid(np.arange(n_rows) * self._spacing[0],
+                                         np.arange(n_cols) * self._spacing[1],
+                                         indexing='ij')
+        voxel_coords = np.stack([row_grid.ravel(), col_grid.ravel(), np.zeros(n_rows * n_cols)], axis=-1)
+
+        world_coords = (voxel_coords @ orientation.T)[None, :, :] + self._positions[:, None, :]
+        world_coords = world_coords.reshape(-1, 3)
+
+        intensities = (self._pixel_array.reshape(n_slices, -1) * self._slopes[:, None]) + self._intercepts[:, None]
+
+        return pd.DataFrame({'x': world_coords[:, 0],
+                             'y': world_coords[:, 1],
+                             'z': world_coords[:, 2],
+                             'intensity': intensities.ravel()})
+
+    @classmethod
+    def from_dicom(cls, key: str, dicom_slices: Iterable[dcm.dataset.FileDataset]) -> 'ScanVolume':
+        """
+        Decode the DICOM slices of a scan, sorted along the z-axis.
+
+        Parameters
+        ----------
+        key : (str)
+            The cache key of the volume.
+
+        dicom_slices : (Iterable[dcm.dataset.FileDataset])
+            The DICOM slices of the scan, sorted along the z-axis.
+
+        Returns
+        -------
+        ScanVolume
+            The decoded volume.
+
+        Raises
+        ------
+        DicomMetadataError
+            If a slice is missing its geometry, or if the slices don't share the same geometry.
+
+        """
+
+        list_pixel_arrays, list_positions, list_slopes, list_intercepts = [], [], [], []
+        orientation, spacing = None, None
+
+        for dicom_slice in dicom_slices:
+
+            try:
+                slice_orientation = np.array(dicom_slice.ImageOrientationPatient, dtype=float)
+                slice_spacing = np.array(dicom_slice.PixelSpacing, dtype=float)
+                slice_position = np.array(dicom_slice.ImagePositionPatient, dtype=float)
+            except AttributeError as e:
+                raise exceptions.DicomMetadataError("Missing metadata in DICOM slice !") from e
+
+            if slice_orientation.shape != (6,) or slice_spacing.shape != (2,) or slice_position.shape != (3,):
+                raise exceptions.DicomMetadataError("Invalid ImageOrientationPatient, PixelSpacing "
+                                                    "or ImagePositionPatient !")
+
+            if orientation is None:
+                orientation, spacing = slice_orientation, slice_spacing
+
+            elif not (np.allclose(orientation, slice_orientation) and np.allclose(spacing, slice_spacing)):
+                raise exceptions.DicomMetadataError("The slices of the scan don't share the same geometry !")
+
+            list_pixel_arrays.append(dicom_slice.pixel_array)
+            list_positions.append(slice_position)
+            list_slopes.append(float(dicom_slice.get('RescaleSlope', 1)))
+            list_intercepts.append(float(dicom_slice.get('RescaleIntercept', 0)))
+
+        if not list_pixel_arrays:
+            raise exceptions.DicomMetadataError("The scan doesn't have any slice !")
+
+        if len({pixel_array.shape for pixel_array in list_pixel_arrays}) != 1:
+            raise exceptions.DicomMetadataError("The slices of the scan don't share the same shape !")
+
+        return cls(key=key,
+                   pixel_array=np.stack(list_pixel_arrays),
+                   positions=np.array(list_positions),
+                   orientation=orientation,
+                   spacing=spacing,
+                   slopes=np.array(list_slopes),
+                   intercepts=np.array(list_intercepts))
+
+    def save(self, path_npy: Path):
+        """
+        Spill the volume to disk : its pixel data to a .npy file, and its geometry to a .npz file next to it.
+
+        Parameters
+        ----------
+        path_npy : (Path)
+            The path of the .npy file.
+
+        """
+
+        path_npy = Path(path_npy)
+
+        # Write to temporary files first, so that a concurrent reader never sees a partial spill :
+        for path, write in [(path_npy.with_suffix(".npz"), self._save_geometry),
+                            (path_npy, lambda file: np.save(file, self._pixel_array))]:
+
+            path_tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+            with open(path_tmp, "wb") as file:
+                write(file)
+            os.replace(path_tmp, path)
+
+    def _save_geometry(self, file):
+        np.savez(file,
+                 positions=self._positions,
+                 orientation=self._orientation,
+                 spacing=self._spacing,
+                 slopes=self._slopes,
+                 intercepts=self._intercepts)
+
+    @classmethod
+    def load(cls, key: str, path_npy: Path, mmap_mode: str = 'r') -> 'ScanVolume':
+        """
+        Load a volume spilled to disk, memory-mapping its pixel data by default.
+
+        Parameters
+        ----------
+        key : (str)
+            The cache key of the volume.
+
+        path_npy : (Path)
+            The path of the .npy file.
+
+        mmap_mode : (str, Optional)
+            The memory-map mode of np.load, defaults to 'r'.
+
+        Returns
+        -------
+        ScanVolume
+            The loaded volume.
+
+        """
+
+        path_npy = Path(path_npy)
+
+        with np.load(path_npy.with_suffix(".npz")) as geometry:
+            return cls(key=key,
+                       pixel_array=np.load(path_npy, mmap_mode=mmap_mode),
+                       **{name: geometry[name] for name in geometry.files})
+
+    def __str__(self):
+        return f"ScanVolume: {self.key} - shape: {self.shape}"
+
+    __repr__ = __str__
+
+
+def get_volume_key(series_instance_uid: str, dicom_paths: Iterable[Path]) -> str:
+    """
+    Get the cache key of a scan's volume, from its Series Instance UID and the modification times of its slices.
+
+    Parameters
+    ----------
+    series_instance_uid : (str)
+        The Series Instance UID of the scan.
+
+    dicom_paths : (Iterable[Path])
+        The paths of the scan's slices.
+
+    Returns
+    -------
+    str
+        The cache key.
+
+    """
+
+    file_hash = hashlib.sha1()
+    for path_dicom in dicom_paths:
+        file_hash.update(f"{path_dicom}|{os.stat(path_dicom).st_mtime_ns}\n".encode())
+
+    return f"{series_instance_uid}.{file_hash.hexdigest()[:16]}"
+
+
+def get_cached_volume(key: str) -> ScanVolume | None:
+    return _cached_volumes.get(key)
+
+
+def cache_volume(volume: ScanVolume):
+    _cached_volumes[volume.key] = volume
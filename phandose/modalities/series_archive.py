@@ -0,0 +1,212 @@
+from typing import Iterable, Generator
+from pathlib import Path
+import pydicom as dcm
+import struct
+import shutil
+import json
+import mmap
+import io
+import os
+
+# The signature at the start and the end of an archive :
+ARCHIVE_MAGIC = b"PHDSER01"
+
+# The footer : the offset and the size of the JSON index (little-endian uint64), then the signature :
+_FOOTER = struct.Struct("<QQ8s")
+
+
+class SeriesArchive:
+    """
+    A packed series : the DICOM part-10 files of a scan's slices concatenated into a single container file.
+
+    A single file per series keeps the metadata operations of shared filesystems (NFS, Lustre) to one open per scan,
+    while every slice remains readable on its own, through a memory map of the archive.
+
+    The layout of the archive is :
+        - the signature (8 bytes),
+        - the DICOM files of the slices, concatenated in the order of the scan (sorted along the z-axis),
+        - a JSON index : {"series_instance_uid": str, "slices": [{"name", "offset", "size", "mtime_ns"}, ...]},
+        - the footer : the offset and the size of the index (little-endian uint64), and the signature.
+
+    Attributes
+    ----------
+    _path_archive : (Path)
+        The path of the archive.
+
+    _index : (dict)
+        The index of the archive.
+
+    _file : (BinaryIO)
+        The opened archive.
+
+    _mmap : (mmap.mmap)
+        The read-only memory map of the archive.
+
+    """
+
+    def __init__(self, path_archive: Path):
+        """
+        Open an archive and read its index.
+
+        Parameters
+        ----------
+        path_archive : (Path)
+            The path of the archive.
+
+        Raises
+        ------
+        ValueError
+            If the file isn't a series archive.
+
+        """
+
+        self._path_archive = Path(path_archive)
+        self._file = open(self._path_archive, "rb")
+
+        try:
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+            if len(self._mmap) < len(ARCHIVE_MAGIC) + _FOOTER.size or self._mmap[:len(ARCHIVE_MAGIC)] != ARCHIVE_MAGIC:
+                raise ValueError(f"{self._path_archive} isn't a series archive !")
+
+            index_offset, index_size, magic = _FOOTER.unpack(self._mmap[-_FOOTER.size:])
+            if magic != ARCHIVE_MAGIC:
+                raise ValueError(f"{self._path_archive} is a truncated series archive !")
+
+            self._index = json.loads(self._mmap[index_offset:index_offset + index_size])
+
+        except (ValueError, OSError):
+            self.close()
+            raise
+
+    @property
+    def path_archive(self) -> Path:
+        return self._path_archive
+
+    @property
+    def series_instance_uid(self) -> str:
+        return self._index["series_instance_uid"]
+
+    @property
+    def slices(self) -> list[dict]:
+        """ The index entries of the slices : their file name, offset and size in the archive, and source mtime """
+        return self._index["slices"]
+
+    @property
+    def names(self) -> list[str]:
+        return [entry["name"] for entry in self.slices]
+
+    def __len__(self):
+        return len(self.slices)
+
+    def read_bytes(self, index: int) -> bytes:
+        """ Read the DICOM file of a slice, as bytes """
+
+        entry = self.slices[index]
+        return self._mmap[entry["offset"]:entry["offset"] + entry["size"]]
+
+    def read_slice(self, index: int, **kwargs) -> dcm.dataset.FileDataset:
+        """
+        Read a slice of the series.
+
+        Parameters
+        ----------
+        index : (int)
+            The index of the slice, in the order of the scan.
+
+        **kwargs : (dict)
+            Additional keyword arguments of pydicom.dcmread, e.g. stop_before_pixels.
+
+        Returns
+        -------
+        dcm.dataset.FileDataset
+            The DICOM dataset of the slice.
+
+        """
+
+        return dcm.dcmread(io.BytesIO(self.read_bytes(index)), **kwargs)
+
+    def iter_slices(self, **kwargs) -> Generator[dcm.dataset.FileDataset, None, None]:
+        for index in range(len(self)):
+            yield self.read_slice(index, **kwargs)
+
+    def extract(self, index: int, path_dicom: Path) -> Path:
+        """ Write the DICOM file of a slice back to disk """
+
+        Path(path_dicom).write_bytes(self.read_bytes(index))
+        return Path(path_dicom)
+
+    def close(self):
+
+        if getattr(self, "_mmap", None) is not None:
+            self._mmap.close()
+            self._mmap = None
+
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @classmethod
+    def create(cls, path_archive: Path, dicom_paths: Iterable[Path], series_instance_uid: str) -> 'SeriesArchive':
+        """
+        Pack the DICOM files of a scan's slices into an archive.
+
+        The archive is written to a temporary file first, then renamed, so that readers never see a partial archive.
+
+        Parameters
+        ----------
+        path_archive : (Path)
+            The path of the archive.
+
+        dicom_paths : (Iterable[Path])
+            The paths of the DICOM files of the slices, sorted along the z-axis.
+
+        series_instance_uid : (str)
+            The Series Instance UID of the scan.
+
+        Returns
+        -------
+        SeriesArchive
+            The opened archive.
+
+        """
+
+        path_archive = Path(path_archive)
+        path_tmp = path_archive.with_name(f".{path_archive.name}.{os.getpid()}.tmp")
+
+        list_entries = []
+        try:
+            with open(path_tmp, "wb") as file_archive:
+                file_archive.write(ARCHIVE_MAGIC)
+
+                for path_dicom in dicom_paths:
+                    offset = file_archive.tell()
+                    with open(path_dicom, "rb") as file_dicom:
+                        shutil.copyfileobj(file_dicom, file_archive)
+
+                    list_entries.append({"name": Path(path_dicom).name,
+                                         "offset": offset,
+                                         "size": file_archive.tell() - offset,
+                                         "mtime_ns": os.stat(path_dicom).st_mtime_ns})
+
+                index = json.dumps({"series_instance_uid": series_instance_uid, "slices": list_entries}).encode()
+                index_offset = file_archive.tell()
+                file_archive.write(index)
+                file_archive.write(_FOOTER.pack(index_offset, len(index), ARCHIVE_MAGIC))
+
+            os.replace(path_tmp, path_archive)
+
+        finally:
+            path_tmp.unlink(missing_ok=True)
+
+        return cls(path_archive)
+
+    def __str__(self):
+        return f"SeriesArchive: {self._path_archive} - {len(self)} slices"
+
+    __repr__ = __str__
+
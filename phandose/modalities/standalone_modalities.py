@@ -1,4 +1,5 @@
 from phandose.utils import dicom_utils
+from phandose.dose import RtdoseGrid
 from phandose import conversions
 from .modality import Modality
 
@@ -6,6 +7,9 @@ from abc import ABC
 from pathlib import Path
 import pydicom as dcm
 
+# Elements larger than this size are not read with the header, but on access (e.g. contour sequences) :
+HEADER_DEFER_SIZE = "64 KB"
+
 
 class StandAloneModality(Modality, ABC):
 
@@ -21,6 +25,10 @@ class StandAloneModality(Modality, ABC):
         self._dir_dicom = dir_dicom
         self._path_dicom = path_dicom
 
+        # Cached header-only and full datasets of the DICOM file :
+        self._header = None
+        self._dataset = None
+
     @property
     def path_dicom(self) -> Path:
 
@@ -34,15 +42,38 @@ class StandAloneModality(Modality, ABC):
 
     @path_dicom.setter
     def path_dicom(self, path_dicom: Path):
+
+        if path_dicom != self._path_dicom:
+            self.clear_cache()
+
         self._path_dicom = path_dicom
 
     def set_series_description(self):
-        self._series_description = self.dicom().SeriesDescription
+        self._series_description = self.header().SeriesDescription
+
+    def header(self) -> dcm.dataset.FileDataset:
+        """ Return the cached header of the DICOM file, without pixel data, its large elements being read on access """
+
+        if self._header is None:
+            self._header = dcm.dcmread(str(self.path_dicom), stop_before_pixels=True, defer_size=HEADER_DEFER_SIZE)
+
+        return self._header
 
     def dicom(self) -> dcm.dataset.FileDataset:
-        return dcm.dcmread(str(self.path_dicom))
+        """ Return the cached full dataset of the DICOM file, read on first access """
+
+        if self._dataset is None:
+            self._dataset = dcm.dcmread(str(self.path_dicom))
+
+        return self._dataset
 
-    def to_dict(self):
+    def clear_cache(self):
+        """ Release the cached header and full dataset of the DICOM file """
+
+        self._header = None
+        self._dataset = None
+
+    def to_dict(self, compact: bool = False):
 
         return {
             "modality_id": self.modality_id,
@@ -74,14 +105,18 @@ class RtdoseModality(StandAloneModality):
     def path_rtdose(self, path_rtdose: Path):
         self.path_dicom = path_rtdose
 
+    def dose_grid(self) -> RtdoseGrid:
+        """ Return a lazy accessor to the dose grid, decoding its frames on demand from the DICOM file """
+        return RtdoseGrid(self.path_dicom)
+
     def dataframe(self):
-        return conversions.convert_rtdose_to_dataframe(self.dicom())
+        return conversions.convert_rtdose_to_dataframe(self.dose_grid())
 
     def is_primary_dose(self) -> bool:
-        return self.dicom().get("DoseSummationType") == "PLAN"
+        return self.header().get("DoseSummationType") == "PLAN"
 
     def get_referenced_rtplan_uid(self) -> str:
-        referenced_rtplan_sequence = self.dicom().get("ReferencedRTPlanSequence", None)
+        referenced_rtplan_sequence = self.header().get("ReferencedRTPlanSequence", None)
 
         if not referenced_rtplan_sequence:
             raise ValueError(f"RTDOSE {self.modality_id} doesn't reference any RTPLAN !")
@@ -119,7 +154,7 @@ class RtstructModality(StandAloneModality):
 
     def get_referenced_scan_uid(self) -> str:
 
-        referenced_frame_sequence = self.dicom().get("ReferencedFrameOfReferenceSequence", None)
+        referenced_frame_sequence = self.header().get("ReferencedFrameOfReferenceSequence", None)
         if not referenced_frame_sequence:
             raise ValueError(f"RTSTRUCT {self.modality_id} doesn't reference any Scan, issue at Frame of reference !")
 
@@ -161,7 +196,7 @@ class RtplanModality(StandAloneModality):
 
     def get_referenced_rtstruct_uid(self) -> str:
 
-        referenced_rtstruct_sequence = self.dicom().get("ReferencedStructureSetSequence", None)
+        referenced_rtstruct_sequence = self.header().get("ReferencedStructureSetSequence", None)
 
         if not referenced_rtstruct_sequence:
             raise ValueError(f"RTPLAN {self.modality_id} doesn't reference any RTSTRUCT !")
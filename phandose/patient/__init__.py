@@ -1,2 +1,4 @@
 from .patient import Patient
-from .patient_characteristics import get_patient_characteristics
+from .patient_characteristics import get_patient_characteristics, get_cohort_characteristics
+from .characteristics_cache import CharacteristicsCache
+from .modality_link_graph import ModalityLinkGraph, PlanChain
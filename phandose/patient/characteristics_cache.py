@@ -0,0 +1,146 @@
+from datetime import datetime
+from typing import Iterable
+from pathlib import Path
+import sqlite3
+import json
+import os
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS characteristics (
+    folder TEXT PRIMARY KEY,
+    folder_mtime_ns INTEGER NOT NULL,
+    path_slice TEXT NOT NULL,
+    slice_mtime_ns INTEGER NOT NULL,
+    record TEXT NOT NULL
+);
+"""
+
+# The characteristics stored as ISO dates in the cache :
+DATE_KEYS = ("AcquisitionDate", "PatientBirthDate")
+
+
+class CharacteristicsCache:
+    """
+    Cache of the patient characteristics of imaging folders, in a SQLite file.
+
+    The characteristics of a folder are keyed by the modification times of the folder and of the slice they were
+    read from : they are read again only if files were added to, or removed from, the folder, or if the slice was
+    modified, so that a re-run over a whole cohort only reads the new folders.
+
+    Attributes
+    ----------
+    _path_cache : (Path)
+        The path of the SQLite file.
+
+    _connection : (sqlite3.Connection)
+        The connection to the SQLite file.
+
+    """
+
+    def __init__(self, path_cache: Path):
+        """
+        Open the cache of patient characteristics, creating it if needed.
+
+        Parameters
+        ----------
+        path_cache : (Path)
+            The path of the SQLite file.
+
+        """
+
+        self._path_cache = Path(path_cache)
+        self._path_cache.parent.mkdir(parents=True, exist_ok=True)
+
+        self._connection = sqlite3.connect(str(self._path_cache), timeout=30)
+        self._connection.executescript(_SCHEMA)
+
+    @property
+    def path_cache(self) -> Path:
+        return self._path_cache
+
+    def get_records(self, list_folders: Iterable[Path | str]) -> dict[str, dict]:
+        """
+        Get the cached characteristics of the folders which didn't change since they were read.
+
+        Parameters
+        ----------
+        list_folders : (Iterable[Path | str])
+            The imaging folders.
+
+        Returns
+        -------
+        dict[str, dict]
+            The characteristics of the unchanged cached folders, by folder.
+
+        """
+
+        dict_records = {}
+        for folder in map(str, list_folders):
+            row = self._connection.execute("SELECT folder_mtime_ns, path_slice, slice_mtime_ns, record "
+                                           "FROM characteristics WHERE folder = ?", (folder,)).fetchone()
+            if row is None:
+                continue
+
+            folder_mtime_ns, path_slice, slice_mtime_ns, record = row
+            if _get_mtime_ns(folder) == folder_mtime_ns and _get_mtime_ns(path_slice) == slice_mtime_ns:
+                dict_records[folder] = _load_record(record)
+
+        return dict_records
+
+    def put_records(self, list_entries: Iterable[tuple[str, int, str, int, dict]]):
+        """
+        Store the characteristics of folders, replacing their previous ones.
+
+        Parameters
+        ----------
+        list_entries : (Iterable[tuple[str, int, str, int, dict]])
+            For each folder : the folder and its modification time (ns), the slice the characteristics were read
+            from and its modification time (ns), and the characteristics.
+
+        """
+
+        with self._connection:
+            self._connection.executemany("INSERT OR REPLACE INTO characteristics VALUES (?, ?, ?, ?, ?)",
+                                         [(str(folder), folder_mtime_ns, str(path_slice), slice_mtime_ns,
+                                           _dump_record(record))
+                                          for folder, folder_mtime_ns, path_slice, slice_mtime_ns, record
+                                          in list_entries])
+
+    def __len__(self):
+        return self._connection.execute("SELECT COUNT(*) FROM characteristics").fetchone()[0]
+
+    def close(self):
+        self._connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __str__(self):
+        return f"CharacteristicsCache: {self._path_cache}"
+
+    __repr__ = __str__
+
+
+def _get_mtime_ns(path: Path | str) -> int | None:
+
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def _dump_record(record: dict) -> str:
+    return json.dumps(record, default=lambda value: value.isoformat() if isinstance(value, datetime) else str(value))
+
+
+def _load_record(record: str) -> dict:
+
+    record = json.loads(record)
+    for key in DATE_KEYS:
+        if isinstance(record.get(key), str):
+            record[key] = datetime.fromisoformat(record[key])
+
+    return record
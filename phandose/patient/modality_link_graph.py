@@ -0,0 +1,138 @@
+from phandose.modalities import Modality
+from phandose.utils import get_logger
+
+from typing import NamedTuple, Iterable
+from collections import defaultdict
+
+# Initialize the logger :
+logger = get_logger("phandose.patient.modality_link_graph")
+
+
+class PlanChain(NamedTuple):
+    """ A consistent RD -> RP -> RS -> scan chain of a patient's modalities UIDs """
+
+    dose_uid: str
+    plan_uid: str
+    rtstruct_uid: str
+    scan_uid: str
+
+
+class ModalityLinkGraph:
+    """
+    Indexed graph of the references between a patient's modalities : RD -> RP -> RS -> scan (CT or PET).
+
+    The references are read once from the cached headers of the standalone modalities, and only the references to
+    modalities of the patient are kept. Every query is then a dictionary lookup.
+
+    """
+
+    def __init__(self, list_modalities: Iterable[Modality]):
+        """
+        Build the link graph of a patient's modalities.
+
+        Parameters
+        ----------
+        list_modalities : (Iterable[Modality])
+            The modalities of the patient.
+
+        """
+
+        self._modalities = {modality.modality_id: modality for modality in list_modalities}
+
+        # Direct references, and their reverse multi-maps :
+        self._plan_for_dose = self._read_references("RD", "RP", "get_referenced_rtplan_uid")
+        self._rtstruct_for_plan = self._read_references("RP", "RS", "get_referenced_rtstruct_uid")
+        self._scan_for_rtstruct = self._read_references("RS", ("CT", "PET"), "get_referenced_scan_uid")
+
+        self._doses_for_plan = _reverse(self._plan_for_dose)
+        self._plans_for_rtstruct = _reverse(self._rtstruct_for_plan)
+        self._rtstructs_for_scan = _reverse(self._scan_for_rtstruct)
+
+        # Transitive references, resolved once :
+        self._rtstruct_for_dose = {dose_uid: self._rtstruct_for_plan[plan_uid]
+                                   for dose_uid, plan_uid in self._plan_for_dose.items()
+                                   if plan_uid in self._rtstruct_for_plan}
+
+        self._scan_for_dose = {dose_uid: self._scan_for_rtstruct[rtstruct_uid]
+                               for dose_uid, rtstruct_uid in self._rtstruct_for_dose.items()
+                               if rtstruct_uid in self._scan_for_rtstruct}
+
+        self._doses_for_scan = _reverse(self._scan_for_dose)
+
+    def _read_references(self, source_type: str, target_types: str | tuple[str, ...], method: str) -> dict[str, str]:
+
+        target_types = (target_types,) if isinstance(target_types, str) else target_types
+        dict_references = {}
+
+        for modality_id, modality in self._modalities.items():
+            if modality.modality_type != source_type:
+                continue
+
+            try:
+                referenced_uid = getattr(modality, method)()
+            except ValueError as e:
+                logger.debug("No reference for %s : %s", modality, e)
+                continue
+
+            referenced_modality = self._modalities.get(referenced_uid)
+            if referenced_modality is None or referenced_modality.modality_type not in target_types:
+                logger.debug("%s references %s, which isn't a modality of the patient", modality, referenced_uid)
+                continue
+
+            dict_references[modality_id] = referenced_uid
+
+        return dict_references
+
+    def get_modality(self, modality_id: str) -> Modality | None:
+        return self._modalities.get(modality_id)
+
+    def plan_for_dose(self, dose_uid: str) -> str | None:
+        return self._plan_for_dose.get(dose_uid)
+
+    def rtstruct_for_plan(self, plan_uid: str) -> str | None:
+        return self._rtstruct_for_plan.get(plan_uid)
+
+    def scan_for_rtstruct(self, rtstruct_uid: str) -> str | None:
+        return self._scan_for_rtstruct.get(rtstruct_uid)
+
+    def rtstruct_for_dose(self, dose_uid: str) -> str | None:
+        return self._rtstruct_for_dose.get(dose_uid)
+
+    def scan_for_dose(self, dose_uid: str) -> str | None:
+        return self._scan_for_dose.get(dose_uid)
+
+    def doses_for_plan(self, plan_uid: str) -> tuple[str, ...]:
+        return self._doses_for_plan.get(plan_uid, ())
+
+    def plans_for_rtstruct(self, rtstruct_uid: str) -> tuple[str, ...]:
+        return self._plans_for_rtstruct.get(rtstruct_uid, ())
+
+    def rtstructs_for_scan(self, scan_uid: str) -> tuple[str, ...]:
+        return self._rtstructs_for_scan.get(scan_uid, ())
+
+    def doses_for_scan(self, scan_uid: str) -> tuple[str, ...]:
+        return self._doses_for_scan.get(scan_uid, ())
+
+    def plan_chains(self) -> list[PlanChain]:
+        """ Get the complete RD -> RP -> RS -> scan chains of the patient """
+
+        return [PlanChain(dose_uid=dose_uid,
+                          plan_uid=self._plan_for_dose[dose_uid],
+                          rtstruct_uid=self._rtstruct_for_dose[dose_uid],
+                          scan_uid=scan_uid)
+                for dose_uid, scan_uid in self._scan_for_dose.items()]
+
+    def __str__(self):
+        return (f"ModalityLinkGraph: {len(self._modalities)} modalities - "
+                f"{len(self._scan_for_dose)} complete plan chains")
+
+    __repr__ = __str__
+
+
+def _reverse(dict_references: dict[str, str]) -> dict[str, tuple[str, ...]]:
+
+    dict_reversed = defaultdict(list)
+    for source_uid, target_uid in dict_references.items():
+        dict_reversed[target_uid].append(source_uid)
+
+    return {target_uid: tuple(list_source_uids) for target_uid, list_source_uids in dict_reversed.items()}
@@ -1,14 +1,21 @@
+from phandose.patient.modality_link_graph import ModalityLinkGraph
 from phandose.modalities import Modality, create_modality
 from phandose.utils import (get_modality_from_dicom_slice,
                             get_logger)
+from phandose.utils.dicom_utils import scan_dicom_headers
+from phandose.utils.profiling import profiled
 
 from pathlib import Path
 from typing import Dict
-import pydicom as dcm
+import logging
 
 # Initialize the logger :
 logger = get_logger("phandose.patient")
 
+# DICOM tags read to ingest a patient's DICOM directory :
+INGESTION_TAGS = ["Modality", "ProcedureCodeSequence", "SeriesInstanceUID", "SOPInstanceUID",
+                  "SeriesDescription", "ImagePositionPatient", "InstanceNumber"]
+
 
 class Patient:
 
@@ -26,11 +33,16 @@ class Patient:
         """
 
         self._patient_id = patient_id
-        self._list_modalities = list_modalities if list_modalities else []
+        self._list_modalities = list(list_modalities) if list_modalities else []
+        self._dict_modalities = {modality.modality_id: modality for modality in self._list_modalities}
+        self._link_graph = None
 
-        logger.debug(f"Patient object initialized with ID: {self.patient_id} and {len(self.list_modalities)} modalities")
-        for i, modality in enumerate(self.list_modalities):
-            logger.debug(f"Patient {self.patient_id} modality {i + 1} : {modality.modality_id} ({modality.modality_type})")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Patient object initialized with ID: %s and %d modalities",
+                         self.patient_id, len(self.list_modalities))
+            for i, modality in enumerate(self.list_modalities):
+                logger.debug("Patient %s modality %d : %s (%s)",
+                             self.patient_id, i + 1, modality.modality_id, modality.modality_type)
 
     @property
     def patient_id(self):
@@ -42,7 +54,7 @@ class Patient:
 
     @property
     def dict_modalities(self) -> Dict[str, Modality]:
-        return {modality.modality_id: modality for modality in self._list_modalities}
+        return self._dict_modalities
 
     def add_modality(self, modality_id: str, modality_type: str, dir_dicom: Path = None,
                      log_silently_if_exists: bool = False,
@@ -70,38 +82,111 @@ class Patient:
         """
         try:
 
-            if modality_id in self.dict_modalities.keys():
+            if modality_id in self.dict_modalities:
                 if not log_silently_if_exists:
-                    logger.warning(f"Modality {modality_id} already exists for patient {self.patient_id} !")
+                    logger.warning("Modality %s already exists for patient %s !", modality_id, self.patient_id)
                 return
 
-            logger.debug(f"Adding modality {modality_id} to patient {self.patient_id} ...")
-            self._list_modalities.append(create_modality(modality_id=modality_id,
-                                                         modality_type=modality_type,
-                                                         dir_dicom=dir_dicom,
-                                                         **kwargs))
+            logger.debug("Adding modality %s to patient %s ...", modality_id, self.patient_id)
+            modality = create_modality(modality_id=modality_id,
+                                       modality_type=modality_type,
+                                       dir_dicom=dir_dicom,
+                                       **kwargs)
+
+            self._list_modalities.append(modality)
+            self._dict_modalities[modality_id] = modality
+            self._link_graph = None
 
-            logger.info(f"Successfully added modality {modality_id} ({modality_type}) to patient {self.patient_id} !")
+            logger.info("Successfully added modality %s (%s) to patient %s !",
+                        modality_id, modality_type, self.patient_id)
 
         except Exception as e:
-            logger.error(f"Failed to add modality {modality_id} ({modality_type}) to patient {self.patient_id} : {e}")
+            logger.error("Failed to add modality %s (%s) to patient %s : %s",
+                         modality_id, modality_type, self.patient_id, e)
             raise e
 
+    def remove_modality(self, modality_id: str) -> Modality | None:
+        """
+        Remove a modality from the patient.
+
+        Parameters
+        ----------
+        modality_id : (str)
+            The unique modality ID of the modality.
+
+        Returns
+        -------
+        Modality | None
+            The removed modality, None if the patient doesn't have it.
+
+        """
+
+        modality = self._dict_modalities.pop(modality_id, None)
+        if modality is None:
+            logger.warning("Modality %s doesn't exist for patient %s !", modality_id, self.patient_id)
+            return None
+
+        self._list_modalities.remove(modality)
+        self._link_graph = None
+
+        logger.info("Successfully removed modality %s from patient %s !", modality_id, self.patient_id)
+        return modality
+
     def get_modality(self, modality_id: str) -> Modality:
         return self.dict_modalities.get(modality_id)
 
-    def to_dict(self) -> Dict[str, any]:
+    def link_graph(self) -> ModalityLinkGraph:
+        """
+        Get the indexed graph of the references between the patient's modalities (RD -> RP -> RS -> CT / PET).
+
+        The graph is built once from the modalities' cached headers, and rebuilt only if modalities were added or
+        removed.
+
+        Returns
+        -------
+        ModalityLinkGraph
+            The link graph of the patient's modalities.
+        """
+
+        if self._link_graph is None:
+            self._link_graph = ModalityLinkGraph(self._list_modalities)
+
+        return self._link_graph
+
+    def to_dict(self, compact: bool = False) -> Dict[str, any]:
+        """
+        Serialize the patient as a dictionary.
+
+        Parameters
+        ----------
+        compact : (bool, Optional)
+            Whether to serialize the scans in their compact form, their DICOM directory instead of the path of every
+            DICOM file, see ScanModality.to_dict, defaults to False.
+
+        Returns
+        -------
+        Dict[str, any]
+            The dictionary representation of the patient.
+
+        """
 
         return {
             "patient_id": self.patient_id,
-            "modalities": [modality.to_dict() for modality in self.list_modalities]
+            "modalities": [modality.to_dict(compact=True) if compact else modality.to_dict()
+                           for modality in self.list_modalities]
         }
 
     @staticmethod
-    def from_dir_dicom(patient_id: str, dir_dicom: Path) -> 'Patient':
+    @profiled
+    def from_dir_dicom(patient_id: str, dir_dicom: Path, max_workers: int = None) -> 'Patient':
         """
         Create a Patient object from a directory containing DICOM files.
 
+        The directory is walked once, and only the headers of the DICOM files needed to identify their modality
+        are read, on a thread pool. The files are grouped by SeriesInstanceUID for the scans (CT, PET), whose slices
+        are sorted along the z-axis, and by SOPInstanceUID for the other modalities (RD, RP, RS). The slices without
+        z-position are sorted after the others, by instance number, and reported with the errors.
+
         Parameters
         ----------
         patient_id : (str)
@@ -110,62 +195,92 @@ class Patient:
         dir_dicom : (Path)
             The directory containing the DICOM files for the patient.
 
+        max_workers : (int, Optional)
+            The maximal number of threads reading the DICOM headers, defaults to the ThreadPoolExecutor's default.
+
         Returns
         -------
         patient : Patient
             The patient object created from the DICOM files and the patient ID.
         """
 
-        logger.debug(f"Attempting to create patient object for ID {patient_id}, from DICOM directory : {dir_dicom} ...")
+        logger.debug("Attempting to create patient object for ID %s, from DICOM directory : %s ...",
+                     patient_id, dir_dicom)
 
         # Initialize the patient object :
         patient = Patient(patient_id=patient_id)
 
-        # Check if directory exists and is not empty :
-        if not dir_dicom.exists() or not any(dir_dicom.rglob("*.dcm")):
-            logger.error(fr"No DICOM files found in directory {dir_dicom} !")
-            raise FileNotFoundError(f"No DICOM files found in directory {dir_dicom} !")
-
         errors = []
+        dict_found = {}
+        n_files = 0
+
+        # Read the DICOM headers on a thread pool, and group the files by modality :
+        for dicom_header in scan_dicom_headers(dir_dicom, tags=INGESTION_TAGS, workers=max_workers,
+                                               include_invalid=True):
+            n_files += 1
+            path_dicom = dicom_header.path
 
-        # Loop over all the DICOM files in the directory :
-        for path_dicom in dir_dicom.rglob("*.dcm"):
             try:
-                dicom_slice = dcm.read_file(str(path_dicom))
+                if not dicom_header.is_dicom:
+                    raise dicom_header.error
+
+                dicom_slice = dicom_header.dataset
                 modality_type = get_modality_from_dicom_slice(dicom_slice)
 
                 if modality_type in ['CT', 'PET']:
-                    modality_id = dicom_slice.SeriesInstanceUID
-                    kwargs = {}
+                    scan = dict_found.setdefault(dicom_slice.SeriesInstanceUID,
+                                                 {"modality_type": modality_type,
+                                                  "dir_dicom": path_dicom.parent,
+                                                  "series_description": dicom_slice.SeriesDescription,
+                                                  "dicom_paths": []})
+
+                    # Record the z-position of the slice, to sort the scan's slices :
+                    slice_position = dicom_slice.get("ImagePositionPatient", None)
+                    if slice_position and len(slice_position) == 3:
+                        scan["dicom_paths"].append(((0, float(slice_position[2]), 0, str(path_dicom)), path_dicom))
+
+                    # A slice without z-position is kept, sorted after the others by instance number and path :
+                    else:
+                        instance_number = dicom_slice.get("InstanceNumber", None)
+                        instance_number = int(instance_number) if instance_number not in (None, "") else 0
+                        scan["dicom_paths"].append(((1, 0.0, instance_number, str(path_dicom)), path_dicom))
+                        errors.append((str(path_dicom), "No ImagePositionPatient, the slice is sorted by "
+                                                        "InstanceNumber after the positioned slices"))
 
                 elif modality_type in ['RD', 'RP', 'RS']:
-                    modality_id = dicom_slice.SOPInstanceUID
-                    kwargs = {"path_dicom": path_dicom}
+                    dict_found.setdefault(dicom_slice.SOPInstanceUID,
+                                          {"modality_type": modality_type,
+                                           "dir_dicom": path_dicom.parent,
+                                           "series_description": dicom_slice.SeriesDescription,
+                                           "path_dicom": path_dicom})
 
                 else:
                     raise ValueError(f"Unknown modality type {modality_type} for file {str(path_dicom)}")
 
-                series_description = dicom_slice.SeriesDescription
-
-                # Add the modality to the patient object :
-                patient.add_modality(modality_id=modality_id,
-                                     modality_type=modality_type,
-                                     dir_dicom=path_dicom.parent,
-                                     series_description=series_description,
-                                     log_silently_if_exists=True,
-                                     **kwargs)
-
             except Exception as e:
                 errors.append((str(path_dicom), str(e)))
 
+        # Check if directory exists and is not empty :
+        if n_files == 0:
+            logger.error(fr"No DICOM files found in directory {dir_dicom} !")
+            raise FileNotFoundError(f"No DICOM files found in directory {dir_dicom} !")
+
+        # Add the fully populated modalities to the patient object, in the order they were found :
+        for modality_id, kwargs in dict_found.items():
+            if "dicom_paths" in kwargs:
+                kwargs["dicom_paths"] = [path_dicom for _, path_dicom in sorted(kwargs["dicom_paths"],
+                                                                                key=lambda x: x[0])]
+
+            patient.add_modality(modality_id=modality_id, log_silently_if_exists=True, **kwargs)
+
         # Log summary of errors
         if errors:
-            logger.warning(f"Completed Patient creation for {patient_id} with {len(errors)} errors.")
+            logger.warning("Completed Patient creation for %s with %d errors.", patient_id, len(errors))
             for path, error in errors:
-                logger.warning(f"Error for file {path}: {error}")
+                logger.warning("Error for file %s: %s", path, error)
 
-        logger.debug(fr"Completed Patient creation for {patient_id} from DICOM directory : {dir_dicom} "
-                     fr"with {len(errors)} errors.")
+        logger.debug("Completed Patient creation for %s from DICOM directory : %s with %d errors.",
+                     patient_id, dir_dicom, len(errors))
         return patient
 
     @staticmethod
@@ -193,21 +308,27 @@ class Patient:
             logger.error("Failed to create Patient object: 'patient_id' key is missing in dictionary !")
             raise ValueError("dict_patient must contain a 'patient_id' key!")
 
-        patient = Patient(patient_id=patient_id)
-
-        # Add the modalities to the patient object :
+        # Create the modalities, indexed by UID, the scans of a compact form resolving their DICOM files lazily :
         list_dict_modalities = dict_patient.get("modalities", [])
+        dict_modalities = {}
 
         try:
-            for i, dict_modality in enumerate(list_dict_modalities):
-                logger.debug(f"Processing modality {i + 1}/{len(list_dict_modalities)} for patient {patient_id} :")
-                patient.add_modality(**dict_modality)
+            for dict_modality in list_dict_modalities:
+                modality_id = dict_modality["modality_id"]
 
-            logger.debug(f"Completed creation of Patient object from dictionary with ID {patient_id} "
-                         f"and {len(patient.list_modalities)} modalities.")
+                if modality_id in dict_modalities:
+                    logger.warning("Modality %s already exists for patient %s !", modality_id, patient_id)
+                    continue
+
+                dict_modalities[modality_id] = create_modality(**dict_modality)
 
         except Exception as e:
             logger.error(f"Failed to create Patient object from dictionary! Error : {e}")
             raise e
 
+        patient = Patient(patient_id=patient_id, list_modalities=list(dict_modalities.values()))
+
+        logger.debug("Completed creation of Patient object from dictionary with ID %s and %d modalities.",
+                     patient_id, len(patient.list_modalities))
+
         return patient
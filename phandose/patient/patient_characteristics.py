@@ -1,8 +1,45 @@
+from phandose.patient.characteristics_cache import CharacteristicsCache
+from phandose.utils.dicom_utils import read_dicom_header
+from phandose.utils import get_logger
+
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
 import pydicom as dcm
 import pandas as pd
 import numpy as np
+import os
+
+# Initialize the logger :
+logger = get_logger("phandose.patient.patient_characteristics")
+
+# dictionary of the patient_characteristics DataFrame columns with their respective data types :
+DICT_COLUMNS = {
+    'Folder': str,
+    'Type': str,
+    'PatientID': str,
+    'CodeMeaning': str,
+    'AcquisitionDate': 'datetime64[ns]',
+    'DataCollectionDiameter': float,
+    'ReconstructionDiameter': float,
+    'PatientPosition': str,
+    'PatientBirthDate': 'datetime64[ns]',
+    'PatientSex': str,
+    'PatientSize': float,
+    'PatientWeight': float
+}
+
+# List of attributes to extract from the DICOM file :
+LIST_ATTRIBUTES = ['PatientID',
+                   'ProcedureCodeSequence',
+                   'AcquisitionDate',
+                   'DataCollectionDiameter',
+                   'ReconstructionDiameter',
+                   'PatientPosition',
+                   'PatientBirthDate',
+                   'PatientSex',
+                   'PatientSize',
+                   "PatientWeight"]
 
 
 def get_patient_characteristics(*list_path_imaging: Path | str) -> pd.DataFrame:
@@ -44,75 +81,153 @@ def get_patient_characteristics(*list_path_imaging: Path | str) -> pd.DataFrame:
 
     """
 
-    # dictionary of the patient_characteristics DataFrame columns with their respective data types :
-    dict_columns = {
-        'Folder': str,
-        'Type': str,
-        'PatientID': str,
-        'CodeMeaning': str,
-        'AcquisitionDate': 'datetime64[ns]',
-        'DataCollectionDiameter': float,
-        'ReconstructionDiameter': float,
-        'PatientPosition': str,
-        'PatientBirthDate': 'datetime64[ns]',
-        'PatientSex': str,
-        'PatientSize': float,
-        'PatientWeight': float
-    }
-    list_columns = list(dict_columns.keys())
-
-    # List of attributes to extract from the DICOM file :
-    list_attributes = ['PatientID',
-                       'ProcedureCodeSequence',
-                       'AcquisitionDate',
-                       'DataCollectionDiameter',
-                       'ReconstructionDiameter',
-                       'PatientPosition',
-                       'PatientBirthDate',
-                       'PatientSex',
-                       'PatientSize',
-                       "PatientWeight"]
-
-    df_patient_data = pd.DataFrame(columns=list_columns).astype(dict_columns)
-    for path_imaging in list_path_imaging:
-
-        path_imaging = Path(path_imaging)
-
-        if not path_imaging.exists():
-            raise FileNotFoundError(f"The path {path_imaging} does not exist !")
-
-        # Get patients characteristics from the first slice :
-        first_slice = next(path_imaging.glob("*.dcm"))
-
-        # Check that the first slice is a dicom file:
-        if not dcm.misc.is_dicom(first_slice):
-            raise ValueError(f"The slice {first_slice} is not a DICOM file !")
-
-        dcm_slice = dcm.dcmread(first_slice)
-
-        # Extract patients characteristics only if slice modality is CT:
-        if dcm_slice.Modality != "CT":
-            raise ValueError(f"The modality of the slice {first_slice} is not CT !")
-
-        dict_patient_data = {"Folder": str(path_imaging), "Type": path_imaging.stem}
-
-        # Loop over the list of attributes to extract from the DICOM file :
-        for attr in list_attributes:
-
-            value = dcm_slice.get(attr, np.nan)
-
-            if attr == 'ProcedureCodeSequence':
-                value = value[0].CodeMeaning if not pd.isna(value) else np.nan
-                dict_patient_data['CodeMeaning'] = value
-
-            elif attr in ['AcquisitionDate', 'PatientBirthDate']:
-                value = datetime.strptime(value, "%Y%m%d") if not pd.isna(value) else np.nan
-                dict_patient_data[attr] = value
-
-            else:
-                dict_patient_data[attr] = value
-
-        # append the patient data to the DataFrame :
-        df_patient_data.loc[len(df_patient_data)] = dict_patient_data
-
-    return df_patient_data.astype(dict_columns)
+    return build_characteristics_dataframe([read_patient_characteristics(path_imaging)
+                                            for path_imaging in list_path_imaging])
+
+
+def get_cohort_characteristics(list_path_imaging: list[Path | str],
+                               path_cache: Path | str = None,
+                               max_workers: int = None,
+                               skip_errors: bool = False) -> pd.DataFrame:
+    """
+    Extract the patient characteristics of a whole cohort of imaging folders, reading them on a thread pool.
+
+    Only the needed tags of the first slice of each folder are read. With a cache, the folders unchanged since a
+    previous run are not read again, see CharacteristicsCache. The result can be pickled for the extension scripts,
+    e.g. df.to_pickle('PatientsCharacteristicsDf.pkl').
+
+    Parameters
+    ----------
+    list_path_imaging : (list[Path | str])
+        The paths to the imaging data of the cohort (e.g. CT or PETCT).
+
+    path_cache : (Path | str, Optional)
+        The SQLite file caching the characteristics of each folder, no cache if None.
+
+    max_workers : (int, Optional)
+        The maximal number of threads reading the folders, defaults to the ThreadPoolExecutor's default.
+
+    skip_errors : (bool, Optional)
+        Whether to skip, and log, the folders whose characteristics can't be read, instead of raising the error,
+        defaults to False.
+
+    Returns
+    -------
+    pd.DataFrame
+        The patient characteristics, one row per folder in the order of list_path_imaging, see
+        get_patient_characteristics.
+
+    """
+
+    list_folders = [str(Path(path_imaging)) for path_imaging in list_path_imaging]
+
+    cache = CharacteristicsCache(path_cache) if path_cache is not None else None
+    try:
+        dict_records = cache.get_records(list_folders) if cache is not None else {}
+        list_to_read = [folder for folder in dict.fromkeys(list_folders) if folder not in dict_records]
+
+        # Read the new and modified folders :
+        list_entries = []
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for folder, entry in zip(list_to_read, executor.map(_read_cache_entry, list_to_read)):
+
+                if isinstance(entry, Exception):
+                    if not skip_errors:
+                        raise entry
+                    logger.warning("Skipped the patient characteristics of %s : %s", folder, entry)
+                    continue
+
+                list_entries.append(entry)
+                dict_records[folder] = entry[-1]
+
+        if cache is not None:
+            cache.put_records(list_entries)
+
+    finally:
+        if cache is not None:
+            cache.close()
+
+    logger.info("Patient characteristics of %d folders : %d read, %d cached",
+                len(list_folders), len(list_entries), len(dict_records) - len(list_entries))
+
+    return build_characteristics_dataframe([dict_records[folder] for folder in list_folders
+                                            if folder in dict_records])
+
+
+def read_patient_characteristics(path_imaging: Path | str) -> dict:
+    """
+    Read the patient characteristics of an imaging folder, from its first slice.
+
+    Parameters
+    ----------
+    path_imaging : (Path | str)
+        Path to the imaging data (e.g. CT or PETCT).
+
+    Returns
+    -------
+    dict
+        The patient characteristics, a row of the DataFrame of get_patient_characteristics.
+
+    """
+
+    return _read_patient_characteristics(Path(path_imaging))[1]
+
+
+def build_characteristics_dataframe(list_records: list[dict]) -> pd.DataFrame:
+    """ Build the patient characteristics DataFrame at once, from the characteristics of each folder """
+
+    return pd.DataFrame(list_records, columns=list(DICT_COLUMNS)).astype(DICT_COLUMNS)
+
+
+def _read_patient_characteristics(path_imaging: Path) -> tuple[Path, dict]:
+    """ Read the patient characteristics of an imaging folder, returning the slice they were read from """
+
+    if not path_imaging.exists():
+        raise FileNotFoundError(f"The path {path_imaging} does not exist !")
+
+    # Get patients characteristics from the first slice :
+    first_slice = next(path_imaging.glob("*.dcm"), None)
+    if first_slice is None:
+        raise FileNotFoundError(f"No DICOM files found in directory {path_imaging} !")
+
+    # Check that the first slice is a dicom file:
+    if not dcm.misc.is_dicom(first_slice):
+        raise ValueError(f"The slice {first_slice} is not a DICOM file !")
+
+    dcm_slice = read_dicom_header(first_slice, tags=["Modality", *LIST_ATTRIBUTES])
+
+    # Extract patients characteristics only if slice modality is CT:
+    if dcm_slice.Modality != "CT":
+        raise ValueError(f"The modality of the slice {first_slice} is not CT !")
+
+    dict_patient_data = {"Folder": str(path_imaging), "Type": path_imaging.stem}
+
+    # Loop over the list of attributes to extract from the DICOM file :
+    for attr in LIST_ATTRIBUTES:
+
+        value = dcm_slice.get(attr, np.nan)
+
+        if attr == 'ProcedureCodeSequence':
+            value = value[0].CodeMeaning if not pd.isna(value) else np.nan
+            dict_patient_data['CodeMeaning'] = value
+
+        elif attr in ['AcquisitionDate', 'PatientBirthDate']:
+            value = datetime.strptime(value, "%Y%m%d") if not pd.isna(value) else np.nan
+            dict_patient_data[attr] = value
+
+        else:
+            dict_patient_data[attr] = value
+
+    return first_slice, dict_patient_data
+
+
+def _read_cache_entry(folder: str) -> tuple[str, int, str, int, dict] | Exception:
+    """ Read the characteristics of a folder, with the modification times keying them in the cache """
+
+    try:
+        folder_mtime_ns = os.stat(folder).st_mtime_ns
+        path_slice, dict_patient_data = _read_patient_characteristics(Path(folder))
+        return folder, folder_mtime_ns, str(path_slice), os.stat(path_slice).st_mtime_ns, dict_patient_data
+
+    except Exception as e:
+        return e
@@ -2,6 +2,77 @@ import pandas as pd
 import numpy as np
 
 
+def calculate_contour_area(df_contours: pd.DataFrame) -> pd.DataFrame:
+    """
+    Calculate the area and the center of each contour.
+
+    Each contour is identified by its ['z', 'ROINumber', 'ROIContourNumber'], its points are rounded to the nearest
+    integer (keeping the last of duplicated points), the center is the center of their bounding box,
+    and the area is the area of the polygon they describe.
+
+    The points are sorted once by contour, then the areas (shoelace formula) and the bounding boxes of all the
+    contours are computed at once, with np.add.reduceat, np.minimum.reduceat and np.maximum.reduceat.
+
+    Parameters
+    ----------
+    df_contours : (pd.DataFrame)
+        A DataFrame containing the contour points, with the following columns :
+        ['ROIName', 'ROINumber', 'ROIContourNumber', 'x', 'y', 'z']
+
+    Returns
+    -------
+    pd.DataFrame
+        A DataFrame containing the area of each contour, sorted by ['z', 'ROINumber', 'ROIContourNumber'],
+        with the following columns :
+            - Centrex: the x-coordinate of the center of the contour
+            - Centrey: the y-coordinate of the center of the contour
+            - z
+            - ROIName
+            - ROINumber
+            - ROIContourNumber
+            - area: the area of the contour
+    """
+
+    columns = ['Centrex', 'Centrey', 'z', 'ROIName', 'ROINumber', 'ROIContourNumber', 'area']
+    if df_contours.empty:
+        return pd.DataFrame(columns=columns)
+
+    # Sort the points once by contour, keeping the order of the points within each contour :
+    order = np.lexsort((df_contours["ROIContourNumber"].to_numpy(),
+                        df_contours["ROINumber"].to_numpy(),
+                        df_contours["z"].to_numpy()))
+    df_sorted = df_contours.iloc[order]
+
+    keys = df_sorted[["z", "ROINumber", "ROIContourNumber"]].to_numpy()
+    is_start = np.r_[True, (keys[1:] != keys[:-1]).any(axis=1)]
+    contour_id = np.cumsum(is_start) - 1
+
+    # Round the points to the nearest integer, and drop the duplicated points of each contour (keeping the last) :
+    x = np.round(df_sorted["x"].to_numpy(dtype=float)).astype(np.int32)
+    y = np.round(df_sorted["y"].to_numpy(dtype=float)).astype(np.int32)
+    is_kept = ~pd.DataFrame({"id": contour_id, "x": x, "y": y}).duplicated(keep="last").to_numpy()
+
+    x, y, contour_id = x[is_kept].astype(np.int64), y[is_kept].astype(np.int64), contour_id[is_kept]
+    start = np.flatnonzero(np.r_[True, contour_id[1:] != contour_id[:-1]])
+    end = np.r_[start[1:], len(contour_id)]
+
+    # Shoelace formula, each point being linked to the next one of its contour (the last one to the first one) :
+    next_idx = np.arange(1, len(x) + 1)
+    next_idx[end - 1] = start
+    area = np.abs(np.add.reduceat(x * y[next_idx] - x[next_idx] * y, start)) / 2
+
+    # Center of the bounding box, whose size is counted in pixels as in cv2.boundingRect :
+    x_min, x_max = np.minimum.reduceat(x, start), np.maximum.reduceat(x, start)
+    y_min, y_max = np.minimum.reduceat(y, start), np.maximum.reduceat(y, start)
+
+    df_area = df_sorted[["z", "ROIName", "ROINumber", "ROIContourNumber"]].iloc[is_start].reset_index(drop=True)
+    df_area["Centrex"] = x_min + (x_max - x_min + 1) / 2
+    df_area["Centrey"] = y_min + (y_max - y_min + 1) / 2
+    df_area["area"] = area
+
+    return df_area[columns]
+
+
 def get_contours_barycenters(df_contours: pd.DataFrame) -> pd.DataFrame:
 
     """
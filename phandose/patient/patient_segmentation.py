@@ -1,25 +1,96 @@
-from totalsegmentator.python_api import totalsegmentator
+from phandose.segmentation.segmentation_cache import (SegmentationCache,
+                                                     get_volume_hash,
+                                                     get_segmentation_key,
+                                                     copy_segmentation_files)
+from phandose.utils.profiling import profiled
+from phandose.utils import get_logger
+
+from typing import TYPE_CHECKING, Callable
+from importlib import metadata
 from pathlib import Path
-import nibabel as nib
 import tempfile
+import shutil
+
+if TYPE_CHECKING:
+    import nibabel as nib
+
+# Initialize the logger :
+logger = get_logger("phandose.patient.patient_segmentation")
+
+# The TotalSegmentator tasks run on the scan, in order :
+SEGMENTATION_TASKS = ("total", "body")
+
+
+def _get_segmenter_name(segmenter: Callable) -> str:
+
+    qualname = getattr(segmenter, "__qualname__", type(segmenter).__qualname__)
+    name = f"{segmenter.__module__}.{qualname}"
+    try:
+        return f"{name}=={metadata.version(segmenter.__module__.split('.')[0])}"
+    except metadata.PackageNotFoundError:
+        return name
+
+
+@profiled
+def segment_patient_scan(scan: 'nib.Nifti1Image',
+                         dir_output: Path | str,
+                         cache: SegmentationCache = None,
+                         segmenter: Callable = None):
+    """
+    Segment a scan with the TotalSegmentator tasks "total" and "body", writing the segmentations to a directory.
 
+    If a cache is given, the segmentations of each task are keyed by the content of the scan, the task and the
+    parameters of the segmenter : a scan already segmented, e.g. when re-running a cohort, is not segmented again.
 
-def segment_patient_scan(scan: nib.Nifti1Image, dir_output: Path | str):
+    Parameters
+    ----------
+    scan : (nib.Nifti1Image)
+        The scan.
+
+    dir_output : (Path | str)
+        The directory the segmentations are written to.
+
+    cache : (SegmentationCache, Optional)
+        The cache of the segmentations, defaults to None, i.e. the scan is always segmented.
+
+    segmenter : (Callable, Optional)
+        The segmentation function, called with the arguments of totalsegmentator, defaults to totalsegmentator.
+
+    """
+
+    if segmenter is None:
+        # TotalSegmentator, and the deep learning stack it loads, are imported on first use :
+        from totalsegmentator.python_api import totalsegmentator
+        segmenter = totalsegmentator
 
     dir_output = Path(dir_output)
     dir_output.mkdir(exist_ok=True, parents=True)
 
-    # First, apply run the TotalSegmentator task=total :
-    try:
-        totalsegmentator(input=scan, output=dir_output, task="total", body_seg=False, output_type="nifti")
+    params = {"body_seg": False, "output_type": "nifti"}
+    volume_hash = get_volume_hash(scan) if cache is not None else None
 
-    except Exception as e:
-        raise ValueError(f"Failed to run TotalSegmentator task=total !") from e
+    for task in SEGMENTATION_TASKS:
 
-    # Second, apply run the TotalSegmentator task=body :
-    dir_temp = Path(tempfile.mkdtemp())
-    try:
-        totalsegmentator(input=scan, output=dir_temp, task="body", body_seg=False, output_type="nifti")
+        # Compute the key of the segmentation, and copy the cached segmentation if any :
+        key = None
+        if cache is not None:
+            key = get_segmentation_key(volume_hash, task, {**params, "segmenter": _get_segmenter_name(segmenter)})
+            if cache.fetch(key, dir_output):
+                logger.debug("Found the cached segmentation of task=%s in %s", task, cache.dir_cache)
+                continue
+
+        # Run the segmentation task in a temporary directory, then cache it and copy it to the output directory :
+        dir_temp = Path(tempfile.mkdtemp())
+        try:
+            try:
+                segmenter(input=scan, output=dir_temp, task=task, **params)
+
+            except Exception as e:
+                raise ValueError(f"Failed to run TotalSegmentator task={task} !") from e
+
+            if cache is not None:
+                cache.store(key, dir_temp, task)
+            copy_segmentation_files(dir_temp, dir_output)
 
-    except Exception as e:
-        raise ValueError(f"Failed to run TotalSegmentator task=body !") from e
+        finally:
+            shutil.rmtree(dir_temp, ignore_errors=True)
@@ -1,11 +1,12 @@
+from phandose.utils.profiling import profiled
+
 from multiprocessing import Pool
-from skimage import measure
 from pathlib import Path
-import nibabel as nib
 import pandas as pd
 import numpy as np
 
 
+@profiled
 def convert_nifti_segmentation_directory_to_contours_dataframe(dir_segmentations: Path | str) -> pd.DataFrame:
     """
     Convert all NIFTI segmentation files in a given directory to a dataframe of contours
@@ -87,6 +88,9 @@ def convert_nifti_segmentation_file_to_contours_dataframe(path_segmentation_file
 
     """
 
+    from skimage import measure
+    import nibabel as nib
+
     # Initialize the contours dataframe list to be concatenated :
     list_df_contours = []
 
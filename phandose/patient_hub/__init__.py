@@ -1,3 +1,7 @@
 from .storage_handler import StorageHandler, LocalStorageHandler
-from .patient_repository import PatientRepository
+from .packed_storage_handler import PackedStorageHandler
+from .file_transfer import TransferReport
+from .blob_store import BlobStore
+from .patient_repository import PatientRepository, LocalPatientRepository
 from .patient_hub import PatientHub
+from .checkpoint_manifest import CheckpointManifest
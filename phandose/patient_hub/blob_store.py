@@ -0,0 +1,284 @@
+from phandose.utils.dicom_headers import read_dicom_header
+from phandose.utils import get_logger
+from .file_transfer import TransferReport, get_file_checksum, copy_file, COPIED, LINKED, SKIPPED
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable
+from pathlib import Path
+import threading
+import sqlite3
+import shutil
+import os
+
+# Initialize the logger :
+logger = get_logger("phandose.patient_hub.blob_store")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS blobs (
+    blob_key TEXT PRIMARY KEY,
+    size INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS links (
+    path TEXT PRIMARY KEY,
+    blob_key TEXT NOT NULL REFERENCES blobs (blob_key),
+    src_size INTEGER,
+    src_mtime_ns INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_links_blob_key ON links (blob_key);
+"""
+
+
+class BlobStore:
+    """
+    Content-addressed store of DICOM files, deduplicating the files stored under several paths.
+
+    Each distinct file is stored once, as a blob keyed by its SOP Instance UID and the SHA-1 of its content, and every
+    stored path is a hard link to its blob. A SQLite index keeps the links of each blob, so that a blob is deleted
+    once the last of its links is released. The store must be on the same filesystem as the links.
+
+    The index also records the size and modification time of the source file of each link : the blob carries the
+    modification time of the first source stored, so a later duplicate source is recognized as already stored from
+    its own recorded stat, without reading it again.
+
+    Attributes
+    ----------
+    _dir_blobs : (Path)
+        The directory of the blobs, and of their index.
+
+    _connection : (sqlite3.Connection)
+        The connection to the index of the blobs and links.
+
+    """
+
+    def __init__(self, dir_blobs: Path):
+        """
+        Open the blob store of a directory.
+
+        Parameters
+        ----------
+        dir_blobs : (Path)
+            The directory of the blobs, and of their index.
+
+        """
+
+        self._dir_blobs = Path(dir_blobs)
+        self._dir_blobs.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.RLock()
+        self._connection = sqlite3.connect(str(self._dir_blobs / "index.sqlite"), check_same_thread=False, timeout=30)
+        self._connection.executescript(_SCHEMA)
+
+        # Add the stat of the sources to the links of an index created before they were recorded :
+        columns = {name for _, name, *_ in self._connection.execute("PRAGMA table_info(links)")}
+        with self._connection:
+            for column in ("src_size", "src_mtime_ns"):
+                if column not in columns:
+                    self._connection.execute(f"ALTER TABLE links ADD COLUMN {column} INTEGER")
+
+    @property
+    def dir_blobs(self) -> Path:
+        return self._dir_blobs
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+    def get_blob_key(self, path_file: Path) -> str:
+        """ Get the key of a file : its SOP Instance UID and the SHA-1 of its content """
+
+        try:
+            sop_instance_uid = read_dicom_header(path_file, tags=["SOPInstanceUID"]).get("SOPInstanceUID", None)
+        except Exception as e:
+            logger.debug("Can't read the SOP Instance UID of %s : %s", path_file, e)
+            sop_instance_uid = None
+
+        return f"{sop_instance_uid or 'unknown'}.{get_file_checksum(path_file)}"
+
+    def get_blob_path(self, blob_key: str) -> Path:
+        checksum = blob_key.rsplit(".", 1)[-1]
+        return self._dir_blobs / checksum[:2] / f"{blob_key}.blob"
+
+    def link_file(self, path_src: Path, path_dst: Path, verify: str = "mtime") -> tuple[str, int]:
+        """
+        Store a file as a hard link to its blob, adding the blob if it isn't stored yet.
+
+        Parameters
+        ----------
+        path_src : (Path)
+            The path of the source file.
+
+        path_dst : (Path)
+            The stored path of the file.
+
+        verify : (str, Optional)
+            How an existing stored path is recognized as identical : "size", "mtime" or "checksum", defaults to "mtime".
+
+        Returns
+        -------
+        tuple[str, int]
+            The action taken ("copied" for a new blob, "linked" for an existing blob, or "skipped"), and the size of
+            the file.
+
+        """
+
+        stat_src = os.stat(path_src)
+        path_dst = Path(os.path.abspath(path_dst))
+
+        if self._is_linked(path_src, path_dst, stat_src, verify):
+            return SKIPPED, stat_src.st_size
+
+        blob_key = self.get_blob_key(path_src)
+        path_blob = self.get_blob_path(blob_key)
+
+        # Add the blob, unless another thread or an earlier transfer already did :
+        action = LINKED
+        if not path_blob.exists():
+            path_blob.parent.mkdir(exist_ok=True)
+            path_tmp = path_blob.with_name(f".{path_blob.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            try:
+                copy_file(path_src, path_tmp)
+                os.link(path_tmp, path_blob)
+                action = COPIED
+            except FileExistsError:
+                pass
+            finally:
+                path_tmp.unlink(missing_ok=True)
+
+        with self._lock, self._connection:
+            self._connection.execute("INSERT OR IGNORE INTO blobs VALUES (?, ?)", (blob_key, stat_src.st_size))
+
+        # Replace the stored path with a link to the blob :
+        path_tmp = path_dst.with_name(f".{path_dst.name}.{os.getpid()}.tmp")
+        try:
+            os.link(path_blob, path_tmp)
+            os.replace(path_tmp, path_dst)
+        finally:
+            path_tmp.unlink(missing_ok=True)
+
+        link = self._get_link(path_dst)
+        previous_key = link[0] if link is not None else None
+        with self._lock, self._connection:
+            self._connection.execute("INSERT OR REPLACE INTO links VALUES (?, ?, ?, ?)",
+                                     (str(path_dst), blob_key, stat_src.st_size, stat_src.st_mtime_ns))
+
+        if previous_key is not None and previous_key != blob_key:
+            self._delete_orphan_blobs([previous_key])
+
+        return action, stat_src.st_size
+
+    def link_files(self,
+                   list_transfers: Iterable[tuple[Path, Path]],
+                   verify: str = "mtime",
+                   executor: ThreadPoolExecutor = None) -> TransferReport:
+        """ Store files in parallel as links to their blobs, see link_file """
+
+        list_transfers = list(list_transfers)
+        report = TransferReport()
+
+        if executor is None:
+            with ThreadPoolExecutor() as executor:
+                return self.link_files(list_transfers, verify=verify, executor=executor)
+
+        for action, n_bytes in executor.map(lambda transfer: self.link_file(*transfer, verify=verify),
+                                            list_transfers):
+            report.add(action, n_bytes)
+
+        return report
+
+    def release(self, path: Path) -> int:
+        """
+        Delete a stored file, or every stored file of a directory, and the blobs no longer linked.
+
+        Parameters
+        ----------
+        path : (Path)
+            The stored file, or directory.
+
+        Returns
+        -------
+        int
+            The number of bytes freed by the deleted blobs.
+
+        """
+
+        path = os.path.abspath(path)
+
+        with self._lock, self._connection:
+            list_keys = [blob_key for blob_key, in self._connection.execute(
+                "SELECT DISTINCT blob_key FROM links WHERE path = ? OR substr(path, 1, ?) = ?",
+                (path, len(path) + 1, path + os.sep))]
+
+            self._connection.execute("DELETE FROM links WHERE path = ? OR substr(path, 1, ?) = ?",
+                                     (path, len(path) + 1, path + os.sep))
+
+        if os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+        elif os.path.exists(path):
+            os.unlink(path)
+
+        return self._delete_orphan_blobs(list_keys)
+
+    def _get_link(self, path_dst: Path) -> tuple[str, int | None, int | None] | None:
+
+        with self._lock:
+            return self._connection.execute("SELECT blob_key, src_size, src_mtime_ns FROM links WHERE path = ?",
+                                            (str(path_dst),)).fetchone()
+
+    def _is_linked(self, path_src: Path, path_dst: Path, stat_src: os.stat_result, verify: str) -> bool:
+        """ Whether a stored path is already a link to the blob of its source, from the stat recorded with the link """
+
+        link = self._get_link(path_dst)
+        if link is None:
+            return False
+
+        blob_key, src_size, src_mtime_ns = link
+        try:
+            stat_dst = os.stat(path_dst)
+        except FileNotFoundError:
+            return False
+
+        if stat_src.st_size != stat_dst.st_size or stat_src.st_size != src_size:
+            return False
+
+        if verify == "mtime":
+            return stat_src.st_mtime_ns == src_mtime_ns
+
+        if verify == "checksum":
+            return get_file_checksum(path_src) == blob_key.rsplit(".", 1)[-1]
+
+        return True
+
+    def _delete_orphan_blobs(self, list_keys: list[str]) -> int:
+
+        n_bytes = 0
+        with self._lock, self._connection:
+            for blob_key in list_keys:
+
+                if self._connection.execute("SELECT 1 FROM links WHERE blob_key = ? LIMIT 1", (blob_key,)).fetchone():
+                    continue
+
+                size, = self._connection.execute("SELECT size FROM blobs WHERE blob_key = ?", (blob_key,)).fetchone()
+                self._connection.execute("DELETE FROM blobs WHERE blob_key = ?", (blob_key,))
+                self.get_blob_path(blob_key).unlink(missing_ok=True)
+                n_bytes += size
+
+        return n_bytes
+
+    def get_stats(self) -> dict[str, int]:
+        """ Get the number of blobs and links, the stored bytes, and the bytes saved by the deduplication """
+
+        with self._lock:
+            n_blobs, blob_bytes = self._connection.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) "
+                                                           "FROM blobs").fetchone()
+            n_links, linked_bytes = self._connection.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM links "
+                                                             "JOIN blobs USING (blob_key)").fetchone()
+
+        return {"blobs": n_blobs,
+                "links": n_links,
+                "stored_bytes": blob_bytes,
+                "deduplicated_bytes": linked_bytes - blob_bytes}
+
+    def __str__(self):
+        return f"BlobStore: {self._dir_blobs}"
+
+    __repr__ = __str__
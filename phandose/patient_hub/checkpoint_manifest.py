@@ -0,0 +1,121 @@
+from datetime import datetime, timezone
+from typing import Iterable
+from pathlib import Path
+import sqlite3
+
+# The statuses of a processed patient :
+DONE, FAILED = "done", "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS patients (
+    patient_id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    error TEXT,
+    elapsed REAL,
+    finished_at TEXT NOT NULL
+);
+"""
+
+
+class CheckpointManifest:
+    """
+    Checkpoint of a batch run over patients : the status of every processed patient, in a SQLite file.
+
+    Each patient is committed as soon as it is processed, so that an interrupted run is resumed from the patients
+    not completed yet.
+
+    Attributes
+    ----------
+    _path_manifest : (Path)
+        The path of the SQLite file.
+
+    _connection : (sqlite3.Connection)
+        The connection to the SQLite file.
+
+    """
+
+    def __init__(self, path_manifest: Path):
+        """
+        Open the checkpoint manifest of a batch run, creating it if needed.
+
+        Parameters
+        ----------
+        path_manifest : (Path)
+            The path of the SQLite file.
+
+        """
+
+        self._path_manifest = Path(path_manifest)
+        self._path_manifest.parent.mkdir(parents=True, exist_ok=True)
+
+        self._connection = sqlite3.connect(str(self._path_manifest), timeout=30)
+        self._connection.executescript(_SCHEMA)
+
+    @property
+    def path_manifest(self) -> Path:
+        return self._path_manifest
+
+    def record(self, patient_id: str, status: str, error: str = None, elapsed: float = None):
+        """
+        Record the status of a processed patient.
+
+        Parameters
+        ----------
+        patient_id : (str)
+            The patient ID of the patient.
+
+        status : (str)
+            The status of the patient, "done" or "failed".
+
+        error : (str, Optional)
+            The error of a failed patient, defaults to None.
+
+        elapsed : (float, Optional)
+            The processing time of the patient, in seconds, defaults to None.
+
+        """
+
+        with self._connection:
+            self._connection.execute("INSERT OR REPLACE INTO patients VALUES (?, ?, ?, ?, ?)",
+                                     (patient_id, status, error, elapsed, datetime.now(timezone.utc).isoformat()))
+
+    def get_status(self, patient_id: str) -> str | None:
+
+        row = self._connection.execute("SELECT status FROM patients WHERE patient_id = ?", (patient_id,)).fetchone()
+        return row[0] if row else None
+
+    def get_completed_patients(self) -> set[str]:
+        return {patient_id for patient_id, in self._connection.execute("SELECT patient_id FROM patients "
+                                                                       "WHERE status = ?", (DONE,))}
+
+    def get_pending_patients(self, list_patients: Iterable[str]) -> list[str]:
+        """ Get the patients not completed yet, in their order """
+
+        completed_patients = self.get_completed_patients()
+        return [patient_id for patient_id in list_patients if patient_id not in completed_patients]
+
+    def get_failed_patients(self) -> dict[str, str]:
+        return dict(self._connection.execute("SELECT patient_id, error FROM patients WHERE status = ?", (FAILED,)))
+
+    def get_counts(self) -> dict[str, int]:
+        return dict(self._connection.execute("SELECT status, COUNT(*) FROM patients GROUP BY status"))
+
+    def reset(self):
+        """ Forget every processed patient, to start a new run """
+
+        with self._connection:
+            self._connection.execute("DELETE FROM patients")
+
+    def close(self):
+        self._connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __str__(self):
+        return f"CheckpointManifest: {self._path_manifest}"
+
+    __repr__ = __str__
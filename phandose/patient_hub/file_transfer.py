@@ -0,0 +1,272 @@
+from phandose.utils import get_logger
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable
+from pathlib import Path
+import hashlib
+import shutil
+import errno
+import os
+
+# Initialize the logger :
+logger = get_logger("phandose.patient_hub.file_transfer")
+
+# How files are transferred : "copy" (with copy_file_range, reflinks on filesystems supporting them), or "hardlink"
+# (falling back to a copy when source and destination are on different filesystems) :
+TRANSFER_MODES = ("copy", "hardlink")
+
+# How an existing destination is recognized as identical to its source : same "size", same "mtime" (and size),
+# or same "checksum" (and size) :
+VERIFY_MODES = ("size", "mtime", "checksum")
+
+# The transfer actions :
+COPIED, LINKED, SKIPPED = "copied", "linked", "skipped"
+
+# Errors of os.copy_file_range and os.link meaning the operation isn't supported between the two files :
+_UNSUPPORTED_ERRNOS = {errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.EPERM, errno.EBADF,
+                       errno.EMLINK}
+
+_CHUNK_SIZE = 1 << 20
+
+
+class TransferReport:
+    """
+    Counts of the files and bytes copied, hard-linked or skipped by a transfer.
+
+    Attributes
+    ----------
+    _files : (dict[str, int])
+        The number of files per action (copied, linked, skipped).
+
+    _bytes : (dict[str, int])
+        The number of bytes per action (copied, linked, skipped).
+
+    """
+
+    def __init__(self):
+        self._files = dict.fromkeys((COPIED, LINKED, SKIPPED), 0)
+        self._bytes = dict.fromkeys((COPIED, LINKED, SKIPPED), 0)
+
+    def add(self, action: str, n_bytes: int):
+        self._files[action] += 1
+        self._bytes[action] += n_bytes
+
+    def update(self, report: 'TransferReport'):
+        for action in self._files:
+            self._files[action] += report._files[action]
+            self._bytes[action] += report._bytes[action]
+
+    @property
+    def files_copied(self) -> int:
+        return self._files[COPIED]
+
+    @property
+    def files_linked(self) -> int:
+        return self._files[LINKED]
+
+    @property
+    def files_skipped(self) -> int:
+        return self._files[SKIPPED]
+
+    @property
+    def bytes_copied(self) -> int:
+        return self._bytes[COPIED]
+
+    @property
+    def bytes_linked(self) -> int:
+        return self._bytes[LINKED]
+
+    @property
+    def bytes_skipped(self) -> int:
+        return self._bytes[SKIPPED]
+
+    def to_dict(self) -> dict[str, int]:
+        return {**{f"files_{action}": n_files for action, n_files in self._files.items()},
+                **{f"bytes_{action}": n_bytes for action, n_bytes in self._bytes.items()}}
+
+    @classmethod
+    def from_dict(cls, dict_report: dict[str, int]) -> 'TransferReport':
+
+        report = cls()
+        for action in report._files:
+            report._files[action] = dict_report.get(f"files_{action}", 0)
+            report._bytes[action] = dict_report.get(f"bytes_{action}", 0)
+
+        return report
+
+    def __str__(self):
+        return ", ".join(f"{self._files[action]} files {action} ({self._bytes[action] / 1e6:.1f} MB)"
+                         for action in self._files)
+
+    __repr__ = __str__
+
+
+def transfer_file(path_src: Path, path_dst: Path, mode: str = "copy", verify: str = "mtime") -> tuple[str, int]:
+    """
+    Transfer a file, unless its destination is already identical to it.
+
+    The file is written to a temporary file next to its destination first, then renamed, so that an interrupted
+    transfer never leaves a partial file behind.
+
+    Parameters
+    ----------
+    path_src : (Path)
+        The path of the source file.
+
+    path_dst : (Path)
+        The path of the destination file.
+
+    mode : (str, Optional)
+        The transfer mode, "copy" or "hardlink", defaults to "copy".
+
+    verify : (str, Optional)
+        How an existing destination is recognized as identical : "size", "mtime" or "checksum", defaults to "mtime".
+
+    Returns
+    -------
+    tuple[str, int]
+        The action taken ("copied", "linked" or "skipped"), and the size of the file.
+
+    """
+
+    stat_src = os.stat(path_src)
+
+    if is_identical(path_src, path_dst, stat_src, verify):
+        return SKIPPED, stat_src.st_size
+
+    path_tmp = path_dst.with_name(f".{path_dst.name}.{os.getpid()}.tmp")
+
+    try:
+        action = LINKED if mode == "hardlink" and _link(path_src, path_tmp) else COPIED
+        if action == COPIED:
+            copy_file(path_src, path_tmp)
+
+        os.replace(path_tmp, path_dst)
+
+    finally:
+        path_tmp.unlink(missing_ok=True)
+
+    return action, stat_src.st_size
+
+
+def transfer_files(list_transfers: Iterable[tuple[Path, Path]],
+                   mode: str = "copy",
+                   verify: str = "mtime",
+                   executor: ThreadPoolExecutor = None) -> TransferReport:
+    """
+    Transfer files in parallel, skipping those whose destination is already identical.
+
+    Parameters
+    ----------
+    list_transfers : (Iterable[tuple[Path, Path]])
+        The (source, destination) paths of the files to transfer.
+
+    mode : (str, Optional)
+        The transfer mode, "copy" or "hardlink", defaults to "copy".
+
+    verify : (str, Optional)
+        How an existing destination is recognized as identical : "size", "mtime" or "checksum", defaults to "mtime".
+
+    executor : (ThreadPoolExecutor, Optional)
+        The thread pool transferring the files, a temporary one if not given.
+
+    Returns
+    -------
+    TransferReport
+        The files and bytes copied, linked and skipped.
+
+    """
+
+    if mode not in TRANSFER_MODES:
+        raise ValueError(f"Invalid transfer mode : {mode}, must be one of {TRANSFER_MODES} !")
+
+    if verify not in VERIFY_MODES:
+        raise ValueError(f"Invalid verify mode : {verify}, must be one of {VERIFY_MODES} !")
+
+    list_transfers = list(list_transfers)
+    report = TransferReport()
+
+    if executor is None:
+        with ThreadPoolExecutor() as executor:
+            return transfer_files(list_transfers, mode=mode, verify=verify, executor=executor)
+
+    for action, n_bytes in executor.map(lambda transfer: transfer_file(*transfer, mode=mode, verify=verify),
+                                        list_transfers):
+        report.add(action, n_bytes)
+
+    return report
+
+
+def get_file_checksum(path_file: Path) -> str:
+
+    file_hash = hashlib.sha1()
+    with open(path_file, "rb") as file:
+        while chunk := file.read(_CHUNK_SIZE):
+            file_hash.update(chunk)
+
+    return file_hash.hexdigest()
+
+
+def is_identical(path_src: Path, path_dst: Path, stat_src: os.stat_result, verify: str) -> bool:
+
+    try:
+        stat_dst = os.stat(path_dst)
+    except FileNotFoundError:
+        return False
+
+    # A hard link to the source is identical to it :
+    if (stat_src.st_dev, stat_src.st_ino) == (stat_dst.st_dev, stat_dst.st_ino):
+        return True
+
+    if stat_src.st_size != stat_dst.st_size:
+        return False
+
+    if verify == "mtime":
+        return stat_src.st_mtime_ns == stat_dst.st_mtime_ns
+
+    if verify == "checksum":
+        return get_file_checksum(path_src) == get_file_checksum(path_dst)
+
+    return True
+
+
+def _link(path_src: Path, path_dst: Path) -> bool:
+
+    try:
+        os.link(path_src, path_dst)
+        return True
+
+    except OSError as e:
+        if e.errno not in _UNSUPPORTED_ERRNOS:
+            raise
+
+        logger.debug("Can't hard-link %s (%s), copying it instead", path_src, e.strerror)
+        return False
+
+
+def copy_file(path_src: Path, path_dst: Path):
+    """ Copy a file and its metadata, within the kernel when possible (reflink or server-side copy) """
+
+    with open(path_src, "rb") as file_src, open(path_dst, "wb") as file_dst:
+        if not _copy_file_range(file_src, file_dst):
+            shutil.copyfileobj(file_src, file_dst, _CHUNK_SIZE)
+
+    shutil.copystat(path_src, path_dst)
+
+
+def _copy_file_range(file_src, file_dst) -> bool:
+
+    if not hasattr(os, "copy_file_range"):
+        return False
+
+    try:
+        while os.copy_file_range(file_src.fileno(), file_dst.fileno(), _CHUNK_SIZE << 6):
+            pass
+        return True
+
+    except OSError as e:
+        if e.errno not in _UNSUPPORTED_ERRNOS:
+            raise
+
+        file_src.seek(0), file_dst.seek(0), file_dst.truncate()
+        return False
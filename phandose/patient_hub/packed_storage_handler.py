@@ -0,0 +1,91 @@
+from phandose.modalities import ScanModality, SeriesArchive
+from phandose.utils import get_logger
+from .storage_handler import LocalStorageHandler
+from .file_transfer import TransferReport, get_file_checksum, COPIED, SKIPPED
+
+from pathlib import Path
+import hashlib
+import os
+
+# Initialize the logger :
+logger = get_logger("phandose.patient_hub.packed_storage_handler")
+
+# The extension of the series archives :
+ARCHIVE_SUFFIX = ".series"
+
+
+class PackedStorageHandler(LocalStorageHandler):
+    """
+    Storage handler packing each scan into a single series archive, patient/<modality type>/<uid>.series.
+
+    On shared filesystems, where per-file metadata operations dominate, a scan is then written and re-read with a
+    single file instead of one file per slice. The slices remain randomly accessible through the archive's index,
+    and the saved ScanModality reads them from the archive transparently. The standalone modalities (RTSTRUCT,
+    RTPLAN, RTDOSE) are single files already, and are stored as with the LocalStorageHandler.
+
+    """
+
+    def get_path_archive(self, patient_id: str, modality: ScanModality) -> Path:
+        return self.dir_storage / patient_id / modality.modality_type / f"{modality.modality_id}{ARCHIVE_SUFFIX}"
+
+    def _save_scan_modality(self, patient_id: str, modality: ScanModality) -> TransferReport:
+
+        # Modality type specific directory :
+        path_archive = self.get_path_archive(patient_id=patient_id, modality=modality)
+        path_archive.parent.mkdir(parents=True, exist_ok=True)
+
+        # An already packed scan only has its archive transferred :
+        if modality.path_archive is not None:
+            report = self._transfer([(modality.path_archive, path_archive)])
+
+        else:
+            report = TransferReport()
+
+            # Pack the slices, unless the archive already holds identical slices :
+            if self._is_archive_identical(path_archive, modality.dicom_paths):
+                report.add(SKIPPED, os.stat(path_archive).st_size)
+            else:
+                SeriesArchive.create(path_archive, modality.dicom_paths, modality.modality_id).close()
+                report.add(COPIED, os.stat(path_archive).st_size)
+
+            self._report.update(report)
+
+        modality.dir_dicom = path_archive.parent
+        modality.path_archive = path_archive
+        modality.dicom_paths = None
+
+        return report
+
+    def _delete_scan_modality(self, patient_id: str, modality: ScanModality):
+
+        path_archive = self.get_path_archive(patient_id=patient_id, modality=modality)
+        self._remove(path_archive)
+
+    def _is_archive_identical(self, path_archive: Path, dicom_paths: list[Path]) -> bool:
+
+        if not path_archive.exists():
+            return False
+
+        try:
+            archive = SeriesArchive(path_archive)
+        except ValueError:
+            return False
+
+        with archive:
+            if archive.names != [path.name for path in dicom_paths]:
+                return False
+
+            for index, (entry, path_dicom) in enumerate(zip(archive.slices, dicom_paths)):
+                stat_dicom = os.stat(path_dicom)
+
+                if entry["size"] != stat_dicom.st_size:
+                    return False
+
+                if self._verify == "mtime" and entry["mtime_ns"] != stat_dicom.st_mtime_ns:
+                    return False
+
+                if (self._verify == "checksum" and
+                        hashlib.sha1(archive.read_bytes(index)).hexdigest() != get_file_checksum(path_dicom)):
+                    return False
+
+        return True
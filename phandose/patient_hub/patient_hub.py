@@ -2,6 +2,7 @@ from .patient_repository import PatientRepository
 from .storage_handler import StorageHandler
 
 from phandose.patient import Patient
+from typing import Iterable
 
 
 class PatientHub:
@@ -15,6 +16,10 @@ class PatientHub:
         self._repository.add_patient(patient)
         print(f"Patient {patient.patient_id} added to the repository")
 
+    def add_patients(self, patients: Iterable[Patient]):
+        dict_counts = self._repository.add_patients(patients)
+        print(f"{dict_counts['inserted']} patients added to the repository, {dict_counts['updated']} updated")
+
     def get_patient(self, patient_id: str):
         patient = self._repository.get_patient(patient_id)
 
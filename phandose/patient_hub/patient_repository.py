@@ -1,27 +1,73 @@
 from phandose.patient import Patient
+from phandose.utils import get_logger
 
 from pymongo.errors import DuplicateKeyError
+from pymongo import MongoClient, UpdateOne, ASCENDING
 from datetime import datetime, timezone
 from abc import ABC, abstractmethod
-from pymongo import MongoClient
+from typing import Iterable
+
+# Initialize the logger :
+logger = get_logger("phandose.patient_hub.patient_repository")
+
+# The number of patients sent to the database per bulk write :
+BULK_WRITE_SIZE = 1000
+
+# The fields of a patient document needed to build the Patient object :
+PATIENT_PROJECTION = {"_id": 0, "patient_id": 1, "modalities": 1}
 
 
 class PatientRepository(ABC):
+    """
+    Repository of the patients' documents, stored in the "patients" collection of a MongoDB database.
+
+    The indexes of the collection are created on the first connection : a unique index on the patient ID, and indexes
+    on the modalities' UIDs and types.
+
+    Attributes
+    ----------
+    db_name : (str)
+        The name of the database.
+
+    patients : (Collection)
+        The collection of the patients' documents.
+
+    """
+
+    def __init__(self, db_name: str = "phandose_db", client: MongoClient = None):
+        """
+        Connect to the patients' database.
+
+        Parameters
+        ----------
+        db_name : (str, Optional)
+            The name of the database, defaults to "phandose_db".
 
-    def __init__(self, db_name: str = "phandose_db"):
+        client : (MongoClient, Optional)
+            The client of the database, e.g. a mongomock.MongoClient in tests, defaults to the client of _connect.
+
+        """
 
         self.db_name = db_name
-        self._client = self._connect()
+        self._client = client if client is not None else self._connect()
         self._db = self._client[db_name]
         self.patients = self._db["patients"]
 
+        self._create_indexes()
+
     @abstractmethod
     def _connect(self) -> MongoClient:
         pass
 
+    def _create_indexes(self):
+
+        self.patients.create_index([("patient_id", ASCENDING)], unique=True)
+        self.patients.create_index([("modalities.modality_id", ASCENDING)])
+        self.patients.create_index([("modalities.modality_type", ASCENDING)])
+
     def add_patient(self, patient: Patient):
         """
-        Add a patient to the repository
+        Add a patient to the repository, its scans being stored in their compact form
 
         Parameters
         ----------
@@ -30,7 +76,7 @@ class PatientRepository(ABC):
 
         """
 
-        patient_dict = patient.to_dict()
+        patient_dict = patient.to_dict(compact=True)
         now = datetime.now(timezone.utc)
         patient_dict["created_at"] = now
         patient_dict["updated_at"] = now
@@ -41,6 +87,152 @@ class PatientRepository(ABC):
         except DuplicateKeyError:
             raise ValueError(f"Patient {patient.patient_id} already exists in the repository !")
 
+    def add_patients(self, patients: Iterable[Patient], batch_size: int = BULK_WRITE_SIZE) -> dict[str, int]:
+        """
+        Add or update patients in the repository, with one unordered bulk write per batch of patients.
+
+        A patient already in the repository has its modalities replaced, and keeps its creation date.
+
+        Parameters
+        ----------
+        patients : (Iterable[Patient])
+            The patients to add to the repository.
+
+        batch_size : (int, Optional)
+            The number of patients per bulk write, defaults to BULK_WRITE_SIZE.
+
+        Returns
+        -------
+        dict[str, int]
+            The number of patients inserted and updated.
+
+        """
+
+        dict_counts = {"inserted": 0, "updated": 0}
+
+        list_requests = []
+        for patient in patients:
+            now = datetime.now(timezone.utc)
+            list_requests.append(UpdateOne({"patient_id": patient.patient_id},
+                                           {"$set": {**patient.to_dict(compact=True), "updated_at": now},
+                                            "$setOnInsert": {"created_at": now}},
+                                           upsert=True))
+
+            if len(list_requests) == batch_size:
+                self._bulk_write(list_requests, dict_counts)
+                list_requests = []
+
+        if list_requests:
+            self._bulk_write(list_requests, dict_counts)
+
+        logger.debug(f"Bulk write of the patients : {dict_counts['inserted']} inserted, "
+                     f"{dict_counts['updated']} updated")
+        return dict_counts
+
+    def _bulk_write(self, list_requests: list[UpdateOne], dict_counts: dict[str, int]):
+
+        result = self.patients.bulk_write(list_requests, ordered=False)
+        dict_counts["inserted"] += result.upserted_count
+        dict_counts["updated"] += result.matched_count
+
+    def get_patient(self, patient_id: str) -> Patient | None:
+        """
+        Get a patient from the repository, reading only the fields needed to build it.
+
+        Parameters
+        ----------
+        patient_id : (str)
+            The patient ID of the patient.
+
+        Returns
+        -------
+        Patient | None
+            The patient, or None if it isn't in the repository.
+
+        """
+
+        patient_dict = self.get_patient_document(patient_id, projection=PATIENT_PROJECTION)
+        return Patient.from_dict(patient_dict) if patient_dict is not None else None
+
+    def get_patients(self, patient_ids: Iterable[str] = None) -> list[Patient]:
+        """
+        Get patients from the repository with a single query, their scans resolving their DICOM files lazily.
+
+        Parameters
+        ----------
+        patient_ids : (Iterable[str], Optional)
+            The patient IDs of the patients, defaults to every patient of the repository.
+
+        Returns
+        -------
+        list[Patient]
+            The patients found in the repository.
+
+        """
+
+        query = {"patient_id": {"$in": list(patient_ids)}} if patient_ids is not None else {}
+        return [Patient.from_dict(patient_dict) for patient_dict in self.patients.find(query, PATIENT_PROJECTION)]
+
+    def get_patient_document(self, patient_id: str, projection: dict | list[str] = None) -> dict | None:
+        """
+        Get the document of a patient from the repository.
+
+        Parameters
+        ----------
+        patient_id : (str)
+            The patient ID of the patient.
+
+        projection : (dict | list[str], Optional)
+            The fields of the document to read, defaults to the whole document.
+
+        Returns
+        -------
+        dict | None
+            The document of the patient, or None if it isn't in the repository.
+
+        """
+
+        return self.patients.find_one({"patient_id": patient_id}, projection)
+
+    def find_patients(self,
+                      modality_type: str = None,
+                      has_rtdose: bool = None,
+                      projection: dict | list[str] = None) -> list[str] | list[dict]:
+        """
+        Find the patients having a modality type, and / or an RTDOSE, through the indexes of the repository.
+
+        Parameters
+        ----------
+        modality_type : (str, Optional)
+            A modality type the patients must have (e.g. CT, PET, RD, RP, RS), defaults to any.
+
+        has_rtdose : (bool, Optional)
+            Whether the patients must have an RTDOSE (True) or none (False), defaults to either.
+
+        projection : (dict | list[str], Optional)
+            The fields of the documents to read, defaults to the patient IDs only.
+
+        Returns
+        -------
+        list[str] | list[dict]
+            The patient IDs of the patients found, or their documents if a projection is given.
+
+        """
+
+        list_conditions = []
+        if modality_type is not None:
+            list_conditions.append({"modalities.modality_type": modality_type})
+
+        if has_rtdose is not None:
+            list_conditions.append({"modalities.modality_type": "RD" if has_rtdose else {"$ne": "RD"}})
+
+        query = {"$and": list_conditions} if list_conditions else {}
+
+        if projection is None:
+            return [document["patient_id"] for document in self.patients.find(query, {"_id": 0, "patient_id": 1})]
+
+        return list(self.patients.find(query, projection))
+
 
 class LocalPatientRepository(PatientRepository):
 
@@ -1,7 +1,11 @@
 from phandose.modalities import Modality, ScanModality, StandAloneModality
+from phandose.utils.profiling import profiled
 from phandose.utils import get_logger
 from phandose.patient import Patient
+from .file_transfer import TransferReport, transfer_files
+from .blob_store import BlobStore
 
+from concurrent.futures import ThreadPoolExecutor
 from abc import ABC, abstractmethod
 from pathlib import Path
 import shutil
@@ -24,10 +28,10 @@ class StorageHandler(ABC):
     def save_modality(self, patient_id: str, modality: Modality):
 
         if isinstance(modality, ScanModality):
-            self._save_scan_modality(patient_id=patient_id, modality=modality)
+            return self._save_scan_modality(patient_id=patient_id, modality=modality)
 
         elif isinstance(modality, StandAloneModality):
-            self._save_standalone_modality(patient_id=patient_id, modality=modality)
+            return self._save_standalone_modality(patient_id=patient_id, modality=modality)
 
         else:
             raise ValueError(f"Unsupported modality type: {modality.modality_type}")
@@ -62,7 +66,13 @@ class StorageHandler(ABC):
 
 class LocalStorageHandler(StorageHandler):
 
-    def __init__(self, dir_storage: Path):
+    def __init__(self,
+                 dir_storage: Path,
+                 transfer_mode: str = "copy",
+                 verify: str = "mtime",
+                 max_workers: int = None,
+                 deduplicate: bool = False,
+                 dir_blobs: Path = None):
         """
         Initialize the local storage handler.
 
@@ -71,24 +81,120 @@ class LocalStorageHandler(StorageHandler):
         dir_storage : (Path)
             The directory where the patient data will be stored.
 
+        transfer_mode : (str, Optional)
+            How the files are transferred into the storage : "copy" or "hardlink", defaults to "copy".
+
+        verify : (str, Optional)
+            How an already stored file is recognized as identical to its source, and skipped : "size", "mtime" or
+            "checksum", defaults to "mtime".
+
+        max_workers : (int, Optional)
+            The number of threads transferring the files, defaults to the ThreadPoolExecutor's default.
+
+        deduplicate : (bool, Optional)
+            Whether to store each distinct file once, in a content-addressed BlobStore, the patient directories holding
+            hard links to the blobs, defaults to False. The transfer_mode is then ignored.
+
+        dir_blobs : (Path, Optional)
+            The directory of the BlobStore, on the same filesystem as the storage, defaults to dir_storage / ".blobs".
+
         """
 
         self._dir_storage = dir_storage
+        self._transfer_mode = transfer_mode
+        self._verify = verify
+        self._max_workers = max_workers
+
+        # Files transferred since the handler was created, by a thread pool created on first use :
+        self._report = TransferReport()
+        self._executor = None
+
+        # Content-addressed store of the files, when deduplicating :
+        self._blob_store = None
+        if deduplicate:
+            self._blob_store = BlobStore(Path(dir_blobs) if dir_blobs else Path(dir_storage) / ".blobs")
+
         logger.debug(f"LocalStorageHandler initialized with storage directory: {str(dir_storage)}")
 
     @property
     def dir_storage(self):
         return self._dir_storage
 
-    def save_patient(self, patient: Patient):
+    @property
+    def report(self) -> TransferReport:
+        return self._report
+
+    @property
+    def blob_store(self) -> BlobStore | None:
+        return self._blob_store
+
+    @profiled
+    def save_patient(self, patient: Patient) -> TransferReport:
+        """
+        Save the modalities of a patient into the storage, transferring their files in parallel.
+
+        Parameters
+        ----------
+        patient : (Patient)
+            The patient to save.
+
+        Returns
+        -------
+        TransferReport
+            The files and bytes copied, linked and skipped for this patient.
+
+        """
 
+        report = TransferReport()
         for modality in patient.list_modalities:
-            self.save_modality(patient_id=patient.patient_id, modality=modality)
+            report.update(self.save_modality(patient_id=patient.patient_id, modality=modality))
 
+        logger.info(f"Patient {patient.patient_id} saved : {report}")
+        return report
+
+    def _transfer(self, list_transfers: list[tuple[Path, Path]]) -> TransferReport:
+
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self._max_workers,
+                                                thread_name_prefix="LocalStorageHandler")
+
+        if self._blob_store is not None:
+            report = self._blob_store.link_files(list_transfers, verify=self._verify, executor=self._executor)
+        else:
+            report = transfer_files(list_transfers, mode=self._transfer_mode, verify=self._verify,
+                                    executor=self._executor)
+
+        self._report.update(report)
+
+        return report
+
+    def _remove(self, path: Path):
+
+        # Release the blobs of a deduplicated storage, deleting those no longer linked :
+        if self._blob_store is not None:
+            self._blob_store.release(path)
+
+        elif path.is_dir():
+            shutil.rmtree(path, ignore_errors=True)
+
+        else:
+            path.unlink(missing_ok=True)
+
+    def close(self):
+        """ Shut down the thread pool transferring the files, and close the blob store """
+
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+        if self._blob_store is not None:
+            self._blob_store.close()
+
+    @profiled
     def delete_patient(self, patient_id: str):
 
         dir_patient = self.dir_storage / patient_id
-        shutil.rmtree(dir_patient, ignore_errors=True)
+        self._remove(dir_patient)
 
     def _save_scan_modality(self, patient_id: str, modality: ScanModality):
 
@@ -96,21 +202,19 @@ class LocalStorageHandler(StorageHandler):
         dir_modality = self.dir_storage / patient_id / modality.modality_type / modality.modality_id
         dir_modality.mkdir(parents=True, exist_ok=True)
 
-        urls = []
-
-        # Save the scan data:
-        for path_src in modality.dicom_paths:
-            path_dst = dir_modality / path_src.name
-            shutil.copy2(path_src, path_dst)
-            urls.append(path_dst)
+        # Save the scan data, skipping the slices already stored :
+        list_transfers = [(path_src, dir_modality / path_src.name) for path_src in modality.dicom_paths]
+        report = self._transfer(list_transfers)
 
         modality.dir_dicom = dir_modality
-        modality.dicom_paths = urls
+        modality.dicom_paths = [path_dst for _, path_dst in list_transfers]
+
+        return report
 
-    def _delete_standalone_modality(self, patient_id: str, modality: ScanModality):
+    def _delete_scan_modality(self, patient_id: str, modality: ScanModality):
 
         dir_modality = self.dir_storage / patient_id / modality.modality_type / modality.modality_id
-        shutil.rmtree(dir_modality, ignore_errors=True)
+        self._remove(dir_modality)
 
     def _save_standalone_modality(self, patient_id: str, modality: StandAloneModality):
 
@@ -121,12 +225,14 @@ class LocalStorageHandler(StorageHandler):
         # Save the standalone data:
         path_src = modality.path_dicom
         path_dst = dir_modality / path_src.name
-        shutil.copy2(path_src, path_dst)
+        report = self._transfer([(path_src, path_dst)])
 
         modality.dir_dicom = dir_modality
         modality.path_dicom = path_dst
 
-    def _delete_scan_modality(self, patient_id: str, modality: StandAloneModality):
+        return report
+
+    def _delete_standalone_modality(self, patient_id: str, modality: StandAloneModality):
 
         path_modality = self.dir_storage / patient_id / modality.modality_type / modality.path_dicom.name
-        path_modality.unlink(missing_ok=True)
+        self._remove(path_modality)
@@ -1,11 +1,10 @@
 from phandose.patient.patient_contours import is_vertebrae_fully_within_contours
-from phandose.phantom.phantom_library import PhantomLibrary
+from phandose.phantom_library.phantom_library import PhantomLibrary
+from phandose.utils.profiling import profiled
 from phandose import constants
 
 import pandas as pd
 import numpy as np
-import swifter
-import cv2
 
 
 class PhantomFilter:
@@ -78,6 +77,7 @@ class PhantomFilter:
         # list of contour names of vertebrae that are fully within the contours :
         self._list_full_vertebrae = self._df_full_vertebrae.loc[self._df_full_vertebrae["Full"], "ROIName"].tolist()
 
+    @profiled
     def filter(self):
         """
         Filters the phantom library based on the patient's characteristics and the contours.
@@ -96,6 +96,7 @@ class PhantomFilter:
         list_selected_phantoms = self._df_phantom_lib["Phantom"].unique().tolist()
         return list_selected_phantoms
 
+    @profiled
     def filter_by_sex_and_position(self):
         """
         Filters the phantom library based on the patient's sex and position
@@ -114,6 +115,7 @@ class PhantomFilter:
         except IndexError:
             self._df_phantom_lib = pd.DataFrame(columns=self._df_phantom_lib.columns)
 
+    @profiled
     def filter_by_size(self):
         """
         Filters the phantom library based on the patient's size.
@@ -160,11 +162,16 @@ class PhantomFilter:
                 (self._df_phantom_lib["SizeRatio"] <= 10)
                 ]
 
+    @profiled
     def filter_by_weight(self):
         """
         Filters the phantom library based on the patient's weight.
         """
 
+        # Imported on first use, swifter registering the .swifter accessor of pandas :
+        import swifter  # noqa: F401
+        import cv2
+
         # Filter the phantom library based on the patient's weight :
         min_full_vertebrae_z = self._df_contours.loc[
             self._df_contours["ROIName"].isin(self._list_full_vertebrae),
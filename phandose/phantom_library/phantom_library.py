@@ -45,7 +45,7 @@ class PhantomLibrary:
         """
 
         self._dir_phantom_lib = Path(dir_phantom_library)
-        logger.debug(fr"Initialized Phantom Library with directory: {self._dir_phantom_lib}")
+        logger.debug("Initialized Phantom Library with directory: %s", self._dir_phantom_lib)
 
     def get_phantom(self, phantom_name: str) -> pd.DataFrame:
         """
@@ -70,14 +70,14 @@ class PhantomLibrary:
             If the phantom does not exist in the Phantom Library.
         """
 
-        logger.debug(fr"Attempting to retrieve phantom {phantom_name} from the Phantom Library")
+        logger.debug("Attempting to retrieve phantom %s from the Phantom Library", phantom_name)
         path_phantom = self._dir_phantom_lib / phantom_name
 
         if path_phantom.exists():
-            logger.debug(fr"Phantom {phantom_name} found in the Phantom Library, loading phantom as DataFrame")
+            logger.debug("Phantom %s found in the Phantom Library, loading phantom as DataFrame", phantom_name)
             return pd.read_csv(path_phantom, encoding="ISO-8859-1", sep="\t", header=0)
         else:
-            logger.error(fr"Phantom {phantom_name} not found in the Phantom Library !")
+            logger.error("Phantom %s not found in the Phantom Library !", phantom_name)
             raise FileNotFoundError(f"Phantom {phantom_name} not found in the Phantom Library.")
 
     def add_phantom(self, df_phantom: pd.DataFrame, phantom_name: str):
@@ -100,7 +100,7 @@ class PhantomLibrary:
             If a phantom with the same name already exists in the Phantom Library.
         """
 
-        logger.debug(fr"Attempting to add phantom {phantom_name} to the Phantom Library")
+        logger.debug("Attempting to add phantom %s to the Phantom Library", phantom_name)
         path_phantom = self._dir_phantom_lib / phantom_name
 
         if path_phantom.exists():
@@ -0,0 +1 @@
+from .segmentation_cache import SegmentationCache, get_volume_hash, get_segmentation_key
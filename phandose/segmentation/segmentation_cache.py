@@ -0,0 +1,283 @@
+from phandose.utils import get_logger
+from phandose import constants
+
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING
+from pathlib import Path
+import numpy as np
+import threading
+import hashlib
+import sqlite3
+import shutil
+import json
+import time
+import uuid
+
+if TYPE_CHECKING:
+    import nibabel as nib
+
+# Initialize the logger :
+logger = get_logger("phandose.segmentation.segmentation_cache")
+
+# The version of the cached segmentations, changing the keys of every entry when the layout of the cache changes :
+CACHE_VERSION = 1
+
+# The default maximal size of the cache, in bytes :
+DEFAULT_MAX_SIZE = 20 * 2 ** 30
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    task TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at TEXT NOT NULL,
+    last_access INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_entries_last_access ON entries (last_access);
+"""
+
+
+class SegmentationCache:
+    """
+    Local cache of the segmentations of scans, keyed by the content of the scan, the task and its parameters.
+
+    Each entry is a directory of the segmentation files of a task, stored once under its key. A SQLite index keeps
+    the size and the last access of every entry : once the cache exceeds its maximal size, the least recently used
+    entries are evicted.
+
+    Attributes
+    ----------
+    _dir_cache : (Path)
+        The directory of the cache, with the entries and their index.
+
+    _max_size : (int)
+        The maximal size of the cache, in bytes.
+
+    _connection : (sqlite3.Connection)
+        The connection to the index of the entries.
+
+    """
+
+    def __init__(self, dir_cache: Path | str = None, max_size: int = DEFAULT_MAX_SIZE):
+        """
+        Open the segmentation cache of a directory, creating it if needed.
+
+        Parameters
+        ----------
+        dir_cache : (Path | str, Optional)
+            The directory of the cache, defaults to DIR_SEGMENTATION_CACHE.
+
+        max_size : (int, Optional)
+            The maximal size of the cache, in bytes, defaults to 20 GB.
+
+        """
+
+        self._dir_cache = Path(dir_cache or constants.DIR_SEGMENTATION_CACHE)
+        (self._dir_cache / "entries").mkdir(parents=True, exist_ok=True)
+        self._max_size = max_size
+
+        self._lock = threading.RLock()
+        self._connection = sqlite3.connect(str(self._dir_cache / "index.sqlite"), check_same_thread=False, timeout=30)
+        self._connection.executescript(_SCHEMA)
+
+    @property
+    def dir_cache(self) -> Path:
+        return self._dir_cache
+
+    @property
+    def max_size(self) -> int:
+        return self._max_size
+
+    def _get_dir_entry(self, key: str) -> Path:
+        return self._dir_cache / "entries" / key
+
+    def fetch(self, key: str, dir_output: Path | str) -> bool:
+        """
+        Copy the segmentation files of an entry to a directory, if the entry is cached.
+
+        Parameters
+        ----------
+        key : (str)
+            The key of the entry, see get_segmentation_key.
+
+        dir_output : (Path | str)
+            The directory the segmentation files are copied to.
+
+        Returns
+        -------
+        bool
+            Whether the entry was cached, and copied.
+
+        """
+
+        dir_entry = self._get_dir_entry(key)
+
+        with self._lock:
+            if key not in self or not dir_entry.is_dir():
+                return False
+
+            with self._connection:
+                self._connection.execute("UPDATE entries SET last_access = ? WHERE key = ?", (time.time_ns(), key))
+
+        copy_segmentation_files(dir_entry, dir_output)
+        return True
+
+    def store(self, key: str, dir_segmentation: Path | str, task: str):
+        """
+        Store the segmentation files of a task in the cache, then evict the least recently used entries.
+
+        Parameters
+        ----------
+        key : (str)
+            The key of the entry, see get_segmentation_key.
+
+        dir_segmentation : (Path | str)
+            The directory of the segmentation files.
+
+        task : (str)
+            The segmentation task, e.g. "total".
+
+        """
+
+        dir_entry = self._get_dir_entry(key)
+
+        # Copy the files to a temporary directory of the cache, moved at once to the entry :
+        dir_temp = self._dir_cache / f"tmp-{uuid.uuid4().hex}"
+        copy_segmentation_files(dir_segmentation, dir_temp)
+        size = sum(path.stat().st_size for path in dir_temp.iterdir())
+
+        with self._lock:
+            try:
+                dir_temp.rename(dir_entry)
+            except OSError:
+                # The entry was stored in the meantime, e.g. by another process :
+                shutil.rmtree(dir_temp, ignore_errors=True)
+                return
+
+            with self._connection:
+                self._connection.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?)",
+                                         (key, task, size, datetime.now(timezone.utc).isoformat(), time.time_ns()))
+
+        self.evict()
+
+    def evict(self) -> list[str]:
+        """
+        Evict the least recently used entries, until the cache doesn't exceed its maximal size.
+
+        Returns
+        -------
+        list[str]
+            The keys of the evicted entries.
+
+        """
+
+        list_evicted = []
+        with self._lock:
+            size = self.get_size()
+            for key, entry_size in self._connection.execute("SELECT key, size FROM entries "
+                                                            "ORDER BY last_access").fetchall():
+                if size <= self._max_size:
+                    break
+
+                self._remove(key)
+                size -= entry_size
+                list_evicted.append(key)
+
+        if list_evicted:
+            logger.debug("Evicted %d segmentations from %s", len(list_evicted), self._dir_cache)
+
+        return list_evicted
+
+    def _remove(self, key: str):
+
+        with self._connection:
+            self._connection.execute("DELETE FROM entries WHERE key = ?", (key,))
+        shutil.rmtree(self._get_dir_entry(key), ignore_errors=True)
+
+    def clear(self):
+        """ Remove every entry of the cache """
+
+        with self._lock:
+            for key, in self._connection.execute("SELECT key FROM entries").fetchall():
+                self._remove(key)
+
+    def get_size(self) -> int:
+        """ Get the size of the cached segmentations, in bytes """
+
+        with self._lock:
+            return self._connection.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+    def __contains__(self, key: str) -> bool:
+
+        with self._lock:
+            return self._connection.execute("SELECT 1 FROM entries WHERE key = ?", (key,)).fetchone() is not None
+
+    def __len__(self):
+
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __str__(self):
+        return f"SegmentationCache: {self._dir_cache} - {len(self)} entries, {self.get_size() / 2 ** 20:.1f} MB"
+
+    __repr__ = __str__
+
+
+def get_volume_hash(scan: 'nib.Nifti1Image') -> str:
+    """
+    Get the SHA-256 of a scan : of its voxel values, shape, data type and affine, whatever their memory layout.
+
+    Parameters
+    ----------
+    scan : (nib.Nifti1Image)
+        The scan.
+
+    Returns
+    -------
+    str
+        The hexadecimal SHA-256 of the scan.
+
+    """
+
+    data = np.asanyarray(scan.dataobj)
+
+    hasher = hashlib.sha256()
+    hasher.update(json.dumps({"shape": data.shape, "dtype": data.dtype.str}).encode())
+    hasher.update(np.ascontiguousarray(scan.affine, dtype=np.float64))
+
+    # Hash the volume slice by slice, along its last axis, to copy one slice at a time :
+    data = data.reshape(*data.shape[:2], -1) if data.ndim > 2 else data.reshape(*data.shape, 1)
+    for index in range(data.shape[-1]):
+        hasher.update(np.ascontiguousarray(data[..., index]))
+
+    return hasher.hexdigest()
+
+
+def get_segmentation_key(volume_hash: str, task: str, params: dict = None) -> str:
+    """ Get the key of the segmentation of a scan : the SHA-256 of the scan's hash, the task and its parameters """
+
+    content = json.dumps({"version": CACHE_VERSION, "volume": volume_hash, "task": task, "params": params or {}},
+                         sort_keys=True, default=str)
+
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+def copy_segmentation_files(dir_src: Path | str, dir_dst: Path | str):
+    """ Copy the segmentation files of a directory to another one """
+
+    dir_dst = Path(dir_dst)
+    dir_dst.mkdir(parents=True, exist_ok=True)
+
+    for path_src in Path(dir_src).iterdir():
+        if path_src.is_file():
+            shutil.copy2(path_src, dir_dst / path_src.name)
@@ -2,4 +2,15 @@ from .dicom_utils import get_series_instance_uid_from_directory
 from .dicom_utils import get_modality_from_dicom_slice
 from .logger import (add_file_handler_to_root,
                      enable_tqdm_logging,
+                     enable_queue_logging,
+                     disable_queue_logging,
+                     init_worker_logging,
+                     RateLimitedHandler,
                      get_logger)
+from .dicom_index import DicomIndex
+from .profiling import (enable_profiling,
+                        disable_profiling,
+                        is_profiling_enabled,
+                        get_profiler,
+                        profiled,
+                        span)
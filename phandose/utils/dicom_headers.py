@@ -0,0 +1,146 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Generator, Iterable, NamedTuple
+from pathlib import Path
+import pydicom as dcm
+
+
+class DicomHeader(NamedTuple):
+    """
+    Lightweight record of the header of a DICOM file, yielded by scan_dicom_headers.
+
+    Attributes
+    ----------
+    path : (Path)
+        Path of the file.
+
+    size : (int | None)
+        Size of the file, in bytes, None if the file couldn't be accessed.
+
+    mtime_ns : (int | None)
+        Modification time of the file, in nanoseconds, None if the file couldn't be accessed.
+
+    dataset : (pydicom.dataset.Dataset | None)
+        The requested tags of the file, None if the file couldn't be read as DICOM.
+
+    error : (Exception | None)
+        The error raised while reading the file, None if it was read successfully.
+    """
+
+    path: Path
+    size: int | None
+    mtime_ns: int | None
+    dataset: dcm.dataset.Dataset | None = None
+    error: Exception | None = None
+
+    @property
+    def is_dicom(self) -> bool:
+        return self.dataset is not None
+
+    def get(self, keyword: str, default=None):
+        return self.dataset.get(keyword, default) if self.dataset is not None else default
+
+
+def scan_dicom_headers(root: Path,
+                       tags: list[str] = None,
+                       workers: int = None,
+                       pattern: str = "*.dcm",
+                       include_invalid: bool = False) -> Generator[DicomHeader, None, None]:
+    """
+    Walk a directory tree once, and read the headers of its DICOM files on a thread pool.
+
+    Parameters:
+    -----------
+    root : (Path)
+        Root directory of the DICOM files.
+
+    tags : (list[str], Optional)
+        Keywords of the only tags to read, all the tags before the pixel data are read if None.
+
+    workers : (int, Optional)
+        Maximal number of threads reading the headers, defaults to the ThreadPoolExecutor's default.
+
+    pattern : (str, Optional)
+        Glob pattern of the files to read, defaults to "*.dcm".
+
+    include_invalid : (bool, Optional)
+        Whether to also yield the files that couldn't be read as DICOM, skipped by default.
+
+    Returns:
+    --------
+    Generator[DicomHeader, None, None]
+        The headers of the files, in the order of the walk.
+    """
+
+    yield from read_dicom_headers(Path(root).rglob(pattern), tags=tags, workers=workers,
+                                  include_invalid=include_invalid)
+
+
+def read_dicom_headers(paths: Iterable[Path],
+                       tags: list[str] = None,
+                       workers: int = None,
+                       include_invalid: bool = False) -> Generator[DicomHeader, None, None]:
+    """
+    Read the headers of DICOM files on a thread pool, see scan_dicom_headers.
+
+    Parameters:
+    -----------
+    paths : (Iterable[Path])
+        Paths of the DICOM files.
+
+    tags : (list[str], Optional)
+        Keywords of the only tags to read, all the tags before the pixel data are read if None.
+
+    workers : (int, Optional)
+        Maximal number of threads reading the headers, defaults to the ThreadPoolExecutor's default.
+
+    include_invalid : (bool, Optional)
+        Whether to also yield the files that couldn't be read as DICOM, skipped by default.
+
+    Returns:
+    --------
+    Generator[DicomHeader, None, None]
+        The headers of the files, in the order of the paths.
+    """
+
+    def read_header(path_dicom: Path) -> DicomHeader:
+
+        # A dangling symbolic link, or a file removed since the walk, is yielded as an invalid file :
+        try:
+            stat = path_dicom.stat()
+        except OSError as e:
+            return DicomHeader(path_dicom, None, None, error=e)
+
+        try:
+            return DicomHeader(path_dicom, stat.st_size, stat.st_mtime_ns, read_dicom_header(path_dicom, tags))
+        except Exception as e:
+            return DicomHeader(path_dicom, stat.st_size, stat.st_mtime_ns, error=e)
+
+    # The pending reads are cancelled if the generator is closed before being exhausted :
+    executor = ThreadPoolExecutor(max_workers=workers)
+    try:
+        for dicom_header in executor.map(read_header, paths):
+            if dicom_header.is_dicom or include_invalid:
+                yield dicom_header
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def read_dicom_header(path_dicom: Path, tags: list[str] = None) -> dcm.dataset.FileDataset:
+    """
+    Read the header of a DICOM file, without its pixel data.
+
+    Parameters:
+    -----------
+    path_dicom : (Path)
+        Path of the DICOM file.
+
+    tags : (list[str], Optional)
+        Keywords of the only tags to read, all the tags before the pixel data are read if None.
+
+    Returns:
+    --------
+    pydicom.dataset.FileDataset
+        The header of the DICOM file.
+    """
+
+    return dcm.dcmread(str(path_dicom), stop_before_pixels=True, specific_tags=tags)
@@ -0,0 +1,337 @@
+from phandose.utils.dicom_headers import DicomHeader, read_dicom_headers
+from phandose import constants
+
+from collections import OrderedDict
+from pathlib import Path
+import threading
+import hashlib
+import sqlite3
+import os
+
+# The maximal number of indexes kept open by DicomIndex.open(), each holding a connection to its SQLite file :
+MAX_OPENED_INDEXES = 16
+
+# DICOM tags stored in the index :
+INDEX_TAGS = ["SOPInstanceUID", "SeriesInstanceUID", "StudyInstanceUID", "Modality",
+              "InstanceNumber", "ImagePositionPatient"]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    sop_instance_uid TEXT,
+    series_instance_uid TEXT,
+    study_instance_uid TEXT,
+    modality TEXT,
+    instance_number INTEGER,
+    z REAL
+);
+CREATE INDEX IF NOT EXISTS idx_files_sop_instance_uid ON files (sop_instance_uid);
+CREATE INDEX IF NOT EXISTS idx_files_series_instance_uid ON files (series_instance_uid);
+CREATE TABLE IF NOT EXISTS directories (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL
+);
+"""
+
+
+class DicomIndex:
+    """
+    Persistent index of the DICOM files of a root directory, backed by a local SQLite file.
+
+    The index stores, for each .dcm file of the directory tree, its path (relative to the root directory), size,
+    modification time, SOP / Series / Study Instance UIDs, modality, instance number and z-position.
+    Files that are not valid DICOM files are stored without UIDs, so that they are not read again.
+
+    A scan only reads the headers of the new or modified files, and removes the deleted ones from the index, so
+    that lookups are answered from the index instead of reading every file of the tree. The index also records the
+    modification time of each directory of the tree, changed when a file is added to, or removed from, it : see
+    is_tree_unchanged.
+
+    """
+
+    # Indexes opened by DicomIndex.open(), for each resolved root directory and SQLite file, the least recently opened
+    # ones being closed beyond MAX_OPENED_INDEXES :
+    _opened_indexes = OrderedDict()
+    _opened_indexes_lock = threading.Lock()
+
+    def __init__(self, dir_root: Path, path_index: Path = None):
+        """
+        Initializes the DICOM index of a root directory.
+
+        Parameters
+        ----------
+        dir_root : (Path)
+            The root directory of the indexed DICOM files.
+
+        path_index : (Path, Optional)
+            The path of the SQLite file, defaults to a file named after the root directory in DIR_DICOM_INDEX.
+
+        """
+
+        self._dir_root = Path(dir_root).resolve()
+        self._path_index = Path(path_index) if path_index else get_default_index_path(self._dir_root)
+        self._path_index.parent.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.RLock()
+        self._sqlite_connection = None
+        self._connection.executescript(_SCHEMA)
+
+    @classmethod
+    def open(cls, dir_root: Path, scan: bool = True, path_index: Path = None) -> 'DicomIndex':
+        """
+        Open the DICOM index of a root directory, shared within the process, and bring it up to date.
+
+        Parameters
+        ----------
+        dir_root : (Path)
+            The root directory of the indexed DICOM files.
+
+        scan : (bool, Optional)
+            Whether to incrementally re-scan the root directory, defaults to True.
+
+        path_index : (Path, Optional)
+            The path of the SQLite file, defaults to a file named after the root directory in DIR_DICOM_INDEX.
+
+        Returns
+        -------
+        DicomIndex
+            The DICOM index of the root directory.
+
+        """
+
+        dir_root = Path(dir_root).resolve()
+        path_index = Path(path_index) if path_index else get_default_index_path(dir_root)
+
+        list_evicted = []
+        with cls._opened_indexes_lock:
+            if (dir_root, path_index) not in cls._opened_indexes:
+                cls._opened_indexes[(dir_root, path_index)] = cls(dir_root, path_index=path_index)
+
+            cls._opened_indexes.move_to_end((dir_root, path_index))
+            index = cls._opened_indexes[(dir_root, path_index)]
+
+            while len(cls._opened_indexes) > MAX_OPENED_INDEXES:
+                list_evicted.append(cls._opened_indexes.popitem(last=False)[1])
+
+        # The evicted indexes are closed, and reconnect if they are still used :
+        for evicted_index in list_evicted:
+            evicted_index.close()
+
+        if scan:
+            index.scan()
+
+        return index
+
+    @property
+    def dir_root(self) -> Path:
+        return self._dir_root
+
+    @property
+    def path_index(self) -> Path:
+        return self._path_index
+
+    @property
+    def _connection(self) -> sqlite3.Connection:
+        """ The connection to the SQLite file, opened on first use, and again after the index is closed """
+
+        with self._lock:
+            if self._sqlite_connection is None:
+                self._sqlite_connection = sqlite3.connect(str(self._path_index), check_same_thread=False, timeout=30)
+
+            return self._sqlite_connection
+
+    def close(self):
+        with self._lock:
+            if self._sqlite_connection is not None:
+                self._sqlite_connection.close()
+                self._sqlite_connection = None
+
+    def scan(self, max_workers: int = None) -> dict[str, int]:
+        """
+        Incrementally update the index with the .dcm files of the root directory.
+
+        Only the headers of the files that are new, or whose size or modification time changed, are read.
+
+        Parameters
+        ----------
+        max_workers : (int, Optional)
+            The maximal number of threads reading the DICOM headers, defaults to the ThreadPoolExecutor's default.
+
+        Returns
+        -------
+        dict[str, int]
+            The number of 'indexed' (new or modified), 'removed' and 'unchanged' files.
+
+        """
+
+        # Stat the directories before their files, so that a file added during the scan is found by the next one :
+        dict_directories = self._stat_directories()
+
+        # Stat the .dcm files of the root directory, skipping the dangling symbolic links and the removed files :
+        dict_stats = {}
+        for path_dicom in self._dir_root.rglob("*.dcm"):
+            try:
+                stat = path_dicom.stat()
+            except OSError:
+                continue
+
+            dict_stats[path_dicom.relative_to(self._dir_root).as_posix()] = (stat.st_size, stat.st_mtime_ns)
+
+        with self._lock:
+            dict_indexed = {path: (size, mtime_ns)
+                            for path, size, mtime_ns in self._connection.execute("SELECT path, size, mtime_ns "
+                                                                                 "FROM files")}
+
+        list_removed = [path for path in dict_indexed if path not in dict_stats]
+        list_to_index = [path for path, stat in dict_stats.items() if dict_indexed.get(path) != stat]
+
+        # Read the headers of the new and modified files :
+        list_rows = [self._to_row(dicom_header)
+                     for dicom_header in read_dicom_headers([self._dir_root / path for path in list_to_index],
+                                                            tags=INDEX_TAGS,
+                                                            workers=max_workers,
+                                                            include_invalid=True)
+                     if dicom_header.size is not None]
+
+        with self._lock, self._connection:
+            self._connection.executemany("DELETE FROM files WHERE path = ?", [(path,) for path in list_removed])
+            self._connection.executemany("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", list_rows)
+            self._connection.execute("DELETE FROM directories")
+            self._connection.executemany("INSERT INTO directories VALUES (?, ?)", dict_directories.items())
+
+        return {"indexed": len(list_to_index),
+                "removed": len(list_removed),
+                "unchanged": len(dict_stats) - len(list_to_index)}
+
+    def _stat_directories(self) -> dict[str, int]:
+        """ Get the modification time (ns) of each directory of the tree, by path relative to the root directory """
+
+        dict_directories = {}
+        for dir_path, _, _ in os.walk(self._dir_root):
+            try:
+                dict_directories[Path(dir_path).relative_to(self._dir_root).as_posix()] = os.stat(dir_path).st_mtime_ns
+            except OSError:
+                continue
+
+        return dict_directories
+
+    def is_tree_unchanged(self) -> bool:
+        """
+        Whether no file was added to, or removed from, the tree since the last scan, from the modification times of
+        its directories : the files themselves are not listed by stat, only the directories.
+        """
+
+        with self._lock:
+            dict_indexed = dict(self._connection.execute("SELECT path, mtime_ns FROM directories"))
+
+        return bool(dict_indexed) and self._stat_directories() == dict_indexed
+
+    def refresh(self, max_workers: int = None) -> dict[str, int]:
+        """
+        Re-scan the whole root directory, see scan.
+
+        The lookup helpers of dicom_utils re-scan the root directory when files were added to, or removed from, its
+        tree, or on a miss or a stale hit : a file modified in place, with its name kept, is only found by a refresh
+        if no lookup returns it.
+
+        """
+
+        return self.scan(max_workers=max_workers)
+
+    def is_empty(self) -> bool:
+        """ Whether no file of the root directory was indexed yet, valid DICOM or not """
+
+        return not self._query("SELECT 1 FROM files LIMIT 1")
+
+    def is_up_to_date(self, paths: list[Path]) -> bool:
+        """ Whether the files still exist, with the size and modification time they were indexed with """
+
+        for path in paths:
+            row = self._query("SELECT size, mtime_ns FROM files WHERE path = ?",
+                              (Path(path).relative_to(self._dir_root).as_posix(),))
+            try:
+                stat = Path(path).stat()
+            except OSError:
+                return False
+
+            if not row or row[0] != (stat.st_size, stat.st_mtime_ns):
+                return False
+
+        return True
+
+    def _to_row(self, dicom_header: DicomHeader) -> tuple:
+
+        instance_number = dicom_header.get("InstanceNumber", None)
+        slice_position = dicom_header.get("ImagePositionPatient", None)
+
+        return (dicom_header.path.relative_to(self._dir_root).as_posix(),
+                dicom_header.size,
+                dicom_header.mtime_ns,
+                dicom_header.get("SOPInstanceUID", None),
+                dicom_header.get("SeriesInstanceUID", None),
+                dicom_header.get("StudyInstanceUID", None),
+                dicom_header.get("Modality", None),
+                int(instance_number) if instance_number not in (None, "") else None,
+                float(slice_position[2]) if slice_position and len(slice_position) == 3 else None)
+
+    def _query(self, query: str, parameters: tuple = ()) -> list[tuple]:
+        with self._lock:
+            return self._connection.execute(query, parameters).fetchall()
+
+    def find_paths(self, sop_instance_uid: str) -> list[Path]:
+        """ Get the paths of the DICOM files with a SOP Instance UID """
+
+        return [self._dir_root / path
+                for path, in self._query("SELECT path FROM files WHERE sop_instance_uid = ? ORDER BY path",
+                                         (sop_instance_uid,))]
+
+    def find_scan_paths(self, series_instance_uid: str) -> list[Path]:
+        """ Get the paths of the slices of a scan with a z-position, sorted along the z-axis """
+
+        return [self._dir_root / path
+                for path, in self._query("SELECT path FROM files "
+                                         "WHERE series_instance_uid = ? AND z IS NOT NULL ORDER BY z, path",
+                                         (series_instance_uid,))]
+
+    def find_series_paths(self, series_instance_uid: str) -> list[Path]:
+        """ Get the paths of the DICOM files of a series, sorted by path """
+
+        return [self._dir_root / path
+                for path, in self._query("SELECT path FROM files WHERE series_instance_uid = ? ORDER BY path",
+                                         (series_instance_uid,))]
+
+    def get_series_instance_uids(self) -> set[str]:
+        """ Get the Series Instance UIDs of the DICOM files of the root directory """
+
+        return {uid for uid, in self._query("SELECT DISTINCT series_instance_uid FROM files "
+                                            "WHERE series_instance_uid IS NOT NULL")}
+
+    def __len__(self):
+        return self._query("SELECT COUNT(*) FROM files WHERE sop_instance_uid IS NOT NULL")[0][0]
+
+    def __str__(self):
+        return f"DicomIndex: {self._dir_root} - {self._path_index}"
+
+    __repr__ = __str__
+
+
+def get_default_index_path(dir_root: Path) -> Path:
+    """
+    Get the default path of the SQLite file indexing a root directory.
+
+    Parameters
+    ----------
+    dir_root : (Path)
+        The root directory of the indexed DICOM files.
+
+    Returns
+    -------
+    Path
+        The path of the SQLite file, named after the hash of the resolved root directory, in DIR_DICOM_INDEX.
+
+    """
+
+    root_hash = hashlib.sha1(os.fsencode(Path(dir_root).resolve())).hexdigest()
+    return Path(constants.DIR_DICOM_INDEX) / f"{root_hash}.sqlite"
@@ -1,3 +1,7 @@
+from .dicom_headers import DicomHeader, scan_dicom_headers, read_dicom_headers, read_dicom_header
+from .dicom_index import DicomIndex
+
+from typing import Callable
 from pathlib import Path
 import pydicom as dcm
 
@@ -37,36 +41,80 @@ def get_modality_from_dicom_slice(dicom_slice):
     raise ValueError(fr"Not yet determined how to interpret {modality} !")
 
 
-def get_series_instance_uid_from_directory(dir_dicom: Path) -> str:
+def _lookup_dicom_index(dir_dicom: Path, lookup: Callable[[DicomIndex], tuple], path_index: Path = None):
     """
-    Get the Series Instance UID of a DICOM directory.
+    Answer a lookup from the DICOM index of a directory, without walking the directory when the index is up to date.
+
+    The directory is incrementally scanned when files were added to, or removed from, its tree since the last scan,
+    checked from the modification times of its directories, and when the lookup finds no file, or files that changed
+    since they were indexed.
 
     Parameters:
     -----------
     dir_dicom : (Path)
         Directory containing DICOM files.
 
+    lookup : (Callable[[DicomIndex], tuple])
+        The lookup, returning its result and the paths of the files it found.
+
+    path_index : (Path, Optional)
+        The path of the SQLite file of the index, see DicomIndex.
+
+    Returns:
+    --------
+    The result of the lookup.
+    """
+
+    index = DicomIndex.open(dir_dicom, scan=False, path_index=path_index)
+
+    scanned = index.is_empty() or not index.is_tree_unchanged()
+    if scanned:
+        index.scan()
+
+    result, paths = lookup(index)
+    if not scanned and (not paths or not index.is_up_to_date(paths)):
+        index.scan()
+        result, paths = lookup(index)
+
+    return result
+
+
+def get_series_instance_uid_from_directory(dir_dicom: Path, path_index: Path = None) -> str:
+    """
+    Get the Series Instance UID of a DICOM directory, from its DICOM index.
+
+    Parameters:
+    -----------
+    dir_dicom : (Path)
+        Directory containing DICOM files.
+
+    path_index : (Path, Optional)
+        The path of the SQLite file of the index, see DicomIndex.
+
     Returns:
     --------
     str
         Series Instance UID of the DICOM directory.
     """
 
-    dicom_files = list(dir_dicom.rglob("*.dcm"))
-    if not dicom_files:
+    def lookup(index: DicomIndex) -> tuple:
+        uids = index.get_series_instance_uids()
+        return uids, [path for uid in uids for path in index.find_series_paths(uid)]
+
+    series_instance_uids = _lookup_dicom_index(dir_dicom, lookup, path_index=path_index)
+    if not series_instance_uids:
         raise ValueError("No DICOM files found in the directory !")
 
-    series_instance_uids = {dcm.dcmread(str(dicom_file)).SeriesInstanceUID for dicom_file in dicom_files}
     if len(series_instance_uids) > 1:
         raise ValueError("Series Instance UID mismatch in the directory !")
 
     return series_instance_uids.pop()
 
 
-def find_dicom_path(dir_dicom: Path, sop_instance_uid: str) -> Path:
+def find_dicom_path(dir_dicom: Path, sop_instance_uid: str, path_index: Path = None) -> Path:
 
     """
-    Fetch the path of a DICOM file with a specific SOP Instance UID.
+    Fetch the path of a DICOM file with a specific SOP Instance UID, from the DICOM index of the directory.
 
     Parameters:
     -----------
@@ -76,15 +124,20 @@ def find_dicom_path(dir_dicom: Path, sop_instance_uid: str) -> Path:
     sop_instance_uid : (str)
         SOP Instance UID of the DICOM file.
 
+    path_index : (Path, Optional)
+        The path of the SQLite file of the index, see DicomIndex.
+
     Returns:
     --------
     Path
         The Path of the DICOM file with the specified SOP Instance UID.
     """
 
-    list_possible_dicoms = [path_dicom
-                            for path_dicom in dir_dicom.rglob("*.dcm")
-                            if dcm.dcmread(path_dicom).SOPInstanceUID == sop_instance_uid]
+    def lookup(index: DicomIndex) -> tuple:
+        paths = index.find_paths(sop_instance_uid)
+        return paths, paths
+
+    list_possible_dicoms = _lookup_dicom_index(dir_dicom, lookup, path_index=path_index)
 
     if len(list_possible_dicoms) != 1:
         raise ValueError(f"Number of {sop_instance_uid} DICOM files is {len(list_possible_dicoms)} !")
@@ -92,10 +145,10 @@ def find_dicom_path(dir_dicom: Path, sop_instance_uid: str) -> Path:
     return list_possible_dicoms[0]
 
 
-def find_dicom_paths_of_scan(dir_dicom: Path, series_instance_uid: str) -> list[Path]:
+def find_dicom_paths_of_scan(dir_dicom: Path, series_instance_uid: str, path_index: Path = None) -> list[Path]:
 
     """
-    Filter DICOM slices of a scan.
+    Filter DICOM slices of a scan, from the DICOM index of the directory.
 
     Parameters:
     -----------
@@ -105,28 +158,17 @@ def find_dicom_paths_of_scan(dir_dicom: Path, series_instance_uid: str) -> list[
     series_instance_uid : (str)
         Series Instance UID of the scan.
 
+    path_index : (Path, Optional)
+        The path of the SQLite file of the index, see DicomIndex.
+
     Returns:
     --------
-    list[dcm.dataset.FileDataset]
-        List of DICOM slices of the scan.
+    list[Path]
+        Paths of the DICOM slices of the scan, sorted along the z-axis.
     """
 
-    # DICOM slices' paths with their Instance Number:
-    list_dicom_paths = []
-
-    for path_dicom in dir_dicom.rglob("*.dcm"):
-
-        try:
-            dcm_slice = dcm.dcmread(str(path_dicom), stop_before_pixels=True)
-
-            if dcm_slice.SeriesInstanceUID == series_instance_uid:
-                slice_position = dcm_slice.get("ImagePositionPatient", None)
-                if slice_position and len(slice_position) == 3:
-                    z_coordinate = slice_position[2]
-                    list_dicom_paths.append((path_dicom, z_coordinate))
-
-        except dcm.errors.InvalidDicomError:
-            # Skip files that are not valid DICOM files
-            continue
+    def lookup(index: DicomIndex) -> tuple:
+        paths = index.find_scan_paths(series_instance_uid)
+        return paths, paths
 
-    return [path_dicom for path_dicom, _ in sorted(list_dicom_paths, key=lambda x: x[1])]
+    return _lookup_dicom_index(dir_dicom, lookup, path_index=path_index)
@@ -1,10 +1,14 @@
 from phandose import constants
 
+from logging.handlers import QueueHandler, QueueListener
 from datetime import datetime, timezone
 from pathlib import Path
 from tqdm import tqdm
+import multiprocessing
 import logging.config
 import logging
+import atexit
+import time
 
 
 class CenterAlignedFormatter(logging.Formatter):
@@ -103,6 +107,148 @@ class TqdmLoggingHandler(logging.StreamHandler):
             self.handleError(record)
 
 
+class RateLimitedHandler(logging.Handler):
+    """
+    A logging handler forwarding the records to its handlers, capping the repetitions of a same message.
+
+    The records of a same logger, level and message template (e.g. "Error for file %s: %s", whatever the file) are
+    forwarded at most max_repeats times per period, the following ones are counted and summarized in a single record
+    at the end of the period. Only the records at or above limited_level are capped.
+
+    Attributes
+    ----------
+    _handlers : (list[logging.Handler])
+        The handlers the records are forwarded to, each one filtering the records below its level.
+
+    _max_repeats : (int | None)
+        The maximal number of records of a same message per period, not capped if None.
+
+    _period : (float)
+        The period of the cap, in seconds.
+
+    _limited_level : (int)
+        The level from which the records are capped.
+
+    _windows : (dict[tuple, list])
+        The start of the current period, the number of records, and the number of suppressed records, of each message.
+
+    """
+
+    # The number of messages from which those with an expired period, and no suppressed record, are forgotten :
+    MAX_WINDOWS = 1024
+
+    def __init__(self,
+                 handlers: list[logging.Handler] = None,
+                 max_repeats: int | None = 10,
+                 period: float = 60.0,
+                 limited_level: int = logging.WARNING):
+
+        super().__init__()
+        self._handlers = list(handlers or [])
+        self._max_repeats = max_repeats
+        self._period = period
+        self._limited_level = limited_level
+        self._windows = {}
+
+    @property
+    def handlers(self) -> list[logging.Handler]:
+        return self._handlers
+
+    def add_handler(self, handler: logging.Handler):
+        with self.lock:
+            self._handlers.append(handler)
+
+    def remove_handler(self, handler: logging.Handler):
+        with self.lock:
+            if handler in self._handlers:
+                self._handlers.remove(handler)
+
+    def emit(self, record):
+        """
+        Forward the log record to the handlers, unless its message was repeated too often in the current period.
+
+        Parameters
+        ----------
+        record : (logging.LogRecord)
+            The log record.
+
+        """
+
+        if self._max_repeats is None or record.levelno < self._limited_level:
+            self._forward(record)
+            return
+
+        # The message template, kept by the queue handlers which merge the arguments into the message :
+        template = getattr(record, "msg_template", record.msg)
+        key = (record.name, record.levelno, str(template))
+
+        now = time.monotonic()
+        window = self._windows.get(key)
+        if window is None or now - window[0] >= self._period:
+            if window is not None:
+                self._summarize(key, window)
+            elif len(self._windows) >= self.MAX_WINDOWS:
+                self._prune(now)
+
+            window = self._windows[key] = [now, 0, 0]
+
+        window[1] += 1
+        if window[1] <= self._max_repeats:
+            self._forward(record)
+        else:
+            window[2] += 1
+
+    def _forward(self, record: logging.LogRecord):
+
+        for handler in self._handlers:
+            if record.levelno >= handler.level:
+                handler.handle(record)
+
+    def _summarize(self, key: tuple, window: list):
+        """ Forward a record counting the suppressed records of a message, if any """
+
+        name, levelno, template = key
+        if window[2]:
+            self._forward(logging.makeLogRecord({"name": name,
+                                                 "levelno": levelno,
+                                                 "levelname": logging.getLevelName(levelno),
+                                                 "msg": "%d similar messages suppressed in %.0f s : %s",
+                                                 "args": (window[2], self._period, template)}))
+            window[2] = 0
+
+    def _prune(self, now: float):
+
+        for key, window in list(self._windows.items()):
+            if now - window[0] >= self._period and not window[2]:
+                del self._windows[key]
+
+    def flush(self):
+        """ Forward the summaries of the suppressed records, and flush the handlers """
+
+        with self.lock:
+            for key, window in self._windows.items():
+                self._summarize(key, window)
+
+            for handler in self._handlers:
+                handler.flush()
+
+    def close(self):
+        self.flush()
+        super().close()
+
+
+class _TemplateQueueHandler(QueueHandler):
+    """ A queue handler keeping the message template of the records, for the RateLimitedHandler """
+
+    def prepare(self, record):
+
+        template = record.msg
+        record = super().prepare(record)
+        record.msg_template = getattr(record, "msg_template", template if isinstance(template, str) else str(template))
+
+        return record
+
+
 DICT_LOGGING_CONFIG = {
     'version': 1,
     'disable_existing_loggers': True,
@@ -206,7 +352,7 @@ def add_file_handler_to_root(dir_log: Path = constants.DIR_LOGS,
         ))
 
         # Add the file handler to the root logger
-        root_logger.addHandler(file_handler)
+        _add_root_handler(file_handler)
 
         logging.getLogger('phandose.utils.logger').info(f"Per-run logging enabled: {str(path_log_file)}")
     except Exception as e:
@@ -225,13 +371,11 @@ def enable_tqdm_logging(log_level: int = logging.INFO):
     """
 
     # Get the root logger :
-    root_logger = logging.getLogger('root')
-
     # Add the TqdmLoggingHandler :
     tqdm_handler = TqdmLoggingHandler()
     tqdm_handler.setLevel(log_level)
     tqdm_handler.setFormatter(logging.Formatter('%(message)s'))
-    root_logger.addHandler(tqdm_handler)
+    _add_root_handler(tqdm_handler)
 
     # Log the change :
     get_logger('phandose.utils.logger').debug("TQDM-compatible logging enabled.")
@@ -248,14 +392,126 @@ def enable_console_logging(log_level: int = logging.INFO):
 
     """
 
-    # Get the root logger :
-    root_logger = logging.getLogger('root')
-
     # Add the console handler :
     console_handler = logging.StreamHandler()
     console_handler.setLevel(log_level)
     console_handler.setFormatter(logging.Formatter('%(message)s'))
-    root_logger.addHandler(console_handler)
+    _add_root_handler(console_handler)
 
     # Log the change :
     logging.getLogger('phandose.utils.logger').debug("Console logging enabled.")
+
+
+# The listener emitting the records of the queue, and its rate-limited handler, when the queue logging is enabled :
+_queue_listener: QueueListener | None = None
+_rate_limited_handler: RateLimitedHandler | None = None
+
+
+def _add_root_handler(handler: logging.Handler):
+    """ Add a handler to the root logger, or to the queue listener when the queue logging is enabled """
+
+    if _rate_limited_handler is not None:
+        _rate_limited_handler.add_handler(handler)
+    else:
+        logging.getLogger('root').addHandler(handler)
+
+
+def enable_queue_logging(log_queue=None, max_repeats: int | None = 10, period: float = 60.0):
+    """
+    Route the records of the root logger through a queue, emitted by the handlers of the root logger in a background
+    thread : logging no longer blocks on the file and console handlers.
+
+    Worker processes attach to the returned queue with init_worker_logging, so that their records are emitted by the
+    handlers of the main process instead of being lost, or contending on the same files. The repetitions of a same
+    warning or error are capped, see RateLimitedHandler. The handlers added afterwards with add_file_handler_to_root,
+    enable_tqdm_logging or enable_console_logging are added to the listener.
+
+    Parameters
+    ----------
+    log_queue : (queue.Queue | multiprocessing.Queue, Optional)
+        The queue of the records, defaults to a new multiprocessing queue, shareable with worker processes.
+
+    max_repeats : (int | None, Optional)
+        The maximal number of records of a same warning or error per period, defaults to 10, not capped if None.
+
+    period : (float, Optional)
+        The period of the cap, in seconds, defaults to 60.
+
+    Returns
+    -------
+    queue.Queue | multiprocessing.Queue
+        The queue of the records, to attach the worker processes to.
+
+    """
+
+    global _queue_listener, _rate_limited_handler
+
+    if _queue_listener is not None:
+        return _queue_listener.queue
+
+    log_queue = log_queue if log_queue is not None else multiprocessing.Queue(-1)
+
+    # Move the handlers of the root logger behind the queue :
+    root_logger = logging.getLogger('root')
+    list_handlers = list(root_logger.handlers)
+    for handler in list_handlers:
+        root_logger.removeHandler(handler)
+
+    _rate_limited_handler = RateLimitedHandler(list_handlers, max_repeats=max_repeats, period=period)
+    _queue_listener = QueueListener(log_queue, _rate_limited_handler)
+    root_logger.addHandler(_TemplateQueueHandler(log_queue))
+    _queue_listener.start()
+
+    get_logger('phandose.utils.logger').debug("Queue logging enabled.")
+    return log_queue
+
+
+def disable_queue_logging():
+    """ Emit the records left in the queue, and restore the handlers of the root logger """
+
+    global _queue_listener, _rate_limited_handler
+
+    if _queue_listener is None:
+        return
+
+    root_logger = logging.getLogger('root')
+    for handler in list(root_logger.handlers):
+        if isinstance(handler, _TemplateQueueHandler):
+            root_logger.removeHandler(handler)
+
+    _queue_listener.stop()
+    _rate_limited_handler.flush()
+
+    for handler in _rate_limited_handler.handlers:
+        root_logger.addHandler(handler)
+
+    _queue_listener, _rate_limited_handler = None, None
+
+
+def init_worker_logging(log_queue, level: int = None):
+    """
+    Send the records of a worker process to the queue of the main process, see enable_queue_logging.
+
+    To be called once in each worker process, e.g. as, or from, the initializer of a process pool.
+
+    Parameters
+    ----------
+    log_queue : (multiprocessing.Queue)
+        The queue returned by enable_queue_logging in the main process.
+
+    level : (int, Optional)
+        The level of the root logger of the worker, defaults to its current level.
+
+    """
+
+    root_logger = logging.getLogger('root')
+    for handler in list(root_logger.handlers):
+        root_logger.removeHandler(handler)
+
+    root_logger.addHandler(_TemplateQueueHandler(log_queue))
+    if level is not None:
+        root_logger.setLevel(level)
+
+
+# Emit the records left in the queue at exit :
+atexit.register(disable_queue_logging)
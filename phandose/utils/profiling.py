@@ -0,0 +1,416 @@
+"""
+Lightweight profiler of the stages of the pipeline : wall time, and optionally peak memory, of nested spans.
+
+The spans are opened with the ``span`` context manager, or the ``profiled`` decorator, and cost a single check when
+the profiling is disabled, its default. Nested spans are aggregated by their path, e.g. "patient/save_patient", per
+process : the statistics of worker processes are sent back to the main process and merged with ``merge_stats``.
+
+Usage
+-----
+>>> enable_profiling(memory=True)
+>>> with span("patient", patient_id="P1"):
+...     convert_scan_to_dataframe(dicom_slices)
+>>> get_profiler().log_summary()
+>>> get_profiler().write_chrome_trace("trace.json")
+
+"""
+
+from phandose.utils.logger import get_logger
+
+from contextlib import ContextDecorator
+from typing import Callable
+from pathlib import Path
+import tracemalloc
+import threading
+import functools
+import json
+import time
+import os
+
+# Initialize the logger :
+logger = get_logger("phandose.utils.profiling")
+
+# The separator between the names of nested spans, in their path :
+PATH_SEPARATOR = "/"
+
+
+class _Frame:
+    """ An open span of a thread, and the peak memory reached by its closed children """
+
+    __slots__ = ("path", "attributes", "start", "start_us", "start_memory", "children_peak_memory")
+
+    def __init__(self, path: str, attributes: dict):
+
+        self.path = path
+        self.attributes = attributes
+        self.start = time.perf_counter()
+        self.start_us = time.time_ns() // 1000
+        self.start_memory = None
+        self.children_peak_memory = 0
+
+
+class Profiler:
+    """
+    Aggregate the wall time, and optionally the peak memory, of the spans of a process.
+
+    The spans are nested per thread, and aggregated over the threads of the process. The peak memory is that of the
+    Python allocations traced by tracemalloc, over the whole process : spans run concurrently in other threads
+    account for it.
+
+    Attributes
+    ----------
+    _enabled : (bool)
+        Whether the spans are profiled.
+
+    _memory : (bool)
+        Whether the peak memory of the spans is measured with tracemalloc.
+
+    _stats : (dict[str, dict])
+        The statistics of the closed spans, by path : count, total_s, min_s, max_s and peak_memory_bytes.
+
+    _events : (list[dict])
+        The closed spans, as Chrome trace events.
+
+    _lock : (threading.Lock)
+        The lock of the statistics and the events.
+
+    _local : (threading.local)
+        The stack of open spans of each thread.
+
+    """
+
+    def __init__(self):
+
+        self._enabled = False
+        self._memory = False
+        self._stats = {}
+        self._events = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @property
+    def enabled(self) -> bool:
+        return self._enabled
+
+    @property
+    def memory(self) -> bool:
+        return self._memory
+
+    def enable(self, memory: bool = False):
+        """
+        Enable the profiling of the spans.
+
+        Parameters
+        ----------
+        memory : (bool, Optional)
+            Whether to measure the peak memory of the spans with tracemalloc, which slows down the allocations,
+            defaults to False.
+
+        """
+
+        self._memory = memory
+        if memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+        self._enabled = True
+
+    def disable(self):
+
+        self._enabled = False
+        if self._memory and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+        self._memory = False
+
+    def _get_stack(self) -> list[_Frame]:
+
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+
+        return stack
+
+    def open(self, name: str, attributes: dict = None) -> _Frame:
+        """ Open a span, nested in the open span of the thread """
+
+        stack = self._get_stack()
+        path = f"{stack[-1].path}{PATH_SEPARATOR}{name}" if stack else name
+        frame = _Frame(path, attributes or {})
+
+        if self._memory and tracemalloc.is_tracing():
+            # Keep the peak reached so far by the parent, since the peak is reset for this span :
+            current_memory, peak_memory = tracemalloc.get_traced_memory()
+            if stack:
+                stack[-1].children_peak_memory = max(stack[-1].children_peak_memory, peak_memory)
+            tracemalloc.reset_peak()
+            frame.start_memory = current_memory
+
+        stack.append(frame)
+        return frame
+
+    def close(self, frame: _Frame):
+        """ Close a span, and add it to the statistics """
+
+        duration = time.perf_counter() - frame.start
+
+        stack = self._get_stack()
+        if stack and stack[-1] is frame:
+            stack.pop()
+
+        peak_memory = None
+        if frame.start_memory is not None and tracemalloc.is_tracing():
+            absolute_peak = max(tracemalloc.get_traced_memory()[1], frame.children_peak_memory)
+            peak_memory = max(absolute_peak - frame.start_memory, 0)
+
+            # The parent's peak includes that of its children :
+            if stack:
+                stack[-1].children_peak_memory = max(stack[-1].children_peak_memory, absolute_peak)
+
+        args = dict(frame.attributes)
+        if peak_memory is not None:
+            args["peak_memory_bytes"] = peak_memory
+
+        event = {"name": frame.path.rsplit(PATH_SEPARATOR, 1)[-1],
+                 "cat": "phandose",
+                 "ph": "X",
+                 "ts": frame.start_us,
+                 "dur": duration * 1e6,
+                 "pid": os.getpid(),
+                 "tid": threading.get_ident(),
+                 "args": {"path": frame.path, **args}}
+
+        with self._lock:
+            self._events.append(event)
+            _add_to_stats(self._stats, frame.path, count=1, total_s=duration, min_s=duration, max_s=duration,
+                          peak_memory_bytes=peak_memory)
+
+    def get_stats(self) -> dict[str, dict]:
+        """ Get the statistics of the closed spans, by path """
+
+        with self._lock:
+            return {path: dict(stats) for path, stats in self._stats.items()}
+
+    def get_events(self) -> list[dict]:
+        """ Get the closed spans, as Chrome trace events """
+
+        with self._lock:
+            return list(self._events)
+
+    def collect(self, reset: bool = True) -> dict:
+        """
+        Collect the statistics and the events of the closed spans, e.g. to send them from a worker process.
+
+        Parameters
+        ----------
+        reset : (bool, Optional)
+            Whether to forget the collected spans, defaults to True.
+
+        Returns
+        -------
+        dict
+            {"stats": {path: stats}, "events": [event]}, to be merged with merge.
+
+        """
+
+        with self._lock:
+            collected = {"stats": {path: dict(stats) for path, stats in self._stats.items()},
+                         "events": list(self._events)}
+            if reset:
+                self._stats, self._events = {}, []
+
+        return collected
+
+    def merge(self, collected: dict):
+        """ Merge the statistics and the events collected by another profiler, e.g. in a worker process """
+
+        with self._lock:
+            merge_stats(self._stats, collected.get("stats", {}))
+            self._events.extend(collected.get("events", []))
+
+    def reset(self):
+
+        with self._lock:
+            self._stats, self._events = {}, []
+
+    def log_summary(self, title: str = "Profiling summary", log: Callable[[str], None] = None):
+        """
+        Log the statistics of the closed spans, by path.
+
+        Parameters
+        ----------
+        title : (str, Optional)
+            The first line of the summary, defaults to "Profiling summary".
+
+        log : (Callable[[str], None], Optional)
+            The logging function, defaults to the info level of the logger of this module.
+
+        """
+
+        (log or logger.info)(format_stats(self.get_stats(), title=title))
+
+    def write_json(self, path_output: Path | str):
+        """ Write the statistics of the closed spans, by path, in a JSON file """
+
+        _write_json(path_output, {"pid": os.getpid(), "stats": self.get_stats()})
+
+    def write_chrome_trace(self, path_output: Path | str):
+        """ Write the closed spans in a Chrome trace file, to be opened in chrome://tracing or Perfetto """
+
+        _write_json(path_output, {"traceEvents": self.get_events(), "displayTimeUnit": "ms"})
+
+    def __str__(self):
+        return f"Profiler: enabled={self._enabled}, memory={self._memory}, {len(self._stats)} spans"
+
+    __repr__ = __str__
+
+
+class span(ContextDecorator):
+    """
+    Profile a block of code, or a function, as a span named `name`, nested in the open span of the thread.
+
+    Parameters
+    ----------
+    name : (str)
+        The name of the span.
+
+    **attributes
+        The attributes of the span, e.g. the patient ID, added to its Chrome trace event.
+
+    """
+
+    def __init__(self, name: str, **attributes):
+
+        self._name = name
+        self._attributes = attributes
+        self._frames = []
+
+    def _recreate_cm(self):
+        # Each call of a decorated function opens its own span, even if called concurrently :
+        return span(self._name, **self._attributes)
+
+    def __enter__(self):
+
+        if _profiler.enabled:
+            self._frames.append(_profiler.open(self._name, self._attributes))
+        else:
+            self._frames.append(None)
+
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+
+        frame = self._frames.pop()
+        if frame is not None:
+            _profiler.close(frame)
+
+        return False
+
+
+def profiled(name: str | Callable = None):
+    """
+    Decorate a function to profile each of its calls as a span, named after the function by default.
+
+    Can be used as ``@profiled`` or ``@profiled("name")``.
+
+    """
+
+    def decorator(function: Callable):
+
+        span_name = name if isinstance(name, str) else function.__qualname__
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+
+            if not _profiler.enabled:
+                return function(*args, **kwargs)
+
+            frame = _profiler.open(span_name)
+            try:
+                return function(*args, **kwargs)
+            finally:
+                _profiler.close(frame)
+
+        return wrapper
+
+    return decorator(name) if callable(name) else decorator
+
+
+def merge_stats(stats: dict[str, dict], other_stats: dict[str, dict]) -> dict[str, dict]:
+    """ Merge statistics by path into `stats`, in place, and return it """
+
+    for path, other in other_stats.items():
+        _add_to_stats(stats, path, **other)
+
+    return stats
+
+
+def format_stats(stats: dict[str, dict], title: str = "Profiling summary") -> str:
+    """ Format statistics by path as a table : count, total, mean and max time, and peak memory """
+
+    lines = [title + " :"]
+    if not stats:
+        return lines[0] + " no span"
+
+    width = max(len(path) for path in stats)
+    lines.append(f"  {'span':<{width}}  {'count':>6}  {'total (s)':>10}  {'mean (s)':>10}  {'max (s)':>10}  "
+                 f"{'peak (MB)':>10}")
+
+    for path, path_stats in sorted(stats.items()):
+        peak_memory = path_stats.get("peak_memory_bytes")
+        peak_memory = f"{peak_memory / 2 ** 20:10.2f}" if peak_memory is not None else f"{'-':>10}"
+        lines.append(f"  {path:<{width}}  {path_stats['count']:>6}  {path_stats['total_s']:>10.3f}  "
+                     f"{path_stats['total_s'] / path_stats['count']:>10.3f}  {path_stats['max_s']:>10.3f}  "
+                     f"{peak_memory}")
+
+    return "\n".join(lines)
+
+
+def _add_to_stats(stats: dict[str, dict],
+                  path: str,
+                  count: int,
+                  total_s: float,
+                  min_s: float,
+                  max_s: float,
+                  peak_memory_bytes: int | None):
+
+    path_stats = stats.get(path)
+    if path_stats is None:
+        stats[path] = {"count": count, "total_s": total_s, "min_s": min_s, "max_s": max_s,
+                       "peak_memory_bytes": peak_memory_bytes}
+        return
+
+    path_stats["count"] += count
+    path_stats["total_s"] += total_s
+    path_stats["min_s"] = min(path_stats["min_s"], min_s)
+    path_stats["max_s"] = max(path_stats["max_s"], max_s)
+    if peak_memory_bytes is not None:
+        path_stats["peak_memory_bytes"] = max(path_stats["peak_memory_bytes"] or 0, peak_memory_bytes)
+
+
+def _write_json(path_output: Path | str, content: dict):
+
+    path_output = Path(path_output)
+    path_output.parent.mkdir(parents=True, exist_ok=True)
+    with open(path_output, "w") as f:
+        json.dump(content, f, indent=1, default=str)
+
+
+# The profiler of the process :
+_profiler = Profiler()
+
+
+def get_profiler() -> Profiler:
+    return _profiler
+
+
+def enable_profiling(memory: bool = False):
+    """ Enable the profiler of the process, see Profiler.enable """
+    _profiler.enable(memory=memory)
+
+
+def disable_profiling():
+    _profiler.disable()
+
+
+def is_profiling_enabled() -> bool:
+    return _profiler.enabled
@@ -0,0 +1,66 @@
+from benchmarks import generate_dataset, run_benchmark, run_benchmarks, compare_results
+from phandose.patient import Patient
+
+from pathlib import Path
+import nibabel as nib
+import tempfile
+import unittest
+
+
+class TestBenchmarks(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp_dir = tempfile.TemporaryDirectory()
+        cls.dataset = generate_dataset(Path(cls.tmp_dir.name), size="small")
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp_dir.cleanup()
+
+    def test_synthetic_patient(self):
+
+        patient = Patient.from_dir_dicom(patient_id=self.dataset.patient_id, dir_dicom=self.dataset.dir_patient)
+        self.assertEqual(sorted(modality.modality_type for modality in patient.list_modalities), ["CT", "RD", "RS"])
+
+        # The RTSTRUCT references the CT :
+        ct, = [modality for modality in patient.list_modalities if modality.modality_type == "CT"]
+        rtstruct, = [modality for modality in patient.list_modalities if modality.modality_type == "RS"]
+        self.assertEqual(rtstruct.get_referenced_scan_uid(), ct.modality_id)
+        self.assertEqual(len(ct.dicom_paths), 16)
+
+    def test_synthetic_masks_and_phantoms(self):
+
+        list_masks = sorted(self.dataset.dir_segmentations.glob("*.nii.gz"))
+        self.assertEqual(len(list_masks), 4)
+        self.assertEqual(nib.load(list_masks[0]).shape, (64, 64, 16))
+
+        self.assertEqual(len(list(self.dataset.dir_phantom_library.glob("PHANTOM_*.txt"))), 4)
+        self.assertIn("body trunc", self.dataset.df_contours["ROIName"].unique())
+
+    def test_run_benchmarks(self):
+
+        results = run_benchmarks(self.dataset, names=["calculate_contour_area", "Patient.from_dir_dicom"], repeat=2)
+        self.assertEqual(results["size"], "small")
+
+        result = results["benchmarks"]["calculate_contour_area"]
+        self.assertEqual(result["status"], "ok")
+        self.assertEqual(len(result["times_s"]), 2)
+        self.assertGreater(result["peak_memory_bytes"], 0)
+
+        # A run twice as slow regressed :
+        baseline = {"size": "small", "benchmarks": {name: {**result, "min_s": result["min_s"] / 2}
+                                                    for name, result in results["benchmarks"].items()}}
+        self.assertTrue(all(comparison["regressed"] for comparison in compare_results(results, baseline)))
+
+        with self.assertRaises(ValueError):
+            run_benchmarks(self.dataset, names=["unknown"])
+
+    def test_benchmark_error(self):
+
+        dataset = self.dataset._replace(dir_patient=Path(self.tmp_dir.name) / "missing")
+        self.assertEqual(run_benchmark("Patient.from_dir_dicom", dataset, repeat=1)["status"], "error")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,27 @@
+from benchmarks import IMPORT_TIME_BUDGETS, measure_import_time, check_import_times
+
+import unittest
+import os
+
+
+class TestImportTime(unittest.TestCase):
+
+    def test_deferred_imports(self):
+
+        # The heavy dependencies are imported on first use only :
+        for module_name in IMPORT_TIME_BUDGETS:
+            with self.subTest(module=module_name):
+                self.assertEqual(measure_import_time(module_name, repeat=1)["deferred_imported"], [])
+
+    @unittest.skipUnless(os.environ.get("PHANDOSE_CHECK_IMPORT_TIME"),
+                         "wall-clock budgets, checked by python -m benchmarks --import_time, "
+                         "or here if PHANDOSE_CHECK_IMPORT_TIME is set")
+    def test_import_time_budgets(self):
+
+        for check in check_import_times():
+            with self.subTest(module=check["module"]):
+                self.assertLessEqual(check["import_time_s"], check["budget_s"])
+
+
+if __name__ == "__main__":
+    unittest.main()
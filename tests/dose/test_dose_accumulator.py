@@ -0,0 +1,132 @@
+from phandose.dose import DoseAccumulator, DoseGridGeometry, sum_doses
+from phandose.modalities import RtdoseModality
+from phandose import exceptions
+from tests.synthetic_dicom import write_rtdose
+
+from unittest.mock import patch
+from pathlib import Path
+import pydicom as dcm
+import numpy as np
+import tempfile
+import unittest
+
+
+def make_linear_dose(shape, origin, spacing=(2.0, 2.0), frame_step=2.0):
+    """ A dose linear in the patient coordinates, which trilinear interpolation resamples exactly """
+
+    k, i, j = np.meshgrid(*(np.arange(n) for n in shape), indexing="ij")
+    x = origin[0] + j * spacing[1]
+    y = origin[1] + i * spacing[0]
+    z = origin[2] + k * frame_step
+
+    return 10 + 0.1 * x + 0.2 * y + 0.3 * z
+
+
+class TestDoseAccumulator(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.dir_dicom = Path(self.tmp_dir.name)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_sum_on_same_grid(self):
+
+        dose = make_linear_dose((4, 5, 6), (0, 0, 0))
+        path_beam_1 = write_rtdose(self.dir_dicom / "beam_1.dcm", dose)
+        path_beam_2 = write_rtdose(self.dir_dicom / "beam_2.dcm", 2 * dose)
+
+        accumulator = sum_doses([RtdoseModality(modality_id="1", path_dicom=path_beam_1), path_beam_2],
+                                weights=[1, 0.5])
+
+        self.assertEqual(accumulator.n_doses, 2)
+        self.assertEqual(accumulator.dose.dtype, np.float32)
+        np.testing.assert_allclose(accumulator.dose, 2 * dose, atol=1e-2)
+
+    def test_resample_shifted_grid(self):
+
+        dose_reference = make_linear_dose((5, 6, 6), (0, 0, 0))
+        dose_shifted = make_linear_dose((5, 6, 6), (1, 1, 1))
+
+        accumulator = DoseAccumulator()
+        accumulator.add(write_rtdose(self.dir_dicom / "reference.dcm", dose_reference))
+        accumulator.add(write_rtdose(self.dir_dicom / "shifted.dcm", dose_shifted, origin=(1.0, 1.0, 1.0)))
+
+        # Inside the shifted grid, the sum is exact ; outside of it, only the reference dose contributes :
+        np.testing.assert_allclose(accumulator.dose[1:, 1:, 1:], 2 * dose_reference[1:, 1:, 1:], atol=1e-2)
+        np.testing.assert_allclose(accumulator.dose[0], dose_reference[0], atol=1e-2)
+        np.testing.assert_allclose(accumulator.dose[:, :, 0], dose_reference[:, :, 0], atol=1e-2)
+
+    def test_common_grid_geometry(self):
+
+        dose = make_linear_dose((3, 4, 4), (0, 0, 0))
+        path_rtdose = write_rtdose(self.dir_dicom / "dose.dcm", dose)
+
+        geometry = DoseGridGeometry(origin=(2.0, 2.0, 0.0), orientation=(1, 0, 0, 0, 1, 0),
+                                    row_spacing=1.0, col_spacing=1.0, frame_offsets=(0.0, 1.0, 2.0),
+                                    rows=3, cols=3)
+        accumulator = DoseAccumulator(geometry).add(path_rtdose)
+
+        expected = make_linear_dose((3, 3, 3), (2, 2, 0), spacing=(1.0, 1.0), frame_step=1.0)
+        np.testing.assert_allclose(accumulator.dose, expected, atol=1e-2)
+
+    def test_different_orientations(self):
+
+        dose = make_linear_dose((2, 3, 3), (0, 0, 0))
+        geometry = DoseGridGeometry(origin=(0.0, 0.0, 0.0), orientation=(0, 1, 0, 1, 0, 0),
+                                    row_spacing=2.0, col_spacing=2.0, frame_offsets=(0.0, 2.0),
+                                    rows=3, cols=3)
+
+        with self.assertRaises(exceptions.DicomMetadataError):
+            DoseAccumulator(geometry).add(write_rtdose(self.dir_dicom / "dose.dcm", dose))
+
+    def test_to_rtdose(self):
+
+        dose = make_linear_dose((3, 4, 5), (-4, -4, 10))
+        path_rtdose = write_rtdose(self.dir_dicom / "dose.dcm", dose, origin=(-4, -4, 10))
+        accumulator = sum_doses([path_rtdose, path_rtdose])
+
+        path_output = self.dir_dicom / "sum.dcm"
+        summed = accumulator.to_rtdose(path_output=path_output)
+
+        rtdose = dcm.dcmread(str(path_output))
+        self.assertEqual(rtdose.DoseSummationType, "MULTI_PLAN")
+        self.assertNotEqual(rtdose.SOPInstanceUID, dcm.dcmread(str(path_rtdose)).SOPInstanceUID)
+        self.assertEqual(rtdose.SOPInstanceUID, summed.SOPInstanceUID)
+        self.assertEqual(DoseGridGeometry.from_dataset(rtdose), accumulator.geometry)
+        np.testing.assert_allclose(rtdose.pixel_array * rtdose.DoseGridScaling, 2 * dose, atol=1e-3)
+
+    def test_header_without_pixel_data(self):
+
+        # The deferred pixel data of a large RTDOSE isn't read to copy its header :
+        dose = make_linear_dose((10, 64, 64), (-4, -4, 10))
+        path_rtdose = write_rtdose(self.dir_dicom / "large_dose.dcm", dose, origin=(-4, -4, 10))
+
+        with patch("pydicom.filereader.read_deferred_data_element",
+                   wraps=dcm.filereader.read_deferred_data_element) as mock_read_deferred:
+            accumulator = sum_doses([path_rtdose])
+            mock_read_deferred.assert_not_called()
+
+        rtdose = accumulator.to_rtdose()
+        np.testing.assert_allclose(rtdose.pixel_array * rtdose.DoseGridScaling, dose, atol=1e-3)
+
+    def test_to_nifti(self):
+
+        dose = make_linear_dose((3, 4, 5), (-4, -6, 10))
+        accumulator = sum_doses([write_rtdose(self.dir_dicom / "dose.dcm", dose, origin=(-4, -6, 10))])
+
+        nifti = accumulator.to_nifti()
+        self.assertEqual(nifti.shape, (5, 4, 3))
+        np.testing.assert_allclose(nifti.affine[:3, 3], [4, 6, 10])
+        np.testing.assert_allclose(np.diag(nifti.affine)[:3], [-2, -2, 2])
+        np.testing.assert_allclose(np.asarray(nifti.dataobj)[4, 3, 2], dose[2, 3, 4], atol=1e-2)
+
+    def test_empty_accumulator(self):
+
+        with self.assertRaises(ValueError):
+            DoseAccumulator().to_nifti()
+
+
+if __name__ == "__main__":
+    unittest.main()
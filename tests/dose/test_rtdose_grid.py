@@ -0,0 +1,99 @@
+from phandose.conversions import convert_rtdose_to_nifti
+from phandose.dose import RtdoseGrid
+from phandose import exceptions
+from tests.synthetic_dicom import write_rtdose
+
+from pydicom.uid import RLELossless
+from pathlib import Path
+import nibabel as nib
+import pydicom as dcm
+import numpy as np
+import tempfile
+import unittest
+
+
+class TestRtdoseGrid(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.dir_dicom = Path(self.tmp_dir.name)
+
+        self.dose = np.random.default_rng(0).uniform(0, 60, size=(4, 5, 6))
+        self.path_rtdose = write_rtdose(self.dir_dicom / "dose.dcm", self.dose, origin=(-10, -20, 30))
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_memory_mapped_frames(self):
+
+        dose_grid = RtdoseGrid(self.path_rtdose)
+
+        self.assertTrue(dose_grid.is_memory_mapped)
+        self.assertIsInstance(dose_grid.stored_frames(), np.memmap)
+        self.assertEqual(dose_grid.shape, (4, 5, 6))
+
+        frame = dose_grid.frame(2)
+        self.assertEqual(frame.dtype, np.float32)
+        np.testing.assert_allclose(frame, self.dose[2], atol=1e-3)
+        np.testing.assert_allclose(dose_grid.to_array(), self.dose, atol=1e-3)
+
+    def test_memory_mapped_large_grid(self):
+
+        # A grid larger than the defer size of the header, its pixel data being deferred :
+        dose = np.random.default_rng(1).uniform(0, 60, size=(10, 64, 64))
+        path_rtdose = write_rtdose(self.dir_dicom / "large_dose.dcm", dose)
+        self.assertGreater(path_rtdose.stat().st_size, 64 * 1024)
+
+        dose_grid = RtdoseGrid(path_rtdose)
+        self.assertTrue(dose_grid.is_memory_mapped)
+        self.assertIsInstance(dose_grid.stored_frames(), np.memmap)
+        np.testing.assert_allclose(dose_grid.to_array(), dose, atol=1e-3)
+
+    def test_in_memory_dataset(self):
+
+        dose_grid = RtdoseGrid(dcm.dcmread(str(self.path_rtdose)))
+
+        self.assertFalse(dose_grid.is_memory_mapped)
+        np.testing.assert_allclose(np.stack(list(dose_grid)), self.dose, atol=1e-3)
+
+    def test_compressed_frames(self):
+
+        rtdose = dcm.dcmread(str(self.path_rtdose))
+        rtdose.BitsAllocated, rtdose.BitsStored, rtdose.HighBit = 16, 16, 15
+        rtdose.PixelData = np.rint(self.dose / 1e-2).astype(np.uint16).tobytes()
+        rtdose.DoseGridScaling = 1e-2
+        rtdose.compress(RLELossless)
+
+        path_compressed = self.dir_dicom / "compressed.dcm"
+        rtdose.save_as(str(path_compressed))
+
+        dose_grid = RtdoseGrid(path_compressed)
+        self.assertTrue(dose_grid.is_compressed)
+        self.assertIsNone(dose_grid.stored_frames())
+        np.testing.assert_allclose(dose_grid.frame(3), self.dose[3], atol=1e-2)
+
+    def test_missing_scaling(self):
+
+        rtdose = dcm.dcmread(str(self.path_rtdose))
+        del rtdose.DoseGridScaling
+
+        with self.assertRaises(exceptions.DicomMetadataError):
+            RtdoseGrid(rtdose)
+
+    def test_convert_to_nifti(self):
+
+        nifti = convert_rtdose_to_nifti(self.path_rtdose)
+
+        # The NIfTI image reads the memory-mapped file through a proxy, indexed by (col, row, frame) :
+        self.assertIsInstance(nifti.dataobj, nib.arrayproxy.ArrayProxy)
+        self.assertEqual(nifti.shape, (6, 5, 4))
+        np.testing.assert_allclose(nifti.get_fdata(), self.dose.transpose(2, 1, 0), atol=1e-3)
+        np.testing.assert_allclose(nifti.affine[:3, 3], [10, 20, 30])
+
+        nifti_in_memory = convert_rtdose_to_nifti(dcm.dcmread(str(self.path_rtdose)))
+        np.testing.assert_allclose(np.asarray(nifti_in_memory.dataobj), self.dose.transpose(2, 1, 0), atol=1e-3)
+        np.testing.assert_allclose(nifti_in_memory.affine, nifti.affine)
+
+
+if __name__ == "__main__":
+    unittest.main()
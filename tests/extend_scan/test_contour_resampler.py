@@ -0,0 +1,107 @@
+from phandose.extend_scan import resample_contours_z
+
+from statistics import mode
+import pandas as pd
+import numpy as np
+import unittest
+
+
+def script_resample(df_patient_phantom, z_step=None):
+    """ Reference implementation, transcribed from Prog_6_CreatePhantom_AXEL_V00.py """
+
+    resampled_contours = pd.DataFrame()
+    list_sections = sorted(df_patient_phantom['Section'].unique().tolist())
+    list_rois = sorted(df_patient_phantom['ROIName'].unique().tolist())
+    list_z = sorted(df_patient_phantom['z'].unique().tolist())
+    list_z_diff = [t - s for s, t in zip(list_z, list_z[1:])]
+    z_step = z_step if z_step is not None else max(5, round(mode(list_z_diff)))
+    list_z_expected_full = np.arange(min(list_z), max(list_z), z_step, dtype=float)
+    roi_number = 0
+    for roi_name in list_rois:
+        roi_number = roi_number + 1
+        roi = df_patient_phantom[df_patient_phantom['ROIName'] == roi_name]
+        for section in list_sections:
+            roi_section = roi[roi['Section'] == section]
+            list_roi_z = sorted(roi_section['z'].unique().tolist())
+            list_z_desired = [z for z in list_z_expected_full
+                              if roi_section['z'].min() <= z and z <= roi_section['z'].max()]
+            for height in list_z_desired:
+                list_dz = [abs(x - height) for x in list_roi_z]
+                z0 = list_roi_z[list_dz.index(min(list_dz))]
+                df0 = roi_section[roi_section['z'] == z0].copy()
+                df0['z'] = height
+                df0['ROINumber'] = roi_number
+                roi_contour_number = 0
+                for contour_number in sorted(df0['ROIContourNumber'].unique().tolist()):
+                    roi_contour_number = roi_contour_number + 1
+                    df00 = df0[df0['ROIContourNumber'] == contour_number].copy()
+                    df00['ROIContourNumber'] = roi_contour_number
+                    df00 = df00.sort_values(by=['ROIContourNumber', 'ROIContourPointNumber', 'x', 'y', 'z'])
+                    resampled_contours = pd.concat([resampled_contours, df00.reset_index(drop=True)],
+                                                   ignore_index=True)
+    return resampled_contours
+
+
+def make_merged_contours(seed=0):
+    """ Build merged patient + phantom contours with irregular slices per ROI and section """
+
+    rng = np.random.default_rng(seed)
+    rows = []
+    for section, (z_min, z_max, dz) in enumerate([(0, 60, 2.5), (60, 160, 3.0), (-90, 0, 2.0)]):
+        for roi_number, roi_name in enumerate(["external", "liver", "brain", "femur left"]):
+            list_z = np.arange(z_min + 1.5 * roi_number, z_max - roi_number, dz)
+            list_z = list_z[rng.random(len(list_z)) > 0.2]
+            for z in list_z:
+                for contour in rng.choice([3, 7, 12], size=rng.integers(1, 3), replace=False):
+                    for point in range(1, rng.integers(3, 6)):
+                        rows.append({"Origine": "Patient" if section == 0 else "Phantom",
+                                     "Section": section,
+                                     "ROIName": roi_name,
+                                     "ROINumber": roi_number + 10,
+                                     "ROIContourNumber": int(contour),
+                                     "ROIContourPointNumber": point,
+                                     "x": round(rng.normal(0, 50), 2),
+                                     "y": round(rng.normal(0, 50), 2),
+                                     "z": float(z)})
+
+    return pd.DataFrame(rows).sample(frac=1, random_state=seed).reset_index(drop=True)
+
+
+class TestResampleContoursZ(unittest.TestCase):
+
+    def test_matches_script(self):
+        """ Test that the vectorized resampling matches the nested loops of the script """
+        for seed in range(3):
+            with self.subTest(seed=seed):
+                df_contours = make_merged_contours(seed)
+                df_expected = script_resample(df_contours)
+                df_result = resample_contours_z(df_contours)
+                pd.testing.assert_frame_equal(df_result, df_expected, check_dtype=False)
+
+    def test_explicit_z_step(self):
+        df_contours = make_merged_contours(1)
+        df_expected = script_resample(df_contours, z_step=2)
+        df_result = resample_contours_z(df_contours, z_step=2)
+        pd.testing.assert_frame_equal(df_result, df_expected, check_dtype=False)
+
+    def test_nearest_slice_tie_takes_lowest(self):
+        """ Test that a target z halfway between two slices takes the lowest one """
+        df_contours = pd.DataFrame({"Section": 0, "ROIName": "liver", "ROINumber": 4, "ROIContourNumber": [1, 2, 1],
+                                    "ROIContourPointNumber": 1, "x": [1.0, 2.0, 3.0], "y": 0.0,
+                                    "z": [0.0, 0.0, 10.0]})
+        df_contours = pd.concat([df_contours, df_contours.assign(z=[20.0, 20.0, 20.0])], ignore_index=True)
+
+        df_result = resample_contours_z(df_contours, z_step=5)
+        self.assertEqual(df_result["z"].tolist(), [0.0, 0.0, 5.0, 5.0, 10.0, 15.0])
+        self.assertEqual(df_result["x"].tolist(), [1.0, 2.0, 1.0, 2.0, 3.0, 3.0])
+        self.assertEqual(df_result["ROIContourNumber"].tolist(), [1, 2, 1, 2, 1, 1])
+        self.assertTrue((df_result["ROINumber"] == 1).all())
+
+    def test_empty(self):
+        df_contours = pd.DataFrame(columns=["Section", "ROIName", "ROINumber", "ROIContourNumber",
+                                            "ROIContourPointNumber", "x", "y", "z"])
+        self.assertTrue(resample_contours_z(df_contours, z_step=5).empty)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,195 @@
+from phandose.extend_scan import JunctionSmoother, PolarProfile
+
+from scipy.interpolate import interp1d
+import pandas as pd
+import numpy as np
+import unittest
+import pickle
+import cv2
+
+
+def make_section(z_values, center=(5.0, -3.0), radii=(160.0, 110.0)):
+    """ Build a phantom section with an elliptic body trunc, a body extremity and an internal organ """
+
+    rows = []
+    angles = np.linspace(-np.pi, np.pi, 90, endpoint=False)
+    for i, z in enumerate(z_values):
+        scale = 1 + 0.002 * i
+        for roi_name, roi_number, factor in [("body trunc", 1, 1.0), ("body extremities", 2, 0.3), ("liver", 3, 0.4)]:
+            for k, angle in enumerate(angles):
+                rows.append({"ROIName": roi_name,
+                             "ROINumber": roi_number,
+                             "ROIContourNumber": i + 1,
+                             "ROIContourPointNumber": k + 1,
+                             "x": center[0] + factor * scale * radii[0] * np.cos(angle),
+                             "y": center[1] + factor * scale * radii[1] * np.sin(angle),
+                             "z": float(z)})
+
+    return pd.DataFrame(rows)
+
+
+def script_blend(df_section, h, junction_x, junction_y, center_x, center_y, junction_z, l_smooth, side):
+    """ Reference implementation, transcribed from Prog_6_CreatePhantom_AXEL_V00.py """
+
+    def polar(x, y):
+        complex_format = x - center_x + 1j * (y - center_y)
+        return np.abs(complex_format), np.angle(complex_format, deg=False)
+
+    junction = pd.DataFrame({"x": junction_x, "y": junction_y})
+    junction["Polar"] = junction.apply(lambda row: polar(row["x"], row["y"]), axis=1)
+    junction["rpat"] = junction.apply(lambda row: row["Polar"][0], axis=1)
+    junction["tpat"] = junction.apply(lambda row: row["Polar"][1], axis=1)
+    junction = junction.drop_duplicates(subset=["tpat"], keep="last")
+    interp_junction = interp1d(junction["tpat"].to_numpy(), junction["rpat"].to_numpy(),
+                               fill_value="extrapolate", kind="slinear")
+
+    df = df_section.copy()
+    if side == "top":
+        df["xh"] = df.apply(lambda row: ((h[0, 0] * row["x"] + h[0, 1] * row["y"] + h[0, 2]) /
+                                         (h[2, 0] * row["x"] + h[2, 1] * row["y"] + h[2, 2]))
+                            if row["ROIName"] == "body trunc" else row["x"], axis=1)
+        df["yh"] = df.apply(lambda row: ((h[1, 0] * row["x"] + h[1, 1] * row["y"] + h[1, 2]) /
+                                         (h[2, 0] * row["x"] + h[2, 1] * row["y"] + h[2, 2]))
+                            if row["ROIName"] == "body trunc" else row["y"], axis=1)
+    else:
+        df["xh"] = df.apply(lambda row: (h[0, 0] * row["x"] + h[0, 1] * row["y"] + h[0, 2]) /
+                                        (h[2, 0] * row["x"] + h[2, 1] * row["y"] + h[2, 2]), axis=1)
+        df["yh"] = df.apply(lambda row: (h[1, 0] * row["x"] + h[1, 1] * row["y"] + h[1, 2]) /
+                                        (h[2, 0] * row["x"] + h[2, 1] * row["y"] + h[2, 2]), axis=1)
+    df["zh"] = df["z"]
+    df = df.drop(["x", "y", "z"], axis=1).rename(columns={"xh": "x", "yh": "y", "zh": "z"})
+
+    body = df[df["ROIName"] == "body trunc"].copy()
+    if side == "top":
+        body["dz"] = abs(body["z"] - junction_z - l_smooth)
+    else:
+        body["dz"] = abs(abs(body["z"] - junction_z) - l_smooth)
+    smooth_junction = body[body["dz"] == body["dz"].min()].copy()
+    smooth_junction["Polar"] = smooth_junction.apply(lambda row: polar(row["x"], row["y"]), axis=1)
+    smooth_junction["rpat"] = smooth_junction.apply(lambda row: row["Polar"][0], axis=1)
+    smooth_junction["tpat"] = smooth_junction.apply(lambda row: row["Polar"][1], axis=1)
+    smooth_junction = smooth_junction.drop_duplicates(subset=["tpat"], keep="last")
+    interp_phantom = interp1d(smooth_junction["tpat"].to_numpy(), smooth_junction["rpat"].to_numpy(),
+                              fill_value="extrapolate", kind="slinear")
+
+    smooth_z = smooth_junction.iloc[0]["z"]
+    to_smooth = body[body["z"] <= smooth_z] if side == "top" else body[body["z"] >= smooth_z]
+    to_smooth = to_smooth.copy()
+    to_smooth["Polar"] = to_smooth.apply(lambda row: polar(row["x"], row["y"]), axis=1)
+    to_smooth["teta"] = to_smooth.apply(lambda row: row["Polar"][1], axis=1)
+    if side == "top":
+        to_smooth["pond"] = to_smooth.apply(lambda row: (row["z"] - junction_z) / l_smooth, axis=1)
+    else:
+        to_smooth["pond"] = to_smooth.apply(lambda row: (junction_z - row["z"]) / l_smooth, axis=1)
+    to_smooth["rPred"] = to_smooth.apply(lambda x: x.pond * interp_phantom(x.teta) +
+                                         (1 - x.pond) * interp_junction(x.teta), axis=1)
+    to_smooth["xPred"] = to_smooth.apply(lambda x: x.rPred * np.cos(x.teta) + center_x, axis=1)
+    to_smooth["yPred"] = to_smooth.apply(lambda x: x.rPred * np.sin(x.teta) + center_y, axis=1)
+    to_smooth = to_smooth.drop(["x", "y", "Polar", "teta", "pond", "rPred"], axis=1)
+    to_smooth = to_smooth.rename(columns={"xPred": "x", "yPred": "y"})
+
+    internal = df[~df["ROIName"].isin(["body trunc", "body extremities"])]
+    extremities = df[df["ROIName"] == "body extremities"]
+    if side == "top":
+        not_smooth = df[(df["ROIName"] == "body trunc") & (df["z"] > smooth_z)]
+    else:
+        not_smooth = df[(df["ROIName"] == "body trunc") & (df["z"] < smooth_z)]
+
+    return pd.concat([internal, extremities, not_smooth, to_smooth], ignore_index=True)
+
+
+class TestPolarProfile(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.theta = rng.uniform(-3, 3, 50)
+        self.r = rng.uniform(100, 150, 50)
+        self.theta[10] = self.theta[3]
+
+    def test_matches_interp1d(self):
+        """ Test that the profile matches interp1d(kind='slinear', fill_value='extrapolate') """
+        df = pd.DataFrame({"t": self.theta, "r": self.r}).drop_duplicates(subset=["t"], keep="last")
+        interp = interp1d(df["t"].to_numpy(), df["r"].to_numpy(), fill_value="extrapolate", kind="slinear")
+
+        profile = PolarProfile(self.theta, self.r)
+        query = np.linspace(-np.pi, np.pi, 400)
+        np.testing.assert_allclose(profile(query), interp(query), rtol=1e-10)
+
+    def test_periodic(self):
+        """ Test that the periodic profile wraps around at ±π """
+        profile = PolarProfile(self.theta, self.r, periodic=True)
+        np.testing.assert_allclose(profile(np.array([-np.pi])), profile(np.array([np.pi])))
+
+    def test_immutable_and_picklable(self):
+        """ Test that the profile arrays are read-only, and survive pickling """
+        profile = PolarProfile(self.theta, self.r)
+        with self.assertRaises(ValueError):
+            profile.theta[0] = 0
+
+        unpickled = pickle.loads(pickle.dumps(profile))
+        np.testing.assert_array_equal(unpickled.r, profile.r)
+        self.assertFalse(unpickled.r.flags.writeable)
+
+    def test_too_few_points(self):
+        with self.assertRaises(ValueError):
+            PolarProfile([0.5, 0.5], [1, 2])
+
+
+class TestJunctionSmoother(unittest.TestCase):
+
+    def setUp(self):
+        self.center_x, self.center_y = 2.0, -1.0
+        angles = np.linspace(-np.pi, np.pi, 120, endpoint=False)
+        self.junction_x = self.center_x + 150 * np.cos(angles)
+        self.junction_y = self.center_y + 105 * np.sin(angles)
+
+        rectangle_phantom = np.array([[-160, -115], [-160, 110], [170, 110], [170, -115]])
+        rectangle_patient = np.array([[-148, -106], [-148, 104], [152, 104], [152, -106]])
+        self.homography, _ = cv2.findHomography(rectangle_phantom, rectangle_patient)
+
+    def _assert_matches_script(self, side, z_values, junction_z):
+
+        df_section = make_section(z_values)
+        profile = PolarProfile.from_contour(self.junction_x, self.junction_y, self.center_x, self.center_y)
+        smoother = JunctionSmoother(profile, self.center_x, self.center_y, junction_z, side=side)
+
+        df_result = smoother.blend(df_section, self.homography)
+        df_expected = script_blend(df_section, self.homography, self.junction_x, self.junction_y,
+                                   self.center_x, self.center_y, junction_z, smoother.smooth_length, side)
+
+        cols = ["ROIName", "ROINumber", "ROIContourNumber", "ROIContourPointNumber", "x", "y", "z"]
+        pd.testing.assert_frame_equal(df_result[cols], df_expected[cols], check_exact=False, rtol=1e-9)
+
+    def test_top_matches_script(self):
+        self._assert_matches_script("top", z_values=np.arange(100, 200, 5), junction_z=97.0)
+
+    def test_bottom_matches_script(self):
+        self._assert_matches_script("bottom", z_values=np.arange(-100, 0, 3), junction_z=2.0)
+
+    def test_only_body_trunc_is_warped_at_top(self):
+        df_section = make_section([10.0, 15.0])
+        profile = PolarProfile.from_contour(self.junction_x, self.junction_y, self.center_x, self.center_y)
+        smoother = JunctionSmoother(profile, self.center_x, self.center_y, 0.0, side="top")
+
+        df_warped = smoother.warp(df_section, self.homography)
+        is_body = df_section["ROIName"] == "body trunc"
+        pd.testing.assert_frame_equal(df_warped.loc[~is_body], df_section.loc[~is_body])
+        self.assertFalse(np.allclose(df_warped.loc[is_body, "x"], df_section.loc[is_body, "x"]))
+
+    def test_missing_body_trunc(self):
+        df_section = make_section([10.0])
+        df_section = df_section[df_section["ROIName"] != "body trunc"]
+        profile = PolarProfile.from_contour(self.junction_x, self.junction_y, self.center_x, self.center_y)
+        smoother = JunctionSmoother(profile, self.center_x, self.center_y, 0.0)
+
+        with self.assertRaises(ValueError):
+            smoother.smooth(df_section)
+
+    def test_invalid_side(self):
+        profile = PolarProfile.from_contour(self.junction_x, self.junction_y, self.center_x, self.center_y)
+        with self.assertRaises(ValueError):
+            JunctionSmoother(profile, 0, 0, 0, side="left")
+
+
+if __name__ == "__main__":
+    unittest.main()
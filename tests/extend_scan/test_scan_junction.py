@@ -0,0 +1,191 @@
+from phandose.extend_scan import ScanExtensionDirector, ScanJunction, JunctionSmoother
+from phandose.extend_scan.scan_junction_builders import ScanTopJunctionBuilder, ScanBottomJunctionBuilder
+
+from unittest.mock import patch
+from pathlib import Path
+import pandas as pd
+import numpy as np
+import unittest
+import tempfile
+import pickle
+import time
+
+
+def make_contours(z_values, vertebrae, radii=(160.0, 110.0), offset=(0.0, 0.0)):
+    """ Build contours with an elliptic body trunc on every slice, and small circular vertebrae """
+
+    rows = []
+    angles = np.linspace(-np.pi, np.pi, 60, endpoint=False)
+
+    def add_contour(roi_name, roi_number, contour_number, z, cx, cy, rx, ry):
+        for k, angle in enumerate(angles):
+            rows.append({"ROIName": roi_name,
+                         "ROINumber": roi_number,
+                         "ROIContourNumber": contour_number,
+                         "ROIContourPointNumber": k + 1,
+                         "x": cx + rx * np.cos(angle),
+                         "y": cy + ry * np.sin(angle),
+                         "z": float(z)})
+
+    for i, z in enumerate(z_values):
+        scale = 1 + 0.001 * i
+        add_contour("body trunc", 1, i + 1, z, offset[0], offset[1], scale * radii[0], scale * radii[1])
+
+    for roi_number, (roi_name, (z_min, z_max)) in enumerate(vertebrae.items(), start=2):
+        for i, z in enumerate(z for z in z_values if z_min <= z <= z_max):
+            add_contour(roi_name, roi_number, i + 1, z, offset[0], offset[1] + 60, 15, 12)
+
+    return pd.DataFrame(rows)
+
+
+PATIENT_VERTEBRAE = {"vertebrae L3": (-80, -60), "vertebrae L1": (-20, 0), "vertebrae T11": (40, 60)}
+PHANTOM_VERTEBRAE = {"vertebrae L5": (-200, -180), "vertebrae L3": (-80, -60),
+                     "vertebrae L1": (-20, 0), "vertebrae T11": (40, 60), "vertebrae T1": (200, 220)}
+
+
+class TestScanJunction(unittest.TestCase):
+
+    def setUp(self):
+        self.df_contours = make_contours(np.arange(-100, 101, 5), PATIENT_VERTEBRAE)
+        self.director = ScanExtensionDirector(df_contours=self.df_contours)
+
+    def test_builders(self):
+
+        top_junction = ScanTopJunctionBuilder(self.df_contours, self.director.df_barycenter).build()
+        bottom_junction = ScanBottomJunctionBuilder(self.df_contours, self.director.df_barycenter).build()
+
+        self.assertEqual(top_junction.side, "top")
+        self.assertEqual(top_junction.vertebra["Organ"], "vertebrae T11")
+        self.assertEqual(top_junction.z, 50)
+        self.assertEqual(bottom_junction.vertebra["Organ"], "vertebrae L3")
+        self.assertEqual(bottom_junction.z, -70)
+        self.assertEqual(top_junction.rectangle.shape, (4, 2))
+        self.assertTrue((top_junction.df_junction["ROIName"] == "body trunc").all())
+
+    def test_builder_without_vertebra(self):
+
+        df_barycenter = pd.DataFrame(columns=["Organ", "Rts", "Barx", "Bary", "Barz"])
+        with self.assertRaises(ValueError):
+            ScanTopJunctionBuilder(self.df_contours, df_barycenter).build()
+
+    def test_immutable(self):
+
+        junction = self.director.top_junction
+        with self.assertRaises(AttributeError):
+            junction.z = 0
+        with self.assertRaises(TypeError):
+            junction.vertebra["Barz"] = 0
+        with self.assertRaises(ValueError):
+            junction.rectangle[0, 0] = 0
+
+    def test_pickle(self):
+
+        junction = self.director.top_junction
+        unpickled = pickle.loads(pickle.dumps(junction))
+
+        self.assertIsInstance(unpickled, ScanJunction)
+        self.assertEqual(unpickled.z, junction.z)
+        self.assertEqual(dict(unpickled.vertebra), dict(junction.vertebra))
+        np.testing.assert_array_equal(unpickled.rectangle, junction.rectangle)
+        pd.testing.assert_frame_equal(unpickled.df_junction, junction.df_junction)
+        np.testing.assert_array_equal(unpickled.profile(np.linspace(-3, 3, 13)),
+                                      junction.profile(np.linspace(-3, 3, 13)))
+
+
+class TestScanExtensionDirector(unittest.TestCase):
+
+    def setUp(self):
+
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.df_contours = make_contours(np.arange(-100, 101, 5), PATIENT_VERTEBRAE)
+
+        self.list_path_phantoms = []
+        for i, offset in enumerate([(0.0, 0.0), (8.0, -5.0)]):
+            path_phantom = Path(self.tmp_dir.name) / f"phantom_{i}.txt"
+            df_phantom = make_contours(np.arange(-300, 301, 5), PHANTOM_VERTEBRAE,
+                                       radii=(150.0 + 10 * i, 100.0), offset=offset)
+            df_phantom.to_csv(path_phantom, sep="\t", index=False, encoding="ISO-8859-1")
+            self.list_path_phantoms.append(path_phantom)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_extend(self):
+
+        df_extended = ScanExtensionDirector(self.list_path_phantoms[0], self.df_contours).extend()
+
+        self.assertEqual(set(df_extended["Section"]), {0, 1, 2})
+        self.assertEqual(set(df_extended["Origine"]), {"Patient", "Phantom"})
+        self.assertNotIn("body trunc", set(df_extended["ROIName"]))
+        self.assertLess(df_extended["z"].min(), self.df_contours["z"].min())
+        self.assertGreater(df_extended["z"].max(), self.df_contours["z"].max())
+
+        df_patient = df_extended.loc[df_extended["Section"] == 0]
+        self.assertTrue(df_patient["z"].between(-70, 50).all())
+
+    def test_extend_with_phantoms(self):
+
+        director = ScanExtensionDirector(df_contours=self.df_contours)
+        dict_df_extended = director.extend_with_phantoms(self.list_path_phantoms, max_workers=2)
+
+        self.assertEqual(list(dict_df_extended), ["phantom_0.txt", "phantom_1.txt"])
+        for path_phantom in self.list_path_phantoms:
+            df_expected = ScanExtensionDirector(path_phantom, self.df_contours).extend()
+            pd.testing.assert_frame_equal(dict_df_extended[path_phantom.name], df_expected)
+
+    def test_extend_top_and_bottom(self):
+
+        path_output = Path(self.tmp_dir.name) / "extended.txt"
+        director = ScanExtensionDirector(self.list_path_phantoms[0], self.df_contours)
+        df_extended, timings = director.extend_top_and_bottom(path_output=path_output)
+
+        self.assertEqual(list(timings), ["load", "junctions", "patient",
+                                         "top.align", "top.homography", "top.smooth",
+                                         "bottom.align", "bottom.homography", "bottom.smooth",
+                                         "merge", "resample", "write", "total"])
+        self.assertTrue(all(duration > 0 for duration in timings.values()))
+
+        # The stages run one after the other, within the wall-clock total :
+        self.assertLessEqual(sum(duration for stage, duration in timings.items() if stage != "total"),
+                             timings["total"])
+        pd.testing.assert_frame_equal(df_extended, director.extend())
+
+        df_written = pd.read_csv(path_output, sep="\t", encoding="ISO-8859-1")
+        self.assertEqual(len(df_written), len(df_extended))
+
+    def test_extend_one_side(self):
+
+        director = ScanExtensionDirector(self.list_path_phantoms[0], self.df_contours)
+
+        df_top, timings = director.extend_top_only()
+        self.assertEqual(set(df_top["Section"]), {0, 1})
+        self.assertEqual(df_top["z"].min(), self.df_contours["z"].min())
+        self.assertEqual(timings["write"], 0.0)
+        self.assertGreater(timings["top.smooth"], 0.0)
+        self.assertEqual(timings["bottom.smooth"], 0.0)
+
+        df_bottom, _ = director.extend_bottom_only()
+        self.assertEqual(set(df_bottom["Section"]), {0, 2})
+        self.assertLess(df_bottom["z"].max(), self.df_contours["z"].max())
+
+    def test_warp_timed_with_homography(self):
+
+        def slow_warp(smoother, df_section, homography):
+            time.sleep(0.05)
+            return warp(smoother, df_section, homography)
+
+        warp = JunctionSmoother.warp
+        director = ScanExtensionDirector(self.list_path_phantoms[0], self.df_contours)
+        with patch.object(JunctionSmoother, "warp", side_effect=slow_warp, autospec=True) as mock_warp:
+            _, timings = director.extend_top_only()
+
+        mock_warp.assert_called_once()
+        self.assertGreaterEqual(timings["top.homography"], 0.05)
+        self.assertLess(timings["top.smooth"], timings["top.homography"])
+
+    def test_extend_with_no_phantom(self):
+        self.assertEqual(ScanExtensionDirector(df_contours=self.df_contours).extend_with_phantoms([]), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
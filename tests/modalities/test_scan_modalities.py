@@ -1,7 +1,11 @@
 from phandose.modalities import ScanModality, CTScanModality
+from phandose.exceptions import DicomMetadataError
+from phandose.utils import DicomIndex
+from tests.synthetic_dicom import write_ct_series
 
 from unittest.mock import patch, MagicMock
 from pathlib import Path
+import tempfile
 import unittest
 import os
 
@@ -46,13 +50,14 @@ class TestScanModality(unittest.TestCase):
         self.assertEqual(len(dicoms), 3)
         mock_dcmread.assert_called()
 
-    @patch("phandose.modalities.scan_modalities.conversions.convert_scan_to_dataframe")
-    def test_dataframe_method(self, mock_convert_to_df):
-        """ Test the dataframe method """
-        mock_convert_to_df.return_value = MagicMock()
+    @patch("phandose.modalities.scan_modalities.ScanModality.volume")
+    def test_dataframe_method(self, mock_volume):
+        """ Test the dataframe method, converting the cached volume """
+        mock_volume.return_value = MagicMock()
         df = self.modality.dataframe()
         self.assertIsNotNone(df)
-        mock_convert_to_df.assert_called_once()
+        mock_volume.assert_called_once()
+        mock_volume.return_value.to_dataframe.assert_called_once()
 
     def test_to_dict(self):
         """ Test the to_dict method """
@@ -73,6 +78,82 @@ class TestScanModality(unittest.TestCase):
 
         self.assertEqual(actual_dict, expected_dict)
 
+    @patch("phandose.modalities.scan_modalities.dicom_utils.find_dicom_paths_of_scan")
+    def test_to_dict_compact(self, mock_find_paths):
+        """ Test the compact form of to_dict, and the lazy resolution of the DICOM files of a hydrated scan """
+
+        dict_compact = self.modality.to_dict(compact=True)
+        self.assertEqual(dict_compact["dir_dicom"], str(Path("/mock/path")))
+        self.assertEqual(dict_compact["n_files"], 3)
+        self.assertNotIn("dicom_paths", dict_compact)
+
+        # The hydrated scan is serialized again without resolving its DICOM files :
+        modality = self.DummyScanModality(**{key: value for key, value in dict_compact.items()
+                                             if key not in ("modality_id", "modality_type")})
+        self.assertEqual(modality.to_dict(compact=True), dict_compact)
+        mock_find_paths.assert_not_called()
+
+        # Its DICOM files are resolved on access :
+        mock_find_paths.return_value = [Path(f"/mock/path/file_{i}.dcm") for i in range(3)]
+        self.assertEqual(len(modality.dicom_paths), 3)
+        mock_find_paths.assert_called_once()
+
+        # Scans whose DICOM files aren't all in their DICOM directory keep their full form :
+        modality = self.DummyScanModality(dicom_paths=[Path("/mock/path/file_0.dcm"), Path("/other/file_1.dcm")],
+                                          series_description="Test Description",
+                                          dir_dicom=Path("/mock/path"))
+        self.assertIn("dicom_paths", modality.to_dict(compact=True))
+
+    @patch("phandose.modalities.scan_modalities.DicomIndex.open")
+    @patch("phandose.modalities.scan_modalities.dicom_utils.find_dicom_paths_of_scan")
+    def test_compact_stale_index(self, mock_find_paths, mock_open):
+        """ Test that the DICOM directory is re-scanned when its index doesn't match the compact form """
+
+        dict_compact = self.modality.to_dict(compact=True)
+        modality = self.DummyScanModality(**{key: value for key, value in dict_compact.items()
+                                             if key not in ("modality_id", "modality_type")})
+
+        mock_find_paths.side_effect = [[Path(f"/mock/path/file_{i}.dcm") for i in range(2)],
+                                       [Path(f"/mock/path/file_{i}.dcm") for i in range(3)]]
+        self.assertEqual(len(modality.dicom_paths), 3)
+        mock_open.return_value.refresh.assert_called_once()
+
+    def test_compact_changed_files(self):
+        """ Test that a scan whose DICOM files changed since it was serialized raises a DicomMetadataError """
+
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        patcher = patch("phandose.constants.DIR_DICOM_INDEX", str(Path(tmp_dir.name) / "index"))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(DicomIndex._opened_indexes.clear)
+
+        dir_dicom = Path(tmp_dir.name) / "CT"
+        list_paths = write_ct_series(dir_dicom, n_slices=4, series_instance_uid="1.2.3.10")
+        dict_compact = CTScanModality(modality_id="1.2.3.10", dir_dicom=dir_dicom).to_dict(compact=True)
+
+        def hydrate():
+            return CTScanModality(**{key: value for key, value in dict_compact.items() if key != "modality_type"})
+
+        # A removed slice :
+        os.remove(list_paths[-1])
+        with patch.object(DicomIndex, "refresh", side_effect=DicomIndex.refresh, autospec=True) as mock_refresh:
+            with self.assertRaises(DicomMetadataError):
+                _ = hydrate().dicom_paths
+            mock_refresh.assert_called_once()
+
+        # An added slice :
+        write_ct_series(dir_dicom, n_slices=5, series_instance_uid="1.2.3.10")
+        with self.assertRaises(DicomMetadataError):
+            _ = hydrate().dicom_paths
+
+        # The slices serialized :
+        for path in dir_dicom.iterdir():
+            if path not in list_paths:
+                os.remove(path)
+        write_ct_series(dir_dicom, n_slices=4, series_instance_uid="1.2.3.10")
+        self.assertEqual(len(hydrate().dicom_paths), 4)
+
 
 class TestCTScanModality(unittest.TestCase):
 
@@ -86,6 +167,13 @@ class TestCTScanModality(unittest.TestCase):
         self.series_instance_uid_2 = "1.3.12.2.1107.5.1.4.49226.30000020030308450423400000657"
         self.dir_dicom_paths_2 = self.dir_patient / "CT" / self.series_instance_uid_2
 
+        # Index the DICOM files in a temporary directory :
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        patcher = patch("phandose.constants.DIR_DICOM_INDEX", tmp_dir.name)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
     def test_dir_patient_exists(self):
         self.assertTrue(self.dir_patient.exists(), "Patient directory does not exist !")
 
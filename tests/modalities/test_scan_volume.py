@@ -0,0 +1,118 @@
+from phandose.modalities import CTScanModality
+from phandose.modalities.scan_volume import ScanVolume, get_cached_volume
+from phandose.conversions import convert_scan_to_dataframe
+from tests.synthetic_dicom import write_ct_series
+
+from unittest.mock import patch
+from pathlib import Path
+import pydicom as dcm
+import numpy as np
+import tempfile
+import unittest
+import gc
+import os
+
+
+class TestScanVolume(unittest.TestCase):
+
+    def setUp(self):
+
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.dir_dicom = Path(self.tmp_dir.name) / "CT"
+        self.dicom_paths = write_ct_series(self.dir_dicom, n_slices=4, series_instance_uid="1.2.3.10", shape=(6, 5))
+
+    def tearDown(self):
+        gc.collect()
+        self.tmp_dir.cleanup()
+
+    def make_modality(self):
+        return CTScanModality(modality_id="1.2.3.10", dir_dicom=self.dir_dicom, dicom_paths=list(self.dicom_paths))
+
+    def test_dataframe_parity(self):
+
+        df_expected = convert_scan_to_dataframe(dcm.dcmread(str(path)) for path in self.dicom_paths)
+        df = self.make_modality().dataframe()
+
+        np.testing.assert_allclose(df[["x", "y", "z", "intensity"]].to_numpy(),
+                                   df_expected[["x", "y", "z", "intensity"]].to_numpy())
+
+    def test_memory_cache(self):
+
+        volume = self.make_modality().volume()
+        self.assertEqual(volume.shape, (4, 6, 5))
+        np.testing.assert_array_equal(volume.rescaled_array()[:, 0, 0], [-24, -23, -22, -21])
+
+        # The volume is shared while it is referenced, without decoding the slices again :
+        with patch("phandose.modalities.scan_volume.ScanVolume.from_dicom") as mock_from_dicom:
+            self.assertIs(self.make_modality().volume(), volume)
+            mock_from_dicom.assert_not_called()
+
+        # It is released once it isn't referenced anymore :
+        key = volume.key
+        del volume
+        gc.collect()
+        self.assertIsNone(get_cached_volume(key))
+
+    def test_volume_kept_by_modality(self):
+
+        modality = self.make_modality()
+        df = modality.dataframe()
+        gc.collect()
+
+        # The modality keeps its volume, the second call doesn't read any DICOM file :
+        with patch("phandose.modalities.scan_modalities.dcm.dcmread", wraps=dcm.dcmread) as mock_dcmread:
+            np.testing.assert_array_equal(modality.dataframe().to_numpy(), df.to_numpy())
+            mock_dcmread.assert_not_called()
+
+        # Until its DICOM files are changed :
+        modality.dicom_paths = list(self.dicom_paths[:2])
+        with patch("phandose.modalities.scan_modalities.dcm.dcmread", wraps=dcm.dcmread) as mock_dcmread:
+            self.assertEqual(modality.volume().shape, (2, 6, 5))
+            self.assertEqual(mock_dcmread.call_count, 2)
+
+    def test_spill(self):
+
+        volume = self.make_modality().volume(spill=True)
+        np.testing.assert_array_equal(np.load(self.dir_dicom / f".{volume.key}.npy"), volume.pixel_array)
+        pixel_array = np.array(volume.pixel_array)
+        del volume
+        gc.collect()
+
+        # The spilled volume is memory-mapped, without decoding the slices again :
+        with patch("phandose.modalities.scan_volume.ScanVolume.from_dicom") as mock_from_dicom:
+            volume = self.make_modality().volume()
+            mock_from_dicom.assert_not_called()
+
+        self.assertIsInstance(volume.pixel_array, np.memmap)
+        np.testing.assert_array_equal(volume.pixel_array, pixel_array)
+
+    def test_invalidation_on_mtime(self):
+
+        key = self.make_modality().volume(spill=True).key
+        gc.collect()
+
+        stat = self.dicom_paths[0].stat()
+        os.utime(self.dicom_paths[0], ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+        volume = self.make_modality().volume(spill=True)
+        self.assertNotEqual(volume.key, key)
+        self.assertNotIsInstance(volume.pixel_array, np.memmap)
+
+        # The stale spilled volume was replaced :
+        self.assertEqual(sorted(path.name for path in self.dir_dicom.glob(".*.np[yz]")),
+                         [f".{volume.key}.npy", f".{volume.key}.npz"])
+
+    def test_save_load(self):
+
+        volume = self.make_modality().volume()
+        path_npy = Path(self.tmp_dir.name) / "volume.npy"
+        volume.save(path_npy)
+
+        loaded = ScanVolume.load("key", path_npy)
+        np.testing.assert_array_equal(loaded.pixel_array, volume.pixel_array)
+        np.testing.assert_array_equal(loaded.positions, volume.positions)
+        np.testing.assert_array_equal(loaded.intercepts, volume.intercepts)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+from phandose.modalities import SeriesArchive, CTScanModality
+from tests.synthetic_dicom import write_ct_series
+
+from pathlib import Path
+import numpy as np
+import tempfile
+import unittest
+
+
+class TestSeriesArchive(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.dir_dicom = Path(self.tmp_dir.name)
+        self.dicom_paths = write_ct_series(self.dir_dicom / "CT", n_slices=5, series_instance_uid="1.2.3.10")
+        self.path_archive = self.dir_dicom / "1.2.3.10.series"
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_random_access(self):
+
+        with SeriesArchive.create(self.path_archive, self.dicom_paths, "1.2.3.10") as archive:
+
+            self.assertEqual(len(archive), 5)
+            self.assertEqual(archive.series_instance_uid, "1.2.3.10")
+            self.assertEqual(archive.names, [path.name for path in self.dicom_paths])
+
+            # Every slice is read on its own, as the original file :
+            self.assertEqual(archive.read_bytes(3), self.dicom_paths[3].read_bytes())
+            self.assertEqual(float(archive.read_slice(3).ImagePositionPatient[2]), 7.5)
+            self.assertNotIn("PixelData", archive.read_slice(1, stop_before_pixels=True))
+
+    def test_invalid_archive(self):
+
+        with self.assertRaises(ValueError):
+            SeriesArchive(self.dicom_paths[0])
+
+    def test_scan_modality_from_archive(self):
+
+        SeriesArchive.create(self.path_archive, self.dicom_paths, "1.2.3.10").close()
+
+        ct = CTScanModality(modality_id="1.2.3.10", dicom_paths=self.dicom_paths)
+        ct_packed = CTScanModality(modality_id="1.2.3.10", dir_dicom=self.dir_dicom, path_archive=self.path_archive)
+
+        self.assertEqual(ct_packed.dicom_paths, [])
+        self.assertEqual(ct_packed.series_description, "synthetic")
+        self.assertEqual(ct_packed.to_dict()["path_archive"], str(self.path_archive))
+        np.testing.assert_array_equal(ct_packed.volume().pixel_array, ct.volume().pixel_array)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,7 +1,12 @@
-from phandose.modalities import StandAloneModality
+from phandose.modalities import StandAloneModality, RtdoseModality, RtstructModality
+from tests.synthetic_dicom import write_standalone
 
 from unittest.mock import patch, MagicMock
+from pydicom.dataset import Dataset
 from pathlib import Path
+import pydicom as dcm
+import numpy as np
+import tempfile
 import unittest
 
 
@@ -56,4 +61,64 @@ class TestStandAloneModality(unittest.TestCase):
         """ Test the __str__ and __repr__ methods """
         expected_str = "Modality: Dummy - UID: 12345"
         self.assertEqual(str(self.modality), expected_str)
-        self.assertEqual(repr(self.modality), expected_str)
\ No newline at end of file
+        self.assertEqual(repr(self.modality), expected_str)
+
+
+class TestStandAloneModalityHeaderCache(unittest.TestCase):
+
+    def setUp(self):
+
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        dir_dicom = Path(self.tmp_dir.name)
+
+        referenced_rtplan = Dataset()
+        referenced_rtplan.ReferencedSOPInstanceUID = "1.2.3.30"
+        self.path_rtdose = write_standalone(dir_dicom / "dose.dcm", "RTDOSE", sop_instance_uid="1.2.3.20",
+                                            DoseSummationType="PLAN",
+                                            ReferencedRTPlanSequence=[referenced_rtplan],
+                                            Rows=4, Columns=4, NumberOfFrames=2,
+                                            BitsAllocated=32, BitsStored=32, HighBit=31,
+                                            PixelRepresentation=0, SamplesPerPixel=1,
+                                            PhotometricInterpretation="MONOCHROME2",
+                                            PixelData=np.arange(32, dtype=np.uint32).tobytes())
+
+        referenced_series, referenced_study, referenced_frame = Dataset(), Dataset(), Dataset()
+        referenced_series.SeriesInstanceUID = "1.2.3.10"
+        referenced_study.RTReferencedSeriesSequence = [referenced_series]
+        referenced_frame.RTReferencedStudySequence = [referenced_study]
+        self.path_rtstruct = write_standalone(dir_dicom / "struct.dcm", "RTSTRUCT", sop_instance_uid="1.2.3.40",
+                                              ReferencedFrameOfReferenceSequence=[referenced_frame])
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_metadata_queries_read_header_once(self):
+
+        modality = RtdoseModality(modality_id="1.2.3.20", path_dicom=self.path_rtdose)
+
+        with patch("pydicom.dcmread", wraps=dcm.dcmread) as mock_dcmread:
+            self.assertTrue(modality.is_primary_dose())
+            self.assertEqual(modality.get_referenced_rtplan_uid(), "1.2.3.30")
+            self.assertEqual(modality.series_description, "synthetic")
+
+        mock_dcmread.assert_called_once()
+        self.assertTrue(mock_dcmread.call_args.kwargs["stop_before_pixels"])
+        self.assertNotIn("PixelData", modality.header())
+
+        # The full dataset is loaded lazily, separately from the header :
+        self.assertIn("PixelData", modality.dicom())
+        self.assertIs(modality.dicom(), modality.dicom())
+
+    def test_invalidate_on_path_change(self):
+
+        modality = RtstructModality(modality_id="1.2.3.40", path_dicom=self.path_rtstruct)
+        self.assertEqual(modality.get_referenced_scan_uid(), "1.2.3.10")
+        header = modality.header()
+
+        modality.path_dicom = self.path_rtstruct
+        self.assertIs(modality.header(), header)
+
+        modality.path_dicom = self.path_rtdose
+        self.assertIsNot(modality.header(), header)
+        self.assertEqual(modality.header().SOPInstanceUID, "1.2.3.20")
+
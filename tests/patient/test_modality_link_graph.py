@@ -0,0 +1,96 @@
+from phandose.patient import Patient, ModalityLinkGraph, PlanChain
+from tests.synthetic_dicom import write_ct_series, write_standalone
+
+from unittest.mock import patch
+from pydicom.dataset import Dataset
+from pathlib import Path
+import pydicom as dcm
+import tempfile
+import unittest
+
+
+def reference(keyword: str, uid: str) -> list[Dataset]:
+    item = Dataset()
+    setattr(item, keyword, uid)
+    return [item]
+
+
+def write_rtstruct(path_dicom: Path, sop_instance_uid: str, series_instance_uid: str) -> Path:
+
+    referenced_study, referenced_frame = Dataset(), Dataset()
+    referenced_study.RTReferencedSeriesSequence = reference("SeriesInstanceUID", series_instance_uid)
+    referenced_frame.RTReferencedStudySequence = [referenced_study]
+
+    return write_standalone(path_dicom, "RTSTRUCT", sop_instance_uid=sop_instance_uid,
+                            ReferencedFrameOfReferenceSequence=[referenced_frame])
+
+
+class TestModalityLinkGraph(unittest.TestCase):
+
+    def setUp(self):
+
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        dir_dicom = Path(self.tmp_dir.name)
+
+        write_ct_series(dir_dicom / "CT", n_slices=2, series_instance_uid="1.2.3.1")
+        write_rtstruct(dir_dicom / "RS" / "rs1.dcm", "1.2.3.11", "1.2.3.1")
+        write_rtstruct(dir_dicom / "RS" / "rs2.dcm", "1.2.3.12", "1.2.3.99")
+        write_standalone(dir_dicom / "RP" / "rp1.dcm", "RTPLAN", sop_instance_uid="1.2.3.21",
+                         ReferencedStructureSetSequence=reference("ReferencedSOPInstanceUID", "1.2.3.11"))
+        write_standalone(dir_dicom / "RP" / "rp2.dcm", "RTPLAN", sop_instance_uid="1.2.3.22",
+                         ReferencedStructureSetSequence=reference("ReferencedSOPInstanceUID", "1.2.3.12"))
+        for dose_uid, plan_uid in [("1.2.3.31", "1.2.3.21"), ("1.2.3.32", "1.2.3.21"), ("1.2.3.33", "1.2.3.22")]:
+            write_standalone(dir_dicom / "RD" / f"{dose_uid}.dcm", "RTDOSE", sop_instance_uid=dose_uid,
+                             ReferencedRTPlanSequence=reference("ReferencedSOPInstanceUID", plan_uid))
+        write_standalone(dir_dicom / "RD" / "rd4.dcm", "RTDOSE", sop_instance_uid="1.2.3.34")
+
+        self.patient = Patient.from_dir_dicom(patient_id="SYNTHETIC", dir_dicom=dir_dicom)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_queries(self):
+
+        graph = self.patient.link_graph()
+        self.assertIsInstance(graph, ModalityLinkGraph)
+
+        self.assertEqual(graph.plan_for_dose("1.2.3.31"), "1.2.3.21")
+        self.assertEqual(graph.rtstruct_for_dose("1.2.3.32"), "1.2.3.11")
+        self.assertEqual(graph.scan_for_dose("1.2.3.31"), "1.2.3.1")
+        self.assertEqual(set(graph.doses_for_scan("1.2.3.1")), {"1.2.3.31", "1.2.3.32"})
+        self.assertEqual(set(graph.doses_for_plan("1.2.3.21")), {"1.2.3.31", "1.2.3.32"})
+        self.assertEqual(graph.rtstructs_for_scan("1.2.3.1"), ("1.2.3.11",))
+
+        # Broken chains and missing references :
+        self.assertEqual(graph.rtstruct_for_dose("1.2.3.33"), "1.2.3.12")
+        self.assertIsNone(graph.scan_for_dose("1.2.3.33"))
+        self.assertIsNone(graph.plan_for_dose("1.2.3.34"))
+        self.assertEqual(graph.doses_for_scan("unknown"), ())
+
+        self.assertEqual(sorted(graph.plan_chains()), [PlanChain("1.2.3.31", "1.2.3.21", "1.2.3.11", "1.2.3.1"),
+                                                       PlanChain("1.2.3.32", "1.2.3.21", "1.2.3.11", "1.2.3.1")])
+
+    def test_built_once(self):
+
+        graph = self.patient.link_graph()
+
+        with patch("pydicom.dcmread", wraps=dcm.dcmread) as mock_dcmread:
+            self.assertIs(self.patient.link_graph(), graph)
+            ModalityLinkGraph(self.patient.list_modalities)
+            mock_dcmread.assert_not_called()
+
+        # The graph is rebuilt when a modality is added :
+        self.patient.add_modality(modality_id="1.2.3.35", modality_type="RD", path_dicom=Path("rd5.dcm"))
+        with patch.object(type(self.patient.get_modality("1.2.3.35")), "get_referenced_rtplan_uid",
+                          side_effect=ValueError("no plan")):
+            self.assertIsNot(self.patient.link_graph(), graph)
+            graph = self.patient.link_graph()
+
+        # And when a modality is removed :
+        self.patient.remove_modality("1.2.3.35")
+        self.assertIsNot(self.patient.link_graph(), graph)
+        self.assertEqual(self.patient.link_graph().plan_for_dose("1.2.3.31"), "1.2.3.21")
+
+
+if __name__ == '__main__':
+    unittest.main()
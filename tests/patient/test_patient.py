@@ -1,8 +1,11 @@
-from phandose.modalities import Modality
+from phandose.modalities import Modality, CTScanModality, RtdoseModality
 from phandose.patient import Patient
+from tests.synthetic_dicom import write_ct_series, write_standalone
 
 from unittest.mock import patch, MagicMock
 from pathlib import Path
+import pydicom as dcm
+import tempfile
 import unittest
 
 
@@ -57,20 +60,34 @@ class TestPatient(unittest.TestCase):
     def test_get_modality(self):
         """Test retrieving a modality."""
         modality = MagicMock(spec=Modality, modality_id="M12345")
-        self.patient._list_modalities.append(modality)
+        patient = Patient(patient_id="P12345", list_modalities=[modality])
 
-        retrieved_modality = self.patient.get_modality("M12345")
+        retrieved_modality = patient.get_modality("M12345")
         self.assertEqual(retrieved_modality, modality)
 
-        self.assertIsNone(self.patient.get_modality("NonExistent"))
+        self.assertIsNone(patient.get_modality("NonExistent"))
+
+    def test_remove_modality(self):
+        """ Test removing a modality """
+        list_modalities = [MagicMock(spec=Modality, modality_id=f"M{i}") for i in range(3)]
+        patient = Patient(patient_id="P12345", list_modalities=list_modalities)
+
+        self.assertIs(patient.remove_modality("M1"), list_modalities[1])
+        self.assertEqual(patient.list_modalities, [list_modalities[0], list_modalities[2]])
+        self.assertEqual(list(patient.dict_modalities), ["M0", "M2"])
+        self.assertIsNone(patient.get_modality("M1"))
+
+        # Removing a missing modality doesn't change the patient :
+        self.assertIsNone(patient.remove_modality("M1"))
+        self.assertEqual(len(patient.list_modalities), 2)
 
     def test_to_dict(self):
         """Test serializing a patient to a dictionary."""
         modality = MagicMock(spec=Modality, modality_id="M12345")
         modality.to_dict.return_value = {"mock": "modality"}
-        self.patient._list_modalities.append(modality)
+        patient = Patient(patient_id="P12345", list_modalities=[modality])
 
-        patient_dict = self.patient.to_dict()
+        patient_dict = patient.to_dict()
         self.assertEqual(patient_dict["patient_id"], "P12345")
         self.assertEqual(len(patient_dict["modalities"]), 1)
         self.assertEqual(patient_dict["modalities"][0], {"mock": "modality"})
@@ -159,6 +176,54 @@ class TestPatient(unittest.TestCase):
                 self.assertEqual(modality.modality_type, expected["modality_type"])
                 self.assertEqual(modality.series_description, expected["series_description"])
 
+    def test_from_dir_dicom_headers_only(self):
+        """ Test creating a patient from synthetic DICOM files, reading their headers only """
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            dir_dicom = Path(tmp_dir)
+            list_ct_paths = write_ct_series(dir_dicom / "CT", n_slices=6, series_instance_uid="1.2.3.10")
+            path_rtdose = write_standalone(dir_dicom / "RD" / "dose.dcm", "RTDOSE", sop_instance_uid="1.2.3.20")
+            (dir_dicom / "CT" / "not_a_dicom.dcm").write_text("not a DICOM file")
+
+            with patch("phandose.utils.dicom_utils.dcm.dcmread", wraps=dcm.dcmread) as mock_dcmread:
+                patient = Patient.from_dir_dicom(patient_id="SYNTHETIC", dir_dicom=dir_dicom, max_workers=4)
+
+            self.assertEqual(mock_dcmread.call_count, 8)
+            self.assertTrue(all(call.kwargs["stop_before_pixels"] for call in mock_dcmread.call_args_list))
+
+            self.assertEqual(len(patient.list_modalities), 2)
+
+            ct = patient.get_modality("1.2.3.10")
+            self.assertIsInstance(ct, CTScanModality)
+            self.assertEqual(ct.series_description, "synthetic")
+            self.assertEqual(ct.dicom_paths, list_ct_paths)
+
+            rtdose = patient.get_modality("1.2.3.20")
+            self.assertIsInstance(rtdose, RtdoseModality)
+            self.assertEqual(rtdose.path_dicom, path_rtdose)
+
+    def test_from_dir_dicom_without_position(self):
+        """ Test that the slices without ImagePositionPatient are kept, sorted after the others, and reported """
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            dir_dicom = Path(tmp_dir)
+            list_ct_paths = write_ct_series(dir_dicom / "CT", n_slices=3, series_instance_uid="1.2.3.10")
+
+            ds = dcm.dcmread(str(list_ct_paths[0]))
+            del ds.ImagePositionPatient
+            ds.save_as(str(list_ct_paths[0]), write_like_original=False)
+
+            with self.assertLogs("phandose.patient", level="WARNING") as logs:
+                patient = Patient.from_dir_dicom(patient_id="SYNTHETIC", dir_dicom=dir_dicom)
+
+            self.assertEqual(patient.get_modality("1.2.3.10").dicom_paths, [*list_ct_paths[1:], list_ct_paths[0]])
+            self.assertTrue(any(str(list_ct_paths[0]) in message for message in logs.output))
+
+    def test_from_dir_dicom_empty(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            with self.assertRaises(FileNotFoundError):
+                Patient.from_dir_dicom(patient_id="EMPTY", dir_dicom=Path(tmp_dir))
+
 
 if __name__ == "__main__":
     unittest.main()
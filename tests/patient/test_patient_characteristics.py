@@ -1,10 +1,13 @@
-from phandose.patient import get_patient_characteristics
+from phandose.patient import get_patient_characteristics, get_cohort_characteristics
+from phandose.utils.dicom_utils import read_dicom_header
+from tests.synthetic_dicom import write_ct_series
 
 from unittest.mock import patch, MagicMock
 from datetime import datetime
 from pathlib import Path
 import pandas as pd
 import numpy as np
+import tempfile
 import unittest
 
 
@@ -57,5 +60,52 @@ class TestGetPatientCharacteristics(unittest.TestCase):
             get_patient_characteristics(self.dir_ct)
 
 
+class TestGetCohortCharacteristics(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.dir_cohort = Path(self.tmp_dir.name) / "cohort"
+        self.path_cache = Path(self.tmp_dir.name) / "characteristics.sqlite"
+
+        self.list_dir_ct = []
+        for i in range(4):
+            dir_ct = self.dir_cohort / f"P{i}" / "CT"
+            write_ct_series(dir_ct, n_slices=2, code_meaning=f"TDM {i}")
+            self.list_dir_ct.append(dir_ct)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_cohort_characteristics(self):
+
+        df_cohort = get_cohort_characteristics(self.list_dir_ct, path_cache=self.path_cache, max_workers=2)
+
+        # The same characteristics as those read one folder at a time, in the order of the folders :
+        pd.testing.assert_frame_equal(df_cohort, get_patient_characteristics(*self.list_dir_ct))
+        self.assertEqual(df_cohort["CodeMeaning"].tolist(), ["TDM 0", "TDM 1", "TDM 2", "TDM 3"])
+
+        # A re-run only reads the new folders :
+        dir_new_ct = self.dir_cohort / "P4" / "CT"
+        write_ct_series(dir_new_ct, n_slices=2, code_meaning="TDM 4")
+
+        with patch("phandose.patient.patient_characteristics.read_dicom_header",
+                   wraps=read_dicom_header) as mock_read_dicom_header:
+            df_cohort = get_cohort_characteristics([*self.list_dir_ct, dir_new_ct], path_cache=self.path_cache)
+
+        mock_read_dicom_header.assert_called_once()
+        self.assertEqual(df_cohort["CodeMeaning"].tolist(), ["TDM 0", "TDM 1", "TDM 2", "TDM 3", "TDM 4"])
+        pd.testing.assert_frame_equal(df_cohort, get_patient_characteristics(*self.list_dir_ct, dir_new_ct))
+
+    def test_skip_errors(self):
+
+        list_folders = [*self.list_dir_ct, self.dir_cohort / "missing"]
+
+        with self.assertRaises(FileNotFoundError):
+            get_cohort_characteristics(list_folders)
+
+        df_cohort = get_cohort_characteristics(list_folders, skip_errors=True)
+        self.assertEqual(df_cohort["Folder"].tolist(), [str(dir_ct) for dir_ct in self.list_dir_ct])
+
+
 if __name__ == '__main__':
     unittest.main()
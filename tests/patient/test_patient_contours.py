@@ -0,0 +1,66 @@
+from phandose.patient.patient_contours import calculate_contour_area
+
+import pandas as pd
+import numpy as np
+import unittest
+import cv2
+
+
+def reference_contour_area(df_contours):
+    """ Reference implementation, calling cv2 on each contour """
+
+    def calculate_area(contour):
+        rounded_contour = contour.round({'x': 0, 'y': 0}).drop_duplicates(subset=['x', 'y'], keep='last')
+        points = np.array(rounded_contour[['x', 'y']].to_numpy()).astype(np.int32)
+        xul, yul, wr, hr = cv2.boundingRect(points)
+        return pd.Series({'Centrex': xul + wr / 2, 'Centrey': yul + hr / 2, 'area': cv2.contourArea(points)})
+
+    cols = ['z', 'ROINumber', 'ROIContourNumber']
+    df_area = df_contours.groupby(cols)[['x', 'y']].apply(calculate_area).reset_index()
+    df_area['ROIName'] = df_contours.groupby(cols)['ROIName'].first().reset_index(drop=True)
+    return df_area[['Centrex', 'Centrey', 'z', 'ROIName', 'ROINumber', 'ROIContourNumber', 'area']]
+
+
+class TestCalculateContourArea(unittest.TestCase):
+
+    def setUp(self):
+
+        rng = np.random.default_rng(0)
+        rows = []
+        for z in [10.0, -5.0, 0.0]:
+            for roi_number, roi_name in [(2, "liver"), (1, "body trunc")]:
+                for contour_number in [3, 1]:
+                    n_points = rng.integers(3, 40)
+                    angles = np.sort(rng.uniform(-np.pi, np.pi, n_points))
+                    radius = rng.uniform(5, 80)
+                    for k, angle in enumerate(angles):
+                        rows.append({"ROIName": roi_name, "ROINumber": roi_number,
+                                     "ROIContourNumber": contour_number, "ROIContourPointNumber": k + 1,
+                                     "x": rng.uniform(-50, 50) + radius * np.cos(angle),
+                                     "y": radius * np.sin(angle), "z": z})
+
+        # Duplicated points, and a degenerate contour of two points :
+        rows.extend([dict(rows[0], ROIContourPointNumber=100), dict(rows[5], x=rows[5]["x"] + 0.2)])
+        rows.extend([{"ROIName": "spine", "ROINumber": 3, "ROIContourNumber": 1, "ROIContourPointNumber": k,
+                      "x": float(k), "y": 2.5, "z": 0.0} for k in (1, 2)])
+
+        self.df_contours = pd.DataFrame(rows).sample(frac=1, random_state=0)
+
+    def test_parity_with_cv2(self):
+
+        df_expected = reference_contour_area(self.df_contours)
+        df_area = calculate_contour_area(self.df_contours)
+
+        self.assertEqual(df_area.columns.tolist(), df_expected.columns.tolist())
+        pd.testing.assert_frame_equal(df_area, df_expected, check_dtype=False)
+
+    def test_empty(self):
+
+        df_area = calculate_contour_area(self.df_contours.iloc[:0])
+        self.assertTrue(df_area.empty)
+        self.assertEqual(df_area.columns.tolist(),
+                         ['Centrex', 'Centrey', 'z', 'ROIName', 'ROINumber', 'ROIContourNumber', 'area'])
+
+
+if __name__ == '__main__':
+    unittest.main()
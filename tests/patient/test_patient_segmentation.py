@@ -0,0 +1,75 @@
+from phandose.patient.patient_segmentation import segment_patient_scan
+from phandose.segmentation import SegmentationCache
+
+from pathlib import Path
+import nibabel as nib
+import numpy as np
+import tempfile
+import unittest
+import shutil
+
+
+class StubSegmenter:
+    """ A segmenter writing a fake segmentation for each task, and counting its calls """
+
+    def __init__(self):
+        self.list_tasks = []
+
+    def __call__(self, input: nib.Nifti1Image, output: Path, task: str, **kwargs):
+
+        self.list_tasks.append(task)
+        list_names = ["liver.nii.gz", "spleen.nii.gz"] if task == "total" else ["body_trunc.nii.gz"]
+        for name in list_names:
+            (Path(output) / name).write_bytes(name.encode())
+
+
+class TestSegmentPatientScan(unittest.TestCase):
+
+    def setUp(self):
+
+        self.dir_tmp = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.dir_tmp, ignore_errors=True)
+
+        self.scan = nib.Nifti1Image(np.arange(4 * 4 * 3, dtype=np.int16).reshape(4, 4, 3), np.eye(4))
+        self.segmenter = StubSegmenter()
+
+    def test_without_cache(self):
+
+        segment_patient_scan(self.scan, self.dir_tmp / "output", segmenter=self.segmenter)
+
+        self.assertEqual(self.segmenter.list_tasks, ["total", "body"])
+        self.assertEqual(sorted(path.name for path in (self.dir_tmp / "output").iterdir()),
+                         ["body_trunc.nii.gz", "liver.nii.gz", "spleen.nii.gz"])
+
+    def test_cache_hit(self):
+
+        with SegmentationCache(self.dir_tmp / "cache") as cache:
+            segment_patient_scan(self.scan, self.dir_tmp / "output_1", cache=cache, segmenter=self.segmenter)
+            self.assertEqual(len(cache), 2)
+
+            # The same scan is not segmented again, its cached segmentations are copied :
+            segment_patient_scan(self.scan, self.dir_tmp / "output_2", cache=cache, segmenter=self.segmenter)
+            self.assertEqual(self.segmenter.list_tasks, ["total", "body"])
+            self.assertEqual((self.dir_tmp / "output_2" / "liver.nii.gz").read_bytes(), b"liver.nii.gz")
+            self.assertEqual(sorted(path.name for path in (self.dir_tmp / "output_2").iterdir()),
+                             ["body_trunc.nii.gz", "liver.nii.gz", "spleen.nii.gz"])
+
+            # Another scan is segmented :
+            scan = nib.Nifti1Image(np.zeros((4, 4, 3), dtype=np.int16), np.eye(4))
+            segment_patient_scan(scan, self.dir_tmp / "output_3", cache=cache, segmenter=self.segmenter)
+            self.assertEqual(self.segmenter.list_tasks, ["total", "body", "total", "body"])
+
+    def test_failed_segmentation(self):
+
+        def failing_segmenter(**kwargs):
+            raise RuntimeError("Out of memory")
+
+        with SegmentationCache(self.dir_tmp / "cache") as cache:
+            with self.assertRaises(ValueError):
+                segment_patient_scan(self.scan, self.dir_tmp / "output", cache=cache, segmenter=failing_segmenter)
+
+            self.assertEqual(len(cache), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
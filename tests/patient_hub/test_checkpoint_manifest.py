@@ -0,0 +1,41 @@
+from phandose.patient_hub import CheckpointManifest
+
+from pathlib import Path
+import tempfile
+import unittest
+
+
+class TestCheckpointManifest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path_manifest = Path(self.tmp_dir.name) / "run" / "manifest.sqlite"
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_resume(self):
+
+        with CheckpointManifest(self.path_manifest) as manifest:
+            manifest.record("P1", "done", elapsed=1.5)
+            manifest.record("P2", "failed", error="No DICOM files found")
+            manifest.record("P3", "done")
+
+        # A new run over the same manifest only processes the patients not completed yet :
+        with CheckpointManifest(self.path_manifest) as manifest:
+            self.assertEqual(manifest.get_completed_patients(), {"P1", "P3"})
+            self.assertEqual(manifest.get_pending_patients(["P4", "P3", "P2", "P1"]), ["P4", "P2"])
+            self.assertEqual(manifest.get_failed_patients(), {"P2": "No DICOM files found"})
+            self.assertEqual(manifest.get_counts(), {"done": 2, "failed": 1})
+
+            # A retried patient replaces its previous status :
+            manifest.record("P2", "done")
+            self.assertEqual(manifest.get_status("P2"), "done")
+            self.assertIsNone(manifest.get_status("P4"))
+
+            manifest.reset()
+            self.assertEqual(manifest.get_pending_patients(["P1", "P2"]), ["P1", "P2"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,53 @@
+from phandose.patient_hub import PackedStorageHandler
+from phandose.patient import Patient
+from tests.synthetic_dicom import write_ct_series, write_standalone
+
+from pathlib import Path
+import tempfile
+import unittest
+
+
+class TestPackedStorageHandler(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.dir_dicom = Path(self.tmp_dir.name) / "dicom"
+        self.dir_storage = Path(self.tmp_dir.name) / "hub"
+
+        self.dicom_paths = write_ct_series(self.dir_dicom / "CT", n_slices=6, series_instance_uid="1.2.3.10")
+        write_standalone(self.dir_dicom / "RD" / "dose.dcm", "RTDOSE", sop_instance_uid="1.2.3.20")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_save_patient(self):
+
+        storage_handler = PackedStorageHandler(dir_storage=self.dir_storage)
+        patient = Patient.from_dir_dicom(patient_id="SYNTHETIC", dir_dicom=self.dir_dicom)
+
+        report = storage_handler.save_patient(patient)
+        self.assertEqual(report.files_copied, 2)
+
+        # The scan is stored as a single archive, which the modality reads from :
+        path_archive = self.dir_storage / "SYNTHETIC" / "CT" / "1.2.3.10.series"
+        self.assertEqual([path.name for path in (self.dir_storage / "SYNTHETIC" / "CT").iterdir()], [path_archive.name])
+
+        ct = patient.get_modality("1.2.3.10")
+        self.assertEqual(ct.path_archive, path_archive)
+        self.assertEqual([float(ds.ImagePositionPatient[2]) for ds in ct.dicom()], [2.5 * i for i in range(6)])
+
+        # The packed patient is serialized, and saved again without repacking :
+        patient = Patient.from_dict(patient.to_dict())
+        self.assertEqual(patient.get_modality("1.2.3.10").path_archive, path_archive)
+
+        report = storage_handler.save_patient(Patient.from_dir_dicom(patient_id="SYNTHETIC", dir_dicom=self.dir_dicom))
+        self.assertEqual((report.files_copied, report.files_skipped), (0, 2))
+
+        storage_handler.delete_modality(patient_id="SYNTHETIC", modality=ct)
+        self.assertFalse(path_archive.exists())
+
+        storage_handler.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,170 @@
+from phandose.patient_hub import LocalPatientRepository
+from phandose.patient import Patient
+
+from pymongo import UpdateOne
+from types import SimpleNamespace
+import unittest
+
+try:
+    import mongomock
+except ImportError:
+    mongomock = None
+
+
+def mongomock_supports_bulk_write() -> bool:
+    """ Older mongomock releases can't run the bulk writes of recent pymongo releases """
+
+    try:
+        mongomock.MongoClient().db.collection.bulk_write([UpdateOne({}, {"$set": {"a": 1}}, upsert=True)])
+        return True
+    except TypeError:
+        return False
+
+
+def make_patient(patient_id: str, modality_types: list[str]) -> Patient:
+
+    return Patient.from_dict({"patient_id": patient_id,
+                              "modalities": [{"modality_id": f"{patient_id}.{i}",
+                                              "modality_type": modality_type,
+                                              "series_description": modality_type,
+                                              "path_dicom": f"/hub/{patient_id}/{modality_type}/{i}.dcm"}
+                                             for i, modality_type in enumerate(modality_types)]})
+
+
+class StubCollection:
+    """ A collection recording its bulk writes, and applying their upserts to documents kept by patient ID """
+
+    def __init__(self):
+        self.documents = {}
+        self.list_bulk_writes = []
+
+    def create_index(self, keys, **kwargs):
+        pass
+
+    def bulk_write(self, requests: list[UpdateOne], ordered: bool = True):
+
+        self.list_bulk_writes.append((list(requests), ordered))
+
+        upserted_count, matched_count = 0, 0
+        for request in requests:
+            patient_id = request._filter["patient_id"]
+            if patient_id in self.documents:
+                matched_count += 1
+            else:
+                upserted_count += 1
+                self.documents[patient_id] = dict(request._doc["$setOnInsert"])
+
+            self.documents[patient_id].update(request._doc["$set"])
+
+        return SimpleNamespace(upserted_count=upserted_count, matched_count=matched_count)
+
+
+class TestAddPatients(unittest.TestCase):
+    """ Test the bulk writes of add_patients, without depending on the bulk write support of mongomock """
+
+    def setUp(self):
+        self.collection = StubCollection()
+        self.repository = LocalPatientRepository(client={"phandose_db": {"patients": self.collection}})
+
+    def test_batches(self):
+
+        dict_counts = self.repository.add_patients([make_patient(f"P{i}", ["RS"]) for i in range(5)], batch_size=2)
+        self.assertEqual(dict_counts, {"inserted": 5, "updated": 0})
+
+        # One unordered bulk write of upserts per batch of patients :
+        self.assertEqual([len(requests) for requests, _ in self.collection.list_bulk_writes], [2, 2, 1])
+        self.assertTrue(all(ordered is False for _, ordered in self.collection.list_bulk_writes))
+
+        request = self.collection.list_bulk_writes[0][0][0]
+        self.assertEqual(request._filter, {"patient_id": "P0"})
+        self.assertTrue(request._upsert)
+        self.assertEqual(set(request._doc["$setOnInsert"]), {"created_at"})
+        self.assertNotIn("created_at", request._doc["$set"])
+
+    def test_keep_created_at(self):
+
+        self.repository.add_patients([make_patient("P0", ["RS"])])
+        created_at = self.collection.documents["P0"]["created_at"]
+
+        dict_counts = self.repository.add_patients([make_patient("P0", ["RS", "RD"]), make_patient("P9", ["RS"])])
+        self.assertEqual(dict_counts, {"inserted": 1, "updated": 1})
+
+        document = self.collection.documents["P0"]
+        self.assertEqual(document["created_at"], created_at)
+        self.assertGreaterEqual(document["updated_at"], created_at)
+        self.assertEqual(len(document["modalities"]), 2)
+
+
+@unittest.skipIf(mongomock is None, "mongomock is not installed")
+class TestPatientRepository(unittest.TestCase):
+
+    def setUp(self):
+        self.repository = LocalPatientRepository(client=mongomock.MongoClient())
+
+    def test_indexes(self):
+
+        dict_indexes = self.repository.patients.index_information()
+        self.assertTrue(any(index["key"] == [("patient_id", 1)] and index.get("unique")
+                            for index in dict_indexes.values()))
+        self.assertTrue(any(index["key"] == [("modalities.modality_id", 1)] for index in dict_indexes.values()))
+
+    def test_add_patient_duplicate(self):
+
+        self.repository.add_patient(make_patient("P1", ["RS"]))
+        with self.assertRaises(ValueError):
+            self.repository.add_patient(make_patient("P1", ["RS"]))
+
+    @unittest.skipIf(mongomock is not None and not mongomock_supports_bulk_write(),
+                     "mongomock doesn't support the bulk writes of this pymongo release")
+    def test_add_patients(self):
+
+        dict_counts = self.repository.add_patients([make_patient(f"P{i}", ["RS"]) for i in range(5)], batch_size=2)
+        self.assertEqual(dict_counts, {"inserted": 5, "updated": 0})
+
+        # Adding them again updates them, and keeps their creation date :
+        created_at = self.repository.get_patient_document("P0", projection=["created_at"])["created_at"]
+        dict_counts = self.repository.add_patients([make_patient("P0", ["RS", "RD"]), make_patient("P9", ["RS"])])
+        self.assertEqual(dict_counts, {"inserted": 1, "updated": 1})
+
+        document = self.repository.get_patient_document("P0")
+        self.assertEqual(document["created_at"], created_at)
+        self.assertEqual(len(document["modalities"]), 2)
+        self.assertEqual(self.repository.patients.count_documents({}), 6)
+
+    def test_get_patient(self):
+
+        self.repository.add_patient(make_patient("P1", ["RS", "RD"]))
+
+        patient = self.repository.get_patient("P1")
+        self.assertEqual(patient.patient_id, "P1")
+        self.assertEqual([modality.modality_type for modality in patient.list_modalities], ["RS", "RD"])
+        self.assertIsNone(self.repository.get_patient("P2"))
+
+        document = self.repository.get_patient_document("P1", projection={"_id": 0, "patient_id": 1})
+        self.assertEqual(document, {"patient_id": "P1"})
+
+    def test_get_patients(self):
+
+        for patient in [make_patient("P1", ["RS", "RD"]), make_patient("P2", ["RS"]), make_patient("P3", ["RP"])]:
+            self.repository.add_patient(patient)
+
+        list_patients = self.repository.get_patients(["P1", "P3", "P4"])
+        self.assertEqual(sorted(patient.patient_id for patient in list_patients), ["P1", "P3"])
+        self.assertEqual(len(self.repository.get_patients()), 3)
+
+    def test_find_patients(self):
+
+        for patient in [make_patient("P1", ["RS", "RD"]), make_patient("P2", ["RS"]), make_patient("P3", ["RP", "RD"])]:
+            self.repository.add_patient(patient)
+
+        self.assertEqual(sorted(self.repository.find_patients()), ["P1", "P2", "P3"])
+        self.assertEqual(sorted(self.repository.find_patients(has_rtdose=True)), ["P1", "P3"])
+        self.assertEqual(self.repository.find_patients(has_rtdose=False), ["P2"])
+        self.assertEqual(self.repository.find_patients(modality_type="RS", has_rtdose=True), ["P1"])
+
+        documents = self.repository.find_patients(modality_type="RP", projection={"_id": 0, "patient_id": 1})
+        self.assertEqual(documents, [{"patient_id": "P3"}])
+
+
+if __name__ == "__main__":
+    unittest.main()
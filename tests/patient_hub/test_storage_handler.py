@@ -0,0 +1,140 @@
+from phandose.patient_hub import LocalStorageHandler
+from phandose.patient_hub.file_transfer import transfer_file
+from phandose.patient import Patient
+from tests.synthetic_dicom import write_ct_series, write_standalone
+
+from unittest.mock import patch
+from pathlib import Path
+import tempfile
+import unittest
+import shutil
+import os
+
+
+class TestLocalStorageHandler(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.dir_dicom = Path(self.tmp_dir.name) / "dicom"
+        self.dir_storage = Path(self.tmp_dir.name) / "hub"
+
+        write_ct_series(self.dir_dicom / "CT", n_slices=6, series_instance_uid="1.2.3.10")
+        write_standalone(self.dir_dicom / "RD" / "dose.dcm", "RTDOSE", sop_instance_uid="1.2.3.20")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def load_patient(self) -> Patient:
+        return Patient.from_dir_dicom(patient_id="SYNTHETIC", dir_dicom=self.dir_dicom)
+
+    def test_incremental_save(self):
+
+        storage_handler = LocalStorageHandler(dir_storage=self.dir_storage, max_workers=4)
+
+        patient = self.load_patient()
+        report = storage_handler.save_patient(patient)
+        self.assertEqual((report.files_copied, report.files_skipped), (7, 0))
+        self.assertGreater(report.bytes_copied, 0)
+
+        ct = patient.get_modality("1.2.3.10")
+        self.assertTrue(all(path.parent == self.dir_storage / "SYNTHETIC" / "CT" / "1.2.3.10"
+                            for path in ct.dicom_paths))
+        self.assertTrue(all(path.is_file() for path in ct.dicom_paths))
+
+        # Saving the patient again only skips the identical files :
+        report = storage_handler.save_patient(self.load_patient())
+        self.assertEqual((report.files_copied, report.files_skipped), (0, 7))
+
+        # A modified source file is copied again :
+        path_rtdose = self.dir_dicom / "RD" / "dose.dcm"
+        os.utime(path_rtdose, ns=(0, 0))
+        report = storage_handler.save_patient(self.load_patient())
+        self.assertEqual((report.files_copied, report.files_skipped), (1, 6))
+
+        self.assertEqual(storage_handler.report.files_copied, 8)
+        storage_handler.close()
+
+    def test_hardlink_save(self):
+
+        storage_handler = LocalStorageHandler(dir_storage=self.dir_storage, transfer_mode="hardlink")
+        patient = self.load_patient()
+        path_src = patient.get_modality("1.2.3.20").path_dicom
+
+        report = storage_handler.save_patient(patient)
+        self.assertEqual((report.files_linked, report.files_copied), (7, 0))
+        self.assertTrue(os.path.samefile(path_src, patient.get_modality("1.2.3.20").path_dicom))
+
+        storage_handler.close()
+
+    def test_deduplicated_save(self):
+
+        # The same DICOM files, exported under two patient folders at different times :
+        shutil.copytree(self.dir_dicom, Path(self.tmp_dir.name) / "dicom_copy")
+        for path_dicom in (Path(self.tmp_dir.name) / "dicom_copy").rglob("*.dcm"):
+            os.utime(path_dicom, ns=(10 ** 18, 10 ** 18))
+
+        storage_handler = LocalStorageHandler(dir_storage=self.dir_storage, deduplicate=True)
+        blob_store = storage_handler.blob_store
+
+        report = storage_handler.save_patient(Patient.from_dir_dicom("P1", self.dir_dicom))
+        self.assertEqual(report.files_copied, 7)
+
+        patient = Patient.from_dir_dicom("P2", Path(self.tmp_dir.name) / "dicom_copy")
+        report = storage_handler.save_patient(patient)
+        self.assertEqual((report.files_copied, report.files_linked), (0, 7))
+
+        stats = blob_store.get_stats()
+        self.assertEqual((stats["blobs"], stats["links"]), (7, 14))
+        self.assertEqual(stats["deduplicated_bytes"], stats["stored_bytes"])
+        self.assertTrue(os.path.samefile(self.dir_storage / "P1" / "RD" / "dose.dcm",
+                                         self.dir_storage / "P2" / "RD" / "dose.dcm"))
+
+        # Saving the duplicates again skips them from the stat of their sources, without reading them :
+        with patch.object(blob_store, "get_blob_key", wraps=blob_store.get_blob_key) as mock_get_blob_key:
+            report = storage_handler.save_patient(Patient.from_dir_dicom("P2", Path(self.tmp_dir.name) / "dicom_copy"))
+            self.assertEqual((report.files_copied, report.files_linked, report.files_skipped), (0, 0, 7))
+            mock_get_blob_key.assert_not_called()
+
+        # The blobs are deleted with their last link only :
+        storage_handler.delete_modality(patient_id="P2", modality=patient.get_modality("1.2.3.20"))
+        self.assertFalse((self.dir_storage / "P2" / "RD" / "dose.dcm").exists())
+        self.assertEqual(blob_store.get_stats()["blobs"], 7)
+
+        storage_handler.delete_patient("P1")
+        self.assertEqual(blob_store.get_stats()["blobs"], 6)
+
+        storage_handler.delete_patient("P2")
+        self.assertEqual(blob_store.get_stats(), {"blobs": 0, "links": 0, "stored_bytes": 0, "deduplicated_bytes": 0})
+        self.assertEqual(list(blob_store.dir_blobs.rglob("*.blob")), [])
+
+        storage_handler.close()
+
+
+class TestTransferFile(unittest.TestCase):
+
+    def test_verify_modes(self):
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path_src, path_dst = Path(tmp_dir) / "src.dcm", Path(tmp_dir) / "dst.dcm"
+            path_src.write_bytes(b"abcd")
+
+            self.assertEqual(transfer_file(path_src, path_dst), ("copied", 4))
+            self.assertEqual(path_dst.read_bytes(), b"abcd")
+            self.assertEqual(transfer_file(path_src, path_dst), ("skipped", 4))
+
+            # Same size, different content and modification time :
+            path_dst.write_bytes(b"abce")
+            self.assertEqual(transfer_file(path_src, path_dst, verify="size"), ("skipped", 4))
+            self.assertEqual(transfer_file(path_src, path_dst, verify="checksum"), ("copied", 4))
+            self.assertEqual(path_dst.read_bytes(), b"abcd")
+
+            # Same content, different modification time :
+            os.utime(path_dst, ns=(0, 0))
+            self.assertEqual(transfer_file(path_src, path_dst, verify="checksum"), ("skipped", 4))
+            self.assertEqual(transfer_file(path_src, path_dst, verify="mtime"), ("copied", 4))
+
+            self.assertEqual(sorted(path.name for path in Path(tmp_dir).iterdir()), ["dst.dcm", "src.dcm"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+from phandose.segmentation import SegmentationCache, get_volume_hash, get_segmentation_key
+
+from pathlib import Path
+import nibabel as nib
+import numpy as np
+import tempfile
+import shutil
+import unittest
+
+
+def write_segmentation(dir_segmentation: Path, n_bytes: int, name: str = "liver.nii.gz") -> Path:
+
+    dir_segmentation.mkdir(parents=True, exist_ok=True)
+    (dir_segmentation / name).write_bytes(bytes(n_bytes))
+    return dir_segmentation
+
+
+class TestSegmentationCache(unittest.TestCase):
+
+    def setUp(self):
+
+        self.dir_tmp = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.dir_tmp, ignore_errors=True)
+
+    def test_store_and_fetch(self):
+
+        with SegmentationCache(self.dir_tmp / "cache") as cache:
+            self.assertFalse(cache.fetch("key", self.dir_tmp / "output"))
+
+            cache.store("key", write_segmentation(self.dir_tmp / "result", 100), task="total")
+            self.assertIn("key", cache)
+            self.assertEqual(cache.get_size(), 100)
+
+            self.assertTrue(cache.fetch("key", self.dir_tmp / "output"))
+            self.assertEqual((self.dir_tmp / "output" / "liver.nii.gz").stat().st_size, 100)
+
+        # The entries persist when the cache is opened again :
+        with SegmentationCache(self.dir_tmp / "cache") as cache:
+            self.assertEqual(len(cache), 1)
+
+    def test_lru_eviction(self):
+
+        with SegmentationCache(self.dir_tmp / "cache", max_size=250) as cache:
+            for key in ("a", "b"):
+                cache.store(key, write_segmentation(self.dir_tmp / key, 100), task="total")
+
+            # Accessing "a" makes "b" the least recently used entry, evicted when "c" exceeds the size :
+            self.assertTrue(cache.fetch("a", self.dir_tmp / "output"))
+            cache.store("c", write_segmentation(self.dir_tmp / "c", 100), task="total")
+
+            self.assertEqual(len(cache), 2)
+            self.assertNotIn("b", cache)
+            self.assertFalse((cache.dir_cache / "entries" / "b").exists())
+            self.assertLessEqual(cache.get_size(), 250)
+
+    def test_keys(self):
+
+        data = np.arange(4 * 5 * 6, dtype=np.int16).reshape(4, 5, 6)
+        scan = nib.Nifti1Image(data, np.eye(4))
+        volume_hash = get_volume_hash(scan)
+
+        # The hash depends on the content of the scan only, not on its memory layout :
+        self.assertEqual(volume_hash, get_volume_hash(nib.Nifti1Image(np.asfortranarray(data), np.eye(4))))
+        self.assertNotEqual(volume_hash, get_volume_hash(nib.Nifti1Image(data + 1, np.eye(4))))
+        self.assertNotEqual(volume_hash, get_volume_hash(nib.Nifti1Image(data, 2 * np.eye(4))))
+        self.assertNotEqual(volume_hash, get_volume_hash(nib.Nifti1Image(data.astype(np.int32), np.eye(4))))
+
+        key = get_segmentation_key(volume_hash, "total", {"body_seg": False, "fast": False})
+        self.assertEqual(key, get_segmentation_key(volume_hash, "total", {"fast": False, "body_seg": False}))
+        self.assertNotEqual(key, get_segmentation_key(volume_hash, "body", {"body_seg": False, "fast": False}))
+        self.assertNotEqual(key, get_segmentation_key(volume_hash, "total", {"body_seg": False, "fast": True}))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,99 @@
+""" Synthetic DICOM files, written to temporary directories by the tests """
+
+from pydicom.dataset import Dataset, FileMetaDataset
+from pydicom.sequence import Sequence
+from pydicom.uid import ExplicitVRLittleEndian, generate_uid
+from pathlib import Path
+import numpy as np
+
+SOP_CLASS_UIDS = {"CT": "1.2.840.10008.5.1.4.1.1.2",
+                  "RTDOSE": "1.2.840.10008.5.1.4.1.1.481.2",
+                  "RTSTRUCT": "1.2.840.10008.5.1.4.1.1.481.3",
+                  "RTPLAN": "1.2.840.10008.5.1.4.1.1.481.5"}
+
+
+def make_dataset(modality: str, sop_instance_uid: str = None, series_instance_uid: str = None,
+                 study_instance_uid: str = "1.2.3.4", series_description: str = "synthetic") -> Dataset:
+
+    file_meta = FileMetaDataset()
+    file_meta.MediaStorageSOPClassUID = SOP_CLASS_UIDS[modality]
+    file_meta.MediaStorageSOPInstanceUID = sop_instance_uid or generate_uid()
+    file_meta.TransferSyntaxUID = ExplicitVRLittleEndian
+
+    ds = Dataset()
+    ds.file_meta = file_meta
+    ds.is_little_endian, ds.is_implicit_VR = True, False
+    ds.SOPClassUID = file_meta.MediaStorageSOPClassUID
+    ds.SOPInstanceUID = file_meta.MediaStorageSOPInstanceUID
+    ds.SeriesInstanceUID = series_instance_uid or generate_uid()
+    ds.StudyInstanceUID = study_instance_uid
+    ds.PatientID = "SYNTHETIC"
+    ds.Modality = modality
+    ds.SeriesDescription = series_description
+
+    return ds
+
+
+def write_ct_series(dir_dicom: Path, n_slices: int = 5, series_instance_uid: str = None, shape=(8, 8),
+                    z_start: float = 0.0, z_step: float = 2.5, code_meaning: str = "TDM") -> list[Path]:
+    """ Write the slices of a CT series, in a shuffled order of instance numbers, returns their paths sorted by z """
+
+    dir_dicom.mkdir(parents=True, exist_ok=True)
+    series_instance_uid = series_instance_uid or generate_uid()
+
+    list_paths = []
+    for i in range(n_slices):
+        ds = make_dataset("CT", series_instance_uid=series_instance_uid)
+
+        procedure_code = Dataset()
+        procedure_code.CodeMeaning = code_meaning
+        ds.ProcedureCodeSequence = Sequence([procedure_code])
+
+        ds.InstanceNumber = n_slices - i
+        ds.ImagePositionPatient = [-10.0, -10.0, z_start + i * z_step]
+        ds.ImageOrientationPatient = [1, 0, 0, 0, 1, 0]
+        ds.PixelSpacing = [2.5, 2.5]
+        ds.SliceThickness = z_step
+        ds.Rows, ds.Columns = shape
+        ds.BitsAllocated, ds.BitsStored, ds.HighBit = 16, 16, 15
+        ds.PixelRepresentation, ds.SamplesPerPixel = 1, 1
+        ds.PhotometricInterpretation = "MONOCHROME2"
+        ds.RescaleSlope, ds.RescaleIntercept = 1, -1024
+        ds.PixelData = np.full(shape, 1000 + i, dtype=np.int16).tobytes()
+
+        path_dicom = dir_dicom / f"CT_{n_slices - i:04d}.dcm"
+        ds.save_as(str(path_dicom), write_like_original=False)
+        list_paths.append(path_dicom)
+
+    return list_paths
+
+
+def write_standalone(path_dicom: Path, modality: str, sop_instance_uid: str = None, **attributes) -> Path:
+    """ Write an RTDOSE, RTSTRUCT or RTPLAN file, with the given attributes """
+
+    path_dicom.parent.mkdir(parents=True, exist_ok=True)
+
+    ds = make_dataset(modality, sop_instance_uid=sop_instance_uid)
+    for keyword, value in attributes.items():
+        setattr(ds, keyword, value)
+
+    ds.save_as(str(path_dicom), write_like_original=False)
+    return path_dicom
+
+
+def write_rtdose(path_dicom: Path, dose_grid: np.ndarray, origin=(0.0, 0.0, 0.0), spacing=(2.0, 2.0),
+                 frame_offsets=None, dose_grid_scaling: float = 1e-3, sop_instance_uid: str = None) -> Path:
+    """ Write a multi-frame RTDOSE of the given dose grid (n_frames, n_rows, n_cols), in Gy """
+
+    n_frames, n_rows, n_cols = dose_grid.shape
+    frame_offsets = [2.0 * k for k in range(n_frames)] if frame_offsets is None else list(frame_offsets)
+
+    return write_standalone(path_dicom, "RTDOSE", sop_instance_uid=sop_instance_uid,
+                            DoseSummationType="BEAM", DoseUnits="GY", DoseGridScaling=dose_grid_scaling,
+                            ImagePositionPatient=list(origin), ImageOrientationPatient=[1, 0, 0, 0, 1, 0],
+                            PixelSpacing=list(spacing), SliceThickness=frame_offsets[1] - frame_offsets[0]
+                            if n_frames > 1 else 0, GridFrameOffsetVector=frame_offsets,
+                            Rows=n_rows, Columns=n_cols, NumberOfFrames=n_frames,
+                            BitsAllocated=32, BitsStored=32, HighBit=31,
+                            PixelRepresentation=0, SamplesPerPixel=1, PhotometricInterpretation="MONOCHROME2",
+                            PixelData=np.rint(dose_grid / dose_grid_scaling).astype(np.uint32).tobytes())
@@ -0,0 +1,80 @@
+from phandose.utils.dicom_utils import scan_dicom_headers
+from tests.synthetic_dicom import write_ct_series, write_standalone
+
+from unittest.mock import patch
+from pathlib import Path
+import pydicom as dcm
+import tempfile
+import unittest
+
+
+class TestScanDicomHeaders(unittest.TestCase):
+
+    def setUp(self):
+
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.dir_root = Path(self.tmp_dir.name)
+
+        self.list_ct_paths = write_ct_series(self.dir_root / "CT", n_slices=5, series_instance_uid="1.2.3.10")
+        self.path_rtdose = write_standalone(self.dir_root / "RD" / "dose.dcm", "RTDOSE", sop_instance_uid="1.2.3.20")
+        self.path_invalid = self.dir_root / "RD" / "not_a_dicom.dcm"
+        self.path_invalid.write_text("not a DICOM file")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_scan(self):
+
+        list_headers = list(scan_dicom_headers(self.dir_root, tags=["SOPInstanceUID", "Modality"], workers=3))
+
+        self.assertEqual({header.path for header in list_headers}, {*self.list_ct_paths, self.path_rtdose})
+        for header in list_headers:
+            self.assertTrue(header.is_dicom)
+            self.assertIsNone(header.error)
+            self.assertEqual(header.size, header.path.stat().st_size)
+            self.assertIsNotNone(header.get("SOPInstanceUID"))
+
+            # Only the requested tags are read :
+            self.assertIsNone(header.get("SeriesDescription"))
+            self.assertNotIn("PixelData", header.dataset)
+
+    def test_header_only(self):
+
+        with patch("pydicom.dcmread", wraps=dcm.dcmread) as mock_dcmread:
+            list(scan_dicom_headers(self.dir_root))
+
+        self.assertEqual(mock_dcmread.call_count, 7)
+        self.assertTrue(all(call.kwargs["stop_before_pixels"] for call in mock_dcmread.call_args_list))
+
+    def test_include_invalid(self):
+
+        list_headers = [header for header in scan_dicom_headers(self.dir_root, include_invalid=True)
+                        if not header.is_dicom]
+
+        self.assertEqual([header.path for header in list_headers], [self.path_invalid])
+        self.assertIsInstance(list_headers[0].error, Exception)
+        self.assertEqual(list_headers[0].get("Modality", "missing"), "missing")
+
+    def test_dangling_symlink(self):
+
+        path_dangling = self.dir_root / "CT" / "dangling.dcm"
+        path_dangling.symlink_to(self.dir_root / "missing.dcm")
+
+        # The dangling link doesn't abort the scan, and is yielded as an invalid file :
+        list_headers = list(scan_dicom_headers(self.dir_root, include_invalid=True))
+        self.assertEqual(sum(header.is_dicom for header in list_headers), 6)
+
+        header = next(header for header in list_headers if header.path == path_dangling)
+        self.assertIsInstance(header.error, OSError)
+        self.assertIsNone(header.size)
+        self.assertIsNone(header.mtime_ns)
+
+    def test_early_close(self):
+
+        headers = scan_dicom_headers(self.dir_root, workers=1)
+        self.assertTrue(next(headers).is_dicom)
+        headers.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,157 @@
+from phandose.utils import DicomIndex, dicom_utils
+from tests.synthetic_dicom import write_ct_series, write_standalone
+
+from unittest.mock import patch
+from pathlib import Path
+import pydicom as dcm
+import tempfile
+import unittest
+import os
+
+
+class TestDicomIndex(unittest.TestCase):
+
+    def setUp(self):
+
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.dir_root = Path(self.tmp_dir.name) / "patient"
+        self.path_index = Path(self.tmp_dir.name) / "index" / "patient.sqlite"
+
+        self.list_ct_paths = write_ct_series(self.dir_root / "CT", n_slices=4, series_instance_uid="1.2.3.10")
+        self.path_rtdose = write_standalone(self.dir_root / "RD" / "dose.dcm", "RTDOSE", sop_instance_uid="1.2.3.20")
+        (self.dir_root / "RD" / "not_a_dicom.dcm").write_text("not a DICOM file")
+
+        self.addCleanup(DicomIndex._opened_indexes.clear)
+
+    def tearDown(self):
+        for index in DicomIndex._opened_indexes.values():
+            index.close()
+        self.tmp_dir.cleanup()
+
+    def test_scan_and_lookups(self):
+
+        index = DicomIndex(self.dir_root, path_index=self.path_index)
+        self.assertEqual(index.scan(), {"indexed": 6, "removed": 0, "unchanged": 0})
+        self.assertEqual(index.path_index, self.path_index)
+        self.assertEqual(len(index), 5)
+
+        self.assertEqual(index.find_scan_paths("1.2.3.10"), [p.resolve() for p in self.list_ct_paths])
+        self.assertEqual(index.find_paths("1.2.3.20"), [self.path_rtdose.resolve()])
+        self.assertEqual(index.find_paths("unknown"), [])
+        self.assertIn("1.2.3.10", index.get_series_instance_uids())
+
+    def test_incremental_scan(self):
+
+        DicomIndex(self.dir_root, path_index=self.path_index).scan()
+
+        # Reopening the index doesn't read any header if nothing changed :
+        index = DicomIndex(self.dir_root, path_index=self.path_index)
+        with patch("phandose.utils.dicom_utils.dcm.dcmread", wraps=dcm.dcmread) as mock_dcmread:
+            self.assertEqual(index.scan(), {"indexed": 0, "removed": 0, "unchanged": 6})
+            mock_dcmread.assert_not_called()
+
+        # Only the modified and new files are read, the deleted ones are removed :
+        os.remove(self.list_ct_paths[0])
+        write_standalone(self.path_rtdose, "RTDOSE", sop_instance_uid="1.2.3.21")
+        stat = self.path_rtdose.stat()
+        os.utime(self.path_rtdose, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        write_standalone(self.dir_root / "RP" / "plan.dcm", "RTPLAN", sop_instance_uid="1.2.3.30")
+
+        with patch("phandose.utils.dicom_utils.dcm.dcmread", wraps=dcm.dcmread) as mock_dcmread:
+            self.assertEqual(index.scan(), {"indexed": 2, "removed": 1, "unchanged": 4})
+            self.assertEqual(mock_dcmread.call_count, 2)
+
+        self.assertEqual(index.find_paths("1.2.3.20"), [])
+        self.assertEqual(index.find_paths("1.2.3.21"), [self.path_rtdose.resolve()])
+        self.assertEqual(len(index.find_scan_paths("1.2.3.10")), 3)
+
+    def test_dangling_symlink(self):
+
+        (self.dir_root / "CT" / "dangling.dcm").symlink_to(self.dir_root / "missing.dcm")
+
+        # The dangling link is skipped :
+        index = DicomIndex(self.dir_root, path_index=self.path_index)
+        self.assertEqual(index.scan(), {"indexed": 6, "removed": 0, "unchanged": 0})
+        self.assertEqual(len(index.find_scan_paths("1.2.3.10")), 4)
+
+    def test_opened_indexes_bounded(self):
+
+        index = DicomIndex.open(self.dir_root, path_index=self.path_index)
+
+        with patch("phandose.utils.dicom_index.MAX_OPENED_INDEXES", 2):
+            for i in range(3):
+                DicomIndex.open(self.dir_root / "CT", scan=False, path_index=self.path_index.with_name(f"{i}.sqlite"))
+
+            # The least recently opened indexes are closed :
+            self.assertEqual(len(DicomIndex._opened_indexes), 2)
+            self.assertNotIn(index, DicomIndex._opened_indexes.values())
+            self.assertIsNone(index._sqlite_connection)
+
+        # An evicted index reconnects if it is still used :
+        self.assertEqual(len(index.find_scan_paths("1.2.3.10")), 4)
+
+    def test_lookup_helpers(self):
+
+        path_index_ct = self.path_index.with_name("ct.sqlite")
+
+        self.assertEqual(dicom_utils.find_dicom_path(self.dir_root, "1.2.3.20", path_index=self.path_index),
+                         self.path_rtdose.resolve())
+        self.assertEqual(dicom_utils.find_dicom_paths_of_scan(self.dir_root, "1.2.3.10", path_index=self.path_index),
+                         [p.resolve() for p in self.list_ct_paths])
+        self.assertEqual(dicom_utils.get_series_instance_uid_from_directory(self.dir_root / "CT",
+                                                                            path_index=path_index_ct), "1.2.3.10")
+
+        with self.assertRaises(ValueError):
+            dicom_utils.find_dicom_path(self.dir_root, "unknown", path_index=self.path_index)
+
+        with self.assertRaises(ValueError):
+            dicom_utils.get_series_instance_uid_from_directory(self.dir_root, path_index=self.path_index)
+
+    def test_lookup_new_files(self):
+
+        path_index_ct = self.path_index.with_name("ct.sqlite")
+        self.assertEqual(dicom_utils.get_series_instance_uid_from_directory(self.dir_root / "CT",
+                                                                            path_index=path_index_ct), "1.2.3.10")
+        self.assertEqual(len(dicom_utils.find_dicom_paths_of_scan(self.dir_root, "1.2.3.10",
+                                                                  path_index=self.path_index)), 4)
+
+        # Slices added to the indexed series, and another series, are found by the next lookups :
+        write_ct_series(self.dir_root / "CT" / "more", n_slices=5, series_instance_uid="1.2.3.10", z_start=100.0)
+        write_ct_series(self.dir_root / "CT" / "other", n_slices=2, series_instance_uid="1.2.3.11")
+
+        self.assertEqual(len(dicom_utils.find_dicom_paths_of_scan(self.dir_root, "1.2.3.10",
+                                                                  path_index=self.path_index)), 9)
+        with self.assertRaises(ValueError):
+            dicom_utils.get_series_instance_uid_from_directory(self.dir_root / "CT", path_index=path_index_ct)
+
+    def test_lookup_without_scan(self):
+
+        # The first lookup scans the empty index :
+        dicom_utils.find_dicom_paths_of_scan(self.dir_root, "1.2.3.10", path_index=self.path_index)
+
+        # A hit whose files didn't change is answered from the index, without walking the directory :
+        with patch.object(DicomIndex, "scan", side_effect=DicomIndex.scan, autospec=True) as mock_scan:
+            self.assertEqual(dicom_utils.find_dicom_path(self.dir_root, "1.2.3.20", path_index=self.path_index),
+                             self.path_rtdose.resolve())
+            self.assertEqual(len(dicom_utils.find_dicom_paths_of_scan(self.dir_root, "1.2.3.10",
+                                                                      path_index=self.path_index)), 4)
+            mock_scan.assert_not_called()
+
+        # A stale hit, or a miss, re-scans the directory :
+        with patch.object(DicomIndex, "scan", side_effect=DicomIndex.scan, autospec=True) as mock_scan:
+            os.remove(self.list_ct_paths[0])
+            self.assertEqual(len(dicom_utils.find_dicom_paths_of_scan(self.dir_root, "1.2.3.10",
+                                                                      path_index=self.path_index)), 3)
+
+            write_standalone(self.dir_root / "RP" / "plan.dcm", "RTPLAN", sop_instance_uid="1.2.3.30")
+            self.assertEqual(dicom_utils.find_dicom_path(self.dir_root, "1.2.3.30", path_index=self.path_index),
+                             (self.dir_root / "RP" / "plan.dcm").resolve())
+            self.assertEqual(mock_scan.call_count, 2)
+
+        # Files added to an indexed series are found after a refresh :
+        index = DicomIndex.open(self.dir_root, scan=False, path_index=self.path_index)
+        write_standalone(self.dir_root / "CT" / "extra.dcm", "CT", sop_instance_uid="1.2.3.40")
+        self.assertEqual(index.refresh(), {"indexed": 1, "removed": 0, "unchanged": 6})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+from phandose.utils import (RateLimitedHandler,
+                            enable_queue_logging,
+                            disable_queue_logging,
+                            init_worker_logging,
+                            get_logger)
+
+from concurrent.futures import ProcessPoolExecutor
+import logging
+import queue
+import unittest
+
+
+class ListHandler(logging.Handler):
+    """ A handler keeping the formatted messages of the records """
+
+    def __init__(self, level: int = logging.NOTSET):
+        super().__init__(level=level)
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+
+def log_from_worker(patient_id: str):
+    get_logger("tests.utils.test_logger").warning("Processed patient %s", patient_id)
+
+
+class TestRateLimitedHandler(unittest.TestCase):
+
+    def test_cap_repeated_messages(self):
+
+        list_handler = ListHandler()
+        handler = RateLimitedHandler([list_handler], max_repeats=3, period=3600)
+        logger = logging.getLogger("tests.utils.test_logger.rate_limited")
+        logger.propagate = False
+        logger.addHandler(handler)
+        self.addCleanup(logger.removeHandler, handler)
+
+        for i in range(10):
+            logger.error("Error for file %s: %s", f"file_{i}.dcm", "invalid header")
+        logger.error("Another error")
+        logger.info("Not capped")
+
+        # The same template is capped, whatever its arguments, the other messages go through :
+        self.assertEqual(list_handler.messages, ["Error for file file_0.dcm: invalid header",
+                                                 "Error for file file_1.dcm: invalid header",
+                                                 "Error for file file_2.dcm: invalid header",
+                                                 "Another error",
+                                                 "Not capped"])
+
+        # The suppressed records are summarized :
+        handler.flush()
+        self.assertEqual(list_handler.messages[-1], "7 similar messages suppressed in 3600 s : Error for file %s: %s")
+
+
+class TestQueueLogging(unittest.TestCase):
+
+    def setUp(self):
+
+        self.list_handler = ListHandler(level=logging.INFO)
+        self.root_logger = logging.getLogger()
+        self.root_logger.addHandler(self.list_handler)
+        self.addCleanup(self.root_logger.removeHandler, self.list_handler)
+        self.addCleanup(disable_queue_logging)
+
+    def test_queue_logging(self):
+
+        enable_queue_logging(queue.Queue(), max_repeats=2)
+        self.assertNotIn(self.list_handler, self.root_logger.handlers)
+
+        for i in range(5):
+            get_logger("tests.utils.test_logger").warning("Error for file %s", i)
+        get_logger("tests.utils.test_logger").debug("Below the level of the handler")
+
+        # The records are emitted by the listener, and the handlers restored :
+        disable_queue_logging()
+        self.assertIn(self.list_handler, self.root_logger.handlers)
+        self.assertEqual(self.list_handler.messages, ["Error for file 0",
+                                                      "Error for file 1",
+                                                      "3 similar messages suppressed in 60 s : Error for file %s"])
+
+    def test_worker_processes(self):
+
+        log_queue = enable_queue_logging()
+
+        with ProcessPoolExecutor(max_workers=2,
+                                 initializer=init_worker_logging,
+                                 initargs=(log_queue,)) as executor:
+            list(executor.map(log_from_worker, ["P1", "P2", "P3"]))
+
+        disable_queue_logging()
+        self.assertEqual(sorted(self.list_handler.messages), ["Processed patient P1",
+                                                              "Processed patient P2",
+                                                              "Processed patient P3"])
+
+
+if __name__ == "__main__":
+    unittest.main()
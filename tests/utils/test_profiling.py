@@ -0,0 +1,106 @@
+from phandose.utils.profiling import Profiler, format_stats, merge_stats, profiled, span
+from phandose.utils import profiling
+
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+from pathlib import Path
+import tempfile
+import unittest
+import json
+
+
+@profiled
+def allocate(n_bytes: int) -> bytes:
+    return bytes(n_bytes)
+
+
+class TestProfiler(unittest.TestCase):
+
+    def setUp(self):
+
+        # Profile with a profiler of the test, not the one of the process :
+        self.profiler = Profiler()
+        patcher = mock.patch.object(profiling, "_profiler", self.profiler)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.profiler.disable)
+
+    def test_disabled(self):
+
+        with span("patient"):
+            allocate(10)
+
+        self.assertEqual(self.profiler.get_stats(), {})
+
+    def test_nested_spans(self):
+
+        self.profiler.enable(memory=True)
+
+        for patient_id in ("P1", "P2"):
+            with span("patient", patient_id=patient_id):
+                allocate(4 * 2 ** 20)
+                allocate(10)
+
+        stats = self.profiler.get_stats()
+        self.assertEqual(set(stats), {"patient", "patient/allocate"})
+        self.assertEqual(stats["patient"]["count"], 2)
+        self.assertEqual(stats["patient/allocate"]["count"], 4)
+        self.assertLessEqual(stats["patient/allocate"]["max_s"], stats["patient"]["total_s"])
+
+        # The peak memory of a span includes the peak of its children :
+        self.assertGreaterEqual(stats["patient/allocate"]["peak_memory_bytes"], 4 * 2 ** 20)
+        self.assertGreaterEqual(stats["patient"]["peak_memory_bytes"], 4 * 2 ** 20)
+
+        events = self.profiler.get_events()
+        self.assertEqual(len(events), 6)
+        self.assertEqual([event["args"]["patient_id"] for event in events if event["name"] == "patient"],
+                         ["P1", "P2"])
+
+    def test_threads(self):
+
+        self.profiler.enable()
+
+        # Each thread nests its spans in its own stack :
+        with span("patient"):
+            with ThreadPoolExecutor(max_workers=4) as executor:
+                list(executor.map(allocate, [10] * 8))
+
+        stats = self.profiler.get_stats()
+        self.assertEqual(stats["allocate"]["count"], 8)
+        self.assertEqual(stats["patient"]["count"], 1)
+        self.assertIsNone(stats["patient"]["peak_memory_bytes"])
+
+    def test_collect_and_merge(self):
+
+        self.profiler.enable()
+        with span("patient"):
+            allocate(10)
+
+        # The spans collected in a worker process are merged into the profiler of the main process :
+        collected = self.profiler.collect(reset=True)
+        self.assertEqual(self.profiler.get_stats(), {})
+
+        profiler_main = Profiler()
+        profiler_main.merge(collected)
+        profiler_main.merge(collected)
+
+        stats = profiler_main.get_stats()
+        self.assertEqual(stats["patient/allocate"]["count"], 2)
+        self.assertEqual(merge_stats({}, collected["stats"])["patient"]["count"], 1)
+        self.assertIn("patient/allocate", format_stats(stats))
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            profiler_main.write_json(Path(tmp_dir) / "profile.json")
+            profiler_main.write_chrome_trace(Path(tmp_dir) / "trace.json")
+
+            with open(Path(tmp_dir) / "trace.json") as f:
+                trace = json.load(f)
+            self.assertEqual(len(trace["traceEvents"]), 4)
+            self.assertTrue(all(event["ph"] == "X" for event in trace["traceEvents"]))
+
+            with open(Path(tmp_dir) / "profile.json") as f:
+                self.assertEqual(json.load(f)["stats"]["patient"]["count"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()